@@ -38,7 +38,7 @@ useEffect(() => {
         try {
             setLoading(true);
             let allFetchedProducts = [];
-            let nextUrl = `${API_BASE_URL}/api/all_products/`; // Start with the initial URL
+            let nextUrl = `${API_BASE_URL}/api/all_products/?pagination=cursor`; // Keyset pages: each page costs the same
 
             // Loop as long as there is a 'next' URL to follow
             while (nextUrl) {
@@ -0,0 +1,18 @@
+# admin_panel/management/commands/refresh_dashboard_stats.py
+from django.core.management.base import BaseCommand
+from admin_panel import stats
+
+
+class Command(BaseCommand):
+    help = 'Recount dashboard counters and recompute stale dashboard snapshots (run periodically, e.g. every minute)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Recompute every snapshot, stale or not')
+        parser.add_argument('--max-age', type=int, help='Seconds after which a snapshot is refreshed anyway')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            rows = stats.refresh()
+        else:
+            rows = stats.refresh_due(max_age=options['max_age'])
+        self.stdout.write(self.style.SUCCESS(f'Refreshed {rows} dashboard stats'))
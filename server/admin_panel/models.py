@@ -1,3 +1,22 @@
 from django.db import models
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
 
-# Create your models here.
+
+class DashboardStat(models.Model):
+    """
+    One materialized figure of the admin dashboard (see admin_panel.stats).
+
+    Counters (total_products, vendor_tier:premium, ...) live in `count` and
+    are adjusted by signals; lists and windowed sums live in `data` and are
+    recomputed by refresh_dashboard_stats when stale.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    count = models.BigIntegerField(default=0)
+    # Stored as DRF renders it, so cached rows serialize exactly like live ones
+    data = models.JSONField(null=True, blank=True, encoder=JSONEncoder)
+    is_stale = models.BooleanField(default=False)
+    refreshed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,42 @@
+# admin_panel/signals.py - Keep materialized dashboard stats current
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from authentication.models import UserProfile
+from products.models import Product
+
+from . import stats
+
+
+@receiver(post_save, sender=Product)
+def update_dashboard_stats_for_product(sender, instance, created, **kwargs):
+    using = instance._state.db
+    if created:
+        old = set()
+    else:
+        _, _, was_active = getattr(instance, '_loaded_counted_state', instance.counted_state())
+        old = stats.product_counters(was_active)
+    stats.adjust_counters(old, stats.product_counters(instance.is_active), using)
+    stats.mark_stale(using)
+
+
+@receiver(post_delete, sender=Product)
+def update_dashboard_stats_for_deleted_product(sender, instance, **kwargs):
+    using = instance._state.db
+    stats.adjust_counters(stats.product_counters(instance.is_active), set(), using)
+    stats.mark_stale(using)
+
+
+@receiver(post_save, sender=UserProfile)
+def update_dashboard_stats_for_profile(sender, instance, created, **kwargs):
+    """Move the profile between the customer/vendor/tier counters"""
+    old = set() if created else stats.profile_counters(
+        getattr(instance, '_loaded_role', instance.role),
+        getattr(instance, '_loaded_vendor_tier', instance.vendor_tier),
+    )
+    stats.adjust_counters(old, stats.profile_counters(instance.role, instance.vendor_tier), instance._state.db)
+
+
+@receiver(post_delete, sender=UserProfile)
+def update_dashboard_stats_for_deleted_profile(sender, instance, **kwargs):
+    stats.adjust_counters(stats.profile_counters(instance.role, instance.vendor_tier), set(), instance._state.db)
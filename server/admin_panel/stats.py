@@ -0,0 +1,183 @@
+# admin_panel/stats.py - Materialized admin dashboard statistics
+"""
+DashboardStatsView reads precomputed DashboardStat rows instead of running
+its aggregates over the whole catalogue on every load.
+
+- Counters (product, active product, customer, vendor and per-tier vendor
+  counts) are adjusted in place by admin_panel.signals when a Product or
+  UserProfile is saved or deleted.
+- Snapshots (7/30/90-day views/contacts and busiest categories/vendors from
+  analytics.rollup, top viewed/contacted, recent products) are marked
+  stale by the same signals and recomputed by
+  `python manage.py refresh_dashboard_stats`, which also recounts the
+  counters to correct drift from bulk writes (importer, view count flushes).
+  Snapshots older than settings.DASHBOARD_STATS['MAX_AGE'] seconds are
+  refreshed even when not marked stale, since their time windows move.
+- dashboard_stats(fresh=True) recomputes everything before reading.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from analytics.rollup import activity_by, activity_windows
+from authentication.models import UserProfile
+from products.models import Product
+
+from .models import DashboardStat
+
+DEFAULTS = {
+    'MAX_AGE': 300,
+}
+
+TOP_N = 10
+RECENT_N = 20
+
+COUNTERS = ('total_products', 'active_products', 'total_vendors', 'total_customers')
+TIER_COUNTERS = {tier: f'vendor_tier:{tier}' for tier, _ in UserProfile.TIER_CHOICES}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'DASHBOARD_STATS', {})}
+
+
+def product_counters(is_active):
+    """Counters a product with this state is counted in"""
+    return {'total_products', 'active_products'} if is_active else {'total_products'}
+
+
+def profile_counters(role, vendor_tier):
+    """Counters a profile with this role and tier is counted in"""
+    if role == 'vendor':
+        return {'total_vendors', TIER_COUNTERS.get(vendor_tier, f'vendor_tier:{vendor_tier}')}
+    if role == 'customer':
+        return {'total_customers'}
+    return set()
+
+
+def adjust_counters(old, new, using=None):
+    """Move one row from the counters in old to the counters in new"""
+    for names, delta in ((new - old, 1), (old - new, -1)):
+        if names:
+            DashboardStat.objects.using(using).filter(name__in=names).update(count=F('count') + delta)
+
+
+def mark_stale(using=None):
+    DashboardStat.objects.using(using).filter(name__in=SNAPSHOTS, is_stale=False).update(is_stale=True)
+
+
+def count_all():
+    """Recount every counter: one query over products, one over profiles"""
+    counts = defaultdict(int, dict.fromkeys([*COUNTERS, *TIER_COUNTERS.values()], 0))
+    products = Product.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+    )
+    counts['total_products'] = products['total']
+    counts['active_products'] = products['active']
+
+    for row in UserProfile.objects.order_by().values('role', 'vendor_tier').annotate(profiles=Count('id')):
+        for name in profile_counters(row['role'], row['vendor_tier']):
+            counts[name] += row['profiles']
+    return counts
+
+
+def activity():
+    """Views and contact reveals over the last 7/30/90 days, from the daily analytics rollup"""
+    return {str(days): window for days, window in activity_windows().items()}
+
+
+def top_products(field):
+    # Served by the (is_active, -view_count) / (is_active, -contact_reveal_count) indexes
+    return list(Product.objects.filter(is_active=True).order_by(f'-{field}')[:TOP_N].values(
+        'id', 'name', 'view_count', 'contact_reveal_count'
+    ))
+
+
+def recent_products():
+    since = timezone.now() - timedelta(days=7)
+    return list(Product.objects.filter(created_at__gte=since).order_by('-created_at')[:RECENT_N].values(
+        'id', 'name', 'created_at', 'vendor__email', 'view_count'
+    ))
+
+
+SNAPSHOTS = {
+    'activity': activity,
+    'top_viewed_products': lambda: top_products('view_count'),
+    'top_contacted_products': lambda: top_products('contact_reveal_count'),
+    'top_categories_30d': lambda: activity_by('category', days=30),
+    'top_vendors_30d': lambda: activity_by('vendor', days=30),
+    'recent_products': recent_products,
+}
+
+
+def refresh(snapshots=None, recount=True):
+    """Recompute the given snapshots (default: all) and optionally the counters, in one upsert"""
+    now = timezone.now()
+    rows = []
+    if recount:
+        rows += [DashboardStat(name=name, count=count, refreshed_at=now) for name, count in count_all().items()]
+    for name in SNAPSHOTS if snapshots is None else snapshots:
+        rows.append(DashboardStat(name=name, data=SNAPSHOTS[name](), refreshed_at=now))
+
+    DashboardStat.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['name'],
+        update_fields=['count', 'data', 'is_stale', 'refreshed_at'],
+    )
+    return len(rows)
+
+
+def due_snapshots(max_age=None):
+    """Snapshots that are missing, marked stale or older than max_age seconds"""
+    max_age = _config()['MAX_AGE'] if max_age is None else max_age
+    expired = timezone.now() - timedelta(seconds=max_age)
+    fresh = set(DashboardStat.objects.filter(
+        name__in=SNAPSHOTS, is_stale=False, refreshed_at__gt=expired
+    ).values_list('name', flat=True))
+    return [name for name in SNAPSHOTS if name not in fresh]
+
+
+def refresh_due(max_age=None):
+    """The periodic job: recount counters and recompute due snapshots"""
+    return refresh(snapshots=due_snapshots(max_age))
+
+
+def dashboard_stats(fresh=False):
+    """Build the DashboardStatsView payload from the materialized rows (one query)"""
+    if fresh:
+        refresh()
+    stats = {stat.name: stat for stat in DashboardStat.objects.all()}
+    if not fresh and not {*COUNTERS, *SNAPSHOTS} <= stats.keys():
+        # First load before the job has run
+        refresh()
+        stats = {stat.name: stat for stat in DashboardStat.objects.all()}
+
+    count = lambda name: stats[name].count if name in stats else 0
+    windows = stats['activity'].data
+    return {
+        'kpi': {
+            'total_products': count('total_products'),
+            'active_products': count('active_products'),
+            'total_vendors': count('total_vendors'),
+            'total_customers': count('total_customers'),
+            'views_last_30_days': windows['30']['views'],
+            'contacts_last_30_days': windows['30']['reveals'],
+        },
+        'activity': {
+            f'last_{days}_days': {'views': window['views'], 'contacts': window['reveals']}
+            for days, window in windows.items()
+        },
+        'tier_distribution': [
+            {'vendor_tier': tier, 'count': count(name)} for tier, name in TIER_COUNTERS.items() if count(name)
+        ],
+        'top_viewed_products': stats['top_viewed_products'].data,
+        'top_contacted_products': stats['top_contacted_products'].data,
+        'top_categories_last_30_days': stats['top_categories_30d'].data,
+        'top_vendors_last_30_days': stats['top_vendors_30d'].data,
+        'recent_products': stats['recent_products'].data,
+        'refreshed_at': min(stats[name].refreshed_at for name in SNAPSHOTS),
+    }
@@ -1,3 +1,141 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from analytics.rollup import record_events
+from products.models import Category, Product
+
+from . import stats
+from .models import DashboardStat
+
+
+class DashboardStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', password='pass12345', is_staff=True)
+        cls.admin.profile.role = 'admin'
+        cls.admin.profile.save()
+        cls.vendor = User.objects.create_user(username='vendor@example.com', email='vendor@example.com')
+        cls.vendor.profile.role = 'vendor'
+        cls.vendor.profile.vendor_tier = 'premium'
+        cls.vendor.profile.save()
+        User.objects.create_user(username='shopper')
+        cls.category = Category.objects.create(name='Kitchen', slug='kitchen')
+        cls.products = [
+            cls.create_product(f'Cooker {i}', view_count=i * 10, contact_reveal_count=3 - i)
+            for i in range(3)
+        ]
+        # Lifetime counters above; recent activity comes from the daily rollup
+        record_events(views={cls.products[2].id: 5}, reveals={cls.products[0].id: 2})
+        record_events(views={cls.products[1].id: 40}, day=timezone.localdate() - timedelta(days=45))
+
+    @classmethod
+    def create_product(cls, name, **fields):
+        return Product.objects.create(
+            name=name, slug=name.lower().replace(' ', '-'), category=cls.category, vendor=cls.vendor,
+            price=Decimal('100.00'), stock_quantity=1, **fields,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get_stats(self, **params):
+        response = self.client.get('/api/admin/dashboard-stats/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def counters(self):
+        return dict(DashboardStat.objects.values_list('name', 'count'))
+
+    def test_materialized_read_is_one_query(self):
+        stats.refresh()
+        with self.assertNumQueries(1):
+            self.client.get('/api/admin/dashboard-stats/')
+
+    def test_first_load_materializes(self):
+        data = self.get_stats()
+        self.assertEqual(data['kpi'], {
+            'total_products': 3, 'active_products': 3, 'total_vendors': 1, 'total_customers': 1,
+            'views_last_30_days': 5, 'contacts_last_30_days': 2,
+        })
+        self.assertEqual(data['activity']['last_90_days'], {'views': 45, 'contacts': 2})
+        self.assertEqual(data['top_categories_last_30_days'], [
+            {'category_id': self.category.id, 'category__name': 'Kitchen', 'views': 5, 'reveals': 2},
+        ])
+        self.assertEqual(data['tier_distribution'], [{'vendor_tier': 'premium', 'count': 1}])
+        self.assertEqual([p['name'] for p in data['top_viewed_products']], ['Cooker 2', 'Cooker 1', 'Cooker 0'])
+        self.assertEqual([p['name'] for p in data['top_contacted_products']], ['Cooker 0', 'Cooker 1', 'Cooker 2'])
+        self.assertEqual(data['recent_products'][0]['vendor__email'], 'vendor@example.com')
+
+    def test_signals_keep_counters_current(self):
+        stats.refresh()
+        product = self.create_product('Kettle')
+        self.assertEqual(self.counters()['total_products'], 4)
+        self.assertEqual(self.counters()['active_products'], 4)
+
+        product.is_active = False
+        product.save()
+        self.products[0].delete()
+        self.assertEqual(self.counters()['total_products'], 3)
+        self.assertEqual(self.counters()['active_products'], 2)
+
+        profile = User.objects.get(username='shopper').profile
+        profile.role = 'vendor'
+        profile.vendor_tier = 'basic'
+        profile.save()
+        self.vendor.profile.vendor_tier = 'featured'
+        self.vendor.profile.save()
+        counters = self.counters()
+        self.assertEqual(counters['total_customers'], 0)
+        self.assertEqual(counters['total_vendors'], 2)
+        self.assertEqual((counters['vendor_tier:basic'], counters['vendor_tier:premium'],
+                          counters['vendor_tier:featured']), (1, 0, 1))
+
+        # Incremental counts agree with a full recount
+        recount = stats.count_all()
+        self.assertEqual({name: counters[name] for name in recount}, dict(recount))
+
+    def test_job_refreshes_only_due_snapshots(self):
+        stats.refresh()
+        self.assertEqual(stats.due_snapshots(), [])
+
+        Product.objects.filter(pk=self.products[0].pk).update(view_count=500)  # bulk write, no signals
+        self.assertEqual(self.get_stats()['top_viewed_products'][0]['name'], 'Cooker 2')
+
+        DashboardStat.objects.filter(name='activity').update(refreshed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(stats.due_snapshots(), ['activity'])
+        self.create_product('Kettle')
+        self.assertEqual(stats.due_snapshots(), list(stats.SNAPSHOTS))
+
+        call_command('refresh_dashboard_stats', stdout=StringIO())
+        self.assertEqual(stats.due_snapshots(), [])
+        self.assertEqual(self.get_stats()['top_viewed_products'][0]['name'], 'Cooker 0')
+
+    def test_fresh_recomputes(self):
+        stats.refresh()
+        Product.objects.filter(pk=self.products[1].pk).update(contact_reveal_count=99)
+        record_events(reveals={self.products[1].id: 4})
+        data = self.get_stats(fresh=1)
+        self.assertEqual(data['top_contacted_products'][0]['name'], 'Cooker 1')
+        self.assertEqual(data['kpi']['contacts_last_30_days'], 6)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.vendor)
+        self.assertEqual(self.client.get('/api/admin/dashboard-stats/').status_code, 403)
+        self.assertEqual(self.client.get('/api/admin/metrics/').status_code, 403)
 
-# Create your tests here.
+    def test_prometheus_metrics(self):
+        self.get_stats()
+        response = self.client.get('/api/admin/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('http_requests_total{route="api/admin/dashboard-stats/"}', response.content.decode())
+        self.assertIn('jwt_tokens{table="outstanding"}', response.content.decode())
@@ -1,8 +1,12 @@
 # server/admin_panel/urls.py
 
 from django.urls import path
-from .views import DashboardStatsView
+from .views import AdminOrderListView, DashboardStatsView, CacheStatsView, TaskStatsView, MetricsView
 
 urlpatterns = [
     path('dashboard-stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('task-stats/', TaskStatsView.as_view(), name='task-stats'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('orders/', AdminOrderListView.as_view(), name='admin-orders'),
 ]
\ No newline at end of file
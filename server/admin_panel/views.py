@@ -1,72 +1,89 @@
 # server/admin_panel/views.py
 
-from django.utils import timezone
-from django.db.models import Sum, Count
-from django.db.models.functions import TruncMonth
-from datetime import timedelta
-
+from django.http import HttpResponse
+from rest_framework.generics import ListAPIView
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAdminUser
 
-# Import models
-from django.contrib.auth.models import User
-from products.models import Product
-from authentication.models import UserProfile
+from authentication.tokens import token_metrics
+from orders.models import Order
+from orders.serializers import OrderSerializer
+from orders.views import with_items
+from notifications.metrics import task_stats
+from products.cache import cache_stats
+from server.instrumentation import prometheus_metrics
+from .stats import dashboard_stats
 
 class DashboardStatsView(APIView):
     """
     Provides statistics for the admin dashboard - updated for marketplace model.
+    Served from materialized DashboardStat rows (see admin_panel.stats);
+    ?fresh=1 recomputes them first.
     Only accessible by admin users.
     """
     permission_classes = [IsAdminUser]
 
     def get(self, request, *args, **kwargs):
-        # 1. KPI Data
-        total_products = Product.objects.count()
-        active_products = Product.objects.filter(is_active=True).count()
-        total_vendors = User.objects.filter(profile__role='vendor').count()
-        total_customers = User.objects.filter(profile__role='customer').count()
-
-        # Product views and contact reveals in the last 30 days
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        recent_products = Product.objects.filter(created_at__gte=thirty_days_ago)
-        total_views_30d = recent_products.aggregate(total=Sum('view_count'))['total'] or 0
-        total_contacts_30d = recent_products.aggregate(total=Sum('contact_reveal_count'))['total'] or 0
-
-        kpi_data = {
-            'total_products': total_products,
-            'active_products': active_products,
-            'total_vendors': total_vendors,
-            'total_customers': total_customers,
-            'views_last_30_days': total_views_30d,
-            'contacts_last_30_days': total_contacts_30d,
-        }
-
-        # 2. Vendor tier distribution
-        tier_distribution = UserProfile.objects.filter(role='vendor').values('vendor_tier').annotate(count=Count('id'))
-
-        # 3. Top products by views
-        top_viewed_products = Product.objects.filter(is_active=True).order_by('-view_count')[:10].values(
-            'id', 'name', 'view_count', 'contact_reveal_count'
-        )
-
-        # 4. Top products by contact reveals
-        top_contacted_products = Product.objects.filter(is_active=True).order_by('-contact_reveal_count')[:10].values(
-            'id', 'name', 'view_count', 'contact_reveal_count'
-        )
-
-        # 5. Recent products (last 7 days)
-        seven_days_ago = timezone.now() - timedelta(days=7)
-        recent_products_list = Product.objects.filter(created_at__gte=seven_days_ago).order_by('-created_at')[:20].values(
-            'id', 'name', 'created_at', 'vendor__email', 'view_count'
-        )
+        fresh = request.query_params.get('fresh') in ('1', 'true')
+        return Response({
+            'success': True,
+            **dashboard_stats(fresh=fresh),
+        })
+
+
+class CacheStatsView(APIView):
+    """
+    Hit/miss counters for the public catalogue response cache.
+    Only accessible by admin users.
+    """
+    permission_classes = [IsAdminUser]
 
+    def get(self, request, *args, **kwargs):
         return Response({
             'success': True,
-            'kpi': kpi_data,
-            'tier_distribution': list(tier_distribution),
-            'top_viewed_products': list(top_viewed_products),
-            'top_contacted_products': list(top_contacted_products),
-            'recent_products': list(recent_products_list),
+            'catalogue_cache': cache_stats(),
         })
+
+
+class TaskStatsView(APIView):
+    """
+    Background task queue depth and per-task run counts and latencies.
+    Only accessible by admin users.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({
+            'success': True,
+            **task_stats(),
+        })
+
+
+class MetricsView(APIView):
+    """
+    Per-route request counts, latency and query histograms and query budget
+    overruns (server.instrumentation), plus refresh-token table sizes, in
+    Prometheus text format.
+    Only accessible by admin users.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(prometheus_metrics() + token_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class AdminOrderListView(ListAPIView):
+    """
+    All orders, newest first, optionally filtered by ?status=.
+    Only accessible by admin users.
+    """
+    permission_classes = [IsAdminUser]
+    serializer_class = OrderSerializer
+
+    def get_queryset(self):
+        orders = Order.objects.all()
+        status = self.request.query_params.get('status')
+        if status:
+            orders = orders.filter(status=status)
+        return with_items(orders)
@@ -0,0 +1,11 @@
+# analytics/management/commands/compact_analytics.py
+from django.core.management.base import BaseCommand
+from analytics.rollup import compact
+
+
+class Command(BaseCommand):
+    help = 'Fold daily product activity older than ANALYTICS["RETENTION_DAYS"] into monthly buckets (run daily)'
+
+    def handle(self, *args, **options):
+        written, deleted = compact()
+        self.stdout.write(self.style.SUCCESS(f'Folded {deleted} daily rows into {written} monthly rows'))
@@ -0,0 +1,50 @@
+# analytics/models.py - Per-product activity buckets
+from django.contrib.auth.models import User
+from django.db import models
+
+from products.models import Category, Product
+
+
+class ProductActivity(models.Model):
+    """
+    Views and contact reveals of one product over one period. vendor and
+    category are copied from the product when the bucket is written so
+    per-vendor/per-category windows don't have to join products.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', db_index=False)
+    vendor = models.ForeignKey(User, on_delete=models.CASCADE, null=True, related_name='+', db_index=False)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='+', db_index=False)
+    views = models.PositiveIntegerField(default=0)
+    reveals = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailyProductActivity(ProductActivity):
+    """One row per product per day with activity (see analytics.rollup)"""
+    day = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='daily_activity_product_day_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['day']),
+            models.Index(fields=['vendor', 'day']),
+            models.Index(fields=['category', 'day']),
+        ]
+
+
+class MonthlyProductActivity(ProductActivity):
+    """Daily buckets older than the retention window, folded per calendar month"""
+    month = models.DateField(help_text='First day of the month')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'month'], name='monthly_activity_product_month_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['vendor', 'month']),
+            models.Index(fields=['category', 'month']),
+        ]
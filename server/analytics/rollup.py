@@ -0,0 +1,195 @@
+# analytics/rollup.py - Daily/monthly product activity rollups
+"""
+Product.view_count and contact_reveal_count are lifetime counters. This
+module keeps the same activity per product per day so "last N days"
+figures are real and cheap:
+
+- record_events() merges a batch of {product_id: count} views/reveals into
+  today's DailyProductActivity rows with one multi-row
+  INSERT ... SELECT ... ON CONFLICT DO UPDATE (batched upsert). Buffered
+  view counts arrive once per ViewCounter flush (see analytics.signals).
+- activity_windows() sums 7/30/90-day windows in one query, optionally for
+  one vendor or category; activity_by() ranks vendors or categories.
+- compact() folds daily rows older than settings.ANALYTICS['RETENTION_DAYS']
+  into MonthlyProductActivity and deletes them, so windows up to the
+  retention period are always answered from daily rows alone.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max, Q, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from products.models import Product
+
+from .models import DailyProductActivity, MonthlyProductActivity
+
+DEFAULTS = {
+    'RETENTION_DAYS': 120,
+    'BATCH_SIZE': 500,   # rows per INSERT statement
+}
+
+WINDOWS = (7, 30, 90)
+
+COLUMNS = ['product_id', 'vendor_id', 'category_id', 'views', 'reveals']
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'ANALYTICS', {})}
+
+
+def _insert_sql(connection, model, period_field):
+    """INSERT INTO model (...) head and the ON CONFLICT clause that adds to an existing bucket"""
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    head = f"INSERT INTO {table} ({', '.join(map(qn, [*COLUMNS, period_field]))}) "
+    tail = (
+        f" ON CONFLICT ({qn('product_id')}, {qn(period_field)}) DO UPDATE SET"
+        f" {qn('views')} = {table}.{qn('views')} + EXCLUDED.{qn('views')},"
+        f" {qn('reveals')} = {table}.{qn('reveals')} + EXCLUDED.{qn('reveals')},"
+        f" {qn('vendor_id')} = EXCLUDED.{qn('vendor_id')},"
+        f" {qn('category_id')} = EXCLUDED.{qn('category_id')}"
+    )
+    return head, tail
+
+
+def _batches(rows):
+    rows = list(rows)
+    batch_size = _config()['BATCH_SIZE']
+    for start in range(0, len(rows), batch_size):
+        yield rows[start:start + batch_size]
+
+
+def _upsert(model, period_field, rows, using=None):
+    """
+    Add (product_id, vendor_id, category_id, views, reveals, period) rows into
+    model's buckets, creating missing ones. Returns the number of rows given.
+    """
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    head, tail = _insert_sql(connection, model, period_field)
+    written = 0
+    with connection.cursor() as cursor:
+        for batch in _batches(rows):
+            params = []
+            for *values, period in batch:
+                params += [*values, connection.ops.adapt_datefield_value(period)]
+            placeholders = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(batch))
+            cursor.execute(f"{head}VALUES {placeholders}{tail}", params)
+            written += len(batch)
+    return written
+
+
+def record_events(views=None, reveals=None, day=None, using=None):
+    """
+    Add {product_id: count} views and reveals to the day's buckets (today by
+    default) with one INSERT ... SELECT per BATCH_SIZE products; vendor and
+    category are read from the product table in the same statement and
+    unknown product ids are dropped by the join.
+    """
+    views, reveals = views or {}, reveals or {}
+    product_ids = {pk for pk, n in views.items() if n} | {pk for pk, n in reveals.items() if n}
+    if not product_ids:
+        return 0
+
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    qn = connection.ops.quote_name
+    head, tail = _insert_sql(connection, DailyProductActivity, 'day')
+    day = connection.ops.adapt_datefield_value(day or timezone.localdate())
+    product = qn(Product._meta.db_table)
+
+    with connection.cursor() as cursor:
+        for batch in _batches(sorted(product_ids)):
+            params = [day]
+            for pk in batch:
+                params += [pk, views.get(pk, 0), reveals.get(pk, 0)]
+            placeholders = ', '.join(['(%s, %s, %s)'] * len(batch))
+            # WHERE true: SQLite needs it to tell the join's ON from ON CONFLICT
+            cursor.execute(
+                f"{head}SELECT p.{qn('id')}, p.{qn('vendor_id')}, p.{qn('category_id')},"
+                f" activity.column2, activity.column3, %s"
+                f" FROM (VALUES {placeholders}) AS activity"
+                f" JOIN {product} p ON p.{qn('id')} = activity.column1 WHERE true{tail}",
+                params,
+            )
+    return len(product_ids)
+
+
+def record_reveal(product, day=None):
+    """Count one contact reveal of a loaded product (one upsert, no lookup)"""
+    day = day or timezone.localdate()
+    return _upsert(DailyProductActivity, 'day', [
+        (product.id, product.vendor_id, product.category_id, 0, 1, day)
+    ], using=product._state.db)
+
+
+def window_start(days, today=None):
+    """First day of a window of `days` days ending today"""
+    return (today or timezone.localdate()) - timedelta(days=days - 1)
+
+
+def _check_windows(windows):
+    retention = _config()['RETENTION_DAYS']
+    if max(windows) > retention:
+        raise ValueError(f"Windows longer than RETENTION_DAYS ({retention}) are not kept at daily resolution")
+
+
+def activity_windows(windows=WINDOWS, **filters):
+    """
+    Views and reveals over each window in one query, e.g.
+    activity_windows(vendor=user) -> {7: {'views': 12, 'reveals': 1}, 30: {...}, 90: {...}}
+    """
+    _check_windows(windows)
+    today = timezone.localdate()
+    aggregates = {}
+    for days in windows:
+        in_window = Q(day__gte=window_start(days, today))
+        aggregates[f'views_{days}'] = Coalesce(Sum('views', filter=in_window), 0)
+        aggregates[f'reveals_{days}'] = Coalesce(Sum('reveals', filter=in_window), 0)
+
+    totals = DailyProductActivity.objects.filter(
+        day__gte=window_start(max(windows), today), **filters
+    ).aggregate(**aggregates)
+    return {
+        days: {'views': totals[f'views_{days}'], 'reveals': totals[f'reveals_{days}']}
+        for days in windows
+    }
+
+
+def activity_by(dimension, days=30, limit=10):
+    """
+    Busiest vendors or categories over the last `days` days:
+    [{'category_id': 3, 'category__name': 'Phones', 'views': 120, 'reveals': 9}, ...]
+    """
+    _check_windows([days])
+    label = {'vendor': 'vendor__email', 'category': 'category__name'}[dimension]
+    return list(
+        DailyProductActivity.objects.filter(day__gte=window_start(days))
+        .values(f'{dimension}_id', label)
+        .annotate(views=Sum('views'), reveals=Sum('reveals'))
+        .order_by('-views', f'{dimension}_id')[:limit]
+    )
+
+
+def compact(today=None, using=None):
+    """
+    Fold daily buckets older than the retention window into monthly buckets.
+    Returns (monthly rows written, daily rows deleted).
+    """
+    cutoff = window_start(_config()['RETENTION_DAYS'], today)
+    expired = DailyProductActivity.objects.using(using).filter(day__lt=cutoff)
+
+    with transaction.atomic(using=using):
+        months = (
+            expired.annotate(month=TruncMonth('day')).order_by()
+            .values('product_id', 'month')
+            .annotate(
+                last_vendor=Max('vendor_id'), last_category=Max('category_id'),
+                month_views=Sum('views'), month_reveals=Sum('reveals'),
+            )
+            .values_list('product_id', 'last_vendor', 'last_category', 'month_views', 'month_reveals', 'month')
+        )
+        written = _upsert(MonthlyProductActivity, 'month', months.iterator(), using=using)
+        deleted, _ = expired.delete()
+    return written, deleted
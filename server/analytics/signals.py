@@ -0,0 +1,16 @@
+# analytics/signals.py - Feed product activity into the daily rollup
+from django.dispatch import receiver
+
+from products.signals import product_contact_revealed, product_views_flushed
+
+from . import rollup
+
+
+@receiver(product_views_flushed)
+def record_flushed_views(sender, counts, **kwargs):
+    rollup.record_events(views=counts)
+
+
+@receiver(product_contact_revealed)
+def record_contact_reveal(sender, product, **kwargs):
+    rollup.record_reveal(product)
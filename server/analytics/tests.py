@@ -0,0 +1,131 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from products.models import Category, Product
+from products.view_counts import MemoryViewBuffer, ViewCounter
+
+from . import rollup
+from .models import DailyProductActivity, MonthlyProductActivity
+
+
+class AnalyticsTestCase(TestCase):
+    """Two vendors, two categories, three products"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = User.objects.create_user(username='vendor@example.com', email='vendor@example.com')
+        cls.vendor.profile.role = 'vendor'
+        cls.vendor.profile.save()
+        cls.other_vendor = User.objects.create_user(username='other@example.com', email='other@example.com')
+        cls.phones = Category.objects.create(name='Phones', slug='phones')
+        cls.kitchen = Category.objects.create(name='Kitchen', slug='kitchen')
+        cls.phone = cls.create_product('Phone', cls.phones, cls.vendor)
+        cls.kettle = cls.create_product('Kettle', cls.kitchen, cls.vendor)
+        cls.cooker = cls.create_product('Cooker', cls.kitchen, cls.other_vendor)
+
+    @classmethod
+    def create_product(cls, name, category, vendor):
+        return Product.objects.create(
+            name=name, slug=name.lower(), category=category, vendor=vendor, price=Decimal('10.00'), stock_quantity=1,
+        )
+
+    def days_ago(self, days):
+        return timezone.localdate() - timedelta(days=days)
+
+
+class RollupTests(AnalyticsTestCase):
+
+    def test_batched_upsert_adds_to_existing_buckets(self):
+        with self.assertNumQueries(1):
+            rollup.record_events(views={self.phone.id: 3, self.kettle.id: 1}, reveals={self.phone.id: 1})
+        rollup.record_events(views={self.phone.id: 2, 999999: 5})
+
+        bucket = DailyProductActivity.objects.get(product=self.phone, day=timezone.localdate())
+        self.assertEqual((bucket.views, bucket.reveals, bucket.vendor_id, bucket.category_id),
+                         (5, 1, self.vendor.id, self.phones.id))
+        self.assertEqual(DailyProductActivity.objects.count(), 2)
+
+    @override_settings(ANALYTICS={'BATCH_SIZE': 2})
+    def test_large_batches_are_split(self):
+        products = [self.phone, self.kettle, self.cooker]
+        with self.assertNumQueries(2):
+            rollup.record_events(views={product.id: 1 for product in products})
+        self.assertEqual(DailyProductActivity.objects.count(), 3)
+
+    def test_windows_in_one_query(self):
+        rollup.record_events(views={self.phone.id: 1})
+        rollup.record_events(views={self.phone.id: 10}, day=self.days_ago(6))
+        rollup.record_events(views={self.kettle.id: 100}, reveals={self.kettle.id: 2}, day=self.days_ago(29))
+        rollup.record_events(views={self.cooker.id: 1000}, day=self.days_ago(89))
+        rollup.record_events(views={self.cooker.id: 10000}, day=self.days_ago(90))
+
+        with self.assertNumQueries(1):
+            windows = rollup.activity_windows()
+        self.assertEqual(windows, {
+            7: {'views': 11, 'reveals': 0},
+            30: {'views': 111, 'reveals': 2},
+            90: {'views': 1111, 'reveals': 2},
+        })
+        self.assertEqual(rollup.activity_windows(vendor=self.vendor)[90]['views'], 111)
+        self.assertEqual(rollup.activity_windows(category=self.kitchen)[30]['views'], 100)
+
+    def test_windows_beyond_retention_are_rejected(self):
+        with self.assertRaises(ValueError):
+            rollup.activity_windows(windows=(365,))
+
+    def test_activity_by_category_and_vendor(self):
+        rollup.record_events(views={self.phone.id: 5, self.kettle.id: 3, self.cooker.id: 4})
+        self.assertEqual(
+            [(row['category__name'], row['views']) for row in rollup.activity_by('category')],
+            [('Kitchen', 7), ('Phones', 5)],
+        )
+        self.assertEqual(
+            [(row['vendor__email'], row['views']) for row in rollup.activity_by('vendor', days=7)],
+            [('vendor@example.com', 8), ('other@example.com', 4)],
+        )
+
+    @override_settings(ANALYTICS={'RETENTION_DAYS': 30})
+    def test_compaction_folds_old_days_into_months(self):
+        today = date(2026, 6, 15)
+        for day, views in ((date(2026, 4, 2), 1), (date(2026, 4, 20), 2), (date(2026, 5, 10), 4),
+                           (date(2026, 6, 1), 8)):
+            rollup.record_events(views={self.phone.id: views}, day=day)
+        MonthlyProductActivity.objects.create(
+            product=self.phone, vendor=self.vendor, category=self.phones, month=date(2026, 4, 1), views=100,
+        )
+
+        written, deleted = rollup.compact(today=today)
+        self.assertEqual((written, deleted), (2, 3))
+        self.assertEqual(
+            list(MonthlyProductActivity.objects.order_by('month').values_list('month', 'views')),
+            [(date(2026, 4, 1), 103), (date(2026, 5, 1), 4)],
+        )
+        self.assertEqual(list(DailyProductActivity.objects.values_list('day', flat=True)), [date(2026, 6, 1)])
+
+
+class ActivityIngestTests(AnalyticsTestCase):
+
+    def test_view_counter_flush_feeds_the_rollup(self):
+        counter = ViewCounter(MemoryViewBuffer(), flush_interval=3600)
+        for product in (self.phone, self.phone, self.kettle):
+            counter.record(product.id)
+        counter.flush()
+        self.assertEqual(rollup.activity_windows(windows=(7,))[7]['views'], 3)
+
+    def test_contact_reveal_and_vendor_stats(self):
+        client = APIClient()
+        client.force_authenticate(self.other_vendor)
+        client.post(f'/api/products/{self.phone.id}/reveal-contact/')
+        client.post(f'/api/products/{self.phone.id}/reveal-contact/')
+        rollup.record_events(views={self.phone.id: 7}, day=self.days_ago(20))
+
+        client.force_authenticate(self.vendor)
+        stats = client.get('/api/vendor/stats/').json()['stats']
+        self.assertEqual((stats['contacts_last_7_days'], stats['views_last_7_days']), (2, 0))
+        self.assertEqual((stats['contacts_last_30_days'], stats['views_last_30_days']), (2, 7))
+        self.assertEqual(stats['total_contacts'], 2)
@@ -0,0 +1,60 @@
+# authentication/authentication.py - DRF authentication classes
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class ProfileJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that loads the user and their UserProfile in one query.
+
+    request.user keeps the profile cached for the rest of the request, so
+    user.role, user.profile.vendor_tier and product_limit checks in the views
+    don't query again. Role is read from the database rather than from token
+    claims so that becoming a vendor or a tier change applies immediately.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self.token_user_id(validated_token)
+        try:
+            user = self.user_model.objects.select_related('profile').get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+        return self.check_user(user, validated_token)
+
+    async def aauthenticate(self, request):
+        """authenticate() for async views; the user is loaded with the async ORM"""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.token_user_id(validated_token)
+        try:
+            user = await self.user_model.objects.select_related('profile').aget(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+        return self.check_user(user, validated_token)
+
+    def token_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+        return user
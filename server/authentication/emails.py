@@ -0,0 +1,70 @@
+# authentication/emails.py - Account emails
+"""
+Message builders for account events. They return notifications.mail
+message dicts; authentication.tasks sends them off the request path.
+"""
+from django.utils import timezone
+
+from notifications.mail import admin_recipients, message
+
+
+def vendor_welcome_email(user, profile):
+    """Welcome email to a new vendor"""
+    subject = "Welcome to Kipsunya Biz - Your Vendor Account is Ready!"
+
+    body = f"""
+Dear {user.get_full_name() or user.email},
+
+Congratulations! Your vendor account has been successfully created on Kipsunya Biz.
+
+Business Details:
+- Business Name: {profile.business_name}
+- Business Type: {profile.business_type}
+- Business Email: {profile.business_email}
+
+Next Steps:
+1. Complete your business profile
+2. Add your first products
+3. Set up your store policies
+4. Start selling to thousands of customers
+
+Your vendor dashboard: https://kipsunya.com/vendor/dashboard
+
+If you have any questions, our vendor support team is here to help:
+- Email: vendor-support@kipsunya.com
+- Phone: +254 700 000 000
+
+Welcome to the Kipsunya Biz family!
+
+Best regards,
+The Kipsunya Biz Team
+    """
+
+    return message(subject, body, [user.email])
+
+
+def vendor_application_notification(user, profile):
+    """Notification to the admins (settings.NOTIFICATIONS['ADMIN_RECIPIENTS']) about a new vendor"""
+    subject = f"New Vendor Application - {profile.business_name}"
+    applied = profile.vendor_approved_at or timezone.now()
+
+    body = f"""
+A new vendor has registered on Kipsunya Biz:
+
+Vendor Details:
+- Name: {user.get_full_name()}
+- Email: {user.email}
+- Business Name: {profile.business_name}
+- Business Type: {profile.business_type}
+- Business Email: {profile.business_email}
+- Phone: {profile.business_phone}
+- Applied: {applied.strftime('%Y-%m-%d %H:%M')}
+
+Please review the application in the admin panel:
+https://kipsunya.com/admin/vendors/
+
+Best regards,
+Kipsunya Biz System
+    """
+
+    return message(subject, body, admin_recipients())
@@ -0,0 +1,22 @@
+# authentication/management/commands/prune_tokens.py
+from django.core.management.base import BaseCommand
+from authentication.tokens import prune_expired_tokens, token_table_sizes
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding/blacklisted refresh tokens in batches (run hourly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Rows per delete (default TOKEN_BLACKLIST["PRUNE_BATCH_SIZE"])')
+
+    def handle(self, *args, **options):
+        def progress(deleted):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  {deleted} deleted')
+
+        deleted = prune_expired_tokens(batch_size=options['batch_size'], progress=progress)
+        sizes = token_table_sizes()
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} expired tokens; {sizes['outstanding']} outstanding, "
+            f"{sizes['blacklisted']} blacklisted remain"
+        ))
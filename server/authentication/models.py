@@ -1,8 +1,125 @@
 # authentication/models.py
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
+from django.utils.text import slugify
+
+
+def _clean(name):
+    return ' '.join((name or '').split())
+
+
+# Location keys are range-scanned in byte order ('/' sorts just before '0').
+# SQLite compares bytes already; PostgreSQL's default collations skip
+# punctuation, which would leave "nairobi/westlands/" out of "nairobi/".
+KEY_COLLATION = 'C' if settings.DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql' else None
+
+
+class Location(models.Model):
+    """
+    A place vendors are in: city -> district -> neighborhood. Each row
+    carries its materialized path ("nairobi/westlands/"), which products
+    copy into Product.location_key so listings filter a location and
+    everything under it with one indexed range scan.
+    """
+
+    LEVELS = ('city', 'district', 'neighborhood')
+    LEVEL_CHOICES = [(level, level.title()) for level in LEVELS]
+
+    name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=100)
+    level = models.CharField(max_length=20, choices=LEVEL_CHOICES)
+    parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='children')
+    key = models.CharField(max_length=310, unique=True, db_collation=KEY_COLLATION)
+
+    class Meta:
+        ordering = ['key']
+        indexes = [models.Index(fields=['level', 'slug'])]
+
+    def __str__(self):
+        return ', '.join(location.name for location in self.ancestors())
+
+    def ancestors(self):
+        location = self
+        while location is not None:
+            yield location
+            location = location.parent
+
+    @staticmethod
+    def key_range(key):
+        """[low, high) bounds of the keys at or under `key`, in KEY_COLLATION's byte order"""
+        return key, key[:-1] + '0'
+
+    @staticmethod
+    def parse_key(value):
+        """A ?location= value ("Nairobi/Westlands") as a key, or None"""
+        slugs = [slugify(part) for part in (value or '').split('/')]
+        slugs = [slug for slug in slugs if slug]
+        return '/'.join(slugs) + '/' if slugs else None
+
+    @staticmethod
+    def path_names(city=None, district=None, neighborhood=None):
+        """
+        Normalize free-text profile fields into [city, district, neighborhood]
+        names (up to three). Neighborhoods are often written "Westlands,
+        Nairobi", with the city repeated or put in the district field, so
+        the trailing part of a comma list stands in for a missing city and
+        names that repeat a broader level are dropped.
+        """
+        parts = [_clean(part) for part in (neighborhood or '').split(',')]
+        parts = [part for part in parts if part]
+        if not _clean(city) and len(parts) > 1:
+            city = parts.pop()
+        names, seen = [], set()
+        for name in [city, district, *reversed(parts)]:
+            name = _clean(name)
+            slug = slugify(name)[:100]
+            if slug and slug not in seen:
+                seen.add(slug)
+                names.append(name[:100])
+        return names[:len(Location.LEVELS)]
+
+    @classmethod
+    def resolve(cls, city=None, district=None, neighborhood=None):
+        """The (possibly new) deepest Location for free-text fields, or None"""
+        location, key = None, ''
+        for level, name in zip(cls.LEVELS, cls.path_names(city, district, neighborhood)):
+            slug = slugify(name)[:100]
+            key = f'{key}{slug}/'
+            location, _ = cls.objects.get_or_create(
+                key=key, defaults={'name': name, 'slug': slug, 'level': level, 'parent': location},
+            )
+        return location
+
+    @classmethod
+    def matching_keys(cls, city=None, district=None, location=None):
+        """
+        Keys whose subtrees match the ?city= / ?district= / ?location=
+        filters (names compared by slug), or None when none was given
+        """
+        keys = None
+        if city or district:
+            matches = cls.objects.all()
+            if district:
+                matches = matches.filter(level='district', slug=slugify(district))
+                if city:
+                    matches = matches.filter(parent__slug=slugify(city))
+            else:
+                matches = matches.filter(level='city', slug=slugify(city))
+            keys = list(matches.values_list('key', flat=True))
+        if location:
+            key = cls.parse_key(location)
+            if keys is None:
+                keys = [key] if key else []
+            elif key:
+                # Both given: where each match's subtree overlaps the ?location= one
+                keys = [max(key, match, key=len) for match in keys if key.startswith(match) or match.startswith(key)]
+            else:
+                keys = []
+        return keys
+
 
 class UserProfile(models.Model):
     """Extend Django's User with additional fields for marketplace"""
@@ -20,6 +137,27 @@ class UserProfile(models.Model):
         ('featured', 'Featured'),
     ]
 
+    # Listing priority per tier (higher tiers appear first).
+    # Denormalized onto Product.tier_priority for index-backed ordering.
+    TIER_PRIORITY = {
+        'featured': 4,
+        'premium': 3,
+        'basic': 2,
+        'free': 1,
+    }
+
+    # Profile fields shown on public product listings; a change to any of
+    # them invalidates cached catalogue responses
+    LISTING_FIELDS = (
+        'phone', 'whatsapp', 'business_name', 'neighborhood', 'district', 'city', 'vendor_tier',
+    )
+
+    # Free-text location fields that Location.resolve normalizes into `location`
+    LOCATION_FIELDS = ('city', 'district', 'neighborhood')
+
+    # Changed only by relative UPDATEs (products.limits), never written back by save()
+    COUNTER_FIELDS = ('product_count', 'active_product_count')
+
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='customer')
 
@@ -30,6 +168,9 @@ class UserProfile(models.Model):
     city = models.CharField(max_length=100, blank=True, null=True)
     district = models.CharField(max_length=100, blank=True, null=True)
     neighborhood = models.CharField(max_length=100, blank=True, null=True)
+    # Normalized from city/district/neighborhood on save (see Location.resolve)
+    location = models.ForeignKey(Location, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='profiles', editable=False)
     country = models.CharField(max_length=100, default='Kenya')
     date_of_birth = models.DateField(blank=True, null=True)
     bio = models.TextField(blank=True, null=True)
@@ -53,12 +194,61 @@ class UserProfile(models.Model):
     business_verified = models.BooleanField(default=False)
     vendor_approved_at = models.DateTimeField(null=True, blank=True)
 
+    # The vendor's products, all and active; see products/limits.py
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    active_product_count = models.PositiveIntegerField(default=0, editable=False)
+
     # Social media (stored as JSON)
     social_media = models.JSONField(default=dict, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored tier so post_save can tell whether it changed
+        instance._loaded_role = instance.__dict__.get('role')
+        instance._loaded_vendor_tier = instance.__dict__.get('vendor_tier')
+        instance._loaded_listing_values = instance.listing_values()
+        instance._loaded_location_values = instance.location_values()
+        instance._loaded_location_id = instance.__dict__.get('location_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.location_values() != getattr(self, '_loaded_location_values', (None, None, None)):
+            self.location = Location.resolve(*self.location_values())
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'location'}
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            # A loaded copy of the counters may be stale by now
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        # post_save receivers have diffed against the loaded values; start over from what was saved
+        self._loaded_role = self.role
+        self._loaded_vendor_tier = self.vendor_tier
+        self._loaded_listing_values = self.listing_values()
+        self._loaded_location_values = self.location_values()
+        self._loaded_location_id = self.location_id
+
+    def location_values(self):
+        return tuple(self.__dict__.get(field) for field in self.LOCATION_FIELDS)
+
+    def listing_values(self):
+        return tuple(self.__dict__.get(field) for field in self.LISTING_FIELDS)
+
+    def listing_fields_changed(self):
+        """Whether any publicly listed field differs from what was loaded"""
+        return getattr(self, '_loaded_listing_values', None) != self.listing_values()
+
+    @property
+    def tier_priority(self):
+        """Return listing priority for this profile's vendor tier"""
+        return self.TIER_PRIORITY.get(self.vendor_tier, 0)
+
     @property
     def product_limit(self):
         """Return product limit based on vendor tier"""
@@ -0,0 +1,26 @@
+# authentication/tasks.py - Background jobs for account events
+import logging
+from smtplib import SMTPException
+
+from celery import shared_task
+from django.contrib.auth.models import User
+
+from notifications.mail import send_batch
+
+from .emails import vendor_application_notification, vendor_welcome_email
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(autoretry_for=(SMTPException, OSError), retry_backoff=True, max_retries=5)
+def send_vendor_upgrade_emails(user_id):
+    """Welcome the new vendor and notify the admins, over one SMTP connection"""
+    user = User.objects.select_related('profile').filter(id=user_id).first()
+    if user is None:
+        logger.warning(f"Vendor upgrade emails skipped: user {user_id} no longer exists")
+        return 0
+    messages = [
+        vendor_welcome_email(user, user.profile),
+        vendor_application_notification(user, user.profile),
+    ]
+    return send_batch(messages)
@@ -1,3 +1,213 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import ProfileJWTAuthentication
+from . import tokens
+from .models import Location, UserProfile
+from .tokens import BloomBlacklistStore, CacheBlacklistStore, RefreshToken, prune_expired_tokens
+
+
+class ProfileJWTAuthenticationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = User.objects.create_user(
+            username='vendor@example.com', email='vendor@example.com', password='pass12345'
+        )
+        cls.vendor.profile.role = 'vendor'
+        cls.vendor.profile.vendor_tier = 'premium'
+        cls.vendor.profile.save()
+
+    def auth_header(self, user):
+        return {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(user)}'}
+
+    def test_user_and_profile_in_one_query(self):
+        request = APIRequestFactory().get('/', **self.auth_header(self.vendor))
+        with self.assertNumQueries(1):
+            user, _ = ProfileJWTAuthentication().authenticate(request)
+            self.assertEqual(user.role, 'vendor')
+            self.assertEqual(user.role, 'vendor')
+            self.assertEqual(user.profile.vendor_tier, 'premium')
+            self.assertEqual(user.profile.product_limit, 150)
+
+    def test_vendor_endpoint_authenticates_with_one_query(self):
+        client = APIClient()
+        # auth (user + profile) + the vendor's products
+        with self.assertNumQueries(2):
+            response = client.get('/api/vendor/products/', **self.auth_header(self.vendor))
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_profile_is_created_once(self):
+        user = User.objects.create_user(username='shopper', password='pass12345')
+        UserProfile.objects.filter(user=user).delete()
+        request = APIRequestFactory().get('/', **self.auth_header(user))
+
+        user, _ = ProfileJWTAuthentication().authenticate(request)
+        self.assertEqual(user.role, 'customer')
+        with self.assertNumQueries(0):
+            self.assertEqual(user.role, 'customer')
+
+    def test_inactive_user_is_rejected(self):
+        user = User.objects.create_user(username='gone', password='pass12345')
+        header = self.auth_header(user)
+        User.objects.filter(pk=user.pk).update(is_active=False)
+        response = APIClient().get('/api/vendor/products/', **header)
+        self.assertEqual(response.status_code, 401)
+
+
+class LoginTests(TestCase):
+
+    def test_failures_do_not_reveal_whether_the_account_exists(self):
+        User.objects.create_user(username='shopper@example.com', email='shopper@example.com', password='pass12345')
+        client = APIClient()
+        responses = []
+        for email in ('shopper@example.com', 'nobody@example.com'):
+            with self.assertNumQueries(1):
+                responses.append(client.post('/api/auth/login/', {'email': email, 'password': 'wrong-password'},
+                                             format='json'))
+        self.assertEqual([response.status_code for response in responses], [401, 401])
+        self.assertEqual(responses[0].json(), responses[1].json())
+
+
+class LocationTests(TestCase):
+
+    def test_path_names_normalize_inconsistent_profiles(self):
+        self.assertEqual(Location.path_names(None, 'Nairobi', 'Westlands, Nairobi'), ['Nairobi', 'Westlands'])
+        self.assertEqual(Location.path_names('Nairobi', 'Westlands', 'Westlands, Nairobi'), ['Nairobi', 'Westlands'])
+        self.assertEqual(
+            Location.path_names(' nairobi ', 'Westlands', 'Parklands,  Westlands'),
+            ['nairobi', 'Westlands', 'Parklands'],
+        )
+        self.assertEqual(Location.path_names(None, None, ''), [])
+
+    def test_resolve_reuses_the_tree(self):
+        parklands = Location.resolve('Nairobi', 'Westlands', 'Parklands')
+        self.assertEqual((parklands.key, parklands.level), ('nairobi/westlands/parklands/', 'neighborhood'))
+        self.assertEqual(str(parklands), 'Parklands, Westlands, Nairobi')
+        self.assertEqual(Location.resolve(None, 'NAIROBI', 'Westlands, Nairobi'), parklands.parent)
+        self.assertEqual(Location.objects.count(), 3)
+        self.assertIsNone(Location.resolve())
+
+    def test_profile_save_links_its_location(self):
+        user = User.objects.create_user(username='vendor', password='pass12345')
+        profile = user.profile
+        profile.district, profile.neighborhood = 'Eldoret', 'Kapsoya, Eldoret'
+        profile.save()
+        self.assertEqual(UserProfile.objects.get(pk=profile.pk).location.key, 'eldoret/kapsoya/')
+
+        profile = UserProfile.objects.get(pk=profile.pk)
+        with self.assertNumQueries(1):
+            profile.bio = 'Unrelated'
+            profile.save()
+
+    def test_matching_keys(self):
+        Location.resolve('Nairobi', 'Milimani')
+        Location.resolve('Kisumu', 'Milimani')
+        self.assertIsNone(Location.matching_keys())
+        self.assertEqual(Location.matching_keys(city='nairobi'), ['nairobi/'])
+        self.assertEqual(sorted(Location.matching_keys(district='Milimani')), ['kisumu/milimani/', 'nairobi/milimani/'])
+        self.assertEqual(Location.matching_keys(city='Kisumu', district='Milimani'), ['kisumu/milimani/'])
+        self.assertEqual(Location.matching_keys(location='Nairobi/Milimani/'), ['nairobi/milimani/'])
+        self.assertEqual(Location.matching_keys(city='Nairobi', location='nairobi/milimani'), ['nairobi/milimani/'])
+        self.assertEqual(Location.matching_keys(city='Kisumu', location='nairobi'), [])
+        self.assertEqual(Location.matching_keys(city='Atlantis'), [])
+
+
+class TokenBlacklistTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='shopper', password='pass12345')
+        caches['default'].clear()
+        patcher = mock.patch.object(tokens, '_store', BloomBlacklistStore(1000, 0.001, 0, 3600, 30))
+        self.addCleanup(patcher.stop)
+        self.store = patcher.start()
+
+    def refresh(self, token):
+        return APIClient().post('/api/auth/refresh/', {'refresh': str(token)}, format='json')
+
+    def test_rotation_revokes_the_old_token_in_a_few_queries(self):
+        token = RefreshToken.for_user(self.user)
+        self.refresh(RefreshToken.for_user(self.user))  # builds the filter
+        # user, blacklist sync, outstanding lookup, two inserts (the blacklist row's in a savepoint)
+        with self.assertNumQueries(7):
+            response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('accessToken', response.json())
+
+        self.assertEqual(self.refresh(token).status_code, 401)
+        self.assertEqual(self.refresh(response.json()['refresh']).status_code, 200)
+        self.assertTrue(OutstandingToken.objects.filter(jti=token['jti'], blacklistedtoken__isnull=False).exists())
+
+    def test_logout_revokes_the_refresh_token(self):
+        token = RefreshToken.for_user(self.user)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.post('/api/auth/logout/', {'refresh_token': str(token)}, format='json')
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_refresh_refuses_a_token_the_store_has_not_seen_revoked(self):
+        stale_filter = BloomBlacklistStore(1000, 0.001, 3600, 3600, 30)
+        stale_filter.is_blacklisted('x')   # built, and not due to sync for an hour
+        evicted_key = CacheBlacklistStore('default', 'jwt-blacklist')
+        caches['default'].set('jwt-blacklist:warm', 1)
+        for store in (stale_filter, evicted_key):
+            with self.subTest(store=type(store).__name__), mock.patch.object(tokens, '_store', store):
+                token = RefreshToken.for_user(self.user)
+                # Revoked by another process; this one's store doesn't know
+                BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+                self.assertFalse(store.is_blacklisted(token['jti']))
+                self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_bloom_sync_rereads_rows_that_commit_out_of_id_order(self):
+        rows = [BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=RefreshToken.for_user(
+            self.user)['jti'])) for _ in range(3)]
+        late_id, late_token = rows[1].id, rows[1].token
+        rows[1].delete()
+        self.assertFalse(self.store.is_blacklisted(late_token.jti))
+        # Committed after the sync read its neighbours, under the lower id it was given first
+        BlacklistedToken.objects.create(id=late_id, token=late_token)
+        self.assertTrue(self.store.is_blacklisted(late_token.jti))
+
+    def test_bloom_filter_sees_other_processes_and_confirms_hits(self):
+        token = RefreshToken.for_user(self.user)
+        self.assertFalse(self.store.is_blacklisted(token['jti']))
+        # Revoked by another process: only the table knows
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+        self.assertTrue(self.store.is_blacklisted(token['jti']))
+        # In the filter but not the table (a false positive): the database has the last word
+        self.store.add('not-revoked', timezone.now())
+        self.assertFalse(self.store.is_blacklisted('not-revoked'))
+
+    def test_cache_store_warms_from_the_table(self):
+        store = CacheBlacklistStore('default', 'test-blacklist')
+        revoked, live = RefreshToken.for_user(self.user), RefreshToken.for_user(self.user)
+        revoked.blacklist()
+        self.assertTrue(store.is_blacklisted(revoked['jti']))
+        with self.assertNumQueries(0):
+            self.assertTrue(store.is_blacklisted(revoked['jti']))
+            self.assertFalse(store.is_blacklisted(live['jti']))
+        store.add(live['jti'], timezone.now() + timedelta(days=1))
+        self.assertTrue(store.is_blacklisted(live['jti']))
+
+    def test_prune_deletes_only_expired_tokens_in_batches(self):
+        now = timezone.now()
+        for days in (-3, -2, -1, 1, 2):
+            outstanding = OutstandingToken.objects.create(
+                user=self.user, jti=f'jti{days}', token='x', created_at=now, expires_at=now + timedelta(days=days),
+            )
+            BlacklistedToken.objects.create(token=outstanding)
 
-# Create your tests here.
+        self.assertEqual(prune_expired_tokens(batch_size=2), 3)
+        self.assertEqual(sorted(OutstandingToken.objects.values_list('jti', flat=True)), ['jti1', 'jti2'])
+        self.assertEqual(BlacklistedToken.objects.count(), 2)
+        call_command('prune_tokens', stdout=io.StringIO())
@@ -0,0 +1,323 @@
+# authentication/tokens.py - Refresh tokens with a cached blacklist
+"""
+simplejwt's token_blacklist app keeps an OutstandingToken row per refresh
+token and a BlacklistedToken row per revoked one. With ROTATE_REFRESH_TOKENS
+and BLACKLIST_AFTER_ROTATION every refresh revokes the old token and issues
+a new one, so stock simplejwt joins the blacklist table on every refresh,
+looks rows up with get_or_create before writing them, and both tables grow
+by a row per refresh, forever.
+
+RefreshToken here keeps the same tables (logout, the Django admin and
+flushexpiredtokens keep working) but:
+
+- rejects revoked tokens early through a store chosen by
+  settings.TOKEN_BLACKLIST:
+  - 'cache': one key per revoked jti in the shared cache (Redis), kept
+    until the token would have expired anyway, warmed from the table; a
+    lost warm marker (flush, restart) makes the next check reload it.
+  - 'bloom': an in-process bloom filter of revoked jtis; "maybe" is
+    confirmed in the database. Every SYNC_INTERVAL it re-reads the rows
+    blacklisted in the last SYNC_OVERLAP seconds (other processes'
+    revocations, including ones that committed out of id order), and it
+    is rebuilt from unexpired rows every REBUILD_INTERVAL.
+  Neither store's "not revoked" is final: an evicted key or a filter that
+  hasn't caught up would let a revoked token through. Rotation blacklists
+  the token it refreshes, and that insert is the check: BlacklistedToken
+  is unique per token, so if the row already exists (revoked by logout or
+  by an earlier rotation, in any process) the refresh is refused. Without
+  BLACKLIST_AFTER_ROTATION the table is checked as simplejwt does.
+- writes with the user id from the token (no user lookups), inserting
+  rows that cannot exist yet instead of get_or_create
+
+`python manage.py prune_tokens` deletes expired rows in batches, and
+token_metrics() reports the table sizes for /api/admin/metrics/.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer as BaseTokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken as BaseRefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+DEFAULTS = {
+    'BACKEND': 'bloom',
+    'ALIAS': 'default',
+    'KEY_PREFIX': 'jwt-blacklist',
+    'BLOOM_CAPACITY': 1_000_000,     # revoked, unexpired tokens before the filter grows
+    'BLOOM_ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': 1.0,            # seconds between catching up with other processes' revocations
+    'SYNC_OVERLAP': 30,              # seconds of revocations each catch-up re-reads (slow commits land late)
+    'REBUILD_INTERVAL': 3600,        # seconds; drops expired tokens from the filter
+    'PRUNE_BATCH_SIZE': 5000,
+}
+
+
+def token_blacklist_config():
+    return {**DEFAULTS, **getattr(settings, 'TOKEN_BLACKLIST', {})}
+
+
+def _unexpired_blacklist():
+    """Revoked tokens that haven't expired yet"""
+    return BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now()).order_by('id')
+
+
+class BaseBlacklistStore:
+    """Interface shared by the blacklist stores"""
+
+    def is_blacklisted(self, jti):
+        """True if jti is revoked; False may be stale (see the module docstring)"""
+        raise NotImplementedError
+
+    def add(self, jti, expires_at):
+        """Record a revocation already written to the BlacklistedToken table"""
+        raise NotImplementedError
+
+
+class CacheBlacklistStore(BaseBlacklistStore):
+    """A key per revoked jti in a cache shared by every process"""
+
+    def __init__(self, alias, key_prefix):
+        self.alias = alias
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def key(self, jti):
+        return f'{self.key_prefix}:{jti}'
+
+    def is_blacklisted(self, jti):
+        warm_key = f'{self.key_prefix}:warm'
+        found = self.cache.get_many([warm_key, self.key(jti)])
+        if warm_key not in found:
+            self.warm()
+            return BlacklistedToken.objects.filter(token__jti=jti).exists()
+        return self.key(jti) in found
+
+    def add(self, jti, expires_at):
+        timeout = max(int((expires_at - timezone.now()).total_seconds()), 1)
+        self.cache.set(self.key(jti), 1, timeout)
+
+    def warm(self, batch_size=5000):
+        lifetime = int(api_settings.REFRESH_TOKEN_LIFETIME.total_seconds())
+        batch = {}
+        for jti in _unexpired_blacklist().values_list('token__jti', flat=True).iterator(chunk_size=batch_size):
+            batch[self.key(jti)] = 1
+            if len(batch) >= batch_size:
+                self.cache.set_many(batch, lifetime)
+                batch = {}
+        if batch:
+            self.cache.set_many(batch, lifetime)
+        self.cache.set(f'{self.key_prefix}:warm', 1, timeout=None)
+
+
+class BloomFilter:
+    """Set membership with false positives but no false negatives"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(value))
+
+
+class BloomBlacklistStore(BaseBlacklistStore):
+    """An in-process bloom filter over the BlacklistedToken table"""
+
+    def __init__(self, capacity, error_rate, sync_interval, rebuild_interval, sync_overlap):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.sync_overlap = sync_overlap
+        self.lock = threading.Lock()
+        self.filter = None
+        self.checkpoints = deque()   # (monotonic time, highest row id read by then), oldest first
+        self.synced_at = self.built_at = 0.0
+
+    def is_blacklisted(self, jti):
+        self.sync()
+        if jti not in self.filter:
+            return False
+        return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+    def add(self, jti, expires_at):
+        with self.lock:
+            if self.filter is not None:
+                self.filter.add(jti)
+
+    def sync(self):
+        """Catch up with revocations written since the last sync (or rebuild)"""
+        now = time.monotonic()
+        if self.filter is not None and now - self.synced_at < self.sync_interval:
+            return
+        with self.lock:
+            if self.filter is None or self.filter.count > self.filter.capacity or \
+                    now - self.built_at >= self.rebuild_interval:
+                self.rebuild(now)
+            elif now - self.synced_at >= self.sync_interval:
+                # Rows can commit out of id order, so re-read the whole overlap window. The id floor
+                # (the highest id read before the window opened) only keeps the scan on the primary key.
+                since = timezone.now() - timedelta(seconds=self.sync_overlap)
+                rows = BlacklistedToken.objects.filter(
+                    id__gt=self.floor(now), blacklisted_at__gte=since,
+                ).values_list('id', 'token__jti')
+                highest = self.checkpoints[-1][1] if self.checkpoints else 0
+                for row_id, jti in rows:
+                    if jti not in self.filter:
+                        self.filter.add(jti)
+                    highest = max(highest, row_id)
+                self.checkpoints.append((now, highest))
+            self.synced_at = now
+
+    def floor(self, now):
+        """An id below every row blacklisted since the overlap window opened"""
+        opened = now - self.sync_overlap
+        while len(self.checkpoints) > 1 and self.checkpoints[1][0] <= opened:
+            self.checkpoints.popleft()
+        if self.checkpoints and self.checkpoints[0][0] <= opened:
+            return self.checkpoints[0][1]
+        return 0
+
+    def rebuild(self, now):
+        rows = list(_unexpired_blacklist().values_list('id', 'token__jti'))
+        bloom = BloomFilter(max(self.capacity, len(rows) * 2), self.error_rate)
+        for _, jti in rows:
+            bloom.add(jti)
+        if rows:
+            self.checkpoints.append((now, max(rows[-1][0], self.checkpoints[-1][1] if self.checkpoints else 0)))
+        self.filter, self.built_at = bloom, now
+
+
+_store = None
+
+
+def get_blacklist_store():
+    """Return the process-wide blacklist store configured by settings.TOKEN_BLACKLIST"""
+    global _store
+    if _store is None:
+        config = token_blacklist_config()
+        if config['BACKEND'] == 'cache':
+            _store = CacheBlacklistStore(config['ALIAS'], config['KEY_PREFIX'])
+        elif config['BACKEND'] == 'bloom':
+            _store = BloomBlacklistStore(
+                config['BLOOM_CAPACITY'], config['BLOOM_ERROR_RATE'],
+                config['SYNC_INTERVAL'], config['REBUILD_INTERVAL'], config['SYNC_OVERLAP'],
+            )
+        else:
+            raise ValueError(f"Unknown TOKEN_BLACKLIST backend: {config['BACKEND']}")
+    return _store
+
+
+class RefreshToken(BaseRefreshToken):
+    """simplejwt's RefreshToken with the blacklist checked through get_blacklist_store()"""
+
+    def check_blacklist(self):
+        if get_blacklist_store().is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+        if not (api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION):
+            # No blacklist() insert will follow to catch what the store missed
+            super().check_blacklist()
+
+    def outstanding_row(self):
+        return OutstandingToken(
+            jti=self.payload[api_settings.JTI_CLAIM],
+            user_id=self.payload.get(api_settings.USER_ID_CLAIM),
+            created_at=self.current_time,
+            token=str(self),
+            expires_at=datetime_from_epoch(self.payload['exp']),
+        )
+
+    def blacklist(self):
+        """Revoke this token; raises TokenError if it already was (the authoritative blacklist check)"""
+        row = self.outstanding_row()
+        token = OutstandingToken.objects.get_or_create(jti=row.jti, defaults={
+            'user_id': row.user_id, 'created_at': row.created_at, 'token': row.token, 'expires_at': row.expires_at,
+        })[0]
+        try:
+            with transaction.atomic():
+                blacklisted = BlacklistedToken.objects.create(token=token)
+        except IntegrityError:
+            raise TokenError(_('Token is blacklisted'))
+        transaction.on_commit(lambda: get_blacklist_store().add(token.jti, token.expires_at))
+        return blacklisted
+
+    def outstand(self):
+        # A freshly rotated jti: nothing to get
+        row = self.outstanding_row()
+        OutstandingToken.objects.bulk_create([row], ignore_conflicts=True)
+        return row
+
+
+class TokenRefreshSerializer(BaseTokenRefreshSerializer):
+    token_class = RefreshToken
+
+
+def token_table_sizes():
+    now = timezone.now()
+    return {
+        'outstanding': OutstandingToken.objects.count(),
+        'blacklisted': BlacklistedToken.objects.count(),
+        'expired': OutstandingToken.objects.filter(expires_at__lte=now).count(),
+    }
+
+
+def token_metrics():
+    """Refresh-token table sizes in Prometheus text format"""
+    sizes = token_table_sizes()
+    lines = ['# HELP jwt_tokens Rows in the refresh-token tables (expired: outstanding rows prune_tokens will delete)',
+             '# TYPE jwt_tokens gauge']
+    lines += [f'jwt_tokens{{table="{table}"}} {count}' for table, count in sizes.items()]
+    return '\n'.join(lines) + '\n'
+
+
+def prune_expired_tokens(batch_size=None, progress=None):
+    """
+    Delete expired outstanding tokens and their blacklist rows, batch_size
+    at a time (each batch its own transaction), walking the primary key so
+    no batch rescans what earlier ones kept. Returns the number deleted.
+    """
+    batch_size = batch_size or token_blacklist_config()['PRUNE_BATCH_SIZE']
+    now = timezone.now()
+    deleted, cursor = 0, 0
+    while True:
+        ids = list(OutstandingToken.objects.filter(id__gt=cursor, expires_at__lte=now).order_by('id').values_list(
+            'id', flat=True,
+        )[:batch_size])
+        if not ids:
+            return deleted
+        batch = {'id__gte': ids[0], 'id__lte': ids[-1], 'expires_at__lte': now}
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(**{f'token__{name}': value for name, value in batch.items()}).delete()
+            deleted += OutstandingToken.objects.filter(**batch).delete()[1].get(OutstandingToken._meta.label, 0)
+        cursor = ids[-1]
+        if progress:
+            progress(deleted)
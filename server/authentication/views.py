@@ -3,20 +3,21 @@ from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from rest_framework_simplejwt.token_blacklist.models import OutstandingToken, BlacklistedToken
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.db import IntegrityError
 from django.utils import timezone
-from django.core.mail import send_mail
-from django.conf import settings
 import json
 import logging
 
 # Add these imports that were missing
 from .models import UserProfile
+from .tokens import RefreshToken, TokenRefreshSerializer
+from .tasks import send_vendor_upgrade_emails
+from cart.service import merge_guest_cart
+from notifications.metrics import enqueue
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -25,6 +26,8 @@ logger = logging.getLogger(__name__)
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = RefreshToken
+
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
@@ -102,6 +105,9 @@ def register(request):
             password=password
         )
         
+        # Carry over anything added to the cart before signing in
+        merge_guest_cart(request, user)
+
         # Generate tokens
         refresh = RefreshToken.for_user(user)
         access_token = refresh.access_token
@@ -165,20 +171,12 @@ def login(request):
         user = authenticate(username=email, password=password)
         
         if user is None:
-            # Try to find user by email and check if they exist
-            try:
-                user_obj = User.objects.get(email=email)
-                # User exists but password is wrong
-                return Response({
-                    'success': False,
-                    'message': 'Invalid password'
-                }, status=status.HTTP_401_UNAUTHORIZED)
-            except User.DoesNotExist:
-                # User doesn't exist
-                return Response({
-                    'success': False,
-                    'message': 'No account found with this email'
-                }, status=status.HTTP_401_UNAUTHORIZED)
+            # The same answer (and one password hash, as authenticate() runs
+            # for unknown users too) whether or not the account exists
+            return Response({
+                'success': False,
+                'message': 'Invalid email or password'
+            }, status=status.HTTP_401_UNAUTHORIZED)
         
         if not user.is_active:
             return Response({
@@ -186,6 +184,9 @@ def login(request):
                 'message': 'Account is disabled'
             }, status=status.HTTP_401_UNAUTHORIZED)
         
+        # Carry over anything added to the cart before signing in
+        merge_guest_cart(request, user)
+
         # Generate tokens
         refresh = RefreshToken.for_user(user)
         access_token = refresh.access_token
@@ -327,6 +328,8 @@ def update_profile(request):
 
 # Custom refresh token view
 class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = TokenRefreshSerializer
+
     def post(self, request, *args, **kwargs):
         response = super().post(request, *args, **kwargs)
         
@@ -447,16 +450,8 @@ def upgrade_to_vendor(request):
         # except Exception as e:
         #     logger.warning(f"Failed to create vendor application record: {str(e)}")
         
-        # Send notification emails
-        try:
-            # Send welcome email to new vendor
-            send_vendor_welcome_email(user, profile)
-            
-            # Send notification to admin
-            send_vendor_application_notification(user, profile)
-        except Exception as e:
-            # Log email error but don't fail the upgrade
-            logger.error(f"Failed to send vendor upgrade emails: {str(e)}")
+        # Welcome email and admin notification go out from a background job
+        enqueue(send_vendor_upgrade_emails, user.id)
         
         # Return success response with updated user data
         return Response({
@@ -486,91 +481,6 @@ def upgrade_to_vendor(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def send_vendor_welcome_email(user, profile):
-    """Send welcome email to new vendor"""
-    try:
-        subject = "Welcome to Kipsunya Biz - Your Vendor Account is Ready!"
-        
-        message = f"""
-Dear {user.get_full_name() or user.email},
-
-Congratulations! Your vendor account has been successfully created on Kipsunya Biz.
-
-Business Details:
-- Business Name: {profile.business_name}
-- Business Type: {profile.business_type}
-- Business Email: {profile.business_email}
-
-Next Steps:
-1. Complete your business profile
-2. Add your first products
-3. Set up your store policies
-4. Start selling to thousands of customers
-
-Your vendor dashboard: https://kipsunya.com/vendor/dashboard
-
-If you have any questions, our vendor support team is here to help:
-- Email: vendor-support@kipsunya.com
-- Phone: +254 700 000 000
-
-Welcome to the Kipsunya Biz family!
-
-Best regards,
-The Kipsunya Biz Team
-        """
-        
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@kipsunya.com'),
-            recipient_list=[user.email],
-            fail_silently=False,
-        )
-        logger.info(f"Welcome email sent to new vendor: {user.email}")
-        
-    except Exception as e:
-        logger.error(f"Failed to send welcome email to {user.email}: {str(e)}")
-
-
-def send_vendor_application_notification(user, profile):
-    """Send notification to admin about new vendor application"""
-    try:
-        subject = f"New Vendor Application - {profile.business_name}"
-        
-        message = f"""
-A new vendor has registered on Kipsunya Biz:
-
-Vendor Details:
-- Name: {user.get_full_name()}
-- Email: {user.email}
-- Business Name: {profile.business_name}
-- Business Type: {profile.business_type}
-- Business Email: {profile.business_email}
-- Phone: {profile.business_phone}
-- Applied: {timezone.now().strftime('%Y-%m-%d %H:%M')}
-
-Please review the application in the admin panel:
-https://kipsunya.com/admin/vendors/
-
-Best regards,
-Kipsunya Biz System
-        """
-        
-        # Send to admin emails - update these with your actual admin emails
-        admin_emails = ['admin@kipsunya.com', 'vendors@kipsunya.com']
-        
-        send_mail(
-            subject=subject,
-            message=message,
-            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@kipsunya.com'),
-            recipient_list=admin_emails,
-            fail_silently=True,  # Don't fail if admin emails don't work
-        )
-        logger.info(f"Admin notification sent for new vendor: {profile.business_name}")
-        
-    except Exception as e:
-        logger.error(f"Failed to send admin notification: {str(e)}")
-
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def vendor_detail(request, vendor_id):
@@ -0,0 +1,15 @@
+# cart/management/commands/prune_carts.py
+from django.core.management.base import BaseCommand
+from cart.storage import DatabaseCartStore, cart_config, get_cart_store
+
+
+class Command(BaseCommand):
+    help = 'Delete guest carts untouched for CART["ANONYMOUS_TTL"] seconds (database backend; run daily)'
+
+    def handle(self, *args, **options):
+        store = get_cart_store()
+        if not isinstance(store, DatabaseCartStore):
+            self.stdout.write('Guest carts expire on their own with the Redis backend; nothing to do')
+            return
+        deleted = store.prune(cart_config()['ANONYMOUS_TTL'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} stale guest cart lines'))
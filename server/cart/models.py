@@ -0,0 +1,28 @@
+# cart/models.py - Database cart storage
+from django.db import models
+
+from products.models import Product
+
+
+class CartItem(models.Model):
+    """
+    One cart line for DatabaseCartStore. owner is 'user:<id>' for signed-in
+    users or 'anon:<token>' for guests (see cart.service.cart_owner).
+    """
+    owner = models.CharField(max_length=64)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    quantity = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'product'], name='cart_item_owner_product_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.owner}: {self.quantity} x {self.product_id}"
@@ -0,0 +1,145 @@
+# cart/service.py - Cart owners, pricing and merging
+"""
+Ties a request to a cart owner and renders carts with live product data.
+
+- Signed-in users own 'user:<id>'. Guests own 'anon:<token>', where the
+  token travels in the X-Cart-Token header or the cart_token cookie and is
+  issued on the guest's first add.
+- Cart.summary() resolves price, stock and availability of every line with
+  one `id IN (...)` product query, whatever the cart size.
+- merge_guest_cart() folds a guest cart into the user's cart at login.
+"""
+import re
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+
+from products.images import image_fields
+from products.models import Product
+from products.serializers import ProductListingSerializer
+
+from .storage import cart_config, get_cart_store
+
+VAT_RATE = Decimal(str(settings.DEFAULT_TAX_RATE)) / 100
+CENT = Decimal('0.01')
+
+TOKEN_HEADER = 'HTTP_X_CART_TOKEN'
+TOKEN_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+LINE_VALUES = (
+    'id', 'name', 'slug', 'description', 'price', 'stock_quantity', 'in_stock', 'is_active', 'image', 'image_variants',
+    'vendor__username', 'vendor__first_name', 'vendor__last_name', 'vendor__profile__business_name',
+)
+
+
+def guest_token(request):
+    """The guest cart token sent with request, if it is well formed"""
+    token = request.META.get(TOKEN_HEADER) or request.COOKIES.get(cart_config()['COOKIE_NAME'])
+    return token if token and TOKEN_PATTERN.fullmatch(token) else None
+
+
+def cart_owner(request, create=False):
+    """
+    Return (owner, new_token). new_token is set when a guest cart was just
+    created and must be handed back to the client.
+    """
+    if request.user.is_authenticated:
+        return f'user:{request.user.id}', None
+    token = guest_token(request)
+    if token:
+        return f'anon:{token}', None
+    if not create:
+        return None, None
+    token = uuid.uuid4().hex
+    return f'anon:{token}', token
+
+
+def merge_guest_cart(request, user):
+    """Move the request's guest cart, if any, into user's cart"""
+    token = guest_token(request)
+    if token:
+        get_cart_store().merge(f'anon:{token}', f'user:{user.id}')
+
+
+def vendor_name(row):
+    full_name = f"{row['vendor__first_name'] or ''} {row['vendor__last_name'] or ''}".strip()
+    return row['vendor__profile__business_name'] or full_name or row['vendor__username'] or ''
+
+
+class Cart:
+    """The cart of one owner, backed by the configured cart store"""
+
+    def __init__(self, owner, store=None):
+        self.owner = owner
+        self.store = store or get_cart_store()
+
+    def quantities(self):
+        return self.store.get(self.owner) if self.owner else {}
+
+    def add(self, product_id, quantity):
+        self.store.add(self.owner, product_id, quantity)
+
+    def set(self, product_id, quantity):
+        self.store.set(self.owner, product_id, quantity)
+
+    def remove(self, product_id):
+        return self.store.remove(self.owner, product_id)
+
+    def clear(self):
+        if self.owner:
+            self.store.clear(self.owner)
+
+    def summary(self, request=None):
+        """
+        Render the cart with current product data: one storage read plus one
+        product query. Lines for deleted products are dropped from storage.
+        """
+        quantities = self.quantities()
+        rows = {
+            row['id']: row
+            for row in Product.objects.filter(id__in=quantities).values(*LINE_VALUES)
+        } if quantities else {}
+
+        missing = [product_id for product_id in quantities if product_id not in rows]
+        if missing:
+            self.store.remove(self.owner, *missing)
+
+        image_url = ProductListingSerializer._image_url_builder(request)
+        items = []
+        total_items = 0
+        subtotal = Decimal('0.00')
+        for product_id, quantity in quantities.items():
+            row = rows.get(product_id)
+            if row is None:
+                continue
+            # Same rule as Product.is_available, on values() rows
+            is_available = row['in_stock'] and row['stock_quantity'] > 0 and row['is_active']
+            line_total = row['price'] * quantity
+            items.append({
+                'id': product_id,
+                'product_id': product_id,
+                'product_name': row['name'],
+                'product_slug': row['slug'],
+                'product_description': row['description'],
+                'product_image': image_fields(row['image'], row['image_variants'], image_url)['thumbnail'],
+                'vendor_name': vendor_name(row),
+                'unit_price': row['price'],
+                'quantity': quantity,
+                'line_total': line_total,
+                'stock_quantity': row['stock_quantity'],
+                'is_available': is_available,
+                'exceeds_stock': quantity > row['stock_quantity'],
+            })
+            if is_available:
+                total_items += quantity
+                subtotal += line_total
+
+        tax_amount = (subtotal * VAT_RATE).quantize(CENT)
+        return {
+            'items': items,
+            'total_items': total_items,
+            'subtotal': subtotal,
+            'tax_amount': tax_amount,
+            'total_amount': subtotal + tax_amount,
+        }
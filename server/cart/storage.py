@@ -0,0 +1,168 @@
+# cart/storage.py - Pluggable cart storage
+"""
+A cart is a mapping of product_id -> quantity per owner string. Prices,
+stock and availability are never stored; cart.service resolves them from
+the product table when the cart is rendered.
+
+Two stores are available, chosen with settings.CART['BACKEND']:
+- 'redis':    one hash per cart (HINCRBY/HSET/HDEL), guest carts expire
+              after ANONYMOUS_TTL seconds of inactivity
+- 'database': CartItem rows, one per line; `python manage.py prune_carts`
+              removes stale guest carts
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CartItem
+
+DEFAULTS = {
+    'BACKEND': 'database',
+    'REDIS_URL': None,
+    'KEY_PREFIX': 'cart',
+    'ANONYMOUS_TTL': 60 * 60 * 24 * 30,   # seconds
+    'COOKIE_NAME': 'cart_token',
+}
+
+
+def cart_config():
+    return {**DEFAULTS, **getattr(settings, 'CART', {})}
+
+
+def is_anonymous(owner):
+    return owner.startswith('anon:')
+
+
+class BaseCartStore:
+    """Interface shared by the cart stores"""
+
+    def get(self, owner):
+        """Return {product_id: quantity} in the order lines were added"""
+        raise NotImplementedError
+
+    def add(self, owner, product_id, quantity):
+        """Add quantity to a line, creating it if needed"""
+        raise NotImplementedError
+
+    def set(self, owner, product_id, quantity):
+        raise NotImplementedError
+
+    def remove(self, owner, *product_ids):
+        """Remove lines; returns how many existed"""
+        raise NotImplementedError
+
+    def clear(self, owner):
+        raise NotImplementedError
+
+    def merge(self, source, target):
+        """Add every line of source's cart to target's and delete source's cart"""
+        for product_id, quantity in self.get(source).items():
+            self.add(target, product_id, quantity)
+        self.clear(source)
+
+
+class DatabaseCartStore(BaseCartStore):
+
+    def get(self, owner):
+        return dict(CartItem.objects.filter(owner=owner).values_list('product_id', 'quantity'))
+
+    def add(self, owner, product_id, quantity):
+        lines = CartItem.objects.filter(owner=owner, product_id=product_id)
+        if lines.update(quantity=F('quantity') + quantity, updated_at=timezone.now()):
+            return
+        try:
+            with transaction.atomic():
+                CartItem.objects.create(owner=owner, product_id=product_id, quantity=quantity)
+        except IntegrityError:
+            # A concurrent request created the line first
+            lines.update(quantity=F('quantity') + quantity, updated_at=timezone.now())
+
+    def set(self, owner, product_id, quantity):
+        CartItem.objects.update_or_create(owner=owner, product_id=product_id, defaults={'quantity': quantity})
+
+    def remove(self, owner, *product_ids):
+        deleted, _ = CartItem.objects.filter(owner=owner, product_id__in=product_ids).delete()
+        return deleted
+
+    def clear(self, owner):
+        CartItem.objects.filter(owner=owner).delete()
+
+    def merge(self, source, target):
+        with transaction.atomic():
+            super().merge(source, target)
+
+    def prune(self, max_age):
+        """Delete guest carts untouched for max_age seconds"""
+        cutoff = timezone.now() - timedelta(seconds=max_age)
+        stale = CartItem.objects.filter(owner__startswith='anon:', updated_at__lt=cutoff)
+        deleted, _ = stale.delete()
+        return deleted
+
+
+class RedisCartStore(BaseCartStore):
+
+    def __init__(self, url, key_prefix=DEFAULTS['KEY_PREFIX'], anonymous_ttl=DEFAULTS['ANONYMOUS_TTL']):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.key_prefix = key_prefix
+        self.anonymous_ttl = anonymous_ttl
+
+    def key(self, owner):
+        return f'{self.key_prefix}:{owner}'
+
+    def _touch(self, pipe, owner):
+        if is_anonymous(owner):
+            pipe.expire(self.key(owner), self.anonymous_ttl)
+
+    def get(self, owner):
+        return {int(pk): int(quantity) for pk, quantity in self.client.hgetall(self.key(owner)).items()}
+
+    def add(self, owner, product_id, quantity):
+        with self.client.pipeline() as pipe:
+            pipe.hincrby(self.key(owner), product_id, quantity)
+            self._touch(pipe, owner)
+            pipe.execute()
+
+    def set(self, owner, product_id, quantity):
+        with self.client.pipeline() as pipe:
+            pipe.hset(self.key(owner), product_id, quantity)
+            self._touch(pipe, owner)
+            pipe.execute()
+
+    def remove(self, owner, *product_ids):
+        return self.client.hdel(self.key(owner), *product_ids) if product_ids else 0
+
+    def clear(self, owner):
+        self.client.delete(self.key(owner))
+
+    def merge(self, source, target):
+        lines = self.get(source)
+        with self.client.pipeline() as pipe:
+            for product_id, quantity in lines.items():
+                pipe.hincrby(self.key(target), product_id, quantity)
+            pipe.delete(self.key(source))
+            self._touch(pipe, target)
+            pipe.execute()
+
+
+_store = None
+
+
+def get_cart_store():
+    """Return the process-wide cart store configured by settings.CART"""
+    global _store
+    if _store is None:
+        config = cart_config()
+        if config['BACKEND'] == 'redis':
+            _store = RedisCartStore(
+                config['REDIS_URL'], key_prefix=config['KEY_PREFIX'], anonymous_ttl=config['ANONYMOUS_TTL'],
+            )
+        elif config['BACKEND'] == 'database':
+            _store = DatabaseCartStore()
+        else:
+            raise ValueError(f"Unknown CART backend: {config['BACKEND']}")
+    return _store
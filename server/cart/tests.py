@@ -0,0 +1,204 @@
+import json
+import unittest
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from products.models import Category, Product
+
+from .models import CartItem
+from .service import Cart
+from .storage import DatabaseCartStore, RedisCartStore
+
+
+class CartTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = User.objects.create_user(username='vendor@example.com', first_name='Jane', last_name='Vendor')
+        cls.vendor.profile.business_name = 'Jane Electronics'
+        cls.vendor.profile.save()
+        cls.category = Category.objects.create(name='Phones', slug='phones')
+        cls.phone = cls.create_product('Phone', '100.00', stock=5)
+        cls.case = cls.create_product('Case', '10.50', stock=20)
+
+    @classmethod
+    def create_product(cls, name, price, stock):
+        return Product.objects.create(
+            name=name, slug=name.lower(), category=cls.category, vendor=cls.vendor,
+            price=Decimal(price), stock_quantity=stock,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def get_cart(self):
+        # Money is rendered as JSON numbers; keep it exact
+        return json.loads(self.client.get('/api/cart/').content, parse_float=Decimal)
+
+    def add(self, product, quantity=1, **headers):
+        return self.client.post('/api/cart/add/', {'product_id': product.id, 'quantity': quantity},
+                                format='json', headers=headers)
+
+
+class GuestCartTests(CartTestCase):
+
+    def test_first_add_issues_a_token_that_identifies_the_cart(self):
+        response = self.add(self.phone, 2)
+        self.assertEqual(response.status_code, 200)
+        token = response.json()['cart_token']
+        self.assertEqual(response.cookies['cart_token'].value, token)
+
+        # The cookie alone identifies the cart...
+        self.add(self.case)
+        self.assertEqual(self.client.get('/api/cart/').json()['total_items'], 3)
+
+        # ...and so does the header, for clients that cannot send cookies
+        other = APIClient()
+        cart = other.get('/api/cart/', headers={'X-Cart-Token': token}).json()
+        self.assertEqual([(item['product_id'], item['quantity']) for item in cart['items']],
+                         [(self.phone.id, 2), (self.case.id, 1)])
+
+    def test_summary_prices_lines_and_totals(self):
+        self.add(self.phone, 2)
+        self.add(self.case, 3)
+        cart = self.get_cart()
+
+        phone = cart['items'][0]
+        self.assertEqual(phone['id'], self.phone.id)
+        self.assertEqual(phone['product_name'], 'Phone')
+        self.assertEqual(phone['vendor_name'], 'Jane Electronics')
+        self.assertEqual(phone['unit_price'], Decimal('100.00'))
+        self.assertEqual(phone['line_total'], Decimal('200.00'))
+        self.assertEqual(cart['total_items'], 5)
+        self.assertEqual(cart['subtotal'], Decimal('231.50'))
+        self.assertEqual(cart['tax_amount'], Decimal('37.04'))
+        self.assertEqual(cart['total_amount'], Decimal('268.54'))
+
+    def test_prices_and_availability_are_read_live(self):
+        self.add(self.phone, 1)
+        self.add(self.case, 2)
+        Product.objects.filter(id=self.phone.id).update(price=Decimal('90.00'))
+        Product.objects.filter(id=self.case.id).update(stock_quantity=0)
+
+        cart = self.get_cart()
+        self.assertEqual(cart['items'][0]['unit_price'], Decimal('90.00'))
+        self.assertFalse(cart['items'][1]['is_available'])
+        self.assertEqual((cart['total_items'], cart['subtotal']), (1, Decimal('90.00')))
+
+    def test_deleted_products_drop_out_of_the_cart(self):
+        self.add(self.phone)
+        self.add(self.case)
+        Product.objects.filter(id=self.case.id).delete()
+        cart = self.client.get('/api/cart/').json()
+        self.assertEqual([item['product_id'] for item in cart['items']], [self.phone.id])
+
+    def test_add_is_limited_by_stock(self):
+        self.add(self.phone, 4)
+        response = self.add(self.phone, 2)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Only 5', response.json()['error'])
+
+        self.case.is_active = False
+        self.case.save()
+        self.assertEqual(self.add(self.case).status_code, 404)
+        self.assertEqual(self.add(self.phone, 0).status_code, 400)
+
+    def test_update_remove_and_clear(self):
+        self.add(self.phone)
+        self.add(self.case)
+
+        response = self.client.put(f'/api/cart/items/{self.phone.id}/', {'quantity': 3}, format='json')
+        self.assertEqual(response.json()['cart_summary']['total_items'], 4)
+        response = self.client.put(f'/api/cart/items/{self.phone.id}/', {'quantity': 6}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.delete(f'/api/cart/items/{self.case.id}/remove/')
+        self.assertEqual(response.json()['cart_summary']['total_items'], 3)
+        self.assertEqual(self.client.delete(f'/api/cart/items/{self.case.id}/remove/').status_code, 404)
+
+        response = self.client.put(f'/api/cart/items/{self.phone.id}/', {'quantity': 0}, format='json')
+        self.assertEqual(response.json()['cart_summary']['items'], [])
+
+        self.add(self.phone)
+        self.client.post('/api/cart/clear/')
+        self.assertEqual(self.client.get('/api/cart/').json()['items'], [])
+
+    def test_empty_cart_without_token(self):
+        with self.assertNumQueries(0):
+            cart = self.client.get('/api/cart/').json()
+        self.assertEqual((cart['items'], cart['total_items']), ([], 0))
+
+
+class CartQueryTests(CartTestCase):
+
+    def test_summary_queries_do_not_grow_with_the_cart(self):
+        products = [self.create_product(f'Item {i}', '1.00', stock=10) for i in range(50)]
+        store = DatabaseCartStore()
+
+        store.add('user:1', products[0].id, 1)
+        with self.assertNumQueries(2):
+            self.assertEqual(len(Cart('user:1', store).summary()['items']), 1)
+
+        for product in products[1:]:
+            store.add('user:1', product.id, 1)
+        with self.assertNumQueries(2):
+            self.assertEqual(Cart('user:1', store).summary()['total_items'], 50)
+
+
+class CartMergeTests(CartTestCase):
+
+    def test_login_merges_the_guest_cart(self):
+        user = User.objects.create_user(username='buyer@example.com', email='buyer@example.com', password='secret-pass')
+        CartItem.objects.create(owner=f'user:{user.id}', product=self.phone, quantity=1)
+
+        token = self.add(self.phone, 2).json()['cart_token']
+        self.add(self.case, 1)
+
+        response = self.client.post('/api/auth/login/', json.dumps({
+            'email': 'buyer@example.com', 'password': 'secret-pass',
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        self.assertFalse(CartItem.objects.filter(owner=f'anon:{token}').exists())
+        self.assertEqual(
+            dict(CartItem.objects.filter(owner=f'user:{user.id}').values_list('product_id', 'quantity')),
+            {self.phone.id: 3, self.case.id: 1},
+        )
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['accessToken']}")
+        self.assertEqual(self.client.get('/api/cart/').json()['total_items'], 4)
+
+
+def redis_available():
+    try:
+        import redis
+        return redis.Redis(socket_connect_timeout=0.2).ping()
+    except Exception:
+        return False
+
+
+@unittest.skipUnless(redis_available(), 'needs a Redis server on localhost:6379')
+class RedisCartStoreTests(SimpleTestCase):
+
+    def setUp(self):
+        self.store = RedisCartStore('redis://localhost:6379/15', key_prefix='cart-test', anonymous_ttl=60)
+        self.addCleanup(self.store.clear, 'anon:abc')
+        self.addCleanup(self.store.clear, 'user:1')
+
+    def test_add_set_remove_and_merge(self):
+        self.store.add('anon:abc', 1, 2)
+        self.store.add('anon:abc', 1, 1)
+        self.store.set('anon:abc', 2, 5)
+        self.assertEqual(self.store.get('anon:abc'), {1: 3, 2: 5})
+        self.assertGreater(self.store.client.ttl(self.store.key('anon:abc')), 0)
+
+        self.store.add('user:1', 2, 1)
+        self.store.merge('anon:abc', 'user:1')
+        self.assertEqual(self.store.get('user:1'), {1: 3, 2: 6})
+        self.assertEqual(self.store.get('anon:abc'), {})
+        self.assertEqual(self.store.client.ttl(self.store.key('user:1')), -1)
+
+        self.assertEqual(self.store.remove('user:1', 1, 99), 1)
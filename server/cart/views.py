@@ -0,0 +1,128 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.response import Response
+
+from products.models import Product
+
+from .service import Cart, cart_owner, merge_guest_cart
+from .storage import cart_config
+
+
+def cart_response(data, new_token=None, status=status.HTTP_200_OK):
+    """Response that hands a newly issued guest cart token back to the client"""
+    if new_token:
+        data['cart_token'] = new_token
+    response = Response(data, status=status)
+    if new_token:
+        config = cart_config()
+        response.set_cookie(
+            config['COOKIE_NAME'], new_token, max_age=config['ANONYMOUS_TTL'], httponly=True, samesite='Lax',
+        )
+    return response
+
+
+def error(message, status=status.HTTP_400_BAD_REQUEST):
+    return Response({'error': message}, status=status)
+
+
+def parse_quantity(value, minimum=1):
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        return None
+    return quantity if quantity >= minimum else None
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def cart_detail(request):
+    """The current cart with live prices, stock and totals"""
+    owner, _ = cart_owner(request)
+    return Response(Cart(owner).summary(request))
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def add_to_cart(request):
+    """Add a quantity of a product to the cart"""
+    quantity = parse_quantity(request.data.get('quantity', 1))
+    if quantity is None:
+        return error('Quantity must be a positive whole number')
+    try:
+        product = Product.objects.only('name', 'stock_quantity', 'in_stock', 'is_active').get(
+            id=request.data.get('product_id'), is_active=True,
+        )
+    except (Product.DoesNotExist, ValueError, TypeError):
+        return error('Product not found', status.HTTP_404_NOT_FOUND)
+    if not product.is_available:
+        return error(f'{product.name} is out of stock')
+
+    owner, new_token = cart_owner(request, create=True)
+    cart = Cart(owner)
+    in_cart = cart.quantities().get(product.id, 0)
+    if in_cart + quantity > product.stock_quantity:
+        return error(f'Only {product.stock_quantity} of {product.name} available')
+
+    cart.add(product.id, quantity)
+    return cart_response({
+        'message': f'{product.name} added to cart',
+        'cart_summary': cart.summary(request),
+    }, new_token)
+
+
+@api_view(['PUT'])
+@permission_classes([AllowAny])
+def update_cart_item(request, item_id):
+    """Set the quantity of a cart line; 0 removes it"""
+    quantity = parse_quantity(request.data.get('quantity'), minimum=0)
+    if quantity is None:
+        return error('Quantity must be a whole number of 0 or more')
+
+    owner, _ = cart_owner(request)
+    cart = Cart(owner)
+    if item_id not in cart.quantities():
+        return error('Item not in cart', status.HTTP_404_NOT_FOUND)
+
+    if quantity == 0:
+        cart.remove(item_id)
+        return Response({'message': 'Item removed from cart', 'cart_summary': cart.summary(request)})
+
+    stock = Product.objects.filter(id=item_id).values_list('stock_quantity', flat=True).first() or 0
+    if quantity > stock:
+        return error(f'Only {stock} available')
+    cart.set(item_id, quantity)
+    return Response({'message': 'Cart updated', 'cart_summary': cart.summary(request)})
+
+
+@api_view(['DELETE'])
+@permission_classes([AllowAny])
+def remove_cart_item(request, item_id):
+    """Remove a line from the cart"""
+    owner, _ = cart_owner(request)
+    cart = Cart(owner)
+    if not owner or not cart.remove(item_id):
+        return error('Item not in cart', status.HTTP_404_NOT_FOUND)
+    return Response({'message': 'Item removed from cart', 'cart_summary': cart.summary(request)})
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def clear_cart(request):
+    """Empty the cart"""
+    owner, _ = cart_owner(request)
+    Cart(owner).clear()
+    return Response({'message': 'Cart cleared'})
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def merge_cart(request):
+    """
+    Fold the guest cart named by the X-Cart-Token header or cart_token cookie
+    into the signed-in user's cart. Login does this automatically; this is
+    for clients that authenticate another way (token refresh, social login).
+    """
+    merge_guest_cart(request, request.user)
+    owner, _ = cart_owner(request)
+    return Response({'message': 'Cart merged', 'cart_summary': Cart(owner).summary(request)})
@@ -0,0 +1,72 @@
+# loadtest/client.py - Minimal asyncio HTTP/1.1 keep-alive client
+"""
+Just enough HTTP/1.1 for the harness: one keep-alive connection per
+virtual user, JSON bodies, Content-Length responses. Avoids a third-party
+client whose own overhead would show up in the latencies.
+"""
+import asyncio
+import json
+from dataclasses import dataclass, field
+
+REQUEST_TIMEOUT = 30
+
+# Failures that count as an errored request rather than a response
+CONNECTION_ERRORS = (OSError, ValueError, IndexError, asyncio.TimeoutError, asyncio.IncompleteReadError)
+
+
+@dataclass
+class Response:
+    status: int
+    headers: dict = field(default_factory=dict)
+    body: bytes = b''
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class Connection:
+    """A keep-alive connection that reconnects when the server closes it"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.streams = None
+
+    async def request(self, method, path, headers=None, data=None):
+        if self.streams is None:
+            self.streams = await asyncio.open_connection(self.host, self.port)
+        try:
+            response = await asyncio.wait_for(self._exchange(method, path, headers or {}, data), REQUEST_TIMEOUT)
+        except BaseException:
+            self.close()
+            raise
+        if response.headers.get('connection', '').lower() == 'close':
+            self.close()
+        return response
+
+    async def _exchange(self, method, path, headers, data):
+        reader, writer = self.streams
+        body = b'' if data is None else json.dumps(data).encode()
+        lines = [f'{method} {path} HTTP/1.1', 'Host: localhost', 'Connection: keep-alive']
+        if data is not None:
+            lines += ['Content-Type: application/json', f'Content-Length: {len(body)}']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+        await writer.drain()
+
+        status = int((await reader.readline()).split()[1])
+        response_headers = {}
+        while (line := await reader.readline()) not in (b'\r\n', b''):
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        if 'content-length' in response_headers:
+            content = await reader.readexactly(int(response_headers['content-length']))
+        else:
+            content = await reader.read()
+            response_headers['connection'] = 'close'
+        return Response(status, response_headers, content)
+
+    def close(self):
+        if self.streams is not None:
+            self.streams[1].close()
+            self.streams = None
@@ -0,0 +1,112 @@
+# loadtest/dataset.py - Scalable, deterministic load-test data
+"""
+Seeds a database for the load-test harness: vendors and products from
+products.generator (the generate_catalogue command's generator, modelled
+on the Jumia CSVs), plus customers and an admin to sign in as.
+
+The same seed always produces the same rows. Every account shares one
+password (hashed once). The returned manifest lists what the scenario
+needs: product ids and slugs, cities, search words, the price range and
+the accounts to sign in as.
+"""
+import re
+import time
+from collections import Counter
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max, Min
+
+from admin_panel import stats as dashboard
+from authentication.models import UserProfile
+from products.generator import CITIES, CatalogueGenerator
+from products.models import Category, Product
+
+PASSWORD = 'loadtest-password'
+EMAIL_DOMAIN = 'loadtest.kipsunya.com'
+
+WORD_RE = re.compile(r'[A-Za-z]{4,}')
+
+
+def email(kind, number):
+    return f'{kind}{number}@{EMAIL_DOMAIN}'
+
+
+class DatasetBuilder:
+    """Build a load-test dataset. See module docstring."""
+
+    def __init__(self, products=5000, vendors=200, customers=500, seed=1, batch_size=2000, progress=None):
+        self.counts = {'products': products, 'vendors': vendors, 'customers': customers}
+        self.seed = seed
+        self.batch_size = batch_size
+        self.progress = progress or (lambda message: None)
+        self.generator = CatalogueGenerator(
+            products=products, vendors=vendors, seed=seed, batch_size=batch_size,
+            password=PASSWORD, email_domain=EMAIL_DOMAIN,
+        )
+        self.rng = self.generator.rng
+
+    def build(self):
+        started = time.perf_counter()
+        vendors, stats = self.generator.generate(progress=lambda stats: self.progress(
+            f'  {stats.products}/{self.counts["products"]} products'
+        ))
+        password = make_password(PASSWORD)
+        customers = self.create_customers(password)
+        admin = self.create_admin(password)
+        dashboard.refresh()
+        self.progress(f'{stats.vendors} vendors, {stats.products} products and {len(customers)} customers '
+                      f'in {time.perf_counter() - started:.1f}s')
+        return self.manifest(vendors, customers, admin)
+
+    def create_customers(self, password):
+        customers = []
+        count = self.counts['customers']
+        for start in range(0, count, self.batch_size):
+            numbers = range(start + 1, min(count, start + self.batch_size) + 1)
+            with transaction.atomic():
+                batch = User.objects.bulk_create([
+                    User(username=email('customer', number), email=email('customer', number), password=password,
+                         first_name='Customer', last_name=str(number))
+                    for number in numbers
+                ])
+                UserProfile.objects.bulk_create([UserProfile(user=user, role='customer') for user in batch])
+            customers += batch
+        return customers
+
+    def create_admin(self, password):
+        admin = User.objects.create(username=email('admin', 1), email=email('admin', 1), password=password,
+                                    is_staff=True, first_name='Admin')
+        UserProfile.objects.filter(user=admin).update(role='admin')
+        return admin
+
+    def sample_products(self, size):
+        """Up to `size` active products spread over the whole id range"""
+        bounds = Product.objects.aggregate(low=Min('id'), high=Max('id'))
+        if bounds['low'] is None:
+            return []
+        ids = range(bounds['low'], bounds['high'] + 1)
+        sample = self.rng.sample(ids, min(size, len(ids)))
+        return list(Product.objects.filter(id__in=sample, is_active=True).order_by('id').values_list('id', 'slug'))
+
+    def search_words(self, count=40):
+        words = Counter(word.lower() for template in self.generator.templates for word in WORD_RE.findall(template.name))
+        return [word for word, _ in words.most_common(count)]
+
+    def manifest(self, vendors, customers, admin, sample=5000):
+        prices = Product.objects.filter(is_active=True).aggregate(low=Min('price'), high=Max('price'))
+        featured_vendors = [vendor for vendor in vendors if vendor.profile.vendor_tier == 'featured'] or vendors
+        return {
+            'seed': self.seed,
+            'counts': self.counts,
+            'password': PASSWORD,
+            'customers': [[user.id, user.email] for user in customers[:sample]],
+            'vendors': [[user.id, user.email] for user in featured_vendors[:sample]],
+            'admin': [admin.id, admin.email],
+            'categories': list(Category.objects.order_by('id').values_list('id', flat=True)),
+            'products': [list(row) for row in self.sample_products(sample)],
+            'cities': list(CITIES),
+            'search_words': self.search_words(),
+            'price_range': [str(prices['low'] or 0), str(prices['high'] or 0)],
+        }
@@ -0,0 +1,149 @@
+# loadtest/management/commands/loadtest.py
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from loadtest import report, scenario, servers
+
+DATASET_OPTIONS = ['products', 'vendors', 'customers', 'seed']
+
+
+class Command(BaseCommand):
+    help = ('Seed a scratch database, boot the server against it and replay a realistic request mix; '
+            'reports throughput, latency percentiles and query counts per endpoint')
+
+    def add_arguments(self, parser):
+        dataset = parser.add_argument_group('dataset')
+        dataset.add_argument('--products', type=int, default=5000)
+        dataset.add_argument('--vendors', type=int, default=200)
+        dataset.add_argument('--customers', type=int, default=500)
+        dataset.add_argument('--seed', type=int, default=1)
+        dataset.add_argument('--database-url', type=str,
+                             help='Scratch database (default: SQLite in var/loadtest/). It is flushed and reseeded!')
+        dataset.add_argument('--reuse', action='store_true',
+                             help='Keep the database if it was seeded with the same dataset options')
+
+        run = parser.add_argument_group('run')
+        run.add_argument('--server', choices=['gunicorn', 'uvicorn'], default='gunicorn')
+        run.add_argument('--workers', type=int, default=1, help='Server worker processes')
+        run.add_argument('--concurrency', type=int, default=20, help='Virtual users, one connection each')
+        run.add_argument('--duration', type=int, default=30, help='Seconds to run the mix')
+        run.add_argument('--warmup', type=int, default=5, help='Seconds of unrecorded traffic first')
+        run.add_argument('--mix', type=str, help='Override endpoint weights, e.g. "search=30,login=0"')
+        run.add_argument('--debug', action='store_true', help='Run the server with DEBUG on')
+        run.add_argument('--throttling', action='store_true',
+                         help='Apply the THROTTLING rate limits (off by default: a virtual user is far busier '
+                              'than any one visitor)')
+
+        results = parser.add_argument_group('results')
+        results.add_argument('--output', type=str, help='Results JSON (default: var/loadtest/results-<time>.json)')
+        results.add_argument('--baseline', type=str, help='Compare against this earlier results JSON')
+        results.add_argument('--threshold', type=float, default=0.10,
+                             help='Relative change that counts as a regression (default 0.10)')
+
+    def handle(self, *args, **options):
+        try:
+            weights = scenario.parse_mix(options['mix'])
+        except ValueError as exc:
+            raise CommandError(exc)
+        baseline = None
+        if options['baseline']:
+            try:
+                baseline = report.load(Path(options['baseline']))
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {exc}")
+
+        workdir = Path(settings.BASE_DIR) / 'var' / 'loadtest'
+        workdir.mkdir(parents=True, exist_ok=True)
+        database_url = options['database_url'] or f'sqlite:///{workdir / "loadtest.sqlite3"}'
+        env = {
+            **os.environ,
+            'DATABASE_URL': database_url,
+            'DATABASE_REPLICA_URLS': '',
+            'INSTRUMENTATION_ENABLED': '1',
+            'REQUEST_LOG_LEVEL': 'ERROR',   # overload makes every request a slow-request warning
+            'DJANGO_DEBUG': '1' if options['debug'] else '0',
+            'THROTTLING_ENABLED': '1' if options['throttling'] else '0',
+            'THROTTLE_NUM_PROXIES': '1',    # the virtual users' X-Forwarded-For addresses
+        }
+        manifest = self.prepare_dataset(workdir, database_url, env, options)
+
+        port = servers.free_port()
+        self.stdout.write(f"Starting {options['server']} ({options['workers']} worker(s)) on port {port}")
+        try:
+            process = servers.start(options['server'], options['workers'], port, settings.BASE_DIR, env)
+        except RuntimeError as exc:
+            raise CommandError(exc)
+        recorder = report.Recorder()
+        try:
+            if options['warmup']:
+                asyncio.run(scenario.drive(servers.HOST, port, manifest, options['concurrency'], options['warmup'],
+                                           report.Recorder(), weights, seed=options['seed'] + 1))
+            self.stdout.write(f"Running {options['concurrency']} virtual users for {options['duration']}s")
+            asyncio.run(scenario.drive(servers.HOST, port, manifest, options['concurrency'], options['duration'],
+                                       recorder, weights, seed=options['seed']))
+        finally:
+            servers.stop(process)
+
+        results = recorder.summary(meta={
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'dataset': {name: options[name] for name in DATASET_OPTIONS},
+            'database': database_url.split(':', 1)[0],
+            'server': options['server'],
+            'workers': options['workers'],
+            'concurrency': options['concurrency'],
+            'debug': options['debug'],
+            'throttling': options['throttling'],
+            'mix': weights,
+            'python': sys.version.split()[0],
+            'cpus': os.cpu_count(),
+        })
+        output = Path(options['output'] or workdir / f"results-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        report.save(results, output)
+        self.stdout.write(report.format_summary(results))
+        self.stdout.write(self.style.SUCCESS(f'Results saved to {output}'))
+
+        if baseline is not None:
+            rows = report.compare(results, baseline, options['threshold'])
+            self.stdout.write(f"\nAgainst {options['baseline']}:")
+            self.stdout.write(report.format_comparison(rows))
+            regressed = [row for row in rows if row[-1]]
+            if regressed:
+                raise CommandError(f"{len(regressed)} metric(s) regressed by more than {options['threshold']:.0%}")
+
+    def prepare_dataset(self, workdir, database_url, env, options):
+        manifest_path = workdir / 'manifest.json'
+        dataset = {name: options[name] for name in DATASET_OPTIONS}
+        if options['reuse'] and manifest_path.exists():
+            manifest = json.loads(manifest_path.read_text())
+            if manifest.get('dataset') == dataset and manifest.get('database_url') == database_url:
+                self.stdout.write(f'Reusing the dataset in {database_url}')
+                return manifest
+
+        self.stdout.write(f"Seeding {options['products']} products into {database_url}")
+        sqlite_path = database_url.removeprefix('sqlite:///') if database_url.startswith('sqlite:///') else None
+        if sqlite_path:
+            Path(sqlite_path).unlink(missing_ok=True)
+        self.manage(env, 'migrate', '--run-syncdb', '--verbosity', '0')
+        if not sqlite_path:
+            self.manage(env, 'flush', '--no-input', '--verbosity', '0')
+        seed_args = [f'--{name}={options[name]}' for name in DATASET_OPTIONS]
+        self.manage(env, 'seed_loadtest', *seed_args, f'--manifest={manifest_path}')
+
+        manifest = json.loads(manifest_path.read_text())
+        manifest.update(dataset=dataset, database_url=database_url)
+        manifest_path.write_text(json.dumps(manifest))
+        return manifest
+
+    def manage(self, env, *args):
+        try:
+            subprocess.run([sys.executable, 'manage.py', *args], cwd=settings.BASE_DIR, env=env, check=True)
+        except subprocess.CalledProcessError as exc:
+            raise CommandError(f"manage.py {args[0]} failed with status {exc.returncode}")
@@ -0,0 +1,140 @@
+# loadtest/report.py - Load-test results, JSON baselines and diffs
+"""
+Recorder collects one sample per request. summary() turns them into the
+results document saved as JSON:
+
+    {"meta": {...run parameters...},
+     "totals": {"requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", ...},
+     "endpoints": {"listing": {...same fields, "queries_mean", "queries_max", "statuses"}, ...}}
+
+compare() diffs two such documents: a later run against a stored baseline.
+"""
+import json
+import time
+from collections import Counter, defaultdict
+
+# Metrics compared against a baseline, and whether higher is worse
+COMPARED = {
+    'rps': False,
+    'p50_ms': True,
+    'p95_ms': True,
+    'p99_ms': True,
+    'error_rate': True,
+    'queries_mean': True,
+}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Recorder:
+
+    def __init__(self):
+        self.samples = defaultdict(list)    # endpoint -> [(status, seconds, queries, error)]
+        self.started = self.stopped = None
+
+    def start(self):
+        self.started = time.monotonic()
+
+    def stop(self):
+        self.stopped = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return (self.stopped or time.monotonic()) - self.started
+
+    def record(self, endpoint, status, seconds, queries=None, error=None):
+        self.samples[endpoint].append((status, seconds, queries, error))
+
+    def summary(self, meta=None):
+        endpoints = {name: summarize(samples, self.elapsed) for name, samples in sorted(self.samples.items())}
+        everything = [sample for samples in self.samples.values() for sample in samples]
+        totals = summarize(everything, self.elapsed)
+        del totals['statuses']
+        return {'meta': {**(meta or {}), 'seconds': round(self.elapsed, 2)}, 'totals': totals, 'endpoints': endpoints}
+
+
+def summarize(samples, elapsed):
+    latencies = sorted(seconds * 1000 for status, seconds, queries, error in samples if status is not None)
+    queries = [count for status, seconds, count, error in samples if count is not None]
+    errors = sum(1 for sample in samples if sample[3] is not None)
+
+    def ms(value):
+        return None if value is None else round(value, 1)
+
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0,
+        'rps': round(len(samples) / elapsed, 1) if elapsed else 0,
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'queries_mean': round(sum(queries) / len(queries), 1) if queries else None,
+        'queries_max': max(queries) if queries else None,
+        'statuses': dict(sorted(Counter(str(sample[0]) for sample in samples).items())),
+    }
+
+
+def save(results, path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2) + '\n')
+
+
+def load(path):
+    return json.loads(path.read_text())
+
+
+def compare(results, baseline, threshold=0.10):
+    """
+    Rows of (endpoint, metric, baseline, current, relative change, regressed)
+    for every metric in COMPARED present in both runs. A metric regresses when
+    it moves the wrong way by more than `threshold` (a fraction).
+    """
+    rows = []
+    sections = [('TOTAL', results['totals'], baseline['totals'])]
+    sections += [(name, stats, baseline['endpoints'][name])
+                 for name, stats in results['endpoints'].items() if name in baseline['endpoints']]
+    for name, current, previous in sections:
+        for metric, higher_is_worse in COMPARED.items():
+            old, new = previous.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            if old == 0:
+                change = 0.0 if new == 0 else float('inf')
+            else:
+                change = (new - old) / old
+            worse = change if higher_is_worse else -change
+            rows.append((name, metric, old, new, change, worse > threshold))
+    return rows
+
+
+def format_summary(results):
+    lines = [f'{"endpoint":16s} {"reqs":>6s} {"err":>5s} {"req/s":>7s} {"p50 ms":>8s} {"p95 ms":>8s} '
+             f'{"p99 ms":>8s} {"queries":>8s}']
+    rows = list(results['endpoints'].items()) + [('TOTAL', results['totals'])]
+    for name, stats in rows:
+        queries = '-' if stats['queries_mean'] is None else f'{stats["queries_mean"]:.1f}'
+        lines.append(
+            f'{name:16s} {stats["requests"]:6d} {stats["errors"]:5d} {stats["rps"]:7.1f} '
+            f'{_ms(stats["p50_ms"])} {_ms(stats["p95_ms"])} {_ms(stats["p99_ms"])} {queries:>8s}'
+        )
+    return '\n'.join(lines)
+
+
+def format_comparison(rows, regressions_only=False):
+    lines = [f'{"endpoint":16s} {"metric":13s} {"baseline":>10s} {"current":>10s} {"change":>8s}']
+    for name, metric, old, new, change, regressed in rows:
+        if regressions_only and not regressed:
+            continue
+        lines.append(f'{name:16s} {metric:13s} {old:10g} {new:10g} {change:+8.1%}{"  REGRESSED" if regressed else ""}')
+    return '\n'.join(lines)
+
+
+def _ms(value):
+    return f'{"-":>8s}' if value is None else f'{value:8.1f}'
@@ -0,0 +1,235 @@
+# loadtest/scenario.py - The request mix replayed by the load test
+"""
+Each virtual user holds one keep-alive connection and, until the deadline,
+picks an endpoint from MIX by weight and sends it. Weights approximate
+marketplace traffic: mostly anonymous catalogue browsing (listing, search,
+filters, product pages), then signed-in actions (reveal-contact, token
+refresh, the occasional login), vendors creating products and checking
+their stats, and an admin watching the dashboard.
+
+Virtual users sign in with tokens minted from the manifest's accounts
+(signed locally, no database write), so every run starts from fresh
+refresh tokens even against a reused dataset. Vendors are featured-tier,
+so creating products never hits a tier limit.
+
+Each virtual user sends its own X-Forwarded-For address, so per-address
+rate limits see separate clients. 'stuffing' (off unless given a weight
+with --mix) replays a credential-stuffing attack alongside the traffic:
+leaked email/password pairs, a few for real customers, spread over a
+botnet's worth of addresses.
+"""
+import asyncio
+import random
+import re
+import time
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .client import CONNECTION_ERRORS, Connection
+
+PAGE_SIZE = 20
+
+# The query count in server.instrumentation's Server-Timing header
+QUERIES_RE = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+# endpoint -> relative weight
+MIX = {
+    'listing': 20,
+    'featured': 8,
+    'categories': 7,
+    'search': 12,
+    'filter': 10,
+    'product_detail': 15,
+    'product_by_slug': 8,
+    'reveal_contact': 4,
+    'login': 2,
+    'refresh': 3,
+    'vendor_create': 2,
+    'vendor_stats': 4,
+    'admin_dashboard': 2,
+    'stuffing': 0,
+}
+
+# Addresses the credential-stuffing requests come from
+BOTNET_SIZE = 1024
+
+
+@dataclass
+class Call:
+    method: str
+    path: str
+    data: dict = None
+    auth: str = None    # 'customer', 'vendor' or 'admin'
+    address: str = None     # X-Forwarded-For, when not the virtual user's own
+    ok: tuple = (200,)
+    on_response: object = None
+
+
+def mint_token(user_id):
+    """A refresh token for user_id, as RefreshToken.for_user issues, without recording it"""
+    token = RefreshToken()
+    token[jwt_settings.USER_ID_CLAIM] = user_id
+    return token
+
+
+def query_count(response):
+    match = QUERIES_RE.search(response.headers.get('server-timing', ''))
+    return int(match.group(1)) if match else None
+
+
+def parse_mix(value):
+    """'search=30,login=0' -> MIX with those weights replaced"""
+    weights = dict(MIX)
+    for item in filter(None, (value or '').split(',')):
+        name, _, weight = item.partition('=')
+        if name.strip() not in MIX:
+            raise ValueError(f'Unknown endpoint {name.strip()!r}; choose from {", ".join(MIX)}')
+        weights[name.strip()] = float(weight)
+    return weights
+
+
+class VirtualUser:
+
+    def __init__(self, manifest, number, seed=0, run_id=''):
+        self.manifest = manifest
+        self.name = f'{run_id}-{number}'
+        self.created = 0
+        self.rng = random.Random(f'{seed}:{number}')
+        self.address = f'10.{number // 65536 % 256}.{number // 256 % 256}.{number % 256}'
+        customer_id, self.email = manifest['customers'][number % len(manifest['customers'])]
+        vendor_id, _ = manifest['vendors'][number % len(manifest['vendors'])]
+        refresh = mint_token(customer_id)
+        self.refresh_token = str(refresh)
+        self.tokens = {
+            'customer': str(refresh.access_token),
+            'vendor': str(mint_token(vendor_id).access_token),
+            'admin': str(mint_token(manifest['admin'][0]).access_token),
+        }
+        active = manifest['counts']['products'] * 0.95
+        self.pages = max(1, int(active // PAGE_SIZE))
+
+    def pick(self, weights):
+        return self.rng.choices(list(weights), weights=list(weights.values()))[0]
+
+    def call(self, endpoint):
+        return getattr(self, endpoint)()
+
+    def headers(self, call):
+        headers = {'X-Forwarded-For': call.address or self.address}
+        if call.auth:
+            headers['Authorization'] = f'Bearer {self.tokens[call.auth]}'
+        return headers
+
+    def product(self):
+        return self.rng.choice(self.manifest['products'])
+
+    def price(self, low, high):
+        return round(self.rng.uniform(float(low), float(high)))
+
+    # Anonymous browsing
+
+    def listing(self):
+        # Most visitors stay on the first pages
+        page = 1 if self.rng.random() < 0.6 else self.rng.randint(2, min(self.pages, 50) or 1)
+        return Call('GET', f'/api/all_products/?page={page}')
+
+    def featured(self):
+        return Call('GET', '/api/featured/')
+
+    def categories(self):
+        return Call('GET', '/api/categories/list/')
+
+    def search(self):
+        words = self.rng.sample(self.manifest['search_words'], self.rng.choice([1, 1, 2]))
+        return Call('GET', '/api/all_products/?' + urlencode({'search': ' '.join(words)}))
+
+    def filter(self):
+        low, high = (float(price) for price in self.manifest['price_range'])
+        min_price = self.price(low, min(high, 5000))
+        params = {'city': self.rng.choice(self.manifest['cities']),
+                  'min_price': min_price, 'max_price': min_price + self.price(500, 50000)}
+        if self.rng.random() < 0.3:
+            params['category'] = self.rng.choice(self.manifest['categories'])
+        return Call('GET', '/api/all_products/?' + urlencode(params))
+
+    def product_detail(self):
+        return Call('GET', f'/api/products/{self.product()[0]}/')
+
+    def product_by_slug(self):
+        return Call('GET', f'/api/product/{self.product()[1]}/')
+
+    # Signed in
+
+    def reveal_contact(self):
+        return Call('POST', f'/api/products/{self.product()[0]}/reveal-contact/', auth='customer')
+
+    def login(self):
+        return Call('POST', '/api/auth/login/', {'email': self.email, 'password': self.manifest['password']})
+
+    def refresh(self):
+        def rotate(response):
+            self.refresh_token = response.json()['refresh']
+        return Call('POST', '/api/auth/refresh/', {'refresh': self.refresh_token}, on_response=rotate)
+
+    def vendor_create(self):
+        # Names are unique per vendor, and the dataset may be reused by later runs
+        self.created += 1
+        return Call('POST', '/api/products/', {
+            'name': f'Load Test Item {self.name}-{self.created}',
+            'description': 'Created by the load test',
+            'price': str(self.price(100, 20000)),
+            'stock_quantity': self.rng.randint(1, 50),
+            'category_id': self.rng.choice(self.manifest['categories']),
+        }, auth='vendor', ok=(201,))
+
+    def vendor_stats(self):
+        return Call('GET', '/api/vendor/stats/', auth='vendor')
+
+    def admin_dashboard(self):
+        return Call('GET', '/api/admin/dashboard-stats/', auth='admin')
+
+    # Attack
+
+    def stuffing(self):
+        if self.rng.random() < 0.2:
+            email = self.rng.choice(self.manifest['customers'])[1]
+        else:
+            email = f'leaked{self.rng.randrange(10 ** 6)}@example.net'
+        bot = self.rng.randrange(BOTNET_SIZE)
+        return Call('POST', '/api/auth/login/', {'email': email, 'password': f'hunter{self.rng.randrange(10 ** 6)}'},
+                    ok=(401, 429), address=f'198.18.{bot // 256}.{bot % 256}')
+
+
+async def run_user(user, connection, weights, deadline, recorder):
+    while time.monotonic() < deadline:
+        endpoint = user.pick(weights)
+        call = user.call(endpoint)
+        started = time.perf_counter()
+        try:
+            response = await connection.request(call.method, call.path, user.headers(call), call.data)
+        except CONNECTION_ERRORS as exc:
+            recorder.record(endpoint, None, time.perf_counter() - started, error=type(exc).__name__)
+            continue
+        latency = time.perf_counter() - started
+        ok = response.status in call.ok
+        recorder.record(endpoint, response.status, latency, query_count(response),
+                        error=None if ok else f'HTTP {response.status}')
+        if ok and call.on_response is not None:
+            call.on_response(response)
+    connection.close()
+
+
+async def drive(host, port, manifest, concurrency, seconds, recorder, weights=None, seed=0):
+    """Run `concurrency` virtual users against host:port for `seconds`"""
+    weights = {name: weight for name, weight in (weights or MIX).items() if weight > 0}
+    deadline = time.monotonic() + seconds
+    run_id = format(time.time_ns(), 'x')
+    users = [VirtualUser(manifest, number, seed, run_id) for number in range(concurrency)]
+    recorder.start()
+    await asyncio.gather(*[
+        run_user(user, Connection(host, port), weights, deadline, recorder) for user in users
+    ])
+    recorder.stop()
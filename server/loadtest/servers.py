@@ -0,0 +1,71 @@
+# loadtest/servers.py - Boot the application server under test
+import asyncio
+import socket
+import subprocess
+import sys
+import time
+
+from .client import CONNECTION_ERRORS, Connection
+
+HOST = '127.0.0.1'
+READY_PATH = '/api/categories/list/'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, workers, port):
+    if server == 'gunicorn':
+        return [
+            sys.executable, '-m', 'gunicorn', 'server.wsgi:application', '--workers', str(workers),
+            '--bind', f'{HOST}:{port}', '--backlog', '2048', '--log-level', 'warning',
+        ]
+    if server == 'uvicorn':
+        return [
+            sys.executable, '-m', 'uvicorn', 'server.asgi:application', '--workers', str(workers),
+            '--host', HOST, '--port', str(port), '--backlog', '2048', '--log-level', 'warning', '--no-access-log',
+        ]
+    raise ValueError(f'Unknown server {server!r}')
+
+
+def start(server, workers, port, cwd, env, timeout=60):
+    process = subprocess.Popen(server_command(server, workers, port), cwd=cwd, env=env)
+    try:
+        wait_until_ready(port, process, timeout)
+    except BaseException:
+        stop(process)
+        raise
+    return process
+
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def wait_until_ready(port, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited with status {process.returncode}')
+        if asyncio.run(_probe(port)):
+            return
+        time.sleep(0.2)
+    raise RuntimeError(f'Server did not answer {READY_PATH} within {timeout}s')
+
+
+async def _probe(port):
+    connection = Connection(HOST, port)
+    try:
+        return (await connection.request('GET', READY_PATH)).status == 200
+    except CONNECTION_ERRORS:
+        return False
+    finally:
+        connection.close()
@@ -0,0 +1,138 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import Client, TestCase
+
+from authentication.models import UserProfile
+from products import view_counts
+from products.models import Category, Product
+from products.view_counts import MemoryViewBuffer, ViewCounter
+
+from . import report
+from .dataset import DatasetBuilder
+from .client import Response
+from .scenario import MIX, VirtualUser, parse_mix, query_count
+
+
+def build(**options):
+    return DatasetBuilder(**{'products': 60, 'vendors': 5, 'customers': 3, 'seed': 7, **options}).build()
+
+
+class DatasetTests(TestCase):
+
+    def test_seeds_the_requested_counts_with_what_signals_would_have_done(self):
+        manifest = build()
+
+        self.assertEqual(Product.objects.count(), 60)
+        self.assertEqual(Category.objects.count(), len(manifest['categories']))
+        self.assertEqual(UserProfile.objects.filter(role='vendor').count(), 5)
+        self.assertEqual(UserProfile.objects.filter(role='customer').count(), 3)
+        self.assertTrue(User.objects.get(id=manifest['admin'][0]).is_staff)
+
+        for product in Product.objects.select_related('vendor__profile'):
+            self.assertEqual(product.tier_priority, product.vendor.profile.tier_priority)
+            self.assertEqual(product.in_stock, product.stock_quantity > 0)
+        self.assertEqual(
+            sum(Category.objects.values_list('active_product_count', flat=True)),
+            Product.objects.filter(is_active=True).count(),
+        )
+        word = Product.objects.filter(is_active=True).first().name.split()[-1]
+        response = self.client.get('/api/all_products/', {'search': word})
+        self.assertGreater(response.json()['count'], 0)
+
+    def test_same_seed_same_dataset(self):
+        def snapshot():
+            return list(Product.objects.order_by('id').values_list('name', 'price', 'vendor__email', 'category__name'))
+
+        build()
+        first = snapshot()
+        Product.objects.all().delete()
+        Category.objects.all().delete()
+        User.objects.all().delete()
+        build()
+        self.assertEqual(snapshot(), first)
+
+    def test_refuses_a_database_with_a_catalogue(self):
+        from django.core.management import CommandError, call_command
+
+        Category.objects.create(name='Existing', slug='existing')
+        with self.assertRaises(CommandError):
+            call_command('seed_loadtest', products=1, vendors=1, customers=1)
+
+
+class ScenarioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manifest = build()
+
+    def setUp(self):
+        counter = ViewCounter(MemoryViewBuffer(), flush_interval=3600, max_pending=1000)
+        patcher = mock.patch.object(view_counts, '_view_counter', counter)
+        self.addCleanup(patcher.stop)
+        patcher.start()
+
+    def send(self, user, endpoint, client=None):
+        call = user.call(endpoint)
+        headers = {'Authorization': f'Bearer {user.tokens[call.auth]}'} if call.auth else {}
+        client = client or Client(SERVER_NAME='localhost')
+        if call.method == 'GET':
+            response = client.get(call.path, headers=headers)
+        else:
+            response = client.post(call.path, json.dumps(call.data or {}), content_type='application/json',
+                                   headers=headers)
+        self.assertIn(response.status_code, call.ok, f'{endpoint}: {response.content[:300]}')
+        if call.on_response is not None:
+            call.on_response(response)
+        return response
+
+    def test_every_endpoint_in_the_mix_succeeds(self):
+        user = VirtualUser(self.manifest, 0, run_id='test')
+        for endpoint in MIX:
+            with self.subTest(endpoint=endpoint):
+                self.send(user, endpoint)
+
+    def test_refresh_rotates_the_virtual_users_token(self):
+        user = VirtualUser(self.manifest, 1)
+        first = user.refresh_token
+        self.send(user, 'refresh')
+        self.assertNotEqual(user.refresh_token, first)
+        self.send(user, 'refresh')
+
+    def test_parse_mix(self):
+        weights = parse_mix('search=30, login=0')
+        self.assertEqual((weights['search'], weights['login'], weights['listing']), (30, 0, MIX['listing']))
+        with self.assertRaises(ValueError):
+            parse_mix('checkout=5')
+
+    def test_query_count_from_server_timing(self):
+        response = Client(SERVER_NAME='localhost').get(f"/api/products/{self.manifest['products'][0][0]}/")
+        self.assertGreater(query_count(Response(200, {'server-timing': response['Server-Timing']})), 0)
+        self.assertIsNone(query_count(Response(200)))
+
+
+class ReportTests(TestCase):
+
+    def results(self, seconds, status=200, queries=2):
+        recorder = report.Recorder()
+        for latency in seconds:
+            recorder.record('listing', status, latency, queries, error=None if status == 200 else f'HTTP {status}')
+        recorder.started, recorder.stopped = 0, 1
+        return recorder.summary()
+
+    def test_summary_percentiles_and_errors(self):
+        listing = self.results([i / 1000 for i in range(1, 101)])['endpoints']['listing']
+        self.assertEqual((listing['requests'], listing['errors']), (100, 0))
+        self.assertEqual((listing['p50_ms'], listing['p95_ms'], listing['p99_ms']), (51.0, 96.0, 100.0))
+        self.assertEqual(listing['queries_mean'], 2)
+        self.assertEqual(self.results([0.01], status=500)['totals']['error_rate'], 1)
+
+    def test_compare_flags_regressions_beyond_the_threshold(self):
+        baseline = self.results([0.010] * 10)
+        current = self.results([0.012] * 10, queries=3)
+        regressed = {(name, metric) for name, metric, *_, flagged in report.compare(current, baseline) if flagged}
+        self.assertIn(('listing', 'p50_ms'), regressed)
+        self.assertIn(('listing', 'queries_mean'), regressed)
+        self.assertNotIn(('listing', 'error_rate'), regressed)
+        self.assertFalse([row for row in report.compare(current, baseline, threshold=0.6) if row[-1]])
@@ -0,0 +1,51 @@
+# notifications/mail.py - Batched outgoing mail
+"""
+Mail leaves the request path as notifications.tasks.send_mail_batch jobs.
+Each job sends up to settings.NOTIFICATIONS['BATCH_SIZE'] messages over a
+single SMTP connection (one connect/login instead of one per message).
+
+Messages travel to the worker as plain dicts ({'subject', 'body', 'to'})
+so they serialize as JSON.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+
+DEFAULTS = {
+    'BATCH_SIZE': 100,
+    'ADMIN_RECIPIENTS': [],
+}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'NOTIFICATIONS', {})}
+
+
+def admin_recipients():
+    """Addresses that receive staff notifications such as vendor applications"""
+    return list(_config()['ADMIN_RECIPIENTS'])
+
+
+def message(subject, body, to):
+    return {'subject': subject, 'body': body, 'to': list(to)}
+
+
+def send_batch(messages):
+    """Send message dicts over one connection; returns how many were sent"""
+    emails = [
+        EmailMessage(item['subject'], item['body'], settings.DEFAULT_FROM_EMAIL, item['to'])
+        for item in messages if item['to']
+    ]
+    if not emails:
+        return 0
+    with get_connection() as connection:
+        return connection.send_messages(emails)
+
+
+def batches(messages):
+    """Split an iterable of messages into BATCH_SIZE lists without materializing it"""
+    messages = iter(messages)
+    size = _config()['BATCH_SIZE']
+    while batch := list(islice(messages, size)):
+        yield batch
@@ -0,0 +1,144 @@
+# notifications/metrics.py - Task queue metrics
+"""
+Per-task counters for background jobs, kept in the default cache so every
+worker process adds to the same totals:
+
+- runs, failures, retries
+- wait_ms: time from enqueue() to a worker starting the task
+- run_ms:  time spent running it
+
+task_stats() reports them with averages alongside the current queue depth
+(messages waiting in the broker, or jobs waiting for the in-process thread
+when there is no broker; 0 when tasks run eagerly).
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from celery import current_app, states
+from celery.signals import task_postrun, task_prerun
+from django.core.cache import cache
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+ENQUEUED_AT = 'enqueued_at'
+KEY_PREFIX = 'tasks:stats'
+FIELDS = ('runs', 'failures', 'retries', 'wait_ms', 'run_ms')
+
+_started = {}
+_local_jobs = None       # runs jobs when there is no broker
+
+_local_waiting = 0
+_local_lock = threading.Lock()
+
+
+def enqueue(task, *args, **kwargs):
+    """
+    Queue task once the current transaction commits (so the worker sees
+    the rows the request wrote), stamped for wait-time metrics. Without a
+    broker it runs on a background thread of this process instead.
+    """
+    transaction.on_commit(lambda: dispatch(task, args, kwargs, {ENQUEUED_AT: time.time()}))
+
+
+def dispatch(task, args, kwargs, headers):
+    global _local_jobs, _local_waiting
+    if current_app.conf.broker_url or current_app.conf.task_always_eager:
+        task.apply_async(args, kwargs, headers=headers)
+        return
+    with _local_lock:
+        if _local_jobs is None:
+            _local_jobs = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tasks')
+        _local_waiting += 1
+    _local_jobs.submit(run_locally, task, args, kwargs, headers)
+
+
+def run_locally(task, args, kwargs, headers):
+    """
+    Run task once, off the request thread. There is no worker to wait out
+    a retry's countdown, so an autoretry task starts at its last retry and
+    a failure is logged rather than retried straight away.
+    """
+    global _local_waiting
+    with _local_lock:
+        _local_waiting -= 1
+    try:
+        result = task.apply(args, kwargs, headers=headers, retries=task.max_retries or 0)
+        if result.failed():
+            logger.error('Task %s failed: %r', task.name, result.result)
+    finally:
+        connections.close_all()
+
+
+def _key(name, field):
+    return f'{KEY_PREFIX}:{name}:{field}'
+
+
+def _add(name, field, amount=1):
+    key = _key(name, field)
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        if not cache.add(key, amount, timeout=None):
+            cache.incr(key, amount)
+
+
+@task_prerun.connect
+def task_started(task_id=None, task=None, **kwargs):
+    _started[task_id] = time.monotonic()
+    request = task.request
+    enqueued_at = request.get(ENQUEUED_AT) or (request.headers or {}).get(ENQUEUED_AT)
+    if enqueued_at:
+        _add(task.name, 'wait_ms', max(0, round((time.time() - enqueued_at) * 1000)))
+
+
+@task_postrun.connect
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = _started.pop(task_id, None)
+    if started is not None:
+        _add(task.name, 'run_ms', round((time.monotonic() - started) * 1000))
+    _add(task.name, 'runs')
+    if state == states.FAILURE:
+        _add(task.name, 'failures')
+    elif state == states.RETRY:
+        _add(task.name, 'retries')
+
+
+def queue_depth():
+    """Messages waiting in the default queue, or None if the broker can't be reached"""
+    app = current_app
+    queue = app.conf.task_default_queue
+    if app.conf.task_always_eager:
+        return {queue: 0}
+    if not app.conf.broker_url:
+        return {queue: _local_waiting}
+    try:
+        with app.connection_for_read() as connection:
+            return {queue: connection.default_channel.queue_declare(queue, passive=True).message_count}
+    except Exception as exc:
+        logger.warning('Could not read queue depth: %s', exc)
+        return {queue: None}
+
+
+def task_stats():
+    """Queue depth plus counters and average wait/run times per task"""
+    names = sorted(name for name in current_app.tasks if not name.startswith('celery.'))
+    values = cache.get_many([_key(name, field) for name in names for field in FIELDS])
+    tasks = {}
+    for name in names:
+        counts = {field: values.get(_key(name, field), 0) for field in FIELDS}
+        runs = counts['runs']
+        tasks[name] = {
+            'runs': runs,
+            'failures': counts['failures'],
+            'retries': counts['retries'],
+            'avg_wait_ms': round(counts['wait_ms'] / runs, 1) if runs else None,
+            'avg_run_ms': round(counts['run_ms'] / runs, 1) if runs else None,
+        }
+    return {
+        'eager': bool(current_app.conf.task_always_eager),
+        'queue_depth': queue_depth(),
+        'tasks': tasks,
+    }
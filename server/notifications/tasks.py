@@ -0,0 +1,33 @@
+# notifications/tasks.py - Background mail jobs
+from smtplib import SMTPException
+
+from celery import shared_task
+from django.contrib.auth.models import User
+
+from .mail import batches, message, send_batch
+from .metrics import enqueue
+
+
+@shared_task(autoretry_for=(SMTPException, OSError), retry_backoff=True, max_retries=5)
+def send_mail_batch(messages):
+    """Send up to BATCH_SIZE message dicts over one SMTP connection"""
+    return send_batch(messages)
+
+
+def queue_mail(messages):
+    """Queue message dicts as send_mail_batch jobs, once the current transaction commits"""
+    jobs = 0
+    for batch in batches(messages):
+        enqueue(send_mail_batch, batch)
+        jobs += 1
+    return jobs
+
+
+@shared_task
+def mail_vendors(subject, body, vendor_tier=None):
+    """Send one message to every vendor (optionally of one tier), in batched jobs"""
+    vendors = User.objects.filter(profile__role='vendor').exclude(email='')
+    if vendor_tier:
+        vendors = vendors.filter(profile__vendor_tier=vendor_tier)
+    emails = vendors.order_by('id').values_list('email', flat=True).iterator(chunk_size=2000)
+    return queue_mail(message(subject, body, [email]) for email in emails)
@@ -0,0 +1,135 @@
+import threading
+from smtplib import SMTPException
+from unittest import mock
+
+from celery import current_app
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from . import mail as notifications_mail
+from . import metrics
+from .mail import message
+from .metrics import task_stats
+from .tasks import mail_vendors, queue_mail
+
+
+class NotificationsTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def count_connections(self):
+        """Patch get_connection to count SMTP connections opened"""
+        patcher = mock.patch.object(notifications_mail, 'get_connection', wraps=notifications_mail.get_connection)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+
+@override_settings(NOTIFICATIONS={'BATCH_SIZE': 2})
+class MailBatchTests(NotificationsTestCase):
+
+    def test_messages_are_sent_in_batches_over_one_connection_each(self):
+        connections = self.count_connections()
+        messages = [message(f'Hello {i}', 'Body', [f'user{i}@example.com']) for i in range(5)]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(queue_mail(messages), 3)
+
+        self.assertEqual(connections.call_count, 3)
+        self.assertEqual([email.to for email in mail.outbox], [[f'user{i}@example.com'] for i in range(5)])
+
+    def test_nothing_is_queued_until_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            queue_mail([message('Hello', 'Body', ['user@example.com'])])
+        self.assertEqual((len(callbacks), len(mail.outbox)), (1, 0))
+
+    def test_mail_vendors_by_tier(self):
+        for username, tier in (('free@example.com', 'free'), ('premium@example.com', 'premium')):
+            vendor = User.objects.create_user(username=username, email=username)
+            vendor.profile.role = 'vendor'
+            vendor.profile.vendor_tier = tier
+            vendor.profile.save()
+        User.objects.create_user(username='customer@example.com', email='customer@example.com')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            mail_vendors.delay('Fees are changing', 'Details inside', vendor_tier='premium')
+        self.assertEqual([email.to for email in mail.outbox], [['premium@example.com']])
+
+
+class LocalJobTests(NotificationsTestCase):
+    """Without a broker (and outside tests) jobs run on a background thread"""
+
+    def setUp(self):
+        super().setUp()
+        # Settings-derived keys keep their CELERY_ names in the app's config
+        current_app.conf.CELERY_TASK_ALWAYS_EAGER = False
+        self.addCleanup(setattr, current_app.conf, 'CELERY_TASK_ALWAYS_EAGER', True)
+        self.addCleanup(setattr, metrics, '_local_jobs', None)
+
+    def run_queued(self, messages):
+        with self.captureOnCommitCallbacks(execute=True):
+            queue_mail(messages)
+        metrics._local_jobs.shutdown(wait=True)
+        self.assertEqual(task_stats()['queue_depth'], {'celery': 0})
+
+    def test_jobs_run_off_the_request_thread(self):
+        threads = []
+        send_batch = notifications_mail.send_batch
+
+        def record_thread(messages):
+            threads.append(threading.current_thread())
+            return send_batch(messages)
+
+        with mock.patch('notifications.tasks.send_batch', side_effect=record_thread):
+            self.run_queued([message('Hello', 'Body', ['user@example.com'])])
+        self.assertEqual([email.to for email in mail.outbox], [['user@example.com']])
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_smtp_failures_are_not_retried_inline(self):
+        with mock.patch('notifications.tasks.send_batch', side_effect=SMTPException('down')) as send, \
+                self.assertLogs('notifications.metrics', 'ERROR'):
+            self.run_queued([message('Hello', 'Body', ['user@example.com'])])
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(task_stats()['tasks']['notifications.tasks.send_mail_batch']['failures'], 1)
+
+
+@override_settings(NOTIFICATIONS={'ADMIN_RECIPIENTS': ['ops@example.com']})
+class VendorUpgradeEmailTests(NotificationsTestCase):
+
+    def test_upgrade_emails_are_sent_after_the_response_path(self):
+        user = User.objects.create_user(username='shop@example.com', email='shop@example.com', first_name='Wanjiru')
+        client = APIClient()
+        client.force_authenticate(user)
+        connections = self.count_connections()
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = client.post('/api/auth/upgrade-to-vendor/', {
+                'business_name': 'Wanjiru Crafts', 'business_type': 'retail', 'business_email': 'shop@example.com',
+                'shipping_policy': 'Nairobi only', 'return_policy': '7 days',
+                'agree_to_terms': True, 'agree_to_commission': True,
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mail.outbox, [])
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual([email.to for email in mail.outbox], [['shop@example.com'], ['ops@example.com']])
+        self.assertIn('Wanjiru Crafts', mail.outbox[1].subject)
+        self.assertEqual(connections.call_count, 1)
+
+        stats = task_stats()
+        self.assertTrue(stats['eager'])
+        self.assertEqual(stats['tasks']['authentication.tasks.send_vendor_upgrade_emails']['runs'], 1)
+        self.assertIsNotNone(stats['tasks']['authentication.tasks.send_vendor_upgrade_emails']['avg_wait_ms'])
+
+    def test_task_stats_endpoint_is_admin_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='admin@example.com', is_staff=True))
+        response = client.get('/api/admin/task-stats/')
+        self.assertEqual(response.json()['queue_depth'], {'celery': 0})
+
+        client.force_authenticate(User.objects.create_user(username='customer@example.com'))
+        self.assertEqual(client.get('/api/admin/task-stats/').status_code, 403)
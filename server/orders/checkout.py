@@ -0,0 +1,115 @@
+# orders/checkout.py - Turning a cart into an order
+"""
+place_order() runs the whole checkout in one transaction:
+
+1. reserve stock for every line with conditional UPDATEs (orders.stock);
+   any line short of stock rolls the transaction back and nothing is sold
+2. read name, price and vendor of the lines in one query
+3. insert the order and bulk-insert its items
+
+The checked-out lines leave the cart once the transaction has committed.
+Queries per checkout: one UPDATE per line plus a constant five (cart read,
+product read, two INSERTs, cart cleanup).
+"""
+import secrets
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from cart.service import CENT, VAT_RATE
+from products import cache
+from products.models import Product
+
+from .models import Order, OrderItem
+from .stock import OutOfStock, release_stock, reserve_stock
+
+
+class CheckoutError(Exception):
+    """A checkout that cannot go ahead; the message is shown to the customer"""
+
+
+def new_order_number():
+    return f'ORD-{timezone.now():%Y%m%d}-{secrets.token_hex(4).upper()}'
+
+
+def place_order(user, cart, details=None, product_ids=None):
+    """
+    Check out cart (all lines, or only product_ids) for user. details holds
+    the payment/shipping fields of Order. Raises CheckoutError.
+    """
+    quantities = cart.quantities()
+    if product_ids is not None:
+        wanted = set(product_ids)
+        quantities = {pk: quantity for pk, quantity in quantities.items() if pk in wanted}
+    if not quantities:
+        raise CheckoutError('Your cart is empty')
+
+    with transaction.atomic():
+        try:
+            reserve_stock(quantities)
+        except OutOfStock as exc:
+            name = Product.objects.filter(id=exc.product_id).values_list('name', flat=True).first()
+            if name is None:
+                raise CheckoutError('A product in your cart is no longer available')
+            raise CheckoutError(f'Not enough stock for {name}')
+
+        products = {
+            row['id']: row for row in Product.objects.filter(id__in=quantities).order_by().values(
+                'id', 'name', 'price', 'vendor_id', 'stock_quantity',
+            )
+        }
+        items = []
+        for product_id, quantity in quantities.items():
+            row = products[product_id]
+            items.append(OrderItem(
+                product_id=product_id, vendor_id=row['vendor_id'], product_name=row['name'],
+                unit_price=row['price'], quantity=quantity, line_total=row['price'] * quantity,
+            ))
+        subtotal = sum((item.line_total for item in items), Decimal('0.00'))
+        tax_amount = (subtotal * VAT_RATE).quantize(CENT)
+        order = Order.objects.create(
+            order_number=new_order_number(),
+            customer=user,
+            customer_name=user.get_full_name() or user.username,
+            customer_email=user.email,
+            subtotal=subtotal,
+            tax_amount=tax_amount,
+            total_amount=subtotal + tax_amount,
+            **(details or {}),
+        )
+        for item in items:
+            item.order = order
+        OrderItem.objects.bulk_create(items)
+
+        if any(row['stock_quantity'] == 0 for row in products.values()):
+            # Listings show stock state; refresh them when something sold out
+            transaction.on_commit(lambda: cache.invalidate(cache.PRODUCTS))
+
+    cart.store.remove(cart.owner, *quantities)
+    return order
+
+
+def set_status(order, status):
+    """
+    Move order to status. Moving into a restock status (cancelled,
+    refunded) returns its stock, exactly once even if two requests race.
+    """
+    if status == order.status:
+        return order
+    if order.status in Order.RESTOCK_STATUSES:
+        raise CheckoutError(f'A {order.status} order cannot be changed')
+
+    with transaction.atomic():
+        # Conditional on the status we read, so only one racing request wins
+        updated = Order.objects.filter(id=order.id, status=order.status).update(
+            status=status, updated_at=timezone.now(),
+        )
+        if not updated:
+            raise CheckoutError('The order was changed by someone else; reload and try again')
+        if status in Order.RESTOCK_STATUSES:
+            release_stock(dict(order.items.exclude(product=None).values_list('product_id', 'quantity')))
+            transaction.on_commit(lambda: cache.invalidate(cache.PRODUCTS))
+
+    order.status = status
+    return order
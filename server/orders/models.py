@@ -0,0 +1,85 @@
+# orders/models.py - Orders placed from the cart
+from django.contrib.auth.models import User
+from django.db import models
+
+from products.models import Product
+
+
+class Order(models.Model):
+    """
+    An order placed by orders.checkout.place_order. Customer name/email and
+    line prices are copied at checkout so the order reads the same after
+    the user or products change.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('confirmed', 'Confirmed'),
+        ('processing', 'Processing'),
+        ('shipped', 'Shipped'),
+        ('delivered', 'Delivered'),
+        ('cancelled', 'Cancelled'),
+        ('refunded', 'Refunded'),
+    ]
+
+    # Moving into one of these returns the order's stock to the products
+    RESTOCK_STATUSES = ('cancelled', 'refunded')
+
+    PAYMENT_CHOICES = [
+        ('mpesa', 'M-Pesa'),
+        ('card', 'Credit Card'),
+        ('bank_transfer', 'Bank Transfer'),
+        ('cash_on_delivery', 'Cash on Delivery'),
+    ]
+
+    order_number = models.CharField(max_length=32, unique=True)
+    customer = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='orders')
+    customer_name = models.CharField(max_length=255)
+    customer_email = models.EmailField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+
+    payment_method = models.CharField(max_length=20, choices=PAYMENT_CHOICES, default='mpesa')
+    shipping_address = models.TextField(blank=True)
+    shipping_city = models.CharField(max_length=100, blank=True)
+    shipping_country = models.CharField(max_length=100, default='Kenya')
+    shipping_phone = models.CharField(max_length=20, blank=True)
+    notes = models.TextField(blank=True)
+    special_instructions = models.TextField(blank=True)
+    tracking_number = models.CharField(max_length=100, blank=True, null=True)
+
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2)
+    tax_amount = models.DecimalField(max_digits=12, decimal_places=2)
+    total_amount = models.DecimalField(max_digits=12, decimal_places=2)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['customer', '-created_at']),
+            models.Index(fields=['status', '-created_at']),
+            models.Index(fields=['-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.order_number} ({self.status})"
+
+
+class OrderItem(models.Model):
+    """One product line of an order; vendor is copied from the product for vendor order lists"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True, related_name='order_items')
+    vendor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='order_items')
+    product_name = models.CharField(max_length=255)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField()
+    line_total = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['vendor', 'order']),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product_name}"
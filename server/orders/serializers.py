@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from django.conf import settings
+from rest_framework import serializers
+
+from .models import Order, OrderItem
+
+
+class CheckoutSerializer(serializers.Serializer):
+    """Payment and shipping details posted to /api/cart/checkout/"""
+    payment_method = serializers.ChoiceField(choices=Order.PAYMENT_CHOICES, default='mpesa')
+    shipping_address = serializers.CharField(required=False, allow_blank=True, default='')
+    shipping_city = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    shipping_country = serializers.CharField(max_length=100, required=False, default='Kenya')
+    shipping_phone = serializers.CharField(max_length=20, required=False, allow_blank=True, default='')
+    notes = serializers.CharField(required=False, allow_blank=True, default='')
+    special_instructions = serializers.CharField(required=False, allow_blank=True, default='')
+    # Check out only these cart lines; all of them when omitted
+    product_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source='product_name')
+    price = serializers.DecimalField(source='unit_price', max_digits=10, decimal_places=2)
+    vendor = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'product_id', 'name', 'quantity', 'price', 'line_total', 'vendor_id', 'vendor']
+
+    def get_vendor(self, obj):
+        vendor = obj.vendor
+        if vendor is None:
+            return None
+        return vendor.profile.business_name or vendor.get_full_name() or vendor.username
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    items = OrderItemSerializer(many=True, read_only=True)
+    order_date = serializers.DateTimeField(source='created_at', read_only=True)
+    total_price = serializers.DecimalField(source='total_amount', max_digits=12, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            'id', 'order_number', 'status', 'customer_id', 'customer_name', 'customer_email',
+            'payment_method', 'shipping_address', 'shipping_city', 'shipping_country', 'shipping_phone',
+            'notes', 'special_instructions', 'tracking_number',
+            'subtotal', 'tax_amount', 'total_amount', 'total_price', 'items',
+            'order_date', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class VendorOrderSerializer(OrderSerializer):
+    """An order as one vendor sees it: only their items, and their earnings after commission"""
+    vendor_earnings = serializers.SerializerMethodField()
+
+    class Meta(OrderSerializer.Meta):
+        fields = OrderSerializer.Meta.fields + ['vendor_earnings']
+        read_only_fields = fields
+
+    def get_vendor_earnings(self, obj):
+        # items are prefetched filtered to the requesting vendor
+        sales = sum((item.line_total for item in obj.items.all()), Decimal('0.00'))
+        share = 1 - Decimal(str(settings.DEFAULT_COMMISSION_RATE)) / 100
+        return str((sales * share).quantize(Decimal('0.01')))
+
+
+class OrderStatusSerializer(serializers.Serializer):
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+    tracking_number = serializers.CharField(max_length=100, required=False, allow_blank=True)
@@ -0,0 +1,54 @@
+# orders/stock.py - Atomic stock reservation
+"""
+Stock moves as conditional UPDATEs instead of read-modify-save:
+
+    UPDATE products_product
+       SET stock_quantity = stock_quantity - n,
+           in_stock = CASE WHEN stock_quantity = n THEN false ELSE in_stock END
+     WHERE id = ? AND is_active AND in_stock AND stock_quantity >= n
+
+The WHERE clause is re-checked against the current row under the row lock,
+so two checkouts racing for the last unit cannot both match: one updates a
+row, the other updates none and is refused. in_stock is kept in step in the
+same statement (SET expressions see the old row), so no Product.save() runs.
+
+Lines are reserved in product id order, so concurrent multi-line checkouts
+lock rows in the same order and cannot deadlock on PostgreSQL. Call these
+inside transaction.atomic(): a refused line rolls back the lines already
+reserved.
+"""
+from django.db.models import Case, F, Value, When
+
+from products.models import Product
+
+
+class OutOfStock(Exception):
+
+    def __init__(self, product_id, quantity):
+        self.product_id = product_id
+        self.quantity = quantity
+        super().__init__(f'Product {product_id} has fewer than {quantity} units available')
+
+
+def reserve_stock(quantities, using=None):
+    """Take {product_id: quantity} out of stock, one UPDATE per line, or raise OutOfStock"""
+    products = Product.objects.using(using)
+    for product_id, quantity in sorted(quantities.items()):
+        reserved = products.filter(
+            id=product_id, is_active=True, in_stock=True, stock_quantity__gte=quantity,
+        ).update(
+            stock_quantity=F('stock_quantity') - quantity,
+            in_stock=Case(When(stock_quantity=quantity, then=Value(False)), default=F('in_stock')),
+        )
+        if not reserved:
+            raise OutOfStock(product_id, quantity)
+
+
+def release_stock(quantities, using=None):
+    """Put {product_id: quantity} back in stock; products that had sold out are back in stock"""
+    products = Product.objects.using(using)
+    for product_id, quantity in sorted(quantities.items()):
+        products.filter(id=product_id).update(
+            stock_quantity=F('stock_quantity') + quantity,
+            in_stock=Case(When(stock_quantity=0, then=Value(True)), default=F('in_stock')),
+        )
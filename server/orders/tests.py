@@ -0,0 +1,224 @@
+import functools
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from cart.service import Cart
+from cart.storage import DatabaseCartStore
+from products.models import Category, Product
+from server.testing import race
+
+from .checkout import CheckoutError, place_order
+from .models import Order
+from .stock import OutOfStock, release_stock, reserve_stock
+
+
+def create_vendor(username, business_name):
+    vendor = User.objects.create_user(username=username, email=username)
+    vendor.profile.role = 'vendor'
+    vendor.profile.business_name = business_name
+    vendor.profile.save()
+    return vendor
+
+
+class OrdersTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = create_vendor('vendor@example.com', 'Jane Electronics')
+        cls.other_vendor = create_vendor('other@example.com', 'Kitchen World')
+        cls.customer = User.objects.create_user(
+            username='buyer@example.com', email='buyer@example.com', first_name='Amani', last_name='Buyer',
+        )
+        cls.category = Category.objects.create(name='Phones', slug='phones')
+        cls.phone = cls.create_product('Phone', '100.00', 5, cls.vendor)
+        cls.kettle = cls.create_product('Kettle', '20.00', 10, cls.other_vendor)
+
+    @classmethod
+    def create_product(cls, name, price, stock, vendor):
+        return Product.objects.create(
+            name=name, slug=name.lower(), category=cls.category, vendor=vendor,
+            price=Decimal(price), stock_quantity=stock,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def cart(self, user=None, **lines):
+        """The user's cart holding lines given as product_name=quantity"""
+        cart = Cart(f'user:{(user or self.customer).id}', DatabaseCartStore())
+        for name, quantity in lines.items():
+            cart.add(getattr(self, name).id, quantity)
+        return cart
+
+    def stock(self, product):
+        product.refresh_from_db()
+        return product.stock_quantity, product.in_stock
+
+
+class StockTests(OrdersTestCase):
+
+    def test_reserve_decrements_and_marks_sold_out(self):
+        reserve_stock({self.phone.id: 5, self.kettle.id: 1})
+        self.assertEqual(self.stock(self.phone), (0, False))
+        self.assertEqual(self.stock(self.kettle), (9, True))
+
+        with self.assertRaises(OutOfStock):
+            reserve_stock({self.phone.id: 1})
+
+        release_stock({self.phone.id: 2})
+        self.assertEqual(self.stock(self.phone), (2, True))
+
+    def test_reserve_refuses_more_than_in_stock(self):
+        with self.assertRaises(OutOfStock):
+            reserve_stock({self.phone.id: 6})
+        self.assertEqual(self.stock(self.phone), (5, True))
+
+
+class CheckoutTests(OrdersTestCase):
+
+    def test_checkout_creates_order_and_reserves_stock(self):
+        self.cart(phone=2, kettle=3)
+        response = self.client.post('/api/cart/checkout/', {
+            'payment_method': 'mpesa', 'shipping_city': 'Nairobi', 'shipping_phone': '+254700000000',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        order = response.json()['order']
+        self.assertTrue(order['order_number'].startswith('ORD-'))
+        self.assertEqual(order['customer_name'], 'Amani Buyer')
+        self.assertEqual([(item['name'], item['quantity'], item['vendor']) for item in order['items']],
+                         [('Phone', 2, 'Jane Electronics'), ('Kettle', 3, 'Kitchen World')])
+        self.assertEqual(Decimal(order['subtotal']), Decimal('260.00'))
+        self.assertEqual(Decimal(order['total_amount']), Decimal('301.60'))
+
+        self.assertEqual(self.stock(self.phone), (3, True))
+        self.assertEqual(self.stock(self.kettle), (7, True))
+        self.assertEqual(self.client.get('/api/cart/').json()['items'], [])
+
+    def test_checkout_queries_are_one_update_per_line_plus_constant(self):
+        cart = self.cart(phone=1, kettle=1)
+        # cart read, 2 stock UPDATEs, product read, order INSERT, items INSERT,
+        # cart cleanup, plus the savepoint pair of the atomic block
+        with self.assertNumQueries(9):
+            place_order(self.customer, cart)
+
+    def test_short_line_rolls_back_the_whole_checkout(self):
+        cart = self.cart(kettle=2, phone=6)
+        with self.assertRaisesMessage(CheckoutError, 'Not enough stock for Phone'):
+            place_order(self.customer, cart)
+
+        self.assertEqual(self.stock(self.kettle), (10, True))
+        self.assertEqual(self.stock(self.phone), (5, True))
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(cart.quantities(), {self.kettle.id: 2, self.phone.id: 6})
+
+    def test_last_units_go_to_one_buyer(self):
+        rival = User.objects.create_user(username='rival@example.com')
+        first = self.cart(phone=5)
+        second = self.cart(rival, phone=1)
+
+        place_order(self.customer, first)
+        with self.assertRaises(CheckoutError):
+            place_order(rival, second)
+        self.assertEqual(self.stock(self.phone), (0, False))
+
+    def test_checkout_selected_lines_only(self):
+        self.cart(phone=1, kettle=1)
+        response = self.client.post('/api/cart/checkout/', {'product_ids': [self.kettle.id]}, format='json')
+        self.assertEqual([item['name'] for item in response.json()['order']['items']], ['Kettle'])
+        self.assertEqual([item['product_id'] for item in self.client.get('/api/cart/').json()['items']],
+                         [self.phone.id])
+
+    def test_empty_cart_and_invalid_details(self):
+        response = self.client.post('/api/cart/checkout/', {}, format='json')
+        self.assertEqual(response.json()['error'], 'Your cart is empty')
+
+        self.cart(phone=1)
+        response = self.client.post('/api/cart/checkout/', {'payment_method': 'barter'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.stock(self.phone), (5, True))
+
+
+class OrderListTests(OrdersTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.order = place_order(self.customer, self.cart(phone=2, kettle=1))
+
+    def test_customer_orders(self):
+        response = self.client.get('/api/orders/')
+        self.assertEqual([order['id'] for order in response.json()['results']], [self.order.id])
+
+        other = APIClient()
+        other.force_authenticate(self.vendor)
+        self.assertEqual(other.get(f'/api/orders/{self.order.id}/').status_code, 404)
+
+    def test_vendor_sees_only_their_items(self):
+        self.client.force_authenticate(self.vendor)
+        with self.assertNumQueries(3):
+            orders = self.client.get('/api/vendor/orders/').json()['results']
+        self.assertEqual([item['name'] for item in orders[0]['items']], ['Phone'])
+        self.assertEqual(orders[0]['vendor_earnings'], '170.00')
+
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get('/api/vendor/orders/').status_code, 403)
+
+    def test_cancelling_returns_stock_once(self):
+        order = place_order(self.customer, self.cart(phone=2))
+        self.client.force_authenticate(self.vendor)
+        url = f'/api/vendor/orders/{order.id}/status/'
+        self.client.put(url, {'status': 'shipped', 'tracking_number': 'TRK1'}, format='json')
+        self.assertEqual(self.stock(self.phone), (1, True))
+
+        response = self.client.put(url, {'status': 'cancelled'}, format='json')
+        self.assertEqual(response.json()['status'], 'cancelled')
+        self.assertEqual(self.stock(self.phone), (3, True))
+
+        self.assertEqual(self.client.put(url, {'status': 'pending'}, format='json').status_code, 409)
+        self.assertEqual(self.stock(self.phone), (3, True))
+
+    def test_vendor_cannot_change_a_shared_order(self):
+        # self.order holds the vendor's phones and the other vendor's kettle
+        for vendor in (self.vendor, self.other_vendor):
+            self.client.force_authenticate(vendor)
+            response = self.client.put(f'/api/vendor/orders/{self.order.id}/status/', {'status': 'cancelled'},
+                                       format='json')
+            self.assertEqual(response.status_code, 403)
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'pending')
+        self.assertEqual(self.stock(self.phone), (3, True))
+        self.assertEqual(self.stock(self.kettle), (9, True))
+
+    def test_admin_order_list(self):
+        admin = User.objects.create_user(username='admin@example.com', is_staff=True)
+        self.client.force_authenticate(admin)
+        orders = self.client.get('/api/admin/orders/').json()['results']
+        self.assertEqual((orders[0]['order_number'], orders[0]['total_price']),
+                         (self.order.order_number, '255.20'))
+        self.assertEqual(self.client.get('/api/admin/orders/?status=delivered').json()['results'], [])
+
+
+class CheckoutConcurrencyTests(TransactionTestCase):
+
+    def test_concurrent_checkouts_never_oversell(self):
+        vendor = User.objects.create_user(username='vendor@example.com')
+        category = Category.objects.create(name='Phones', slug='phones')
+        phone = Product.objects.create(name='Phone', slug='phone', category=category, vendor=vendor,
+                                       price=Decimal('10.00'), stock_quantity=5)
+        buyers = [User.objects.create_user(username=f'buyer{i}@example.com') for i in range(12)]
+        store = DatabaseCartStore()
+        for buyer in buyers:
+            store.add(f'user:{buyer.id}', phone.id, 1)
+
+        outcomes = race(*[functools.partial(place_order, buyer, Cart(f'user:{buyer.id}', store)) for buyer in buyers])
+        placed = [outcome for outcome in outcomes if isinstance(outcome, Order)]
+        refused = [outcome for outcome in outcomes if isinstance(outcome, CheckoutError)]
+
+        phone.refresh_from_db()
+        self.assertEqual((len(placed), len(refused)), (5, 7), outcomes)
+        self.assertEqual((phone.stock_quantity, phone.in_stock), (0, False))
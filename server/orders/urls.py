@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+urlpatterns = [
+    path('cart/checkout/', views.checkout, name='cart-checkout'),
+    path('orders/', views.OrderListView.as_view(), name='order-list'),
+    path('orders/<int:pk>/', views.OrderDetailView.as_view(), name='order-detail'),
+    path('vendor/orders/', views.VendorOrderListView.as_view(), name='vendor-orders'),
+    path('vendor/orders/<int:order_id>/status/', views.vendor_order_status, name='vendor-order-status'),
+]
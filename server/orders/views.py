@@ -0,0 +1,113 @@
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from rest_framework import generics, status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from cart.service import Cart, cart_owner
+
+from .checkout import CheckoutError, place_order, set_status
+from .models import Order, OrderItem
+from .serializers import CheckoutSerializer, OrderSerializer, OrderStatusSerializer, VendorOrderSerializer
+
+
+def with_items(orders, **item_filters):
+    """Orders with their items (and item vendors) prefetched: two queries for any page"""
+    items = OrderItem.objects.filter(**item_filters).select_related('vendor__profile')
+    return orders.prefetch_related(Prefetch('items', queryset=items))
+
+
+def is_vendor(user):
+    return getattr(user, 'role', None) == 'vendor'
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def checkout(request):
+    """
+    Place an order for the cart (or the cart lines in product_ids). Stock
+    is reserved atomically; if any line is short, nothing is ordered.
+    """
+    serializer = CheckoutSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({'error': 'Invalid checkout details', 'errors': serializer.errors},
+                        status=status.HTTP_400_BAD_REQUEST)
+    details = dict(serializer.validated_data)
+    product_ids = details.pop('product_ids', None)
+
+    owner, _ = cart_owner(request)
+    try:
+        order = place_order(request.user, Cart(owner), details, product_ids=product_ids)
+    except CheckoutError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+    order = with_items(Order.objects.all()).get(pk=order.pk)
+    return Response({
+        'success': True,
+        'message': 'Order placed successfully',
+        'order': OrderSerializer(order).data,
+    }, status=status.HTTP_201_CREATED)
+
+
+class OrderListView(generics.ListAPIView):
+    """The signed-in customer's orders, newest first"""
+    serializer_class = OrderSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return with_items(Order.objects.filter(customer=self.request.user))
+
+
+class OrderDetailView(generics.RetrieveAPIView):
+    serializer_class = OrderSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return with_items(Order.objects.filter(customer=self.request.user))
+
+
+class VendorOrderListView(generics.ListAPIView):
+    """Orders containing the vendor's products, showing only the vendor's items"""
+    serializer_class = VendorOrderSerializer
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request, *args, **kwargs):
+        if not is_vendor(request.user):
+            return Response({'error': 'Only vendors can access this endpoint'}, status=status.HTTP_403_FORBIDDEN)
+        return super().list(request, *args, **kwargs)
+
+    def get_queryset(self):
+        vendor = self.request.user
+        orders = Order.objects.filter(id__in=OrderItem.objects.filter(vendor=vendor).values('order_id'))
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            orders = orders.filter(status=status_filter)
+        return with_items(orders, vendor=vendor)
+
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+def vendor_order_status(request, order_id):
+    """Update the status (and tracking number) of an order of only the vendor's products"""
+    if not is_vendor(request.user):
+        return Response({'error': 'Only vendors can access this endpoint'}, status=status.HTTP_403_FORBIDDEN)
+    order = get_object_or_404(Order.objects.filter(items__vendor=request.user).distinct(), id=order_id)
+    # The status (and a cancellation's restock) covers every line, so only a sole vendor may set it
+    if order.items.exclude(vendor=request.user).exists():
+        return Response({'error': 'This order includes other vendors\' products; only an admin can change its status'},
+                        status=status.HTTP_403_FORBIDDEN)
+
+    serializer = OrderStatusSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({'error': 'Invalid status', 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        set_status(order, serializer.validated_data['status'])
+    except CheckoutError as exc:
+        return Response({'error': str(exc)}, status=status.HTTP_409_CONFLICT)
+
+    tracking_number = serializer.validated_data.get('tracking_number')
+    if tracking_number is not None:
+        Order.objects.filter(id=order.id).update(tracking_number=tracking_number or None)
+
+    return Response({'success': True, 'order_id': order.id, 'status': order.status})
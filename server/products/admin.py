@@ -1,5 +1,7 @@
 from django.contrib import admin
+from django.db import transaction
 from django.utils.html import format_html
+from . import cache
 from .models import Category, Product
 
 @admin.register(Category)
@@ -79,18 +81,25 @@ class ProductAdmin(admin.ModelAdmin):
     
     # Add actions for bulk operations
     actions = ['mark_as_featured', 'mark_as_not_featured', 'mark_as_out_of_stock']
+
+    def invalidate_listings(self, queryset):
+        # queryset.update() sends no signals, so bump the catalogue cache here
+        transaction.on_commit(lambda: cache.invalidate(cache.PRODUCTS), using=queryset.db)
     
     def mark_as_featured(self, request, queryset):
         updated = queryset.update(featured=True)
+        self.invalidate_listings(queryset)
         self.message_user(request, f'{updated} products marked as featured.')
     mark_as_featured.short_description = "Mark selected products as featured"
     
     def mark_as_not_featured(self, request, queryset):
         updated = queryset.update(featured=False)
+        self.invalidate_listings(queryset)
         self.message_user(request, f'{updated} products unmarked as featured.')
     mark_as_not_featured.short_description = "Remove featured status from selected products"
     
     def mark_as_out_of_stock(self, request, queryset):
         updated = queryset.update(in_stock=False, stock_quantity=0)
+        self.invalidate_listings(queryset)
         self.message_user(request, f'{updated} products marked as out of stock.')
     mark_as_out_of_stock.short_description = "Mark selected products as out of stock"
\ No newline at end of file
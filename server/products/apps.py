@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(create_search_index, sender=self)
+
+
+def create_search_index(sender, using, **kwargs):
+    """Full-text index tables live outside the ORM; create them after migrate"""
+    from .search import ensure_search_index
+
+    ensure_search_index(using)
@@ -0,0 +1,142 @@
+# products/async_views.py - Async public catalogue reads
+"""
+Async versions of the high-traffic public reads, used instead of the DRF
+views in products.urls when settings.ASYNC_CATALOGUE_VIEWS is on (the
+default under server/asgi.py). Under an ASGI server a request waiting on
+the database or the cache no longer holds a worker thread.
+
+Responses match the DRF views': the same serializers, pagination modes,
+catalogue cache and JSON. Product views are recorded in the background
+(record_view_later) rather than awaited.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from authentication.authentication import ProfileJWTAuthentication
+
+from .cache import acache_catalogue_response, PRODUCTS, CATEGORIES
+from .facets import requested_facets
+from .models import Product, Category
+from .serializers import CategorySerializer, ProductSerializer, ProductListingSerializer, listing_values
+from .view_counts import record_view_later
+from .views import AllProductsView
+
+DETAIL_RELATED = ('category', 'vendor', 'vendor__profile')
+
+
+def json_response(data, status=200):
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def public_read(view_func):
+    """
+    The async counterpart of @api_view(['GET']) + AllowAny: authenticates a
+    bearer token if one is sent (anonymous otherwise) and turns DRF API
+    exceptions into their JSON responses.
+    """
+    authentication = ProfileJWTAuthentication()
+
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            response = json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+            response['Allow'] = 'GET, HEAD'
+            return response
+        try:
+            user_auth = await authentication.aauthenticate(request)
+            request.user = user_auth[0] if user_auth else AnonymousUser()
+            return await view_func(request, *args, **kwargs)
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, dict) else {'detail': exc.detail}
+            response = json_response(data, status=exc.status_code)
+            if exc.status_code == 401:
+                response['WWW-Authenticate'] = authentication.authenticate_header(request)
+            return response
+    return wrapper
+
+
+@public_read
+@acache_catalogue_response(PRODUCTS, CATEGORIES)
+async def all_products(request):
+    """Async views.AllProductsView: the same filters, search, ordering and pagination modes"""
+    drf_request = Request(request)
+    drf_request.user = request.user
+    view = AllProductsView(request=drf_request, args=(), kwargs={}, format_kwarg=None)
+    facets = requested_facets(drf_request.query_params)
+
+    # Location filters (?city=) look keys up and filtersets may validate choices (?category=)
+    queryset = await sync_to_async(lambda: view.filter_queryset(view.get_queryset()))()
+    paginator = view.paginator
+    rows = await paginator.apaginate_queryset(listing_values(queryset), drf_request)
+    data = ProductListingSerializer(rows, context=view.get_serializer_context()).data
+    payload = paginator.get_paginated_response(data).data
+    if facets:
+        payload['facets'] = await sync_to_async(view.get_facets)(facets)
+    return json_response(payload)
+
+
+@public_read
+@acache_catalogue_response(PRODUCTS, CATEGORIES)
+async def featured_products(request):
+    """Async views.featured_products"""
+    queryset = listing_values(Product.objects.filter(
+        is_active=True,
+        vendor__profile__vendor_tier='featured'
+    ).order_by('-created_at'))[:20]
+    rows = [row async for row in queryset]
+    data = ProductListingSerializer(rows, context={'request': request}).data
+
+    return json_response({
+        'success': True,
+        'count': len(data),
+        'featured_products': data
+    })
+
+
+async def product_detail(request, **lookup):
+    try:
+        product = await Product.objects.select_related(*DETAIL_RELATED).aget(is_active=True, **lookup)
+    except Product.DoesNotExist:
+        return json_response({
+            'success': False,
+            'message': 'Product not found'
+        }, status=404)
+
+    record_view_later(product)
+
+    serializer = ProductSerializer(product, context={'request': request})
+    return json_response({
+        'success': True,
+        'product': serializer.data
+    })
+
+
+@public_read
+async def product_by_id(request, id):
+    """Async views.product_by_id"""
+    return await product_detail(request, id=id)
+
+
+@public_read
+async def product_by_slug(request, slug):
+    """Async views.product_by_slug"""
+    return await product_detail(request, slug=slug)
+
+
+@public_read
+@acache_catalogue_response(CATEGORIES)
+async def categories(request):
+    """Async views.categories"""
+    data = CategorySerializer([category async for category in Category.objects.all()], many=True).data
+
+    return json_response({
+        'success': True,
+        'count': len(data),
+        'categories': data
+    })
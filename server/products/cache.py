@@ -0,0 +1,227 @@
+# products/cache.py - Response cache for public catalogue endpoints
+"""
+featured_products, categories, category list and AllProductsView pages are
+the same for every visitor, so their rendered JSON is cached. Values derived
+from the catalogue (e.g. listing facet counts) can be cached the same way
+with cached_value().
+
+- Keys are built from the view, the normalized query string and the auth
+  state (anonymous users don't see vendor phone/WhatsApp).
+- Each key embeds a per-namespace generation number. products.signals bumps
+  the generation when a Product, Category or vendor UserProfile changes, which
+  orphans every cached response in that namespace at once.
+- Responses carry an ETag; a matching If-None-Match gets a 304.
+- Hits and misses are counted in the cache (see cache_stats()).
+
+Backed by the cache alias in settings.CATALOGUE_CACHE['ALIAS'] (Redis when
+REDIS_URL is set, local memory otherwise). With local memory each worker
+process invalidates only its own cache, so TIMEOUT bounds staleness there.
+"""
+import functools
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.request import Request
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'TIMEOUT': 60,
+    'KEY_PREFIX': 'catalogue',
+}
+
+PRODUCTS = 'products'
+CATEGORIES = 'categories'
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'CATALOGUE_CACHE', {})}
+
+
+def _cache():
+    return caches[_config()['ALIAS']]
+
+
+def _key(*parts):
+    return ':'.join([_config()['KEY_PREFIX'], *map(str, parts)])
+
+
+def get_generation(namespace):
+    cache = _cache()
+    key = _key('generation', namespace)
+    generation = cache.get(key)
+    if generation is None:
+        # Start from the clock so a lost counter can't resurrect old entries
+        generation = int(time.time() * 1000)
+        if not cache.add(key, generation, timeout=None):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def invalidate(*namespaces):
+    """Orphan every cached response in the given namespaces"""
+    cache = _cache()
+    for namespace in namespaces:
+        key = _key('generation', namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), timeout=None)
+
+
+def _count(outcome):
+    cache = _cache()
+    key = _key('stats', outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def cache_stats():
+    """Hit/miss counters for the catalogue cache"""
+    cache = _cache()
+    hits = cache.get(_key('stats', 'hit'), 0)
+    misses = cache.get(_key('stats', 'miss'), 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else None,
+    }
+
+
+def cached_value(name, namespaces, parts, compute):
+    """compute()'s result, cached under `parts` until one of namespaces is invalidated"""
+    digest = hashlib.md5(repr(parts).encode()).hexdigest()
+    generations = '.'.join(str(get_generation(namespace)) for namespace in namespaces)
+    key = _key('value', name, generations, digest)
+    value = _cache().get(key)
+    if value is None:
+        value = compute()
+        _cache().set(key, value, _config()['TIMEOUT'])
+    return value
+
+
+def response_cache_key(request, view_name, namespaces):
+    params = sorted((k, v) for k, values in request.GET.lists() for v in values)
+    query = hashlib.md5(urlencode(params).encode()).hexdigest()
+    auth_state = 'auth' if request.user.is_authenticated else 'anon'
+    generations = '.'.join(str(get_generation(namespace)) for namespace in namespaces)
+    # Host is part of the key: pagination and image links are absolute URLs
+    return _key('response', view_name, generations, auth_state, request.get_host(), query)
+
+
+def _not_modified(request, etag):
+    """If-None-Match lists etag (weakly compared, as RFC 9110 has it for GET) or is *"""
+    etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+    return '*' in etags or etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in etags}
+
+
+def _not_modified_response(etag):
+    response = HttpResponseNotModified()
+    response['ETag'] = etag
+    return response
+
+
+def lookup_response(request, view_name, namespaces):
+    """Return (cache key, cached response or None), counting the hit or miss"""
+    key = response_cache_key(request, view_name, namespaces)
+    cached = _cache().get(key)
+    if cached is None:
+        _count('miss')
+        return key, None
+
+    _count('hit')
+    content, content_type, etag = cached
+    if _not_modified(request, etag):
+        return key, _not_modified_response(etag)
+    response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    response['X-Cache'] = 'HIT'
+    patch_vary_headers(response, ['Authorization'])
+    return key, response
+
+
+def store_response(request, key, response, content, content_type):
+    """Cache a rendered 200 response and return what to send for it"""
+    etag = f'"{hashlib.md5(content).hexdigest()}"'
+    _cache().set(key, (content, content_type, etag), _config()['TIMEOUT'])
+
+    if _not_modified(request, etag):
+        return _not_modified_response(etag)
+    # Set the rendered body so a DRF Response isn't rendered twice
+    response.content = content
+    response['Content-Type'] = content_type
+    response['ETag'] = etag
+    response['X-Cache'] = 'MISS'
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def cache_catalogue_response(*namespaces):
+    """
+    Cache a GET view's rendered JSON until one of namespaces is invalidated.
+
+    Works on DRF function views (below @api_view) and view methods
+    (e.g. list); the DRF Request is found among the positional arguments.
+    """
+    def decorator(view_func):
+        view_name = view_func.__qualname__
+
+        @functools.wraps(view_func)
+        def wrapper(*args, **kwargs):
+            request = next(arg for arg in args if isinstance(arg, Request))
+            renderer = getattr(request, 'accepted_renderer', None)
+            if request.method != 'GET' or renderer is None or renderer.format != 'json':
+                return view_func(*args, **kwargs)
+
+            key, cached = lookup_response(request, view_name, namespaces)
+            if cached is not None:
+                return cached
+
+            response = view_func(*args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+            content = renderer.render(response.data, request.accepted_media_type, {'request': request})
+            content_type = f'{request.accepted_media_type}; charset={renderer.charset}' if renderer.charset \
+                else request.accepted_media_type
+            return store_response(request, key, response, content, content_type)
+        return wrapper
+    return decorator
+
+
+def acache_catalogue_response(*namespaces):
+    """
+    cache_catalogue_response for the async views in products.async_views,
+    which return already-rendered JSON. The cache client is synchronous, so
+    the lookup and the store each run once in a worker thread.
+    """
+    def decorator(view_func):
+        view_name = view_func.__qualname__
+
+        @functools.wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return await view_func(request, *args, **kwargs)
+
+            key, cached = await sync_to_async(lookup_response, thread_sensitive=False)(request, view_name, namespaces)
+            if cached is not None:
+                return cached
+
+            response = await view_func(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+            return await sync_to_async(store_response, thread_sensitive=False)(
+                request, key, response, response.content, response['Content-Type'],
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,47 @@
+# products/filters.py - Filter backends for product listings
+from django.db.models import Q
+from rest_framework import filters
+
+from authentication.models import Location
+
+from .search import get_search_backend
+
+
+def filter_by_location(queryset, city=None, district=None, location=None):
+    """
+    Narrow products to a vendor location: ?city=, ?district= (exact names,
+    case and punctuation insensitive) and ?location=nairobi/westlands
+    (that place and everything under it). Served by product_location_idx
+    rather than a join to the vendor's profile.
+    """
+    keys = Location.matching_keys(city, district, location)
+    if keys is None:
+        return queryset
+    if not keys:
+        return queryset.none()
+    condition = Q()
+    for key in keys:
+        low, high = Location.key_range(key)
+        condition |= Q(location_key__gte=low, location_key__lt=high)
+    return queryset.filter(condition)
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    ?search= backed by the full-text index in products.search instead of
+    icontains scans. Results are ordered by relevance unless the client
+    asked for an explicit ?ordering=.
+
+    Keep this after OrderingFilter in filter_backends so relevance wins
+    over the view's default ordering.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        term = ' '.join(self.get_search_terms(request))
+        if not term:
+            return queryset
+
+        queryset = get_search_backend().search(queryset, term)
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by('-search_rank', '-id')
+        return queryset
@@ -0,0 +1,324 @@
+# products/generator.py - Synthetic catalogues at benchmark scale
+"""
+Generates vendors and products in bulk, for catalogues big enough to show
+scaling problems (millions of products, thousands of vendors). Products
+are variations on the Jumia CSVs in csv/: their names, categories,
+descriptions and prices, reshaped by distributions that mimic the
+marketplace:
+
+- vendor tiers: half free, a quarter basic, fewer premium and featured;
+  vendors spread over cities/districts weighted by market size
+- products per vendor: Zipf-like (a few vendors list most of the
+  catalogue), capped by each tier's product limit; the top vendor is
+  always featured-tier
+- prices: the template's, with log-normal noise, rounded to KSh x,x99
+- description length: by tier; free listings are short, paid ones carry
+  the template's full details and specifications
+- ~12% out of stock, ~3% inactive, 3% of paid-tier listings featured
+
+Rows are written with bulk_create, TRANSACTION_SIZE products per
+transaction. Like products.importer, the generator then does what the
+skipped signals would: slug, tier_priority and location_key up front,
+search indexing per batch, category counts, dashboard counters and the
+catalogue cache.
+
+Everything random comes from one random.Random(seed): the same seed and
+sizes produce the same catalogue, so benchmark runs are comparable.
+"""
+import bisect
+import csv
+import functools
+import itertools
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from admin_panel import stats as dashboard
+from authentication.models import Location, UserProfile
+
+from . import cache, search
+from .importer import MAX_PRICE, MIN_PRICE, ProductImporter, clean_price_to_decimal
+from .limits import recount_vendor_products
+from .models import Category, Product
+
+TEMPLATE_DIR = Path(settings.BASE_DIR) / 'csv'
+EMAIL_DOMAIN = 'generated.kipsunya.com'
+
+# city -> (relative share of vendors, districts)
+CITIES = {
+    'Nairobi': (40, ['Westlands', 'Kilimani', 'Embakasi', 'Kasarani', 'Langata', 'Karen', 'CBD']),
+    'Mombasa': (15, ['Nyali', 'Kisauni', 'Likoni', 'Changamwe']),
+    'Kisumu': (10, ['Milimani', 'Kondele', 'Nyalenda']),
+    'Nakuru': (10, ['Milimani', 'Section 58', 'Lanet']),
+    'Eldoret': (8, ['Langas', 'Kapsoya', 'Elgon View']),
+    'Thika': (6, ['Makongeni', 'Section 9']),
+    'Nyeri': (5, ["Ruring'u", 'Skuta']),
+    'Malindi': (3, ['Shella', 'Casuarina']),
+    'Kitale': (3, ['Milimani', 'Section 6']),
+}
+
+# tier -> (share of vendors, median description length in characters; None = full template)
+TIERS = {
+    'free': (50, 250),
+    'basic': (25, 700),
+    'premium': (15, 1500),
+    'featured': (10, None),
+}
+
+FIRST_NAMES = ['John', 'Mary', 'Peter', 'Grace', 'James', 'Faith', 'Brian', 'Mercy', 'Kevin', 'Ann', 'David',
+               'Esther', 'Samuel', 'Janet', 'Dennis', 'Caroline', 'Moses', 'Lucy', 'Collins', 'Beatrice']
+LAST_NAMES = ['Mwangi', 'Otieno', 'Kamau', 'Wanjiku', 'Kiprotich', 'Odhiambo', 'Njoroge', 'Achieng', 'Mutua',
+              'Cheruiyot', 'Wafula', 'Kariuki', 'Onyango', 'Chebet', 'Muthoni', 'Omondi', 'Kiplagat', 'Nyambura']
+BUSINESS_TYPES = ['Electronics', 'Phone Hub', 'Home Appliances', 'Traders', 'Enterprises', 'Stores', 'Gadgets',
+                  'Supplies', 'Mart', 'Digital']
+NAME_VARIANTS = ['', '', '', ' - Black', ' - Silver', ' - White', ' - Blue', ' (Refurbished)', ' (2025 Model)',
+                 ' + Free Gift', ' (Pack of 2)']
+
+OUT_OF_STOCK = 0.12
+INACTIVE = 0.03
+FEATURED = 0.03
+VERIFIED = {'free': 0.4, 'basic': 0.7, 'premium': 0.9, 'featured': 0.98}
+
+
+@dataclass(frozen=True)
+class Template:
+    category: str
+    name: str
+    price: float
+    description: str
+
+
+def load_templates(paths=None):
+    """Template rows from the Jumia CSVs (rows without a usable name or price are skipped)"""
+    templates = []
+    for path in sorted(paths or TEMPLATE_DIR.glob('*.csv')):
+        with open(path, newline='', encoding='utf-8') as handle:
+            for row in csv.DictReader(handle):
+                name = (row.get('Name') or '').strip()
+                price = clean_price_to_decimal(row.get('Price'))
+                if not name or price is None or not MIN_PRICE <= price < MAX_PRICE:
+                    continue
+                details = row.get('Product Details') or ''
+                specifications = row.get('Specifications') or ''
+                templates.append(Template(
+                    category=(row.get('Category') or '').strip() or 'Uncategorised',
+                    name=name,
+                    price=float(price),
+                    description=f"{details}\n\n--- SPECIFICATIONS ---\n\n{specifications}".strip(),
+                ))
+    return templates
+
+
+@functools.lru_cache(maxsize=4096)
+def name_slug(name):
+    # Names repeat across templates x variants, and slugify is slow
+    return slugify(name)[:170]
+
+
+@dataclass
+class GenerateStats:
+    vendors: int = 0
+    products: int = 0
+    transactions: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.products / self.elapsed if self.elapsed else 0.0
+
+
+class CatalogueGenerator:
+    """Generate vendors and products in bulk. See module docstring."""
+
+    def __init__(self, products=100_000, vendors=1000, seed=1, batch_size=5000, transaction_size=50_000,
+                 templates=None, password=None, email_domain=EMAIL_DOMAIN):
+        self.products = products
+        self.vendors = vendors
+        self.seed = seed
+        self.batch_size = batch_size
+        self.transaction_size = max(transaction_size, batch_size)
+        self.templates = templates if templates is not None else load_templates()
+        self.password = password
+        self.email_domain = email_domain
+        self.rng = random.Random(seed)
+        self._locations = {}
+
+    def vendor_email(self, number):
+        return f'vendor{number}.s{self.seed}@{self.email_domain}'
+
+    def generate(self, progress=None):
+        """Create the vendors, then the products; returns (vendors, GenerateStats)"""
+        if not self.templates:
+            raise ValueError('No product templates found')
+        stats = GenerateStats()
+        vendors = self.create_vendors()
+        stats.vendors = len(vendors)
+        categories = self.categories()
+
+        touched = set()
+        for products in self.product_batches(vendors, categories):
+            with transaction.atomic():
+                for start in range(0, len(products), self.batch_size):
+                    batch = Product.objects.bulk_create(products[start:start + self.batch_size])
+                    search.index_products([product.pk for product in batch])
+            touched.update(product.category_id for product in products)
+            stats.products += len(products)
+            stats.transactions += 1
+            if progress:
+                progress(stats)
+
+        Category.recount_products(category_ids=touched)
+        recount_vendor_products()
+        dashboard.refresh(snapshots=[])
+        dashboard.mark_stale()
+        cache.invalidate(cache.PRODUCTS, cache.CATEGORIES)
+        return vendors, stats
+
+    # Vendors
+
+    def weighted(self, table):
+        names = list(table)
+        return self.rng.choices(names, weights=[table[name][0] for name in names])[0]
+
+    def phone(self):
+        return f'+2547{self.rng.randrange(10 ** 8):08d}'
+
+    def create_vendors(self):
+        password = make_password(self.password)  # shared, and unusable without one
+        now = timezone.now()
+        vendors = []
+        for start in range(0, self.vendors, self.batch_size):
+            numbers = range(start + 1, min(self.vendors, start + self.batch_size) + 1)
+            users, profiles = [], []
+            for number in numbers:
+                first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+                email = self.vendor_email(number)
+                users.append(User(username=email, email=email, password=password, first_name=first, last_name=last))
+                # Vendor 1 tops the Zipf ranking, so it lists beyond any tier limit
+                profiles.append(self.vendor_profile(last, now, tier='featured' if number == 1 else None))
+            with transaction.atomic():
+                users = User.objects.bulk_create(users)
+                for user, profile in zip(users, profiles):
+                    profile.user = user
+                    user.profile = profile
+                UserProfile.objects.bulk_create(profiles)
+            vendors += users
+        return vendors
+
+    def vendor_profile(self, last_name, now, tier=None):
+        tier = tier or self.weighted(TIERS)
+        city = self.weighted(CITIES)
+        district = self.rng.choice(CITIES[city][1])
+        phone = self.phone()
+        neighborhood = f'{district}, {city}'
+        profile = UserProfile(
+            role='vendor',
+            vendor_tier=tier,
+            city=city,
+            district=district,
+            neighborhood=neighborhood,
+            location=self.location(city, district, neighborhood),
+            phone=phone,
+            whatsapp=phone if self.rng.random() < 0.8 else None,
+            business_name=f'{last_name} {self.rng.choice(BUSINESS_TYPES)}',
+            business_type=self.rng.choice(BUSINESS_TYPES),
+            business_verified=self.rng.random() < VERIFIED[tier],
+        )
+        if tier != 'free':
+            profile.subscription_started_at = now - timedelta(days=self.rng.randint(0, 330))
+            profile.subscription_expires_at = profile.subscription_started_at + timedelta(days=365)
+        return profile
+
+    def location(self, *names):
+        if names not in self._locations:
+            self._locations[names] = Location.resolve(*names)
+        return self._locations[names]
+
+    # Products
+
+    def categories(self):
+        importer = ProductImporter()
+        return {name: importer.get_category(name) for name in sorted({t.category for t in self.templates})}
+
+    def vendor_picker(self, vendors):
+        """
+        A function returning the vendor for the next product: Zipf-weighted
+        by vendor rank, skipping vendors that reached their tier's limit
+        """
+        cumulative = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(vendors))))
+        limits = [vendor.profile.product_limit for vendor in vendors]
+        counts = [0] * len(vendors)
+        unlimited = [index for index, limit in enumerate(limits) if limit is None]
+        total = cumulative[-1]
+
+        def pick():
+            for _ in range(8):
+                index = bisect.bisect(cumulative, self.rng.random() * total)
+                if limits[index] is None or counts[index] < limits[index]:
+                    break
+            else:
+                # Mostly full: limited vendors are saturated, spill to unlimited ones
+                index = self.rng.choice(unlimited)
+            counts[index] += 1
+            return vendors[index]
+        return pick
+
+    def description(self, template, tier):
+        median = TIERS[tier][1]
+        if median is None:
+            return template.description
+        length = int(median * math.exp(self.rng.gauss(0, 0.6)))
+        if length >= len(template.description):
+            return template.description
+        cut = template.description.rfind(' ', 0, length)
+        return template.description[:cut if cut > 0 else length].rstrip() + '...'
+
+    def price(self, template):
+        price = template.price * math.exp(self.rng.gauss(0, 0.2))
+        # KSh prices end in 99 (or 9 below a hundred)
+        price = round(price, -2) - 1 if price >= 100 else max(round(price, -1) - 1, 9)
+        return min(max(price, float(MIN_PRICE)), float(MAX_PRICE) - 1)
+
+    def product(self, number, vendor, categories):
+        template = self.rng.choice(self.templates)
+        profile = vendor.profile
+        name = (template.name + self.rng.choice(NAME_VARIANTS))[:200]
+        in_stock = self.rng.random() >= OUT_OF_STOCK
+        stock = int(self.rng.expovariate(1 / 25)) + 1 if in_stock else 0
+        return Product(
+            name=name,
+            slug=f'{name_slug(name)}-s{self.seed}-{number}',
+            description=self.description(template, profile.vendor_tier),
+            category=categories[template.category],
+            vendor=vendor,
+            price=f'{self.price(template):.2f}',
+            stock_quantity=stock,
+            in_stock=stock > 0,
+            is_active=self.rng.random() >= INACTIVE,
+            featured=profile.vendor_tier in ('premium', 'featured') and self.rng.random() < FEATURED,
+            tier_priority=profile.tier_priority,
+            location_key=profile.location.key,
+        )
+
+    def product_batches(self, vendors, categories):
+        """Unsaved products, TRANSACTION_SIZE at a time"""
+        pick = self.vendor_picker(vendors)
+        for start in range(0, self.products, self.transaction_size):
+            yield [
+                self.product(number, pick(), categories)
+                for number in range(start + 1, min(self.products, start + self.transaction_size) + 1)
+            ]
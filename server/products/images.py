@@ -0,0 +1,210 @@
+# products/images.py - Product image storage and thumbnails
+"""
+Uploads are stored by content: products/<aa>/<sha256>.<ext>. Uploading a
+photo that is already stored (the same image on several listings, an
+unchanged re-upload) reuses the existing file instead of writing a copy.
+
+After an upload, products.tasks.generate_product_image_variants renders
+resized copies in the background, one per width and format in
+settings.PRODUCT_IMAGES:
+
+    products/variants/<aa>/<sha256>-<width>w.<webp|jpg>
+
+Variant names are derived from the original's content hash, so products
+sharing an image share variants and nothing is rendered twice. The names
+are recorded in Product.image_variants ({format: {width: name}}), which
+the serializers turn into `thumbnail` and `image_srcset` without touching
+storage. `python manage.py regenerate_image_variants` re-renders in bulk
+over a process pool.
+"""
+import hashlib
+import io
+import math
+import multiprocessing
+import os
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+DEFAULTS = {
+    'WIDTHS': (160, 320, 640, 1280),
+    'FORMATS': ('webp', 'jpeg'),
+    'QUALITY': 80,
+    'CARD_WIDTH': 320,   # width of `thumbnail`, sized for listing cards
+}
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+ORIENTATION = 0x0112        # EXIF tag
+ROTATED = (5, 6, 7, 8)      # orientations that swap width and height
+CHUNK_SIZE = 64 * 1024
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'PRODUCT_IMAGES', {})}
+
+
+def content_hash(file):
+    """sha256 hex digest of a file's content; leaves the file at position 0"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def product_image_path(instance, filename):
+    """upload_to for Product.image: name the file after its content"""
+    digest = content_hash(instance.image)
+    extension = os.path.splitext(filename)[1].lower() or '.jpg'
+    return f'products/{digest[:2]}/{digest}{extension}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage where a name identifies its content: saving to a name that
+    already exists keeps the stored file rather than writing a suffixed copy.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        if self.exists(name):
+            return name
+        # Write under a unique temporary name and rename into place, so two
+        # writers racing on the same content both succeed and leave one file
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
+
+
+product_image_storage = ContentAddressedStorage()
+
+
+def variant_name(digest, width, image_format):
+    return f'products/variants/{digest[:2]}/{digest}-{width}w.{EXTENSIONS[image_format]}'
+
+
+def target_widths(original_width, widths):
+    """The configured widths that don't upscale; at least one variant for small originals"""
+    fitting = [width for width in widths if width <= original_width]
+    return fitting or [original_width]
+
+
+def render_variants(name, storage=product_image_storage, config=None):
+    """
+    Render every missing variant of the stored image `name` and return
+    {format: {str(width): variant name}}. Touches storage only, never the
+    database, so it can run in worker processes.
+    """
+    config = config or _config()
+    with storage.open(name, 'rb') as original:
+        digest = content_hash(original)
+        image = Image.open(original)
+        display_width = image.height if image.getexif().get(ORIENTATION) in ROTATED else image.width
+        widths = target_widths(display_width, sorted(config['WIDTHS'], reverse=True))
+        names = {
+            image_format: {width: variant_name(digest, width, image_format) for width in widths}
+            for image_format in config['FORMATS']
+        }
+        missing = [(fmt, width) for fmt, by_width in names.items() for width, path in by_width.items()
+                   if not storage.exists(path)]
+        if missing:
+            # JPEG decodes straight to about the largest size needed, far cheaper than full size
+            scale = widths[0] / display_width
+            image.draft('RGB', (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+            image = ImageOps.exif_transpose(image)
+            save_variants(image, names, missing, config['QUALITY'], storage)
+
+    return {fmt: {str(width): path for width, path in by_width.items()} for fmt, by_width in names.items()}
+
+
+def save_variants(image, names, missing, quality, storage):
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    rgba = image.convert('RGBA' if has_alpha else 'RGB')
+    # Resize in descending widths, each from the previous result
+    resized = rgba
+    for width in sorted({width for _, width in missing}, reverse=True):
+        height = max(1, round(rgba.height * width / rgba.width))
+        resized = resized.resize((width, height), Image.LANCZOS)
+        for image_format in [fmt for fmt, w in missing if w == width]:
+            output = resized
+            if image_format == 'jpeg' and has_alpha:
+                output = Image.new('RGB', resized.size, 'white')
+                output.paste(resized, mask=resized.getchannel('A'))
+            buffer = io.BytesIO()
+            output.save(buffer, format=image_format.upper(), quality=quality, optimize=image_format == 'jpeg')
+            storage.save(names[image_format][width], ContentFile(buffer.getvalue()))
+
+
+def generate_variants(product_id):
+    """Render variants for one product's image and record them (the background job)"""
+    from . import cache
+    from .models import Product
+
+    name = Product.objects.filter(id=product_id).values_list('image', flat=True).first()
+    if not name:
+        return {}
+    variants = render_variants(name)
+    # Every product showing this file gets them; skip if the image was replaced meanwhile
+    if Product.objects.filter(image=name).exclude(image_variants=variants).update(image_variants=variants):
+        transaction.on_commit(lambda: cache.invalidate(cache.PRODUCTS))
+    return variants
+
+
+def _render(job):
+    name, location, config = job
+    try:
+        return name, render_variants(name, ContentAddressedStorage(location=location), config), None
+    except Exception as exc:  # reported by regenerate()
+        return name, None, repr(exc)
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def regenerate(names, workers=None, chunksize=4):
+    """
+    Render variants for many stored images over a process pool, yielding
+    (name, variants, error) as they finish. The caller records the results.
+
+    Workers are spawned rather than forked (no inherited database
+    connections or threads) and are handed the storage location and
+    settings explicitly.
+    """
+    jobs = [(name, product_image_storage.location, _config()) for name in names]
+    if workers == 1:
+        yield from map(_render, jobs)
+        return
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        yield from pool.map(_render, jobs, chunksize=chunksize)
+
+
+def image_fields(name, variants, url):
+    """The serializer fields derived from Product.image_variants"""
+    if not name:
+        return {'thumbnail': None, 'image_srcset': None}
+    if not variants:
+        # Not rendered yet: fall back to the original
+        return {'thumbnail': url(name), 'image_srcset': None}
+
+    card_width = _config()['CARD_WIDTH']
+    jpeg = variants.get('jpeg') or next(iter(variants.values()))
+    widths = sorted(jpeg, key=int)
+    card = next((width for width in widths if int(width) >= card_width), widths[-1])
+    return {
+        'thumbnail': url(jpeg[card]),
+        'image_srcset': {
+            image_format: ', '.join(f'{url(by_width[width])} {width}w' for width in sorted(by_width, key=int))
+            for image_format, by_width in variants.items()
+        },
+    }
@@ -0,0 +1,192 @@
+# products/importer.py - Bulk CSV catalogue import
+"""
+Streams a Jumia-style CSV (Category, Name, Price, Product Details,
+Specifications, ...) into Product rows in chunks:
+
+- one `slug IN (...)` query per chunk to find existing products
+- bulk_create for new slugs, bulk_update for existing ones; stock is only
+  set on create (the CSV has no stock column) unless update_stock=True
+- each chunk in its own transaction
+
+bulk_create/bulk_update skip model save() and signals, so the importer
+does their work itself: in_stock/tier_priority/location_key, search indexing, category
+product counts and catalogue cache invalidation.
+"""
+import csv
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from . import cache, search
+from .limits import recount_vendor_products
+from .models import Category, Product
+from .slugs import save_with_unique_slug
+
+UPDATE_FIELDS = ['name', 'description', 'category', 'price', 'updated_at']
+STOCK_FIELDS = ['stock_quantity', 'in_stock']
+
+# Product.price is DecimalField(max_digits=10, decimal_places=2)
+MIN_PRICE = Decimal('0.01')
+MAX_PRICE = Decimal('100000000')
+
+
+def clean_price_to_decimal(price_str):
+    """
+    Cleans a price string like 'KSh 8,180' and converts it to a Decimal.
+    Returns None if the string is invalid.
+    """
+    if not isinstance(price_str, str) or price_str == 'N/A':
+        return None
+    try:
+        return Decimal(price_str.replace('KSh', '').replace(',', '').strip())
+    except (InvalidOperation, ValueError):
+        return None
+
+
+@dataclass
+class ImportStats:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    chunks: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def rows(self):
+        return self.created + self.updated + self.skipped
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+class ProductImporter:
+    """Import products from CSV rows in chunks. See module docstring."""
+
+    def __init__(self, vendor=None, category=None, chunk_size=1000, default_stock=10, update_stock=False,
+                 dry_run=False):
+        self.vendor = vendor
+        self.category = category
+        self.chunk_size = chunk_size
+        self.default_stock = default_stock
+        self.update_stock = update_stock
+        self.dry_run = dry_run
+        self.tier_priority = vendor.profile.tier_priority if vendor is not None else 0
+        self.location_key = vendor.profile.location.key if vendor is not None and vendor.profile.location else ''
+        self._categories = {}
+
+    def import_file(self, path, progress=None):
+        with open(path, newline='', encoding='utf-8') as handle:
+            return self.import_rows(csv.DictReader(handle), progress=progress)
+
+    def import_rows(self, rows, progress=None):
+        stats = ImportStats()
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk, stats)
+            stats.chunks += 1
+            if progress:
+                progress(stats)
+
+        if stats.created or stats.updated:
+            cache.invalidate(cache.PRODUCTS, cache.CATEGORIES)
+        return stats
+
+    def import_chunk(self, chunk, stats):
+        parsed = {}
+        for row in chunk:
+            product = self.parse_row(row)
+            if product is None:
+                stats.skipped += 1
+                continue
+            parsed[product.slug] = product  # a later duplicate row wins
+
+        if self.dry_run:
+            existing = set(Product.objects.filter(slug__in=parsed).values_list('slug', flat=True))
+            stats.updated += len(existing)
+            stats.created += len(parsed) - len(existing)
+            return
+
+        with transaction.atomic():
+            existing = {
+                product.slug: product
+                for product in Product.objects.filter(slug__in=parsed).only('id', 'slug', 'category_id', 'vendor_id')
+            }
+            to_create, to_update = [], []
+            touched_categories, touched_vendors = set(), set()
+            now = timezone.now()
+
+            for slug, product in parsed.items():
+                current = existing.get(slug)
+                if current is None:
+                    to_create.append(product)
+                else:
+                    touched_categories.add(current.category_id)
+                    touched_vendors.add(current.vendor_id)
+                    product.pk = current.pk
+                    product.updated_at = now
+                    to_update.append(product)
+                touched_categories.add(product.category_id)
+                touched_vendors.add(product.vendor_id)
+
+            Product.objects.bulk_create(to_create)
+            update_fields = UPDATE_FIELDS + (STOCK_FIELDS if self.update_stock else [])
+            update_fields += ['vendor', 'tier_priority', 'location_key'] if self.vendor else []
+            # Small batches keep each CASE WHEN short; cost grows with batch size squared
+            Product.objects.bulk_update(to_update, update_fields, batch_size=100)
+
+            search.index_products([product.pk for product in to_create + to_update])
+            Category.recount_products(category_ids=touched_categories)
+            recount_vendor_products(vendor_ids=touched_vendors - {None})
+
+        stats.created += len(to_create)
+        stats.updated += len(to_update)
+
+    def parse_row(self, row):
+        name = (row.get('Name') or '').strip()
+        price = clean_price_to_decimal(row.get('Price'))
+        slug = slugify(name)[:200]
+        if not name or not slug or price is None or not MIN_PRICE <= price < MAX_PRICE:
+            return None
+
+        details = row.get('Product Details') or ''
+        specifications = row.get('Specifications') or ''
+        stock = self.default_stock
+        return Product(
+            name=name[:200],
+            slug=slug,
+            description=f"{details}\n\n--- SPECIFICATIONS ---\n\n{specifications}".strip(),
+            category=self.get_category(row.get('Category')),
+            vendor=self.vendor,
+            price=price,
+            stock_quantity=stock,
+            in_stock=stock > 0,
+            tier_priority=self.tier_priority,
+            location_key=self.location_key,
+        )
+
+    def get_category(self, name):
+        if self.category is not None:
+            return self.category
+        name = (name or '').strip() or 'Uncategorised'
+        if name not in self._categories:
+            category = Category.objects.filter(Q(name__iexact=name) | Q(slug=slugify(name))).first()
+            if category is None and not self.dry_run:
+                category = save_with_unique_slug(
+                    Category, name, lambda slug: Category.objects.create(name=name, slug=slug),
+                )
+            self._categories[name] = category or Category(name=name, slug=slugify(name))
+        return self._categories[name]
@@ -0,0 +1,67 @@
+# products/limits.py - Vendor product counters and tier limits
+"""
+UserProfile.product_count and active_product_count count each vendor's
+products. products.signals moves them with relative UPDATEs whenever a
+product is created, deleted, (de)activated or given to another vendor, in
+the same transaction as the product row; bulk inserts (the importer, the
+generator) recount the vendors they touched. `python manage.py
+reconcile_product_counts` recounts every vendor and reports any drift.
+
+Creating a product through the API checks the tier limit with one
+conditional UPDATE on the vendor's profile row:
+
+    UPDATE authentication_userprofile
+       SET product_count = product_count
+     WHERE user_id = ? AND product_count < <limit>
+
+It matches no row once the vendor is at their limit. When it does match,
+the row stays locked until the transaction commits, so the create that
+follows (and its counter increment) finishes before a concurrent claim
+re-checks the WHERE clause against the new count. Two creates cannot both
+take the last slot. Call claim_product_slot() inside the
+transaction.atomic() that creates the product.
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from authentication.models import UserProfile
+
+from .models import Product
+
+
+class ProductLimitReached(Exception):
+
+    def __init__(self, profile):
+        self.profile = profile
+        super().__init__(f'Vendor {profile.user_id} has reached the {profile.vendor_tier} tier limit '
+                         f'of {profile.product_limit} products')
+
+
+def claim_product_slot(profile, using=None):
+    """Lock the vendor's counters for one more product, or raise ProductLimitReached"""
+    limit = profile.product_limit
+    profiles = UserProfile.objects.using(using).filter(user_id=profile.user_id)
+    if limit is not None:
+        profiles = profiles.filter(product_count__lt=limit)
+    if not profiles.update(product_count=F('product_count')):
+        raise ProductLimitReached(profile)
+
+
+def adjust_product_counts(vendor_id, total, active, using=None):
+    UserProfile.objects.using(using).filter(user_id=vendor_id).update(
+        product_count=F('product_count') + total,
+        active_product_count=F('active_product_count') + active,
+    )
+
+
+def recount_vendor_products(using=None, vendor_ids=None):
+    """Recompute the counters (for all or some vendors) in one UPDATE; returns how many were wrong"""
+    products = Product.objects.filter(vendor=OuterRef('user_id')).order_by().values('vendor')
+    total = Coalesce(Subquery(products.annotate(total=Count('id')).values('total')), 0)
+    active = Coalesce(Subquery(products.filter(is_active=True).annotate(total=Count('id')).values('total')), 0)
+    profiles = UserProfile.objects.using(using)
+    if vendor_ids is not None:
+        profiles = profiles.filter(user_id__in=vendor_ids)
+    return profiles.filter(~Q(product_count=total) | ~Q(active_product_count=active)).update(
+        product_count=total, active_product_count=active,
+    )
@@ -0,0 +1,20 @@
+# products/management/commands/flush_view_counts.py
+from django.core.management.base import BaseCommand, CommandError
+from products.view_counts import MemoryViewBuffer, get_view_counter
+
+
+class Command(BaseCommand):
+    help = 'Flush buffered product views into Product.view_count'
+
+    def handle(self, *args, **options):
+        counter = get_view_counter()
+        if isinstance(counter.buffer, MemoryViewBuffer):
+            # This process's buffer is always empty; the views sit in each worker's memory
+            raise CommandError(
+                "VIEW_COUNTER['BACKEND'] is 'memory': buffered views live in each server process and "
+                "are flushed there. Set it to 'file' to drain them with this command."
+            )
+        updated = counter.flush()
+        self.stdout.write(
+            self.style.SUCCESS(f'Flushed buffered views for {updated} products')
+        )
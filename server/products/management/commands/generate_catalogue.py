@@ -0,0 +1,50 @@
+# products/management/commands/generate_catalogue.py
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from products.generator import CatalogueGenerator, load_templates
+
+
+class Command(BaseCommand):
+    help = ('Bulk-generate a synthetic catalogue (vendors and products modelled on the Jumia CSVs), '
+            'deterministically from --seed')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--vendors', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=1, help='Same seed and sizes, same catalogue')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk_create')
+        parser.add_argument('--transaction-size', type=int, default=50_000, help='Products per transaction')
+        parser.add_argument('--templates', nargs='+', help='Jumia-style CSVs to draw from (default: csv/*.csv)')
+        parser.add_argument('--password', type=str, help='Password for the vendor accounts (default: unusable)')
+
+    def handle(self, *args, **options):
+        if options['products'] < 0 or options['vendors'] < 1:
+            raise CommandError('Need at least one vendor')
+        templates = load_templates(options['templates'])
+        if not templates:
+            raise CommandError('No usable template rows found')
+
+        generator = CatalogueGenerator(
+            products=options['products'],
+            vendors=options['vendors'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            transaction_size=options['transaction_size'],
+            templates=templates,
+            password=options['password'],
+        )
+        if User.objects.filter(username=generator.vendor_email(1)).exists():
+            raise CommandError(f"A catalogue with seed {options['seed']} was already generated here; "
+                               f"use another --seed or a fresh database")
+
+        def progress(stats):
+            if options['verbosity'] > 0:
+                self.stdout.write(f'  {stats.products}/{options["products"]} products, '
+                                  f'{stats.rows_per_second:.0f} rows/sec')
+
+        vendors, stats = generator.generate(progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {stats.vendors} vendors and {stats.products} products from {len(templates)} templates '
+            f'in {stats.elapsed:.1f}s ({stats.rows_per_second:.0f} products/sec)'
+        ))
@@ -0,0 +1,58 @@
+# products/management/commands/import_products.py
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from products.importer import ProductImporter
+from products.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Bulk import products from a Jumia-style CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path', type=str, help='Path to the CSV file')
+        parser.add_argument('--vendor', type=str, help='Email of the vendor who owns the products')
+        parser.add_argument('--category', type=str, help='Slug of a category for every row (default: CSV Category column)')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per query/transaction batch')
+        parser.add_argument('--default-stock', type=int, default=10, help='Stock quantity for newly created products')
+        parser.add_argument('--update-stock', action='store_true',
+                            help='Also reset existing products to --default-stock (default: keep their stock)')
+        parser.add_argument('--dry-run', action='store_true', help='Parse and match rows without writing')
+
+    def handle(self, *args, **options):
+        vendor = category = None
+        if options['vendor']:
+            try:
+                vendor = User.objects.select_related('profile').get(email=options['vendor'].lower().strip())
+            except User.DoesNotExist:
+                raise CommandError(f"Vendor with email {options['vendor']} does not exist")
+        if options['category']:
+            try:
+                category = Category.objects.get(slug=options['category'])
+            except Category.DoesNotExist:
+                raise CommandError(f"Category with slug {options['category']} does not exist")
+
+        importer = ProductImporter(
+            vendor=vendor,
+            category=category,
+            chunk_size=options['chunk_size'],
+            default_stock=options['default_stock'],
+            update_stock=options['update_stock'],
+            dry_run=options['dry_run'],
+        )
+
+        def progress(stats):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  chunk {stats.chunks}: {stats.rows} rows, {stats.rows_per_second:.0f} rows/sec')
+
+        try:
+            stats = importer.import_file(options['csv_path'], progress=progress)
+        except FileNotFoundError:
+            raise CommandError(f"CSV file {options['csv_path']} was not found")
+
+        prefix = '[dry run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}Imported {stats.rows} rows in {stats.elapsed:.2f}s ({stats.rows_per_second:.0f} rows/sec)\n'
+            f'  - Created: {stats.created}\n'
+            f'  - Updated: {stats.updated}\n'
+            f'  - Skipped (invalid data): {stats.skipped}'
+        ))
@@ -0,0 +1,11 @@
+# products/management/commands/reconcile_product_counts.py
+from django.core.management.base import BaseCommand
+from products.limits import recount_vendor_products
+
+
+class Command(BaseCommand):
+    help = "Recompute every vendor's product_count and active_product_count from the product table"
+
+    def handle(self, *args, **options):
+        drifted = recount_vendor_products()
+        self.stdout.write(self.style.SUCCESS(f'Reconciled {drifted} vendor(s) whose counts had drifted'))
@@ -0,0 +1,11 @@
+# products/management/commands/recount_categories.py
+from django.core.management.base import BaseCommand
+from products.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Recompute Category.active_product_count from the product table'
+
+    def handle(self, *args, **options):
+        updated = Category.recount_products()
+        self.stdout.write(self.style.SUCCESS(f'Recounted products for {updated} categories'))
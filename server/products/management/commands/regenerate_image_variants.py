@@ -0,0 +1,40 @@
+# products/management/commands/regenerate_image_variants.py
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from products import cache
+from products.images import regenerate
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Render resized variants of product images over a process pool (after changing PRODUCT_IMAGES)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing', action='store_true', help='Only images that have no variants yet')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes (1 = inline)')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True)
+        if options['missing']:
+            products = products.filter(image_variants={})
+        # Products sharing a file share its variants: render each file once
+        names = list(products.order_by().values_list('image', flat=True).distinct())
+
+        started = time.perf_counter()
+        rendered = failed = 0
+        for name, variants, error in regenerate(names, workers=options['workers']):
+            if error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+                continue
+            Product.objects.filter(image=name).update(image_variants=variants)
+            rendered += 1
+        elapsed = time.perf_counter() - started
+
+        if rendered:
+            cache.invalidate(cache.PRODUCTS)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered variants for {rendered} images ({failed} failed) in {elapsed:.1f}s'
+        ))
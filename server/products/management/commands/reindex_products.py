@@ -0,0 +1,24 @@
+# products/management/commands/reindex_products.py
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from products.search import ensure_search_index, get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text product search index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to reindex')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Products indexed per statement')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        ensure_search_index(using)
+        backend = get_search_backend(using)
+
+        with transaction.atomic(using=using):
+            indexed = backend.rebuild(batch_size=options['batch_size'])
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {indexed} products with {type(backend).__name__}')
+        )
@@ -0,0 +1,40 @@
+# products/management/commands/sync_locations.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from authentication.models import Location, UserProfile
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = ('Backfill UserProfile.location from the free-text city/district/neighborhood fields, '
+            'then Product.location_key from each vendor\'s location')
+
+    def handle(self, *args, **options):
+        profiles = products = 0
+        with transaction.atomic():
+            texts = list(UserProfile.objects.values_list(*UserProfile.LOCATION_FIELDS).distinct())
+            for values in texts:
+                location = Location.resolve(*values)
+                matching = Q()
+                for field, value in zip(UserProfile.LOCATION_FIELDS, values):
+                    matching &= Q(**{f'{field}__isnull': True}) if value is None else Q(**{field: value})
+                stale = UserProfile.objects.filter(matching)
+                stale = stale.exclude(location=location) if location else stale.filter(location__isnull=False)
+                profiles += stale.update(location=location)
+
+            for location in Location.objects.filter(profiles__isnull=False).distinct():
+                products += Product.objects.filter(vendor__profile__location=location).exclude(
+                    location_key=location.key
+                ).update(location_key=location.key)
+
+            # Products without a vendor (or vendor location) match no location filter
+            products += Product.objects.filter(
+                Q(vendor__isnull=True) | Q(vendor__profile__location__isnull=True)
+            ).exclude(location_key='').update(location_key='')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Linked {profiles} profiles to {Location.objects.count()} locations; '
+            f'updated location key on {products} products'
+        ))
@@ -0,0 +1,22 @@
+# products/management/commands/sync_tier_priority.py
+from django.core.management.base import BaseCommand
+from authentication.models import UserProfile
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Backfill Product.tier_priority from each vendor\'s current tier'
+
+    def handle(self, *args, **options):
+        total = 0
+        for tier, priority in UserProfile.TIER_PRIORITY.items():
+            total += Product.objects.filter(vendor__profile__vendor_tier=tier).exclude(
+                tier_priority=priority
+            ).update(tier_priority=priority)
+
+        # Products without a vendor (or vendor profile) sort last
+        total += Product.objects.exclude(
+            vendor__profile__vendor_tier__in=UserProfile.TIER_PRIORITY.keys()
+        ).exclude(tier_priority=0).update(tier_priority=0)
+
+        self.stdout.write(self.style.SUCCESS(f'Updated tier priority on {total} products'))
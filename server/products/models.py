@@ -1,9 +1,18 @@
 # products/models.py - UPDATED VERSION
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from decimal import Decimal
 
+from authentication.models import KEY_COLLATION
+
+from .images import product_image_path, product_image_storage
+
+# What the category and vendor product counters depend on (see products.signals)
+COUNTED_FIELDS = ('category_id', 'vendor_id', 'is_active')
+
 class Category(models.Model):
     """Category model for organizing products"""
     name = models.CharField(max_length=100, unique=True)
@@ -11,6 +20,10 @@ class Category(models.Model):
     slug = models.SlugField(max_length=100, unique=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    # Number of active products, maintained by products.signals on product
+    # create/delete/activate so listings don't COUNT per category
+    active_product_count = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         verbose_name_plural = "Categories"
@@ -19,6 +32,17 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def recount_products(cls, using=None, category_ids=None):
+        """Recompute active_product_count (for all or some categories) in one UPDATE"""
+        active = Product.objects.filter(category=OuterRef('pk'), is_active=True).order_by().values(
+            'category'
+        ).annotate(total=Count('id')).values('total')
+        categories = cls.objects.using(using)
+        if category_ids is not None:
+            categories = categories.filter(pk__in=category_ids)
+        return categories.update(active_product_count=Coalesce(Subquery(active), 0))
+
 class Product(models.Model):
     """Product model for marketplace"""
 
@@ -48,8 +72,12 @@ class Product(models.Model):
     in_stock = models.BooleanField(default=True)
     stock_quantity = models.PositiveIntegerField(default=0)
 
-    # Images - Using ImageField for local upload
-    image = models.ImageField(upload_to='products/', blank=True, null=True)
+    # Images - stored by content hash; resized variants are rendered in the
+    # background and recorded in image_variants (see products/images.py)
+    image = models.ImageField(
+        upload_to=product_image_path, storage=product_image_storage, blank=True, null=True,
+    )
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     # SEO and organization
     slug = models.SlugField(max_length=200, unique=True)
@@ -65,6 +93,15 @@ class Product(models.Model):
     # Analytics fields
     view_count = models.PositiveIntegerField(default=0)
     contact_reveal_count = models.PositiveIntegerField(default=0)
+
+    # Denormalized vendor tier priority (see UserProfile.TIER_PRIORITY),
+    # kept in sync by products.signals when the vendor's tier changes
+    tier_priority = models.PositiveSmallIntegerField(default=0)
+
+    # Denormalized vendor Location.key ("nairobi/westlands/"), kept in sync
+    # by products.signals when the vendor's location changes
+    location_key = models.CharField(max_length=310, blank=True, default='', editable=False,
+                                    db_collation=KEY_COLLATION)
     
     class Meta:
         ordering = ['-created_at']
@@ -73,8 +110,27 @@ class Product(models.Model):
             models.Index(fields=['vendor', 'is_active']),  # ADD vendor index
             models.Index(fields=['price']),
             models.Index(fields=['-created_at']),
+            # Keyset pagination seek for the tier-ordered public listing
+            models.Index(
+                fields=['is_active', '-tier_priority', '-created_at', '-id'],
+                name='product_listing_seek_idx',
+            ),
+            # Top-N by views / contact reveals on the admin dashboard
+            models.Index(fields=['is_active', '-view_count'], name='product_top_viewed_idx'),
+            models.Index(fields=['is_active', '-contact_reveal_count'], name='product_top_contacted_idx'),
+            # ?city= / ?district= / ?location= filters: a range scan over location subtrees.
+            # location_key leads: SQLite compiles is_active=True to a bare column, which can't seek
+            models.Index(fields=['location_key', 'is_active'], name='product_location_idx'),
         ]
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the counter signals care about, to diff on save
+        instance._loaded_counted_state = tuple(instance.__dict__.get(field) for field in COUNTED_FIELDS)
+        instance._loaded_image = instance.__dict__.get('image') or None
+        return instance
+
     def __str__(self):
         # Update to include vendor info when available
         vendor_info = f" - {self.vendor.get_full_name()}" if self.vendor else ""
@@ -89,4 +145,36 @@ class Product(models.Model):
         """Auto-update in_stock based on stock_quantity"""
         if self.stock_quantity <= 0:
             self.in_stock = False
-        super().save(*args, **kwargs)
\ No newline at end of file
+        if self.vendor_changed(kwargs.get('update_fields')):
+            self.tier_priority, self.location_key = self.vendor_listing_keys(kwargs.get('using'))
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'tier_priority', 'location_key'}
+        # Counter updates in post_save commit or roll back with the product row
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+        # post_save receivers have diffed against the loaded state; start over from what was saved
+        self._loaded_counted_state = self.counted_state()
+        self._loaded_image = self.image.name or None
+
+    def counted_state(self):
+        return tuple(getattr(self, field) for field in COUNTED_FIELDS)
+
+    def vendor_changed(self, update_fields=None):
+        """Whether this save gives the product a vendor it wasn't stored with"""
+        if self._state.adding:
+            return True
+        if update_fields is not None and not {'vendor', 'vendor_id'} & set(update_fields):
+            return False
+        loaded = getattr(self, '_loaded_counted_state', None)
+        return loaded is not None and loaded[COUNTED_FIELDS.index('vendor_id')] != self.vendor_id
+
+    def vendor_listing_keys(self, using=None):
+        """Look up the listing priority and location key of this product's vendor"""
+        from authentication.models import UserProfile
+
+        if not self.vendor_id:
+            return 0, ''
+        tier, location_key = UserProfile.objects.using(using).filter(user_id=self.vendor_id).values_list(
+            'vendor_tier', 'location__key'
+        ).first() or (None, None)
+        return UserProfile.TIER_PRIORITY.get(tier, 0), location_key or ''
\ No newline at end of file
@@ -0,0 +1,203 @@
+# products/pagination.py - Pagination for the public product listing
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ProductListPagination(PageNumberPagination):
+    """
+    Page-number pagination with two cheaper modes for deep listings:
+
+    - ?pagination=cursor (or any ?cursor=...): keyset pagination on
+      (tier_priority, created_at, id). Each page is an index seek, so page 500
+      costs the same as page 1, and no COUNT(*) is run.
+    - ?count=false: classic page numbers without the COUNT(*) query.
+
+    Keyset mode is only used with the default tier ordering; an explicit
+    ?ordering=... or a relevance-ordered ?search=... falls back to page numbers.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+    keyset_ordering = ('-tier_priority', '-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.mode = self.get_mode(request)
+
+        if self.mode == 'cursor':
+            return self.paginate_keyset(queryset, request)
+        if self.mode == 'nocount':
+            return self.paginate_without_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset for async views: the same modes, queried with the async ORM"""
+        self.request = request
+        self.mode = self.get_mode(request)
+
+        if self.mode == 'cursor':
+            queryset, page_size, position, reverse = self.keyset_query(queryset, request)
+            return self.keyset_page([row async for row in queryset], page_size, position, reverse)
+        if self.mode == 'nocount':
+            queryset, page_size = self.without_count_query(queryset, request)
+            return self.without_count_page([row async for row in queryset], page_size)
+
+        page_size = self.get_page_size(request)
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Count up front so the paginator never queries synchronously
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        offset = (number - 1) * page_size
+        rows = [row async for row in queryset[offset:offset + page_size]]
+        self.page = paginator._get_page(rows, number, paginator)
+        return rows
+
+    def get_mode(self, request):
+        params = request.query_params
+        wants_cursor = self.cursor_query_param in params or params.get(self.mode_query_param) == 'cursor'
+        if wants_cursor and not params.get('ordering') and not params.get('search'):
+            return 'cursor'
+        if params.get(self.count_query_param, '').lower() in ('false', '0'):
+            return 'nocount'
+        return 'page'
+
+    def get_paginated_response(self, data):
+        if self.mode == 'page':
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if self.mode == 'cursor':
+            return self.next_link
+        if self.mode == 'nocount':
+            if not self.has_next:
+                return None
+            url = self.request.build_absolute_uri()
+            return replace_query_param(url, self.page_query_param, self.page_number + 1)
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.mode == 'cursor':
+            return self.previous_link
+        if self.mode == 'nocount':
+            if self.page_number <= 1:
+                return None
+            url = self.request.build_absolute_uri()
+            if self.page_number == 2:
+                return remove_query_param(url, self.page_query_param)
+            return replace_query_param(url, self.page_query_param, self.page_number - 1)
+        return super().get_previous_link()
+
+    # Page numbers without COUNT(*)
+
+    def paginate_without_count(self, queryset, request):
+        queryset, page_size = self.without_count_query(queryset, request)
+        return self.without_count_page(list(queryset), page_size)
+
+    def without_count_query(self, queryset, request):
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except (TypeError, ValueError):
+            self.page_number = 1
+        if self.page_number < 1:
+            raise NotFound('Invalid page.')
+
+        offset = (self.page_number - 1) * page_size
+        return queryset[offset:offset + page_size + 1], page_size
+
+    def without_count_page(self, rows, page_size):
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    # Keyset pagination
+
+    def paginate_keyset(self, queryset, request):
+        queryset, page_size, position, reverse = self.keyset_query(queryset, request)
+        return self.keyset_page(list(queryset), page_size, position, reverse)
+
+    def keyset_query(self, queryset, request):
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        if reverse:
+            ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in self.keyset_ordering]
+        else:
+            ordering = list(self.keyset_ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, position))
+        return queryset[:page_size + 1], page_size, position, reverse
+
+    def keyset_page(self, rows, page_size, position, reverse):
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        has_next = has_more if not reverse else position is not None
+        has_previous = has_more if reverse else position is not None
+        self.next_link = self.encode_cursor(rows[-1], reverse=False) if rows and has_next else None
+        self.previous_link = self.encode_cursor(rows[0], reverse=True) if rows and has_previous else None
+        return rows
+
+    def seek_filter(self, ordering, position):
+        """
+        Build "row comes after position" for a multi-column ordering:
+        (a < x) OR (a = x AND b < y) OR (a = x AND b = y AND c < z)
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            position = payload['p']
+            tier_priority, created_at, pk = int(position[0]), parse_datetime(position[1]), int(position[2])
+            if created_at is None:
+                raise ValueError(position[1])
+        except (TypeError, ValueError, KeyError, IndexError, UnicodeEncodeError):
+            raise NotFound('Invalid cursor.')
+        return (tier_priority, created_at, pk), bool(payload.get('r'))
+
+    def encode_cursor(self, row, reverse):
+        if isinstance(row, dict):  # .values() rows from the listing fast path
+            position = [row['tier_priority'], row['created_at'], row['id']]
+        else:
+            position = [row.tier_priority, row.created_at, row.pk]
+        payload = {'p': [position[0], position[1].isoformat(), position[2]]}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode('ascii')
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
@@ -0,0 +1,250 @@
+# products/search.py - Full-text product search
+"""
+Product search used to be DRF SearchFilter, i.e. LIKE '%term%' over name,
+description and category name: a full table scan over the long Jumia
+descriptions on every keystroke.
+
+Search now goes through a backend chosen by database vendor:
+- SQLite:     FTS5 virtual table products_product_fts (bm25 ranking)
+- PostgreSQL: products_product_search table holding a weighted tsvector
+              with a GIN index (ts_rank ranking)
+- anything else falls back to the old icontains scan
+
+The index is kept up to date by products.signals on Product/Category
+save and delete, and can be rebuilt with `python manage.py reindex_products`.
+Code that writes products without signals (bulk_create, queryset.update of
+text fields) must call index_products() itself.
+"""
+import logging
+import re
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections, router
+from django.db.models import FloatField, Q, Value
+
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_words(term):
+    """Split user input into plain words, dropping query-syntax characters"""
+    return WORD_RE.findall(term or '')[:16]
+
+
+class BaseSearchBackend:
+    """Interface shared by the search backends"""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def ensure_index(self):
+        """Create index structures if they don't exist"""
+
+    def index_products(self, product_ids):
+        """(Re)index the given products"""
+
+    def remove_products(self, product_ids):
+        """Drop the given products from the index"""
+
+    def rebuild(self, batch_size=2000):
+        """Reindex every product. Returns the number of products indexed."""
+        from .models import Product
+
+        self.clear()
+        ids = list(Product.objects.using(self.using).order_by('id').values_list('id', flat=True))
+        for start in range(0, len(ids), batch_size):
+            self.index_products(ids[start:start + batch_size])
+        return len(ids)
+
+    def clear(self):
+        """Remove everything from the index"""
+
+    def search(self, queryset, term):
+        """Filter queryset to products matching term, annotated with search_rank"""
+        raise NotImplementedError
+
+
+class LikeSearchBackend(BaseSearchBackend):
+    """Fallback: the original icontains scan, unranked"""
+
+    def search(self, queryset, term):
+        condition = Q()
+        for word in search_words(term):
+            condition &= (
+                Q(name__icontains=word)
+                | Q(description__icontains=word)
+                | Q(category__name__icontains=word)
+            )
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """SQLite FTS5 index with bm25 ranking"""
+
+    table = 'products_product_fts'
+    # bm25 column weights: name, description, category_name
+    weights = (10.0, 1.0, 5.0)
+
+    def ensure_index(self):
+        # prefix= keeps short "as you type" prefixes from scanning whole doclists
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+                "name, description, category_name, tokenize='porter unicode61', prefix='1 2 3')"
+            )
+
+    def index_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", product_ids)
+            cursor.execute(
+                f"INSERT INTO {self.table} (rowid, name, description, category_name) "
+                "SELECT p.id, p.name, p.description, COALESCE(c.name, '') "
+                "FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id "
+                f"WHERE p.id IN ({placeholders})",
+                product_ids,
+            )
+
+    def remove_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(product_ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", product_ids)
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    def match_expression(self, term):
+        # Quote every word and prefix-match it, so "sams gal" finds "Samsung Galaxy"
+        return ' '.join(f'"{word}"*' for word in search_words(term))
+
+    def search(self, queryset, term):
+        match = self.match_expression(term)
+        if not match:
+            return queryset
+        table = queryset.model._meta.db_table
+        weights = ', '.join(str(weight) for weight in self.weights)
+        # Join the FTS table so MATCH runs once; bm25() is lower-is-better,
+        # so negate it to make search_rank higher-is-better like Postgres
+        return queryset.extra(
+            select={'search_rank': f"-bm25({self.table}, {weights})"},
+            tables=[self.table],
+            where=[f"{self.table} MATCH %s", f"{self.table}.rowid = {table}.id"],
+            params=[match],
+        )
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Weighted tsvector documents in a side table with a GIN index"""
+
+    table = 'products_product_search'
+    config = 'english'
+
+    def ensure_index(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "product_id bigint PRIMARY KEY REFERENCES products_product (id) "
+                "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_document_gin "
+                f"ON {self.table} USING GIN (document)"
+            )
+
+    def index_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {self.table} (product_id, document) "
+                "SELECT p.id, "
+                "setweight(to_tsvector(%s, p.name), 'A') || "
+                "setweight(to_tsvector(%s, COALESCE(c.name, '')), 'B') || "
+                "setweight(to_tsvector(%s, p.description), 'C') "
+                "FROM products_product p LEFT JOIN products_category c ON c.id = p.category_id "
+                "WHERE p.id = ANY(%s) "
+                "ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+                [self.config, self.config, self.config, product_ids],
+            )
+
+    def remove_products(self, product_ids):
+        product_ids = list(product_ids)
+        if not product_ids:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE product_id = ANY(%s)", [product_ids])
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {self.table}")
+
+    def tsquery(self, term):
+        # Prefix-match every word: "sams gal" -> 'sams':* & 'gal':*
+        return ' & '.join(f"{word}:*" for word in search_words(term))
+
+    def search(self, queryset, term):
+        query = self.tsquery(term)
+        if not query:
+            return queryset
+        table = queryset.model._meta.db_table
+        return queryset.extra(
+            select={'search_rank': f"ts_rank({self.table}.document, to_tsquery(%s, %s))"},
+            select_params=[self.config, query],
+            tables=[self.table],
+            where=[
+                f"{self.table}.product_id = {table}.id",
+                f"{self.table}.document @@ to_tsquery(%s, %s)",
+            ],
+            params=[self.config, query],
+        )
+
+
+BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+_unavailable = set()
+
+
+def get_search_backend(using=None):
+    """Return the search backend for the database products are read from"""
+    from .models import Product
+
+    using = using or router.db_for_read(Product)
+    backend_class = BACKENDS.get(connections[using].vendor, LikeSearchBackend)
+    if using in _unavailable:
+        backend_class = LikeSearchBackend
+    return backend_class(using)
+
+
+def ensure_search_index(using=DEFAULT_DB_ALIAS):
+    """Create the search index for a database, falling back to LIKE if unsupported"""
+    try:
+        get_search_backend(using).ensure_index()
+    except OperationalError:
+        logger.warning("Full-text search unavailable on database %r; using LIKE search", using)
+        _unavailable.add(using)
+
+
+def index_products(product_ids, using=None):
+    """Add or refresh products in the search index"""
+    get_search_backend(using).index_products(product_ids)
+
+
+def remove_products(product_ids, using=None):
+    """Remove products from the search index"""
+    get_search_backend(using).remove_products(product_ids)
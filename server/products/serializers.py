@@ -1,18 +1,21 @@
 # products/serializers.py - Updated for marketplace
+from functools import cached_property
+
 from rest_framework import serializers
-from django.utils.text import slugify
+from .images import image_fields
 from .models import Product, Category
+from .slugs import save_with_unique_slug
 
 class CategorySerializer(serializers.ModelSerializer):
-    product_count = serializers.SerializerMethodField()
+    # Maintained counter column - avoids a COUNT query per category/product row
+    product_count = serializers.IntegerField(source='active_product_count', read_only=True)
 
     class Meta:
         model = Category
         fields = ['id', 'name', 'slug', 'description', 'product_count', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
-
-    def get_product_count(self, obj):
-        return obj.products.filter(is_active=True).count()
+        # Generated by CategoryListCreateView.perform_create when omitted
+        extra_kwargs = {'slug': {'required': False}}
 
     def validate_name(self, value):
         """Ensure category name is unique"""
@@ -42,8 +45,10 @@ class ProductSerializer(serializers.ModelSerializer):
     view_count = serializers.IntegerField(read_only=True)
     contact_reveal_count = serializers.IntegerField(read_only=True)
 
-    # Image field
+    # Image field, plus resized variants for cards and <img srcset>
     image = serializers.ImageField(required=False, allow_null=True)
+    thumbnail = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
@@ -58,6 +63,8 @@ class ProductSerializer(serializers.ModelSerializer):
             'in_stock',
             'is_available',
             'image',
+            'thumbnail',
+            'image_srcset',
             'slug',
             'featured',
             'is_active',
@@ -77,6 +84,16 @@ class ProductSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['created_at', 'updated_at', 'slug', 'view_count', 'contact_reveal_count']
 
+    def _image_fields(self, obj):
+        url = ProductListingSerializer._image_url_builder(self.context.get('request'))
+        return image_fields(obj.image.name, obj.image_variants, url)
+
+    def get_thumbnail(self, obj):
+        return self._image_fields(obj)['thumbnail']
+
+    def get_image_srcset(self, obj):
+        return self._image_fields(obj)['image_srcset']
+
     def get_vendor_name(self, obj):
         """Get vendor's full name"""
         if obj.vendor:
@@ -180,20 +197,12 @@ class ProductSerializer(serializers.ModelSerializer):
         category_id = validated_data.pop('category_id')
         category = Category.objects.get(id=category_id)
 
-        # Generate unique slug
-        name = validated_data['name']
-        base_slug = slugify(name)
-        slug = base_slug
-        counter = 1
-
-        while Product.objects.filter(slug=slug).exists():
-            slug = f"{base_slug}-{counter}"
-            counter += 1
-
-        validated_data['slug'] = slug
         validated_data['category'] = category
 
-        return super().create(validated_data)
+        create = super().create
+        return save_with_unique_slug(
+            Product, validated_data['name'], lambda slug: create({**validated_data, 'slug': slug}),
+        )
 
     def update(self, instance, validated_data):
         """Update product, regenerate slug if name changed"""
@@ -206,15 +215,11 @@ class ProductSerializer(serializers.ModelSerializer):
         # Check if name changed and regenerate slug
         new_name = validated_data.get('name')
         if new_name and new_name != instance.name:
-            base_slug = slugify(new_name)
-            slug = base_slug
-            counter = 1
-
-            while Product.objects.filter(slug=slug).exclude(id=instance.id).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-
-            validated_data['slug'] = slug
+            update = super().update
+            return save_with_unique_slug(
+                Product, new_name, lambda slug: update(instance, {**validated_data, 'slug': slug}),
+                exclude_pk=instance.pk,
+            )
 
         return super().update(instance, validated_data)
 
@@ -225,8 +230,145 @@ class VendorStatsSerializer(serializers.Serializer):
     active_products = serializers.IntegerField()
     total_views = serializers.IntegerField()
     total_contacts = serializers.IntegerField()
+    # Windowed activity from the daily analytics rollup
+    views_last_7_days = serializers.IntegerField()
+    views_last_30_days = serializers.IntegerField()
+    views_last_90_days = serializers.IntegerField()
+    contacts_last_7_days = serializers.IntegerField()
+    contacts_last_30_days = serializers.IntegerField()
+    contacts_last_90_days = serializers.IntegerField()
     vendor_tier = serializers.CharField()
     product_limit = serializers.IntegerField(allow_null=True)
     products_remaining = serializers.IntegerField(allow_null=True)
     subscription_expires_at = serializers.DateTimeField(allow_null=True)
     is_subscription_active = serializers.BooleanField()
+
+
+class ProductListingSerializer:
+    """
+    Read-only fast path for product listings.
+
+    Produces exactly the JSON ProductSerializer does, but from `.values()`
+    rows (see LISTING_VALUES) in a single pass: no model instances, no DRF
+    field machinery per row, and the authentication check done once per
+    page instead of four times per product.
+
+    Usage mirrors a DRF list serializer:
+        ProductListingSerializer(listing_values(queryset), context={'request': request}).data
+    """
+
+    LISTING_VALUES = (
+        'id', 'name', 'description', 'price', 'stock_quantity', 'in_stock', 'image', 'image_variants', 'slug',
+        'featured', 'is_active', 'created_at', 'updated_at', 'view_count', 'contact_reveal_count',
+        'tier_priority',
+        'category_id', 'category__name', 'category__slug', 'category__description',
+        'category__active_product_count', 'category__created_at', 'category__updated_at',
+        'vendor_id', 'vendor__first_name', 'vendor__last_name', 'vendor__email',
+        'vendor__profile__id', 'vendor__profile__phone', 'vendor__profile__whatsapp',
+        'vendor__profile__business_name', 'vendor__profile__neighborhood',
+        'vendor__profile__district', 'vendor__profile__city', 'vendor__profile__vendor_tier',
+    )
+
+    # Reuse DRF's own formatting for the types where byte-identical output matters
+    _datetime = serializers.DateTimeField()
+    _price = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+    def __init__(self, rows, context=None):
+        self.rows = rows
+        self.context = context or {}
+
+    @cached_property
+    def data(self):
+        request = self.context.get('request')
+        show_contact = bool(request and request.user.is_authenticated)
+        image_url = self._image_url_builder(request)
+        datetime = self._datetime_formatter()
+        price = self._price.to_representation
+
+        data = []
+        append = data.append
+        for row in self.rows:
+            vendor_id = row['vendor_id']
+            has_profile = row['vendor__profile__id'] is not None
+
+            if vendor_id is not None:
+                vendor_name = f"{row['vendor__first_name']} {row['vendor__last_name']}".strip() or row['vendor__email']
+            else:
+                vendor_name = None
+
+            if has_profile:
+                location = ', '.join(part for part in (
+                    row['vendor__profile__neighborhood'],
+                    row['vendor__profile__district'],
+                    row['vendor__profile__city'],
+                ) if part) or None
+                vendor_tier = row['vendor__profile__vendor_tier']
+            else:
+                location = None
+                vendor_tier = 'free'
+
+            append({
+                'id': row['id'],
+                'name': row['name'],
+                'description': row['description'],
+                'category': {
+                    'id': row['category_id'],
+                    'name': row['category__name'],
+                    'slug': row['category__slug'],
+                    'description': row['category__description'],
+                    'product_count': row['category__active_product_count'],
+                    'created_at': datetime(row['category__created_at']),
+                    'updated_at': datetime(row['category__updated_at']),
+                },
+                'price': price(row['price']),
+                'stock_quantity': row['stock_quantity'],
+                'in_stock': row['in_stock'],
+                'is_available': row['in_stock'] and row['stock_quantity'] > 0 and row['is_active'],
+                'image': image_url(row['image']) if row['image'] else None,
+                **image_fields(row['image'], row['image_variants'], image_url),
+                'slug': row['slug'],
+                'featured': row['featured'],
+                'is_active': row['is_active'],
+                'created_at': datetime(row['created_at']),
+                'updated_at': datetime(row['updated_at']),
+                'vendor_name': vendor_name,
+                'vendor_phone': row['vendor__profile__phone'] if show_contact and has_profile else None,
+                'vendor_whatsapp': row['vendor__profile__whatsapp'] if show_contact and has_profile else None,
+                'vendor_business': row['vendor__profile__business_name'] if has_profile else None,
+                'vendor_location': location,
+                'vendor_tier': vendor_tier,
+                'vendor_id': vendor_id,
+                'view_count': row['view_count'],
+                'contact_reveal_count': row['contact_reveal_count'],
+            })
+        return data
+
+    @classmethod
+    def _datetime_formatter(cls):
+        """DRF's ISO 8601 DateTimeField output, minus its per-call setting lookups"""
+        field_timezone = cls._datetime.default_timezone()
+        slow_path = cls._datetime.to_representation
+
+        def to_representation(value):
+            if value is None or field_timezone is None or value.tzinfo is None:
+                return slow_path(value)
+            value = value.astimezone(field_timezone).isoformat()
+            return value[:-6] + 'Z' if value.endswith('+00:00') else value
+        return to_representation
+
+    @staticmethod
+    def _image_url_builder(request):
+        field = Product._meta.get_field('image')
+        storage_url = field.storage.url
+        if request is None:
+            return storage_url
+        return lambda name: request.build_absolute_uri(storage_url(name))
+
+
+def listing_values(queryset):
+    """
+    Turn a product queryset into the `.values()` rows ProductListingSerializer
+    reads, keeping any search rank/annotations the ordering depends on.
+    """
+    extra = [*queryset.query.extra_select, *queryset.query.annotations]
+    return queryset.values(*ProductListingSerializer.LISTING_VALUES, *extra)
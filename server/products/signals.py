@@ -0,0 +1,170 @@
+# products/signals.py - Keep denormalized product fields in sync
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from django.contrib.auth.models import User
+
+from authentication.models import UserProfile
+from notifications.metrics import enqueue
+from . import cache, search
+from .limits import adjust_product_counts
+from .models import Category, Product
+from .tasks import generate_product_image_variants
+
+# Sent inside the ViewCounter flush transaction with counts={product_id: views}
+product_views_flushed = Signal()
+
+# Sent when a user reveals a product's vendor contact, with product=
+product_contact_revealed = Signal()
+
+
+@receiver(post_save, sender=UserProfile)
+def sync_product_tier_priority(sender, instance, created, **kwargs):
+    """Re-rank a vendor's products when their vendor_tier changes"""
+    if created:
+        return
+    if getattr(instance, '_loaded_vendor_tier', None) == instance.vendor_tier:
+        return
+
+    Product.objects.using(instance._state.db).filter(vendor_id=instance.user_id).exclude(
+        tier_priority=instance.tier_priority
+    ).update(tier_priority=instance.tier_priority)
+
+
+@receiver(post_save, sender=UserProfile)
+def sync_product_location_key(sender, instance, created, **kwargs):
+    """Move a vendor's products to their new location when it changes"""
+    if created or getattr(instance, '_loaded_location_id', None) == instance.location_id:
+        return
+
+    key = instance.location.key if instance.location_id else ''
+    Product.objects.using(instance._state.db).filter(vendor_id=instance.user_id).exclude(
+        location_key=key
+    ).update(location_key=key)
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, update_fields=None, **kwargs):
+    """Keep the full-text search index in step with product text"""
+    if update_fields is not None and not {'name', 'description', 'category'} & set(update_fields):
+        return
+    search.index_products([instance.id], using=instance._state.db)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    search.remove_products([instance.id], using=instance._state.db)
+
+
+@receiver(post_save, sender=Product)
+def process_product_image(sender, instance, **kwargs):
+    """Drop the old image's thumbnails and render the new one's in the background"""
+    name = instance.image.name or None
+    if name == getattr(instance, '_loaded_image', None):
+        return
+    if instance.image_variants:
+        Product.objects.using(instance._state.db).filter(id=instance.id).update(image_variants={})
+        instance.image_variants = {}
+    if name:
+        enqueue(generate_product_image_variants, instance.id)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_products(sender, instance, created, **kwargs):
+    """Category name is part of each product's search document"""
+    if created:
+        return
+    product_ids = list(instance.products.values_list('id', flat=True))
+    search.index_products(product_ids, using=instance._state.db)
+
+
+def _adjust_active_count(category_id, delta, using):
+    Category.objects.using(using).filter(pk=category_id).update(
+        active_product_count=F('active_product_count') + delta
+    )
+
+
+@receiver(post_save, sender=Product)
+def update_category_count_on_save(sender, instance, created, **kwargs):
+    """Move the product between category counters when it is created, (de)activated or re-categorised"""
+    using = instance._state.db
+    old_category, _, old_active = (None, None, False) if created else getattr(
+        instance, '_loaded_counted_state', instance.counted_state()
+    )
+    new_category, new_active = instance.category_id, instance.is_active
+
+    if (old_category, old_active) != (new_category, new_active):
+        if old_active and old_category:
+            _adjust_active_count(old_category, -1, using)
+        if new_active and new_category:
+            _adjust_active_count(new_category, 1, using)
+
+
+@receiver(post_delete, sender=Product)
+def update_category_count_on_delete(sender, instance, **kwargs):
+    if instance.is_active:
+        _adjust_active_count(instance.category_id, -1, instance._state.db)
+
+
+@receiver(post_save, sender=Product)
+def update_vendor_counts_on_save(sender, instance, created, **kwargs):
+    """Count the product against its vendor when it is created, (de)activated or handed to another vendor"""
+    using = instance._state.db
+    _, old_vendor, old_active = (None, None, False) if created else getattr(
+        instance, '_loaded_counted_state', instance.counted_state()
+    )
+    new_vendor, new_active = instance.vendor_id, instance.is_active
+
+    if old_vendor != new_vendor:
+        if old_vendor:
+            adjust_product_counts(old_vendor, -1, -int(old_active), using)
+        if new_vendor:
+            adjust_product_counts(new_vendor, 1, int(new_active), using)
+    elif new_vendor and old_active != new_active:
+        adjust_product_counts(new_vendor, 0, 1 if new_active else -1, using)
+
+
+@receiver(post_delete, sender=Product)
+def update_vendor_counts_on_delete(sender, instance, **kwargs):
+    if instance.vendor_id:
+        adjust_product_counts(instance.vendor_id, -1, -int(instance.is_active), instance._state.db)
+
+
+def invalidate_on_commit(using, *namespaces):
+    """
+    Invalidate once the write commits: a read between an earlier bump and
+    the commit would cache the old rows under the new generation.
+    """
+    transaction.on_commit(lambda: cache.invalidate(*namespaces), using=using)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_catalogue_cache(sender, instance, **kwargs):
+    """Products embed their category and categories count products, so both go"""
+    invalidate_on_commit(instance._state.db, cache.PRODUCTS, cache.CATEGORIES)
+
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_catalogue_cache_for_profile(sender, instance, created, **kwargs):
+    """Listings show vendor contact, location and tier from the profile"""
+    if not created and instance.listing_fields_changed():
+        invalidate_on_commit(instance._state.db, cache.PRODUCTS)
+
+
+@receiver(post_delete, sender=UserProfile)
+def invalidate_catalogue_cache_for_deleted_profile(sender, instance, **kwargs):
+    invalidate_on_commit(instance._state.db, cache.PRODUCTS)
+
+
+@receiver(post_save, sender=User)
+def invalidate_catalogue_cache_for_vendor(sender, instance, created, update_fields=None, **kwargs):
+    """Listings show the vendor's name and email; ignore last_login-only saves"""
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    if instance.products.exists():
+        invalidate_on_commit(instance._state.db, cache.PRODUCTS)
@@ -0,0 +1,60 @@
+# products/slugs.py - Unique slug allocation for products and categories
+"""
+Picks a free slug for a name without probing one candidate per query:
+
+- allocate_slug() fetches every existing `slug__startswith=<base>` value in
+  one query and chooses the next free `-N` suffix in memory.
+- save_with_unique_slug() saves through a callback and, if a concurrent
+  writer took the same slug first (IntegrityError on the unique index),
+  allocates again and retries.
+
+Used by ProductSerializer, CategoryListCreateView and the CSV importer.
+"""
+import re
+
+from django.db import IntegrityError, transaction
+from django.utils.text import slugify
+
+MAX_ATTEMPTS = 5
+
+# Room kept for a "-N" suffix when the base slug is near max_length
+SUFFIX_ROOM = 11
+
+
+def allocate_slug(model, name, exclude_pk=None, field='slug'):
+    """Return a slug for name that is not used by any other row of model"""
+    max_length = model._meta.get_field(field).max_length
+    base = slugify(name)[:max_length].strip('-') or model._meta.model_name
+    stem = base[:max_length - SUFFIX_ROOM].strip('-')
+
+    queryset = model._default_manager.filter(**{f'{field}__startswith': stem})
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    taken = set(queryset.values_list(field, flat=True))
+    if base not in taken:
+        return base
+
+    suffix = re.compile(rf'{re.escape(stem)}-(\d+)')
+    used = [int(match.group(1)) for match in map(suffix.fullmatch, taken) if match]
+    return f'{stem}-{max(used, default=0) + 1}'
+
+
+def save_with_unique_slug(model, name, save, exclude_pk=None, field='slug', attempts=MAX_ATTEMPTS):
+    """
+    Call save(slug) with a freshly allocated slug and return its result.
+
+    Each attempt runs in a savepoint. An IntegrityError caused by another
+    row taking the slug in the meantime triggers a new allocation; any
+    other IntegrityError is re-raised.
+    """
+    for attempt in range(attempts):
+        slug = allocate_slug(model, name, exclude_pk=exclude_pk, field=field)
+        try:
+            with transaction.atomic():
+                return save(slug)
+        except IntegrityError:
+            taken = model._default_manager.filter(**{field: slug})
+            if exclude_pk is not None:
+                taken = taken.exclude(pk=exclude_pk)
+            if attempt == attempts - 1 or not taken.exists():
+                raise
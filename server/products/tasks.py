@@ -0,0 +1,10 @@
+# products/tasks.py - Background jobs for the catalogue
+from celery import shared_task
+
+from .images import generate_variants
+
+
+@shared_task
+def generate_product_image_variants(product_id):
+    """Render the thumbnails of a product's newly uploaded image"""
+    return generate_variants(product_id)
@@ -1,3 +1,1095 @@
-from django.test import TestCase
+import asyncio
+import functools
+import io
+import json
+import shutil
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from authentication.models import Location, UserProfile
+from server.testing import race
+
+from .models import Category, Product
+from .cache import cache_stats
+from .generator import CatalogueGenerator, Template
+from .images import product_image_storage
+from .importer import ProductImporter
+from .limits import recount_vendor_products
+from .search import LikeSearchBackend, get_search_backend
+from .slugs import allocate_slug, save_with_unique_slug
+from .serializers import ProductListingSerializer, ProductSerializer, listing_values
+from .view_counts import FileViewBuffer, MemoryViewBuffer, ViewCounter
+from . import async_views, view_counts
+
+
+class CatalogueTestCase(TestCase):
+    """Shared fixtures: one vendor, one category, a handful of products"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.vendor = User.objects.create_user(
+            username='vendor@example.com', email='vendor@example.com', password='pass12345'
+        )
+        cls.vendor.profile.role = 'vendor'
+        cls.vendor.profile.vendor_tier = 'featured'
+        cls.vendor.profile.save()
+        cls.category = Category.objects.create(name='Smartphones', slug='smartphones')
+        cls.products = [
+            Product.objects.create(
+                name=f'Phone {i}',
+                slug=f'phone-{i}',
+                description='A phone',
+                category=cls.category,
+                vendor=cls.vendor,
+                price=Decimal('1000.00'),
+                stock_quantity=5,
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        # The catalogue response cache outlives each test's rolled-back transaction
+        caches['default'].clear()
+
+
+class ViewCounterTests(CatalogueTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.counter = ViewCounter(MemoryViewBuffer(), flush_interval=3600, max_pending=1000)
+        patcher = mock.patch.object(view_counts, '_view_counter', self.counter)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_detail_view_buffers_increment_until_flush(self):
+        product = self.products[0]
+
+        response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['product']['view_count'], 1)
+
+        product.refresh_from_db()
+        self.assertEqual(product.view_count, 0)
+
+        self.counter.flush()
+        product.refresh_from_db()
+        self.assertEqual(product.view_count, 1)
+
+    def test_flush_merges_all_products_in_one_update(self):
+        first, second, _ = self.products
+        for _ in range(3):
+            self.client.get(f'/api/product/{first.slug}/')
+        self.client.get(f'/api/products/{second.id}/edit/')
+
+        # savepoint, one UPDATE for all products, one daily analytics upsert, release
+        with self.assertNumQueries(4):
+            self.assertEqual(self.counter.flush(), 2)
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.view_count, second.view_count), (3, 1))
+
+    def test_record_flushes_once_max_pending_is_reached(self):
+        self.counter.max_pending = 2
+        product = self.products[0]
+
+        self.counter.record(product.id)
+        product.refresh_from_db()
+        self.assertEqual(product.view_count, 0)
+
+        self.counter.record(product.id)
+        product.refresh_from_db()
+        self.assertEqual(product.view_count, 2)
+
+    def test_flush_command_refuses_the_memory_backend(self):
+        with self.assertRaisesMessage(CommandError, "VIEW_COUNTER['BACKEND'] is 'memory'"):
+            call_command('flush_view_counts', stdout=io.StringIO())
+
+    def test_flush_command_drains_the_file_backend(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.counter.buffer = FileViewBuffer(Path(directory) / 'views.log')
+            self.counter.record(self.products[0].id)
+            call_command('flush_view_counts', stdout=io.StringIO())
+        self.products[0].refresh_from_db()
+        self.assertEqual(self.products[0].view_count, 1)
+
+    def test_file_buffer_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            buffer = FileViewBuffer(Path(directory) / 'views.log')
+            buffer.add(1)
+            buffer.add(2, amount=2)
+            buffer.add(1)
+
+            self.assertEqual(buffer.drain(), {1: 2, 2: 2})
+            self.assertEqual(buffer.drain(), {})
+
+
+class TierPriorityTests(CatalogueTestCase):
+
+    def test_new_product_takes_vendor_tier_priority(self):
+        self.assertEqual(self.products[0].tier_priority, 4)
+
+    def test_tier_change_reranks_vendor_products(self):
+        profile = User.objects.get(pk=self.vendor.pk).profile
+        profile.vendor_tier = 'basic'
+        profile.save()
+
+        priorities = set(Product.objects.filter(vendor=self.vendor).values_list('tier_priority', flat=True))
+        self.assertEqual(priorities, {2})
+
+    def test_changing_vendor_takes_the_new_vendor_keys(self):
+        other = User.objects.create_user(username='other@example.com', email='other@example.com')
+        other.profile.city = 'Mombasa'
+        other.profile.save()
+        for update_fields in (None, ['vendor']):
+            with self.subTest(update_fields=update_fields):
+                product = Product.objects.get(pk=self.products[0].pk)
+                product.vendor = other if product.vendor_id == self.vendor.pk else self.vendor
+                product.save(update_fields=update_fields)
+                product.refresh_from_db()
+                expected = (1, 'mombasa/') if product.vendor_id == other.pk else (4, '')
+                self.assertEqual((product.tier_priority, product.location_key), expected)
+
+
+class ProductListPaginationTests(CatalogueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        basic_vendor = User.objects.create_user(
+            username='basic@example.com', email='basic@example.com', password='pass12345'
+        )
+        basic_vendor.profile.role = 'vendor'
+        basic_vendor.profile.vendor_tier = 'basic'
+        basic_vendor.profile.save()
+        for i in range(4):
+            Product.objects.create(
+                name=f'Kettle {i}',
+                slug=f'kettle-{i}',
+                description='A kettle',
+                category=cls.category,
+                vendor=basic_vendor,
+                price=Decimal('500.00'),
+                stock_quantity=5,
+            )
+
+    def collect_pages(self, url):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.json())
+            ids.extend(item['id'] for item in response.json()['results'])
+            url = response.json()['next']
+        return ids, pages
+
+    def test_cursor_pages_match_page_number_ordering(self):
+        expected, _ = self.collect_pages('/api/all_products/?page_size=100')
+        ids, pages = self.collect_pages('/api/all_products/?pagination=cursor&page_size=2')
+
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(pages), 4)
+        self.assertNotIn('count', pages[0])
+
+    def test_cursor_previous_link_returns_prior_page(self):
+        first = self.client.get('/api/all_products/?pagination=cursor&page_size=3').json()
+        second = self.client.get(first['next']).json()
+        back = self.client.get(second['previous']).json()
+
+        self.assertEqual([p['id'] for p in back['results']], [p['id'] for p in first['results']])
+        self.assertIsNone(back['previous'])
+
+    def test_cursor_page_skips_count_query(self):
+        first = self.client.get('/api/all_products/?pagination=cursor&page_size=2').json()
+        with self.assertNumQueries(1):
+            self.client.get(first['next'])
+
+    def test_invalid_cursor_is_404(self):
+        response = self.client.get('/api/all_products/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
+
+    def test_count_false_omits_total(self):
+        response = self.client.get('/api/all_products/?count=false&page_size=5')
+        self.assertNotIn('count', response.json())
+        self.assertEqual(len(response.json()['results']), 5)
+        self.assertIsNotNone(response.json()['next'])
+
+        response = self.client.get(response.json()['next'])
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertIsNone(response.json()['next'])
+
+
+class ProductSearchTests(CatalogueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.kitchen = Category.objects.create(name='Kitchen Ware', slug='kitchen-ware')
+        cls.kettle = Product.objects.create(
+            name='Ramtons Electric Kettle',
+            slug='ramtons-electric-kettle',
+            description='1.7 litre cordless kettle with auto shut-off',
+            category=cls.kitchen,
+            vendor=cls.vendor,
+            price=Decimal('2500.00'),
+            stock_quantity=5,
+        )
+        cls.blender = Product.objects.create(
+            name='Blender',
+            slug='blender',
+            description='Pairs well with any kettle',
+            category=cls.kitchen,
+            vendor=cls.vendor,
+            price=Decimal('3500.00'),
+            stock_quantity=5,
+        )
+
+    def search_ids(self, term):
+        response = self.client.get('/api/all_products/', {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.json()['results']]
+
+    def test_uses_full_text_backend_on_sqlite(self):
+        self.assertNotIsInstance(get_search_backend(), LikeSearchBackend)
+
+    def test_results_are_ranked_by_relevance(self):
+        self.assertEqual(self.search_ids('kettle'), [self.kettle.id, self.blender.id])
+
+    def test_prefix_words_match_while_typing(self):
+        self.assertEqual(self.search_ids('ramt elec'), [self.kettle.id])
+
+    def test_query_syntax_is_treated_as_text(self):
+        self.assertEqual(self.search_ids('"kettle" OR (NEAR'), [])
+
+    def test_index_follows_product_updates_and_deletes(self):
+        self.kettle.name = 'Ramtons Jug'
+        self.kettle.save()
+        self.assertEqual(self.search_ids('jug'), [self.kettle.id])
+
+        self.blender.delete()
+        self.assertEqual(self.search_ids('blender'), [])
+
+    def test_index_follows_category_rename(self):
+        self.kitchen.name = 'Cookware'
+        self.kitchen.save()
+        self.assertCountEqual(self.search_ids('cookware'), [self.kettle.id, self.blender.id])
+
+
+class CategoryCountTests(CatalogueTestCase):
+
+    def count(self):
+        self.category.refresh_from_db()
+        return self.category.active_product_count
+
+    def test_counter_follows_create_deactivate_and_delete(self):
+        self.assertEqual(self.count(), 3)
+
+        product = self.products[0]
+        product.is_active = False
+        product.save()
+        self.assertEqual(self.count(), 2)
+
+        product.is_active = True
+        product.save()
+        self.assertEqual(self.count(), 3)
+
+        Product.objects.filter(pk=self.products[1].pk).delete()
+        self.assertEqual(self.count(), 2)
+
+    def test_counter_moves_with_category_change(self):
+        other = Category.objects.create(name='Tablets', slug='tablets')
+        product = Product.objects.get(pk=self.products[0].pk)
+        product.category = other
+        product.save()
+
+        other.refresh_from_db()
+        self.assertEqual((self.count(), other.active_product_count), (2, 1))
+
+    def test_recount_repairs_drift(self):
+        Category.objects.update(active_product_count=99)
+        Category.recount_products()
+        self.assertEqual(self.count(), 3)
+
+
+class VendorProductCountTests(CatalogueTestCase):
+
+    def counts(self):
+        profile = UserProfile.objects.get(user=self.vendor)
+        return profile.product_count, profile.active_product_count
+
+    def create_product(self, name):
+        return self.client.post('/api/products/', {
+            'name': name, 'description': 'x', 'price': '10.00', 'category_id': self.category.id,
+        }, format='json')
+
+    def test_counters_follow_create_deactivate_and_delete(self):
+        self.assertEqual(self.counts(), (3, 3))
+
+        product = self.products[0]
+        product.is_active = False
+        product.save()
+        self.assertEqual(self.counts(), (3, 2))
+
+        Product.objects.filter(pk=self.products[1].pk).delete()
+        self.assertEqual(self.counts(), (2, 1))
+
+        product.delete()
+        self.assertEqual(self.counts(), (1, 1))
+
+    def test_counters_move_with_vendor_change(self):
+        other = User.objects.create_user(username='other@example.com', email='other@example.com', password='x')
+        product = Product.objects.get(pk=self.products[0].pk)
+        product.vendor = other
+        product.save()
+
+        self.assertEqual(self.counts(), (2, 2))
+        self.assertEqual(UserProfile.objects.get(user=other).product_count, 1)
+
+    def test_profile_save_keeps_counters(self):
+        # A stale instance (like request.user.profile) must not write its counts back
+        profile = UserProfile.objects.get(user=self.vendor)
+        Product.objects.create(name='Phone 9', slug='phone-9', category=self.category, vendor=self.vendor,
+                               price=Decimal('10.00'))
+        profile.vendor_tier = 'premium'
+        profile.save()
+        self.vendor.save()
+        self.assertEqual(self.counts(), (4, 4))
+
+    def test_limit_enforced_from_counter(self):
+        UserProfile.objects.filter(user=self.vendor).update(vendor_tier='free')
+        self.client.force_authenticate(User.objects.get(pk=self.vendor.pk))
+        for i in range(7):
+            self.assertEqual(self.create_product(f'Tablet {i}').status_code, 201)
+        self.assertEqual(self.counts(), (10, 10))
+
+        with self.assertNumQueries(5):  # the claim in its savepoint, then the refreshed count
+            response = self.create_product('One too many')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual({key: response.json()[key] for key in ('current_count', 'limit', 'tier')},
+                         {'current_count': 10, 'limit': 10, 'tier': 'free'})
+
+        self.products[0].delete()
+        self.assertEqual(self.create_product('Back under').status_code, 201)
+
+    def test_invalid_product_does_not_take_a_slot(self):
+        UserProfile.objects.filter(user=self.vendor).update(vendor_tier='free')
+        self.client.force_authenticate(User.objects.get(pk=self.vendor.pk))
+        response = self.client.post('/api/products/', {'name': 'No price', 'category_id': self.category.id})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.counts(), (3, 3))
+
+    def test_vendor_stats_use_counters(self):
+        UserProfile.objects.filter(user=self.vendor).update(vendor_tier='free', active_product_count=2)
+        self.client.force_authenticate(User.objects.get(pk=self.vendor.pk))
+        data = self.client.get('/api/vendor/stats/').json()['stats']
+        self.assertEqual((data['total_products'], data['active_products'], data['products_remaining']), (3, 2, 7))
+
+    def test_reconcile_command_repairs_drift(self):
+        UserProfile.objects.filter(user=self.vendor).update(product_count=99, active_product_count=0)
+        out = io.StringIO()
+        call_command('reconcile_product_counts', stdout=out)
+        self.assertIn('Reconciled 1 vendor(s)', out.getvalue())
+        self.assertEqual(self.counts(), (3, 3))
+
+        out = io.StringIO()
+        call_command('reconcile_product_counts', stdout=out)
+        self.assertIn('Reconciled 0 vendor(s)', out.getvalue())
+
+    def test_recount_after_bulk_create(self):
+        UserProfile.objects.filter(user=self.vendor).update(product_count=0, active_product_count=0)
+        Product.objects.bulk_create([
+            Product(name='Bulk', slug='bulk', category=self.category, vendor=self.vendor, price=Decimal('10.00')),
+        ])
+        recount_vendor_products(vendor_ids=[self.vendor.pk])
+        self.assertEqual(self.counts(), (4, 4))
+
+
+class QueryCountTests(CatalogueTestCase):
+    """Listing endpoints must cost a fixed number of queries whatever the page size"""
+
+    def add_products(self, count):
+        with self.captureOnCommitCallbacks(execute=True):   # committed, so cached responses are invalidated
+            for i in range(count):
+                self.add_product(i)
+
+    def add_product(self, i):
+        Product.objects.create(
+            name=f'Extra {i}',
+            slug=f'extra-{i}',
+            description='More stock',
+            category=Category.objects.create(name=f'Extra category {i}', slug=f'extra-category-{i}'),
+            vendor=self.vendor,
+            price=Decimal('10.00'),
+            stock_quantity=1,
+        )
+
+    def assert_constant_queries(self, expected, url, authenticate=False):
+        if authenticate:
+            self.client.force_authenticate(self.vendor)
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.add_products(15)
+        with self.assertNumQueries(expected):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_all_products(self):
+        self.assert_constant_queries(2, '/api/all_products/')  # count + page
+
+    def test_all_products_cursor(self):
+        self.assert_constant_queries(1, '/api/all_products/?pagination=cursor')
+
+    def test_product_list(self):
+        self.assert_constant_queries(2, '/api/products/')
+
+    def test_featured_products(self):
+        self.assert_constant_queries(1, '/api/featured/')
+
+    def test_categories(self):
+        self.assert_constant_queries(1, '/api/categories/list/')
+
+    def test_category_list(self):
+        self.assert_constant_queries(2, '/api/categories/')
+
+    def test_vendor_products(self):
+        self.assert_constant_queries(1, '/api/vendor/products/', authenticate=True)
+
+
+class LocationFilterTests(CatalogueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        profile = cls.vendor.profile
+        profile.city, profile.district = 'Nairobi', 'Westlands'
+        profile.save()
+        cls.mombasa = User.objects.create_user(username='mombasa@example.com', email='mombasa@example.com')
+        cls.mombasa.profile.district, cls.mombasa.profile.neighborhood = 'Nyali', 'Nyali, Mombasa'
+        cls.mombasa.profile.save()
+        Product.objects.create(name='Mombasa phone', slug='mombasa-phone', description='x', category=cls.category,
+                               vendor=cls.mombasa, price=Decimal('10.00'), stock_quantity=1)
+
+    def names(self, **params):
+        response = self.client.get('/api/all_products/', params)
+        return sorted(item['name'] for item in response.json()['results'])
+
+    def test_new_products_take_the_vendor_location(self):
+        self.assertEqual(Product.objects.get(slug='mombasa-phone').location_key, 'mombasa/nyali/')
+
+    def test_exact_and_hierarchical_filters(self):
+        self.assertEqual(self.names(city='mombasa'), ['Mombasa phone'])
+        self.assertEqual(self.names(district='Westlands'), ['Phone 0', 'Phone 1', 'Phone 2'])
+        self.assertEqual(self.names(location='nairobi'), ['Phone 0', 'Phone 1', 'Phone 2'])
+        self.assertEqual(self.names(location='mombasa/nyali'), ['Mombasa phone'])
+        self.assertEqual(self.names(city='Nairobi', district='Nyali'), [])
+        self.assertEqual(self.names(city='Nai'), [])
+
+    def test_nested_keys_fall_inside_their_ancestors_range(self):
+        nested = User.objects.create_user(username='parklands@example.com', email='parklands@example.com')
+        nested.profile.city, nested.profile.district, nested.profile.neighborhood = 'Nairobi', 'Westlands', 'Parklands'
+        nested.profile.save()
+        # 'nairobi-west/' sorts between 'nairobi/' and 'nairobi0' only if '-' and '/' are compared as ignorable
+        sibling = User.objects.create_user(username='west@example.com', email='west@example.com')
+        sibling.profile.city = 'Nairobi West'
+        sibling.profile.save()
+        for name, slug, vendor in (('Parklands phone', 'parklands-phone', nested),
+                                   ('Nairobi West phone', 'nairobi-west-phone', sibling)):
+            Product.objects.create(name=name, slug=slug, description='x', category=self.category,
+                                   vendor=vendor, price=Decimal('10.00'), stock_quantity=1)
+
+        self.assertEqual(Product.objects.get(vendor=nested).location_key, 'nairobi/westlands/parklands/')
+        self.assertEqual(self.names(location='nairobi'), ['Parklands phone', 'Phone 0', 'Phone 1', 'Phone 2'])
+        self.assertEqual(self.names(location='nairobi/westlands'),
+                         ['Parklands phone', 'Phone 0', 'Phone 1', 'Phone 2'])
+        self.assertEqual(self.names(location='nairobi/westlands/parklands'), ['Parklands phone'])
+        self.assertEqual(self.names(city='Nairobi West'), ['Nairobi West phone'])
+
+    def test_key_columns_compare_bytes(self):
+        expected = 'C' if connection.vendor == 'postgresql' else None
+        for field in (Product._meta.get_field('location_key'), Location._meta.get_field('key')):
+            self.assertEqual(field.db_collation, expected)
+
+    def test_filter_uses_the_product_location_key(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/all_products/', {'city': 'Nairobi'})
+        listing = next(query['sql'] for query in queries if 'location_key' in query['sql'])
+        self.assertNotIn('"authentication_userprofile"."city"', listing)
+
+    def test_vendor_move_relocates_their_products(self):
+        profile = User.objects.get(pk=self.vendor.pk).profile
+        profile.city = 'Kisumu'
+        profile.district = 'Milimani'
+        profile.save()
+        self.assertEqual(self.names(city='Kisumu'), ['Phone 0', 'Phone 1', 'Phone 2'])
+        self.assertEqual(self.names(city='Nairobi'), [])
+
+    def test_sync_locations_backfills_free_text_profiles(self):
+        UserProfile.objects.update(location=None)
+        Product.objects.update(location_key='')
+        call_command('sync_locations', stdout=io.StringIO())
+        self.assertEqual(
+            set(Product.objects.values_list('location_key', flat=True)), {'nairobi/westlands/', 'mombasa/nyali/'}
+        )
+        self.assertEqual(User.objects.get(pk=self.mombasa.pk).profile.location.key, 'mombasa/nyali/')
+
+
+class FacetTests(CatalogueTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        profile = cls.vendor.profile
+        profile.city, profile.district = 'Nairobi', 'Westlands'
+        profile.save()
+        cls.kitchen = Category.objects.create(name='Kitchen', slug='kitchen')
+        seller = User.objects.create_user(username='seller@example.com', email='seller@example.com')
+        seller.profile.role, seller.profile.city = 'vendor', 'Mombasa'
+        seller.profile.save()
+        for i, price in enumerate(['450.00', '3000.00', '150000.00']):
+            Product.objects.create(name=f'Sufuria {i}', slug=f'sufuria-{i}', description='Steel pot', category=cls.kitchen,
+                                   vendor=seller, price=Decimal(price), stock_quantity=2)
+        Product.objects.create(name='Hidden pot', slug='hidden-pot', description='x', category=cls.kitchen,
+                               vendor=seller, price=Decimal('10.00'), is_active=False)
+
+    def facets(self, query):
+        response = self.client.get(f'/api/all_products/?{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['facets']
+
+    def test_counts_follow_the_current_filters(self):
+        facets = self.facets('facets=all')
+        self.assertEqual([(row['slug'], row['count']) for row in facets['category']], [('kitchen', 3), ('smartphones', 3)])
+        self.assertEqual({row['name']: row['count'] for row in facets['city']}, {'Nairobi': 3, 'Mombasa': 3})
+        self.assertEqual({row['tier']: row['count'] for row in facets['tier']},
+                         {'featured': 3, 'premium': 0, 'basic': 0, 'free': 3})
+        prices = {row['min']: row['count'] for row in facets['price'] if row['count']}
+        self.assertEqual(prices, {0: 1, 1000: 3, 2500: 1, 100000: 1})
+
+        facets = self.facets('facets=category,city&city=mombasa&min_price=1000')
+        self.assertEqual(set(facets), {'category', 'city'})
+        self.assertEqual([(row['slug'], row['count']) for row in facets['category']], [('kitchen', 2)])
+        self.assertEqual(facets['city'], [{'name': 'Mombasa', 'location': 'mombasa', 'count': 2}])
+        self.assertEqual(self.facets('facets=category&search=sufuria')['category'][0]['count'], 3)
+
+    def test_bounded_queries_cached_per_filter_set(self):
+        def queries(query):
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(f'/api/all_products/?{query}')
+            return len(captured)
+
+        listing = queries('page_size=2')
+        self.assertLessEqual(queries('page_size=2&facets=all') - listing, 3)
+        # Another page or ordering of the same filters reuses the cached counts
+        self.assertEqual(queries('page_size=2&page=2&ordering=price&facets=all'), listing)
+
+        # A catalogue change invalidates them
+        Product.objects.get(slug='sufuria-0').delete()
+        self.assertEqual(self.facets('facets=tier')['tier'][-1], {'tier': 'free', 'count': 2})
+
+    def test_unknown_facet_is_rejected(self):
+        response = self.client.get('/api/all_products/?facets=colour')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('colour', response.json()['facets'])
+
+
+class ProductListingSerializerTests(CatalogueTestCase):
+    """The fast listing serializer must render byte-identical JSON to ProductSerializer"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        profile = cls.vendor.profile
+        profile.phone = '+254700000001'
+        profile.whatsapp = '+254700000002'
+        profile.business_name = 'Phone Hub'
+        profile.neighborhood = 'Westlands'
+        profile.city = 'Nairobi'
+        profile.save()
+
+        no_profile = User.objects.create_user(username='bare@example.com', email='bare@example.com')
+        no_profile.profile.delete()
+        Product.objects.create(
+            name='No profile vendor item', slug='no-profile', description='x', category=cls.category,
+            vendor=no_profile, price=Decimal('12.50'), stock_quantity=0, image='products/item.jpg',
+        )
+        Product.objects.create(
+            name='Vendorless item', slug='vendorless', description='y', category=cls.category,
+            price=Decimal('99999.99'), stock_quantity=3, is_active=False,
+        )
+        Product.objects.filter(slug='no-profile').update(image_variants={
+            'webp': {'160': 'products/variants/ab/ab-160w.webp', '320': 'products/variants/ab/ab-320w.webp'},
+            'jpeg': {'160': 'products/variants/ab/ab-160w.jpg', '320': 'products/variants/ab/ab-320w.jpg'},
+        })
+
+    def render_both(self, user=None):
+        request = Request(APIRequestFactory().get('/api/all_products/'))
+        request.user = user or AnonymousUser()
+        context = {'request': request}
+
+        queryset = Product.objects.order_by('id')
+        instances = queryset.select_related('category', 'vendor', 'vendor__profile')
+        expected = JSONRenderer().render(ProductSerializer(instances, many=True, context=context).data)
+        actual = JSONRenderer().render(ProductListingSerializer(listing_values(queryset), context=context).data)
+        return expected, actual
+
+    def test_identical_for_anonymous_users(self):
+        expected, actual = self.render_both()
+        self.assertEqual(actual, expected)
+        self.assertNotIn(b'+254700000001', actual)
+
+    def test_identical_for_authenticated_users(self):
+        expected, actual = self.render_both(self.vendor)
+        self.assertEqual(actual, expected)
+        self.assertIn(b'+254700000001', actual)
+        self.assertIn(b'ab-320w.webp 320w', actual)
+
+
+class CatalogueCacheTests(CatalogueTestCase):
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get('/api/featured/')
+        self.assertEqual(first['X-Cache'], 'MISS')
+
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/featured/')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(cache_stats()['hits'], 1)
+
+    def test_query_params_are_normalized(self):
+        self.client.get('/api/all_products/?min_price=1&max_price=5000')
+        response = self.client.get('/api/all_products/?max_price=5000&min_price=1')
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_auth_state_is_part_of_the_key(self):
+        self.vendor.profile.phone = '+254700000009'
+        self.vendor.profile.save()
+        anonymous = self.client.get('/api/featured/')
+
+        self.client.force_authenticate(self.vendor)
+        authenticated = self.client.get('/api/featured/')
+        self.assertEqual(authenticated['X-Cache'], 'MISS')
+        self.assertNotIn(b'+254700000009', anonymous.content)
+        self.assertIn(b'+254700000009', authenticated.content)
+
+    def test_etag_revalidation_returns_304(self):
+        etag = self.client.get('/api/categories/list/')['ETag']
+        response = self.client.get('/api/categories/list/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_none_match_is_parsed_not_searched(self):
+        etag = self.client.get('/api/categories/list/')['ETag']
+        for header, status in ((f'"other", {etag}', 304), (f'W/{etag}', 304), ('*', 304),
+                               ('"other"', 200), (etag[:-2] + '"', 200)):
+            with self.subTest(header=header):
+                response = self.client.get('/api/categories/list/', HTTP_IF_NONE_MATCH=header)
+                self.assertEqual(response.status_code, status)
+
+    def test_product_change_invalidates_listings(self):
+        self.client.get('/api/all_products/')
+        product = self.products[0]
+        product.name = 'Renamed phone'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+            # Not committed yet: a read now must not cache the old rows under a new generation
+            self.assertEqual(self.client.get('/api/all_products/')['X-Cache'], 'HIT')
+
+        response = self.client.get('/api/all_products/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('Renamed phone', [item['name'] for item in response.json()['results']])
+
+    def test_vendor_profile_change_invalidates_listings(self):
+        self.client.get('/api/featured/')
+        profile = User.objects.get(pk=self.vendor.pk).profile
+        profile.city = 'Mombasa'
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual(self.client.get('/api/featured/')['X-Cache'], 'MISS')
+
+    def test_admin_bulk_actions_invalidate_listings(self):
+        admin_user = User.objects.create_superuser('admin', 'admin@example.com', 'pass12345')
+        self.client.force_login(admin_user)
+        for action in ('mark_as_featured', 'mark_as_not_featured', 'mark_as_out_of_stock'):
+            with self.subTest(action=action):
+                self.client.get('/api/featured/')
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.post('/admin/products/product/', {
+                        'action': action, '_selected_action': [self.products[0].pk],
+                    })
+                self.assertEqual(self.client.get('/api/featured/')['X-Cache'], 'MISS')
+
+    def test_unrelated_profile_save_keeps_cache(self):
+        self.client.get('/api/featured/')
+        profile = User.objects.get(pk=self.vendor.pk).profile
+        profile.bio = 'Not shown on listings'
+        profile.save()
+        self.assertEqual(self.client.get('/api/featured/')['X-Cache'], 'HIT')
+
+
+
+class AsyncCatalogueViewTests(CatalogueTestCase):
+    """products.async_views answer like the DRF views they replace under ASGI"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.vendor.profile.city, cls.vendor.profile.district = 'Nairobi', 'Westlands'
+        cls.vendor.profile.save()
+
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+
+    def call_async(self, view, path, *args, **headers):
+        caches['default'].clear()
+        return async_to_sync(view)(self.factory.get(path, headers=headers), *args)
+
+    def assertSameResponse(self, view, path, *args):
+        expected = self.client.get(path)
+        response = self.call_async(view, path, *args)
+        self.assertEqual((response.status_code, response['X-Cache']), (200, 'MISS'))
+        self.assertEqual(json.loads(response.content), expected.json())
+
+    def test_listings_match_the_sync_views(self):
+        for query in ('', '?page=2&page_size=2', '?count=false&page_size=2', '?pagination=cursor&page_size=2',
+                      f'?category={self.category.id}&ordering=price', '?search=phone', '?facets=all&page_size=2',
+                      '?city=Nairobi', '?district=Westlands', '?location=nairobi/westlands'):
+            with self.subTest(query=query):
+                self.assertSameResponse(async_views.all_products, f'/api/all_products/{query}')
+        self.assertSameResponse(async_views.featured_products, '/api/featured/')
+        self.assertSameResponse(async_views.categories, '/api/categories/list/')
+
+    def test_cursor_links_walk_the_listing(self):
+        first = self.call_async(async_views.all_products, '/api/all_products/?pagination=cursor&page_size=2')
+        page = json.loads(first.content)
+        following = json.loads(self.call_async(async_views.all_products, page['next']).content)
+        self.assertEqual(len(page['results']) + len(following['results']), 3)
+        self.assertIsNone(following['next'])
+
+    def test_errors_match_the_sync_views(self):
+        response = self.call_async(async_views.all_products, '/api/all_products/?page=9')
+        self.assertEqual((response.status_code, json.loads(response.content)), (404, {'detail': 'Invalid page.'}))
+        response = self.call_async(async_views.product_by_slug, '/api/product/missing/', 'missing')
+        self.assertEqual(response.status_code, 404)
+        response = self.call_async(async_views.categories, '/api/categories/list/', Authorization='Bearer nope')
+        self.assertEqual(response.status_code, 401)
+
+    def test_bearer_token_shows_vendor_contact(self):
+        self.vendor.profile.phone = '+254700000009'
+        self.vendor.profile.save()
+        token = RefreshToken.for_user(self.vendor).access_token
+        response = self.call_async(async_views.featured_products, '/api/featured/', Authorization=f'Bearer {token}')
+        self.assertIn(b'+254700000009', response.content)
+        self.assertNotIn(b'+254700000009', self.call_async(async_views.featured_products, '/api/featured/').content)
+
+    def test_detail_records_the_view_without_waiting(self):
+        counter = ViewCounter(MemoryViewBuffer(), flush_interval=3600, max_pending=1000)
+        product = self.products[0]
+
+        async def view_product():
+            response = await async_views.product_by_id(self.factory.get(f'/api/products/{product.id}/'), product.id)
+            self.assertEqual(len(view_counts._background_views), 1)
+            await asyncio.gather(*view_counts._background_views)
+            return response
+
+        with mock.patch.object(view_counts, '_view_counter', counter):
+            response = async_to_sync(view_product)()
+        self.assertEqual(json.loads(response.content)['product']['view_count'], 1)
+        self.assertEqual(counter.buffer.drain(), {product.id: 1})
+
+
+def image_upload(width, height, color='red', name='photo.jpg'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), color).save(buffer, format='JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class ProductImageTests(CatalogueTestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PRODUCT_IMAGES={'WIDTHS': (160, 320, 640)})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, product, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            product.image = upload
+            product.save()
+        product.refresh_from_db()
+        return product
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.upload(self.products[0], image_upload(400, 300, name='a.jpg'))
+        second = self.upload(self.products[1], image_upload(400, 300, name='b.jpg'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^products/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$')
+        self.assertEqual(len(product_image_storage.listdir(Path(first.image.name).parent.as_posix())[1]), 1)
+
+    def test_variants_are_rendered_after_upload(self):
+        product = self.upload(self.products[0], image_upload(500, 250))
+
+        self.assertEqual(sorted(product.image_variants), ['jpeg', 'webp'])
+        self.assertEqual(sorted(product.image_variants['webp'], key=int), ['160', '320'])
+        with product_image_storage.open(product.image_variants['jpeg']['320']) as variant:
+            self.assertEqual(Image.open(variant).size, (320, 160))
+
+        data = ProductSerializer(product).data
+        self.assertTrue(data['thumbnail'].endswith('-320w.jpg'))
+        self.assertRegex(data['image_srcset']['webp'], r'-160w\.webp 160w, .*-320w\.webp 320w$')
+
+    def test_small_originals_get_one_variant_at_their_own_width(self):
+        product = self.upload(self.products[0], image_upload(100, 80))
+        self.assertEqual(list(product.image_variants['jpeg']), ['100'])
+
+    def test_replacing_the_image_replaces_the_variants(self):
+        product = self.upload(self.products[0], image_upload(400, 300, 'red'))
+        old = product.image_variants
+        with self.captureOnCommitCallbacks(execute=False):
+            product.image = image_upload(400, 300, 'blue')
+            product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants, {})
+        self.assertEqual(ProductSerializer(product).data['image_srcset'], None)
+
+        product = self.upload(product, image_upload(400, 300, 'blue'))
+        self.assertNotEqual(product.image_variants, old)
+
+    def test_bulk_regenerate_over_a_process_pool(self):
+        for product, color in zip(self.products[:3], ('red', 'green', 'blue')):
+            with self.captureOnCommitCallbacks(execute=False):
+                product.image = image_upload(700, 700, color)
+                product.save()
+        self.assertFalse(Product.objects.exclude(image_variants={}).exists())
+
+        call_command('regenerate_image_variants', '--missing', '--workers', '2', stdout=io.StringIO())
+        self.assertEqual(
+            [sorted(variants['jpeg'], key=int) for variants in Product.objects.filter(
+                id__in=[product.id for product in self.products[:3]]).values_list('image_variants', flat=True)],
+            [['160', '320', '640']] * 3,
+        )
+
+
+class ProductImporterTests(CatalogueTestCase):
+
+    def rows(self, *names, price='KSh 1,500'):
+        return [
+            {'Category': 'Home & Office', 'Name': name, 'Price': price,
+             'Product Details': f'{name} details', 'Specifications': 'Steel'}
+            for name in names
+        ]
+
+    def test_creates_then_updates_by_slug(self):
+        importer = ProductImporter(vendor=self.vendor, chunk_size=2)
+        stats = importer.import_rows(self.rows('Jiko Cooker', 'Steel Sufuria', 'Jiko Cooker'))
+        self.assertEqual((stats.created, stats.updated, stats.skipped), (2, 1, 0))
+
+        stats = importer.import_rows(self.rows('Jiko Cooker', price='KSh 2,000'))
+        self.assertEqual((stats.created, stats.updated), (0, 1))
+
+        product = Product.objects.get(slug='jiko-cooker')
+        self.assertEqual(product.price, Decimal('2000'))
+        self.assertEqual(product.tier_priority, 4)
+        self.assertEqual(product.category.active_product_count, 2)
+
+    def test_reimport_keeps_stock_unless_asked(self):
+        ProductImporter(category=self.category).import_rows(self.rows('Jiko Cooker'))
+        Product.objects.filter(slug='jiko-cooker').update(stock_quantity=0, in_stock=False)
+
+        ProductImporter(category=self.category).import_rows(self.rows('Jiko Cooker'))
+        product = Product.objects.get(slug='jiko-cooker')
+        self.assertEqual((product.stock_quantity, product.in_stock), (0, False))
+
+        ProductImporter(category=self.category, default_stock=3, update_stock=True).import_rows(self.rows('Jiko Cooker'))
+        product = Product.objects.get(slug='jiko-cooker')
+        self.assertEqual((product.stock_quantity, product.in_stock), (3, True))
+
+    def test_one_lookup_query_per_chunk(self):
+        importer = ProductImporter(category=self.category, chunk_size=50)
+        # lookup + insert + search index (delete, insert) + recount, all in one transaction
+        with self.assertNumQueries(7):
+            importer.import_rows(self.rows(*[f'Item {i}' for i in range(50)]))
+
+    def test_imported_products_are_searchable(self):
+        ProductImporter(category=self.category).import_rows(self.rows('Ramtons Pressure Cooker'))
+        response = self.client.get('/api/all_products/', {'search': 'pressure'})
+        self.assertEqual([p['name'] for p in response.json()['results']], ['Ramtons Pressure Cooker'])
+
+    def test_invalid_rows_are_skipped(self):
+        stats = ProductImporter(category=self.category).import_rows(
+            self.rows('Free thing', price='N/A') + self.rows('', price='KSh 10')
+        )
+        self.assertEqual((stats.created, stats.skipped), (0, 2))
+
+    def test_dry_run_writes_nothing(self):
+        stats = ProductImporter(dry_run=True).import_rows(self.rows('Dry Run Kettle'))
+        self.assertEqual(stats.created, 1)
+        self.assertFalse(Product.objects.filter(slug='dry-run-kettle').exists())
+        self.assertFalse(Category.objects.filter(name='Home & Office').exists())
+
+
+class CatalogueGeneratorTests(TestCase):
+
+    templates = [
+        Template('Phones & Tablets', 'Tecno Spark 20', 14999.0, 'Tecno Spark 20 details ' * 40),
+        Template('Home & Office', 'Ramtons Pressure Cooker', 6499.0, 'Pressure cooker details ' * 40),
+    ]
+
+    def generate(self, **options):
+        options = {'products': 120, 'vendors': 12, 'seed': 3, 'batch_size': 25, 'transaction_size': 50,
+                   'templates': self.templates, **options}
+        return CatalogueGenerator(**options).generate()
+
+    def test_bulk_rows_get_what_signals_would_have_done(self):
+        vendors, stats = self.generate()
+        self.assertEqual((stats.vendors, stats.products, stats.transactions), (12, 120, 3))
+        self.assertEqual(Product.objects.count(), 120)
+
+        for vendor in vendors:
+            limit = vendor.profile.product_limit
+            if limit is not None:
+                self.assertLessEqual(Product.objects.filter(vendor=vendor).count(), limit)
+        for product in Product.objects.select_related('vendor__profile'):
+            self.assertEqual(product.tier_priority, product.vendor.profile.tier_priority)
+            self.assertEqual(product.in_stock, product.stock_quantity > 0)
+        self.assertEqual(
+            sum(Category.objects.values_list('active_product_count', flat=True)),
+            Product.objects.filter(is_active=True).count(),
+        )
+        response = self.client.get('/api/all_products/', {'search': 'pressure'})
+        self.assertGreater(response.json()['count'], 0)
+
+    def test_same_seed_same_catalogue(self):
+        def snapshot():
+            return list(Product.objects.order_by('id').values_list('slug', 'price', 'description', 'vendor__email'))
+
+        self.generate()
+        first = snapshot()
+        Product.objects.all().delete()
+        User.objects.all().delete()
+        self.generate()
+        self.assertEqual(snapshot(), first)
+
+    def test_command_refuses_a_seed_that_was_already_generated(self):
+        from django.core.management import CommandError
+
+        self.generate(products=5, vendors=1)
+        with self.assertRaises(CommandError):
+            call_command('generate_catalogue', products=5, vendors=1, seed=3, stdout=io.StringIO())
+
+
+class SlugAllocatorTests(CatalogueTestCase):
+
+    def test_next_suffix_in_one_query(self):
+        for slug in ('phone', 'phone-7', 'phone-case'):
+            Product.objects.create(name=slug, slug=slug, category=self.category, price=Decimal('10.00'))
+        with self.assertNumQueries(1):
+            self.assertEqual(allocate_slug(Product, 'Phone'), 'phone-8')
+        self.assertEqual(allocate_slug(Product, 'Phone case'), 'phone-case-1')
+        self.assertEqual(allocate_slug(Product, 'Tablet'), 'tablet')
+
+    def test_excluded_row_keeps_its_slug(self):
+        product = self.products[0]
+        self.assertEqual(allocate_slug(Product, 'Phone 0', exclude_pk=product.pk), 'phone-0')
+        self.assertEqual(allocate_slug(Product, 'Phone 0'), 'phone-0-1')
+
+    def test_long_names_fit_the_column(self):
+        name = 'x' * 150
+        Category.objects.create(name='long', slug=allocate_slug(Category, name))
+        slug = allocate_slug(Category, name)
+        self.assertEqual(slug, 'x' * 89 + '-1')
+        self.assertLessEqual(len(slug), Category._meta.get_field('slug').max_length)
+
+    def test_retries_when_a_concurrent_writer_takes_the_slug(self):
+        allocated = []
+
+        def allocate_then_lose_race(*args, **kwargs):
+            slug = allocate_slug(*args, **kwargs)
+            if not allocated:
+                # Another request inserts the same slug between allocation and insert
+                Product.objects.create(name='Tecno Spark', slug=slug, category=self.category, price=Decimal('10.00'))
+            allocated.append(slug)
+            return slug
+
+        with mock.patch('products.slugs.allocate_slug', side_effect=allocate_then_lose_race):
+            product = save_with_unique_slug(Product, 'Tecno Spark', lambda slug: Product.objects.create(
+                name='Tecno Spark', slug=slug, category=self.category, price=Decimal('10.00'),
+            ))
+        self.assertEqual(allocated, ['tecno-spark', 'tecno-spark-1'])
+        self.assertEqual(product.slug, 'tecno-spark-1')
+
+    def test_unrelated_integrity_errors_are_not_retried(self):
+        def save(slug):
+            raise IntegrityError('NOT NULL constraint failed')
+
+        with self.assertRaises(IntegrityError):
+            save_with_unique_slug(Product, 'Anything', save)
+
+    def test_api_create_and_rename_use_allocator(self):
+        self.client.force_authenticate(self.vendor)
+        response = self.client.post('/api/products/', {
+            'name': 'Phone 1 Pro', 'description': 'x', 'price': '10.00', 'category_id': self.category.id,
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['slug'], 'phone-1-pro')
+
+        response = self.client.patch(f"/api/products/{self.products[2].id}/edit/", {'name': 'Phone 1 Pro!'})
+        self.assertEqual(response.json()['slug'], 'phone-1-pro-1')
+
+        response = self.client.post('/api/categories/', {'name': 'Smartphones!'})
+        self.assertEqual(response.json()['slug'], 'smartphones-1')
+
+
+class SlugAllocatorConcurrencyTests(TransactionTestCase):
+
+    def test_concurrent_creates_get_distinct_slugs(self):
+        category = Category.objects.create(name='Phones', slug='phones')
+
+        def create():
+            return save_with_unique_slug(Product, 'Samsung Galaxy A15', lambda slug: Product.objects.create(
+                name='Samsung Galaxy A15', slug=slug, category=category, price=Decimal('10.00'),
+            )).slug
+
+        slugs = race(*[create] * 4)
+        self.assertEqual(sorted(slugs, key=str), ['samsung-galaxy-a15', 'samsung-galaxy-a15-1',
+                                         'samsung-galaxy-a15-2', 'samsung-galaxy-a15-3'])
+
+
+class VendorProductLimitConcurrencyTests(TransactionTestCase):
+
+    def test_concurrent_creates_stop_at_the_limit(self):
+        vendor = User.objects.create_user(username='vendor@example.com', email='vendor@example.com', password='x')
+        UserProfile.objects.filter(user=vendor).update(role='vendor', vendor_tier='free')
+        category = Category.objects.create(name='Phones', slug='phones')
+        for i in range(8):
+            Product.objects.create(name=f'Phone {i}', slug=f'phone-{i}', category=category, vendor=vendor,
+                                   price=Decimal('10.00'))
+
+        def create(i):
+            client = APIClient()
+            client.force_authenticate(User.objects.get(pk=vendor.pk))
+            return client.post('/api/products/', {
+                'name': f'Tablet {i}', 'description': 'x', 'price': '10.00', 'category_id': category.id,
+            }, format='json').status_code
+
+        statuses = race(*[functools.partial(create, i) for i in range(6)])
+        self.assertEqual(sorted(statuses, key=str), [201, 201, 403, 403, 403, 403])
+        profile = UserProfile.objects.get(user=vendor)
+        self.assertEqual((Product.objects.filter(vendor=vendor).count(), profile.product_count), (10, 10))
@@ -1,17 +1,28 @@
 # products/urls.py - Updated for marketplace
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = 'products'
 
+# Public catalogue reads: async views under ASGI (settings.ASYNC_CATALOGUE_VIEWS)
+if settings.ASYNC_CATALOGUE_VIEWS:
+    all_products, featured_products = async_views.all_products, async_views.featured_products
+    product_by_id, product_by_slug = async_views.product_by_id, async_views.product_by_slug
+    categories = async_views.categories
+else:
+    all_products, featured_products = views.AllProductsView.as_view(), views.featured_products
+    product_by_id, product_by_slug = views.product_by_id, views.product_by_slug
+    categories = views.categories
+
 urlpatterns = [
     # Public product listing (tier-based ordering)
-    path('all_products/', views.AllProductsView.as_view(), name='all_products'),
-    path('featured/', views.featured_products, name='featured_products'),
+    path('all_products/', all_products, name='all_products'),
+    path('featured/', featured_products, name='featured_products'),
 
     # Product detail endpoints (public read, increments view count)
-    path('products/<int:id>/', views.product_by_id, name='product_detail_by_id'),
-    path('product/<slug:slug>/', views.product_by_slug, name='product_detail_by_slug'),
+    path('products/<int:id>/', product_by_id, name='product_detail_by_id'),
+    path('product/<slug:slug>/', product_by_slug, name='product_detail_by_slug'),
 
     # Contact reveal endpoint (authenticated only, increments contact_reveal_count)
     path('products/<int:product_id>/reveal-contact/', views.reveal_contact, name='reveal-contact'),
@@ -27,5 +38,5 @@ urlpatterns = [
     # Category endpoints
     path('categories/', views.CategoryListCreateView.as_view(), name='category-list-create'),
     path('categories/<int:id>/', views.CategoryDetailView.as_view(), name='category-detail'),
-    path('categories/list/', views.categories, name='categories-list'),
-]
\ No newline at end of file
+    path('categories/list/', categories, name='categories-list'),
+]
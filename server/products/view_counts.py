@@ -0,0 +1,233 @@
+# products/view_counts.py - Buffered product view counting
+"""
+Product detail views used to run SELECT + UPDATE view_count + refresh_from_db
+on every read, taking a write lock on the product row for each page view.
+
+Views are now recorded into a buffer and merged into the database in periodic
+batched flushes (one UPDATE per flush window, whatever the number of products).
+
+Two buffers are available, chosen with settings.VIEW_COUNTER['BACKEND']:
+- 'memory': per-process dict, flushed on the flush interval and at exit
+            (flush_view_counts refuses to run: its own buffer is always empty)
+- 'file':   local append-only log shared by every worker on the host, so
+            `python manage.py flush_view_counts` can drain it from outside
+"""
+import asyncio
+import atexit
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+
+from .signals import product_views_flushed
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BACKEND': 'memory',
+    'PATH': None,
+    'FLUSH_INTERVAL': 5.0,   # seconds between flushes
+    'MAX_PENDING': 1000,     # flush early once this many views are buffered
+}
+
+
+class MemoryViewBuffer:
+    """Per-process buffer of pending view increments"""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def add(self, product_id, amount=1):
+        with self._lock:
+            self._counts[product_id] += amount
+
+    def drain(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return counts
+
+
+class FileViewBuffer:
+    """
+    Append-only log of product ids shared between processes on one host.
+
+    Writers append one line per view under an exclusive flock. The drainer
+    renames the log away, waits for in-flight writers on the old file, then
+    reads it; writers that lose the race notice the inode changed and retry
+    against the fresh log, so no increment is lost.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def add(self, product_id, amount=1):
+        import fcntl
+
+        line = f"{product_id}\n" * amount
+        while True:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    current = os.stat(self.path)
+                except FileNotFoundError:
+                    current = None
+                if current is not None and current.st_ino == os.fstat(fd).st_ino:
+                    os.write(fd, line.encode())
+                    return
+            finally:
+                os.close(fd)
+
+    def drain(self):
+        import fcntl
+
+        draining = f"{self.path}.{os.getpid()}.flushing"
+        try:
+            os.replace(self.path, draining)
+        except FileNotFoundError:
+            return Counter()
+
+        with open(draining, 'r') as log:
+            fcntl.flock(log.fileno(), fcntl.LOCK_EX)
+            counts = Counter(int(line) for line in log if line.strip())
+        os.remove(draining)
+        return counts
+
+
+def apply_view_counts(counts):
+    """
+    Merge {product_id: increment} into Product.view_count with a single UPDATE.
+    Returns the number of product rows updated.
+    """
+    from .models import Product
+
+    counts = {pk: n for pk, n in counts.items() if n}
+    if not counts:
+        return 0
+
+    increment = Case(
+        *[When(id=pk, then=Value(n)) for pk, n in counts.items()],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    return Product.objects.filter(id__in=counts.keys()).update(view_count=F('view_count') + increment)
+
+
+class ViewCounter:
+    """Records product views and flushes them to the database in batches"""
+
+    def __init__(self, buffer, flush_interval=DEFAULTS['FLUSH_INTERVAL'], max_pending=DEFAULTS['MAX_PENDING']):
+        self.buffer = buffer
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, product_id):
+        """Buffer one view of product_id, flushing if the window has elapsed"""
+        self.buffer.add(product_id)
+
+        with self._lock:
+            self._pending += 1
+            due = (
+                self._pending >= self.max_pending
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered views to the database. Returns rows updated."""
+        with self._lock:
+            self._pending = 0
+            self._last_flush = time.monotonic()
+
+        counts = self.buffer.drain()
+        if not counts:
+            return 0
+        try:
+            with transaction.atomic():
+                updated = apply_view_counts(counts)
+                # Daily analytics buckets commit or roll back with the counters
+                product_views_flushed.send(sender=ViewCounter, counts=counts)
+            return updated
+        except Exception:
+            # Put the views back so the next flush can retry them
+            for product_id, amount in counts.items():
+                self.buffer.add(product_id, amount)
+            logger.exception("Failed to flush %d buffered product views", sum(counts.values()))
+            return 0
+
+
+def build_view_counter():
+    """Create a ViewCounter from settings.VIEW_COUNTER"""
+    config = {**DEFAULTS, **getattr(settings, 'VIEW_COUNTER', {})}
+
+    if config['BACKEND'] == 'file':
+        path = config['PATH'] or os.path.join(settings.BASE_DIR, 'var', 'view_counts.log')
+        buffer = FileViewBuffer(path)
+    elif config['BACKEND'] == 'memory':
+        buffer = MemoryViewBuffer()
+    else:
+        raise ValueError(f"Unknown VIEW_COUNTER backend: {config['BACKEND']}")
+
+    return ViewCounter(buffer, flush_interval=config['FLUSH_INTERVAL'], max_pending=config['MAX_PENDING'])
+
+
+_view_counter = None
+_view_counter_lock = threading.Lock()
+
+
+def get_view_counter():
+    """Return the process-wide ViewCounter, creating it on first use"""
+    global _view_counter
+    if _view_counter is None:
+        with _view_counter_lock:
+            if _view_counter is None:
+                _view_counter = build_view_counter()
+                atexit.register(_flush_at_exit)
+    return _view_counter
+
+
+def _flush_at_exit():
+    if _view_counter is not None:
+        _view_counter.flush()
+
+
+def record_view(product):
+    """
+    Record a view of product and bump the in-memory instance so the response
+    reflects this view without re-reading the row.
+    """
+    get_view_counter().record(product.id)
+    product.view_count += 1
+
+
+_background_views = set()
+
+
+def record_view_later(product):
+    """
+    record_view for async views: bumps the instance now and records the view
+    in a background task the response doesn't wait for. The task runs in a
+    fresh context, outside the request's database routing and thread.
+    """
+    product.view_count += 1
+    task = asyncio.get_running_loop().create_task(
+        sync_to_async(get_view_counter().record)(product.id), context=contextvars.Context(),
+    )
+    # The loop only keeps weak references to tasks
+    _background_views.add(task)
+    task.add_done_callback(_background_views.discard)
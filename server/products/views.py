@@ -5,26 +5,65 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
-from django.utils.text import slugify
-from django.db.models import Sum, F, Q, Case, When, Value, IntegerField
+from django.db import transaction
+from django.db.models import Sum, F, Q
+from analytics.rollup import activity_windows
 from .models import Product, Category
-from .serializers import ProductSerializer, CategorySerializer, VendorStatsSerializer
+from .cache import cache_catalogue_response, PRODUCTS, CATEGORIES
+from .facets import cached_facet_counts, requested_facets
+from .filters import ProductSearchFilter, filter_by_location
+from .limits import ProductLimitReached, claim_product_slot
+from .pagination import ProductListPagination
+from .slugs import save_with_unique_slug
+from .signals import product_contact_revealed
+from .serializers import (
+    ProductSerializer, CategorySerializer, VendorStatsSerializer, ProductListingSerializer, listing_values,
+)
+from .view_counts import record_view
+
+
+class ProductListingMixin:
+    """Serve GET lists through ProductListingSerializer's .values() fast path"""
+
+    def list(self, request, *args, **kwargs):
+        queryset = listing_values(self.filter_queryset(self.get_queryset()))
+        context = self.get_serializer_context()
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(ProductListingSerializer(page, context=context).data)
+        return Response(ProductListingSerializer(queryset, context=context).data)
 
 
 # Public product listing with tier-based ordering
-class AllProductsView(generics.ListAPIView):
+class AllProductsView(ProductListingMixin, generics.ListAPIView):
     """
     API endpoint that returns all products with filtering, searching, and tier-based ordering.
     Products are ordered by vendor tier (featured -> premium -> basic -> free) then by date.
+    Supports ?pagination=cursor for keyset paging and ?count=false to skip the total count.
+    ?facets=category,price,tier,city (or all) adds facet counts for the current filters.
     """
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = ProductListPagination
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
 
     filterset_fields = ['category', 'in_stock', 'featured', 'is_active']
     search_fields = ['name', 'description', 'category__name']
     ordering_fields = ['price', 'created_at', 'name']
 
+    @cache_catalogue_response(PRODUCTS, CATEGORIES)
+    def list(self, request, *args, **kwargs):
+        facets = requested_facets(request.query_params)
+        response = super().list(request, *args, **kwargs)
+        if facets:
+            response.data['facets'] = self.get_facets(facets)
+        return response
+
+    def get_facets(self, names):
+        queryset = self.filter_queryset(self.get_queryset())
+        return cached_facet_counts(self.request.query_params, names, queryset)
+
     def get_queryset(self):
         queryset = Product.objects.select_related('category', 'vendor', 'vendor__profile').filter(is_active=True)
 
@@ -42,44 +81,35 @@ class AllProductsView(generics.ListAPIView):
         if max_price:
             queryset = queryset.filter(price__lte=max_price)
 
-        # Filter by location
-        city = self.request.query_params.get('city', None)
-        district = self.request.query_params.get('district', None)
-
-        if city:
-            queryset = queryset.filter(vendor__profile__city__icontains=city)
-        if district:
-            queryset = queryset.filter(vendor__profile__district__icontains=district)
+        # Filter by location (see filters.filter_by_location)
+        queryset = filter_by_location(
+            queryset,
+            city=self.request.query_params.get('city'),
+            district=self.request.query_params.get('district'),
+            location=self.request.query_params.get('location'),
+        )
 
         # Filter by vendor_id
         vendor_id = self.request.query_params.get('vendor_id', None)
         if vendor_id:
             queryset = queryset.filter(vendor_id=vendor_id)
 
-        # Order by vendor tier (higher tiers appear first)
-        queryset = queryset.annotate(
-            tier_priority=Case(
-                When(vendor__profile__vendor_tier='featured', then=Value(4)),
-                When(vendor__profile__vendor_tier='premium', then=Value(3)),
-                When(vendor__profile__vendor_tier='basic', then=Value(2)),
-                When(vendor__profile__vendor_tier='free', then=Value(1)),
-                default=Value(0),
-                output_field=IntegerField(),
-            )
-        ).order_by('-tier_priority', '-created_at')
+        # Order by vendor tier (higher tiers appear first). tier_priority is a
+        # denormalized column so this ordering can be served by an index seek.
+        queryset = queryset.order_by('-tier_priority', '-created_at', '-id')
 
         return queryset
 
 
 # Product CRUD for vendors
-class ProductListCreateView(generics.ListCreateAPIView):
+class ProductListCreateView(ProductListingMixin, generics.ListCreateAPIView):
     """
     List products or create new product (for vendors)
     GET: List all products
     POST: Create new product (vendors only) with tier limit enforcement
     """
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
     filterset_fields = ['category', 'in_stock', 'featured', 'is_active']
     search_fields = ['name', 'description', 'category__name']
     ordering_fields = ['price', 'created_at', 'name']
@@ -110,22 +140,28 @@ class ProductListCreateView(generics.ListCreateAPIView):
                 'error': 'Only vendors and admins can create products'
             }, status=status.HTTP_403_FORBIDDEN)
 
-        # Check product limit for vendors (admins have no limit)
-        if user.role == 'vendor':
-            profile = user.profile
-            product_limit = profile.product_limit
-            current_count = Product.objects.filter(vendor=user).count()
-
-            # Enforce limit (None means unlimited for featured tier)
-            if product_limit is not None and current_count >= product_limit:
-                return Response({
-                    'error': f'You have reached your product limit ({product_limit} products for {profile.vendor_tier} tier). Please upgrade your subscription to add more products.',
-                    'current_count': current_count,
-                    'limit': product_limit,
-                    'tier': profile.vendor_tier
-                }, status=status.HTTP_403_FORBIDDEN)
-
-        return super().create(request, *args, **kwargs)
+        # Admins have no limit
+        if user.role != 'vendor':
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(data=request.data)
+        try:
+            # The claimed slot stays locked until the product (and its count) is committed
+            with transaction.atomic():
+                claim_product_slot(user.profile)
+                serializer.is_valid(raise_exception=True)
+                self.perform_create(serializer)
+        except ProductLimitReached as exc:
+            profile = exc.profile
+            profile.refresh_from_db(fields=['product_count'])
+            return Response({
+                'error': f'You have reached your product limit ({profile.product_limit} products for {profile.vendor_tier} tier). Please upgrade your subscription to add more products.',
+                'current_count': profile.product_count,
+                'limit': profile.product_limit,
+                'tier': profile.vendor_tier
+            }, status=status.HTTP_403_FORBIDDEN)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     def perform_create(self, serializer):
         """Set the vendor to the current user when creating a product"""
@@ -162,9 +198,8 @@ class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
         """Increment view count when product is viewed"""
         instance = self.get_object()
 
-        # Increment view count
-        Product.objects.filter(id=instance.id).update(view_count=F('view_count') + 1)
-        instance.refresh_from_db()
+        # Buffer the view; it is written in the next batched flush
+        record_view(instance)
 
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
@@ -185,20 +220,19 @@ class CategoryListCreateView(generics.ListCreateAPIView):
             return [AllowAny()]
         return [IsAuthenticated()]
 
+    @cache_catalogue_response(CATEGORIES)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """Auto-generate slug if not provided"""
         name = serializer.validated_data.get('name')
         slug = serializer.validated_data.get('slug')
 
-        if not slug:
-            base_slug = slugify(name)
-            slug = base_slug
-            counter = 1
-            while Category.objects.filter(slug=slug).exists():
-                slug = f"{base_slug}-{counter}"
-                counter += 1
-
-        serializer.save(slug=slug)
+        if slug:
+            serializer.save()
+        else:
+            save_with_unique_slug(Category, name, lambda slug: serializer.save(slug=slug))
 
 
 class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
@@ -220,14 +254,15 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
 # Simple function-based views
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@cache_catalogue_response(PRODUCTS, CATEGORIES)
 def featured_products(request):
     """API endpoint that returns only featured products (Featured tier vendors)"""
-    products = Product.objects.select_related('category', 'vendor', 'vendor__profile').filter(
+    products = listing_values(Product.objects.filter(
         is_active=True,
         vendor__profile__vendor_tier='featured'
-    ).order_by('-created_at')[:20]
+    ).order_by('-created_at'))[:20]
 
-    serializer = ProductSerializer(products, many=True, context={'request': request})
+    serializer = ProductListingSerializer(products, context={'request': request})
 
     return Response({
         'success': True,
@@ -246,9 +281,8 @@ def product_by_id(request, id):
     try:
         product = Product.objects.select_related('category', 'vendor', 'vendor__profile').get(id=id, is_active=True)
 
-        # Increment view count
-        Product.objects.filter(id=product.id).update(view_count=F('view_count') + 1)
-        product.refresh_from_db()
+        # Buffer the view; it is written in the next batched flush
+        record_view(product)
 
         serializer = ProductSerializer(product, context={'request': request})
         return Response({
@@ -272,9 +306,8 @@ def product_by_slug(request, slug):
     try:
         product = Product.objects.select_related('category', 'vendor', 'vendor__profile').get(slug=slug, is_active=True)
 
-        # Increment view count
-        Product.objects.filter(id=product.id).update(view_count=F('view_count') + 1)
-        product.refresh_from_db()
+        # Buffer the view; it is written in the next batched flush
+        record_view(product)
 
         serializer = ProductSerializer(product, context={'request': request})
         return Response({
@@ -299,8 +332,9 @@ def reveal_contact(request, product_id):
         product = Product.objects.select_related('vendor', 'vendor__profile').get(id=product_id, is_active=True)
 
         # Increment contact reveal count
-        Product.objects.filter(id=product.id).update(contact_reveal_count=F('contact_reveal_count') + 1)
-        product.refresh_from_db()
+        with transaction.atomic():
+            Product.objects.filter(id=product.id).update(contact_reveal_count=F('contact_reveal_count') + 1)
+            product_contact_revealed.send(sender=Product, product=product)
 
         # Return vendor contact information
         vendor_profile = product.vendor.profile
@@ -324,6 +358,7 @@ def reveal_contact(request, product_id):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@cache_catalogue_response(CATEGORIES)
 def categories(request):
     """API endpoint that returns all categories."""
     categories = Category.objects.all()
@@ -346,8 +381,8 @@ def vendor_products(request):
             'error': 'Only vendors can access this endpoint'
         }, status=403)
 
-    products = Product.objects.select_related('category').filter(vendor=request.user)
-    serializer = ProductSerializer(products, many=True, context={'request': request})
+    products = Product.objects.filter(vendor=request.user)
+    serializer = ProductListingSerializer(listing_values(products), context={'request': request})
 
     return Response({
         'success': True,
@@ -368,10 +403,10 @@ def vendor_stats(request):
     user = request.user
     profile = user.profile
 
-    # Calculate stats
+    # Calculate stats; product counts are kept on the profile (products/limits.py)
     products = Product.objects.filter(vendor=user)
-    total_products = products.count()
-    active_products = products.filter(is_active=True).count()
+    total_products = profile.product_count
+    active_products = profile.active_product_count
 
     # Sum of all views and contact reveals
     stats = products.aggregate(
@@ -379,6 +414,9 @@ def vendor_stats(request):
         total_contacts=Sum('contact_reveal_count')
     )
 
+    # Views and contact reveals over the last 7/30/90 days
+    activity = activity_windows(vendor=user)
+
     # Product limit info
     product_limit = profile.product_limit
     products_remaining = None if product_limit is None else max(0, product_limit - total_products)
@@ -388,6 +426,8 @@ def vendor_stats(request):
         'active_products': active_products,
         'total_views': stats['total_views'] or 0,
         'total_contacts': stats['total_contacts'] or 0,
+        **{f'views_last_{days}_days': window['views'] for days, window in activity.items()},
+        **{f'contacts_last_{days}_days': window['reveals'] for days, window in activity.items()},
         'vendor_tier': profile.vendor_tier,
         'product_limit': product_limit,
         'products_remaining': products_remaining,
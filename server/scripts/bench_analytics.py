@@ -0,0 +1,94 @@
+"""
+Benchmark analytics rollup ingest and windowed queries.
+
+Ingest: the same synthetic stream of product views written one event at a
+time (an upsert per view) against ViewCounter-style batches merged with
+rollup.record_events (one INSERT ... SELECT per flush). Queries: 7/30/90
+day windows over 90 days of daily buckets, overall and per vendor.
+
+Run with: python manage.py runscript bench_analytics --script-args 200000 5000
+(events, products). All database work is rolled back at the end.
+"""
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from analytics import rollup
+from analytics.models import DailyProductActivity
+from products.models import Category, Product
+
+FLUSH_EVENTS = 1000   # views buffered per ViewCounter flush (VIEW_COUNTER['MAX_PENDING'])
+PER_EVENT_SAMPLE = 5000
+
+
+def make_products(count):
+    vendors = [User.objects.create_user(username=f'bench-analytics-{i}') for i in range(20)]
+    category = Category.objects.create(name='Bench analytics', slug='bench-analytics')
+    Product.objects.bulk_create([
+        Product(name=f'Bench product {i}', slug=f'bench-analytics-{i}', category=category,
+                vendor=vendors[i % len(vendors)], price=Decimal('10.00'), stock_quantity=1)
+        for i in range(count)
+    ], batch_size=2000)
+    return list(Product.objects.filter(category=category).values_list('id', flat=True)), vendors
+
+
+def zipf_stream(product_ids, events, seed=3):
+    """Popular products get most of the views, as on the real catalogue"""
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(product_ids))]
+    return rng.choices(product_ids, weights=weights, k=events)
+
+
+def median_ms(func, repeat=7):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run(*args):
+    events = int(args[0]) if args else 200000
+    products = int(args[1]) if len(args) > 1 else 5000
+
+    with transaction.atomic():
+        product_ids, vendors = make_products(products)
+        stream = zipf_stream(product_ids, events)
+
+        sample = stream[:PER_EVENT_SAMPLE]
+        started = time.perf_counter()
+        for product_id in sample:
+            rollup.record_events(views={product_id: 1})
+        per_event = len(sample) / (time.perf_counter() - started)
+
+        started = time.perf_counter()
+        for start in range(0, events, FLUSH_EVENTS):
+            rollup.record_events(views=Counter(stream[start:start + FLUSH_EVENTS]))
+        batched = events / (time.perf_counter() - started)
+
+        print(f'Ingest of {events} views over {products} products')
+        print(f'  upsert per view:                {per_event:12.0f} views/sec (first {len(sample)})')
+        print(f'  batched per {FLUSH_EVENTS}-view flush:     {batched:12.0f} views/sec')
+
+        today = timezone.localdate()
+        daily = Counter(stream[:products * 2])
+        for days_ago in range(1, 90):
+            rollup.record_events(views=daily, reveals={pk: 1 for pk in list(daily)[:100]},
+                                 day=today - timedelta(days=days_ago))
+        buckets = DailyProductActivity.objects.count()
+
+        print(f'Windowed queries over {buckets} daily buckets (median ms)')
+        print(f'  7/30/90-day totals:             {median_ms(rollup.activity_windows):8.2f}')
+        print(f'  7/30/90-day totals, one vendor: {median_ms(lambda: rollup.activity_windows(vendor=vendors[0])):8.2f}')
+        print(f'  top categories, 30 days:        {median_ms(lambda: rollup.activity_by("category")):8.2f}')
+        print(f'  top vendors, 30 days:           {median_ms(lambda: rollup.activity_by("vendor")):8.2f}')
+
+        transaction.set_rollback(True)
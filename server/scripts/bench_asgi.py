@@ -0,0 +1,162 @@
+"""
+Benchmark the public catalogue reads under gunicorn (sync workers, DRF
+views) against uvicorn (ASGI, products.async_views).
+
+Each server is started on a free local port against the configured
+database, then driven by an asyncio HTTP/1.1 client holding N concurrent
+keep-alive connections for a fixed time. The request mix is product
+detail by id and slug (database reads plus a view count), listing pages,
+featured products and categories (mostly catalogue-cache hits). Reports
+requests/sec, p50/p99 latency and errors per server and concurrency.
+
+Run with: python manage.py runscript bench_asgi --script-args 10 1 50 200 1000
+(seconds per run, worker processes per server, then concurrency levels)
+against a seeded database. Servers inherit DJANGO_SETTINGS_MODULE.
+"""
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+from products.models import Product
+
+REQUEST_TIMEOUT = 30
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_commands(workers, port):
+    bind = ['127.0.0.1', str(port)]
+    return {
+        'gunicorn (sync)': [
+            sys.executable, '-m', 'gunicorn', 'server.wsgi:application', '--workers', str(workers),
+            '--bind', ':'.join(bind), '--backlog', '2048', '--log-level', 'warning',
+        ],
+        'uvicorn (ASGI)': [
+            sys.executable, '-m', 'uvicorn', 'server.asgi:application', '--workers', str(workers),
+            '--host', bind[0], '--port', bind[1], '--backlog', '2048', '--log-level', 'warning', '--no-access-log',
+        ],
+    }
+
+
+def request_paths():
+    products = list(Product.objects.filter(is_active=True).values_list('id', 'slug'))
+    paths = []
+    for product_id, slug in products:
+        paths += [f'/api/products/{product_id}/', f'/api/product/{slug}/']
+    pages = max(1, len(products) // 20)
+    paths += [f'/api/all_products/?page={page}' for page in range(1, pages + 1)] * max(1, len(products) // (2 * pages))
+    paths += ['/api/featured/', '/api/categories/list/'] * max(1, len(products) // 4)
+    random.Random(0).shuffle(paths)
+    return paths
+
+
+async def get(reader, writer, path):
+    """One GET over an open connection; returns (status, keep_alive)"""
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nConnection: keep-alive\r\n\r\n'.encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip().lower()
+    if 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+        return status, headers.get('connection') != 'close'
+    await reader.read()
+    return status, False
+
+
+async def client(port, paths, offset, deadline, latencies, errors):
+    connection = None
+    index = offset
+    while time.monotonic() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection('127.0.0.1', port)
+            status, keep_alive = await asyncio.wait_for(get(*connection, path), REQUEST_TIMEOUT)
+        except (OSError, ValueError, IndexError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            errors.append(path)
+            keep_alive, status = False, None
+        else:
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(path)
+        if not keep_alive and connection is not None:
+            connection[1].close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+async def load(port, paths, concurrency, seconds):
+    latencies, errors = [], []
+    started = time.monotonic()
+    await asyncio.gather(*[
+        client(port, paths, i * 7, started + seconds, latencies, errors) for i in range(concurrency)
+    ])
+    return latencies, errors, time.monotonic() - started
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000 if values else float('nan')
+
+
+def wait_until_ready(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'server exited with {process.returncode}')
+        try:
+            asyncio.run(asyncio.wait_for(_probe(port), 2))
+            return
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+async def _probe(port):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        await get(reader, writer, '/api/categories/list/')
+    finally:
+        writer.close()
+
+
+def run(*args):
+    seconds = int(args[0]) if args else 10
+    workers = int(args[1]) if len(args) > 1 else 1
+    levels = [int(arg) for arg in args[2:]] or [50, 200, 1000]
+
+    paths = request_paths()
+    print(f'{len(paths)} paths in the mix, {seconds}s per run, {workers} worker process(es) per server, '
+          f'DEBUG={settings.DEBUG}, database {settings.DATABASES["default"]["NAME"]}')
+    print(f'{"server":16s} {"conns":>6s} {"req/s":>8s} {"p50 ms":>8s} {"p99 ms":>9s} {"errors":>7s}')
+
+    for name, command in server_commands(workers, 0).items():
+        for concurrency in levels:
+            port = free_port()
+            command = server_commands(workers, port)[name]
+            process = subprocess.Popen(command, cwd=settings.BASE_DIR, env=os.environ.copy())
+            try:
+                wait_until_ready(port, process)
+                asyncio.run(load(port, paths, 10, 1))  # warm up caches and connections
+                latencies, errors, elapsed = asyncio.run(load(port, paths, concurrency, seconds))
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+            latencies.sort()
+            print(f'{name:16s} {concurrency:6d} {len(latencies) / elapsed:8.0f} {percentile(latencies, 0.5):8.1f} '
+                  f'{percentile(latencies, 0.99):9.1f} {len(errors):7d}')
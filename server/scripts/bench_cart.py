@@ -0,0 +1,79 @@
+"""
+Benchmark cart rendering as the cart grows.
+
+GET /api/cart/ for carts of increasing size, against a per-line baseline
+that loads each product on its own (what a nested serializer over cart
+lines would do). Reports queries per request and median ms.
+
+Run with: python manage.py runscript bench_cart --script-args 1 10 50 200
+(cart sizes). Uses the configured cart store; all database work is rolled
+back at the end.
+"""
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from rest_framework.test import APIClient
+
+from cart.service import Cart
+from cart.storage import get_cart_store
+from products.models import Category, Product
+
+
+def per_line(owner):
+    """Baseline: one product query per cart line"""
+    lines = []
+    for product_id, quantity in get_cart_store().get(owner).items():
+        product = Product.objects.select_related('vendor__profile').get(id=product_id)
+        lines.append((product.price * quantity, product.is_available, product.vendor.profile.business_name))
+    return lines
+
+
+def measure(func, repeat=15):
+    # execute_wrapper rather than CaptureQueriesContext: test client
+    # requests reset connection.queries on request_started
+    queries = []
+    with connection.execute_wrapper(lambda execute, sql, *rest: queries.append(sql) or execute(sql, *rest)):
+        func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return len(queries), statistics.median(timings)
+
+
+def run(*args):
+    sizes = [int(arg) for arg in args] or [1, 10, 50, 200]
+
+    with transaction.atomic():
+        vendor = User.objects.create_user(username='bench-cart-vendor')
+        buyer = User.objects.create_user(username='bench-cart-buyer')
+        category = Category.objects.create(name='Bench cart', slug='bench-cart')
+        Product.objects.bulk_create([
+            Product(name=f'Bench product {i}', slug=f'bench-cart-{i}', category=category, vendor=vendor,
+                    price=Decimal('10.00'), stock_quantity=100)
+            for i in range(max(sizes))
+        ])
+        product_ids = list(Product.objects.filter(category=category).values_list('id', flat=True))
+
+        client = APIClient(SERVER_NAME='localhost')
+        client.force_authenticate(buyer)
+        owner = f'user:{buyer.id}'
+        store = get_cart_store()
+
+        print(f'{"lines":>6} {"GET queries":>12} {"GET ms":>8} {"per-line queries":>17} {"per-line ms":>12}')
+        for size in sizes:
+            store.clear(owner)
+            for product_id in product_ids[:size]:
+                store.add(owner, product_id, 1)
+            assert len(Cart(owner).summary()['items']) == size
+
+            get_queries, get_ms = measure(lambda: client.get('/api/cart/'))
+            line_queries, line_ms = measure(lambda: per_line(owner))
+            print(f'{size:>6} {get_queries:>12} {get_ms:>8.2f} {line_queries:>17} {line_ms:>12.2f}')
+
+        store.clear(owner)
+        transaction.set_rollback(True)
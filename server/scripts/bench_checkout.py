@@ -0,0 +1,119 @@
+"""
+Stress test checkout: many threads checking out carts that compete for a
+few hot products, then check that nothing was oversold.
+
+Every buyer's cart holds 1-3 units of 1-3 of the hot products, so the total
+demand exceeds the stock and most late checkouts must be refused. At the end
+the units ordered per product must equal the stock that product lost, and no
+stock may go negative.
+
+Run with: python manage.py runscript bench_checkout --script-args 8 400 4 100
+(threads, checkouts, hot products, stock per product). Works on SQLite and
+PostgreSQL; threads need committed data, so the rows it creates are deleted
+at the end instead of rolled back.
+"""
+import random
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Sum
+
+from cart.service import Cart
+from cart.storage import DatabaseCartStore
+from orders.checkout import CheckoutError, place_order
+from orders.models import Order, OrderItem
+from products.models import Category, Product
+
+PREFIX = 'bench-checkout'
+
+
+def setup(checkouts, hot_products, stock, seed=7):
+    vendor = User.objects.create_user(username=f'{PREFIX}-vendor')
+    category = Category.objects.create(name='Bench checkout', slug=PREFIX)
+    products = [
+        Product.objects.create(name=f'Hot product {i}', slug=f'{PREFIX}-{i}', category=category, vendor=vendor,
+                               price=Decimal('10.00'), stock_quantity=stock)
+        for i in range(hot_products)
+    ]
+    User.objects.bulk_create([User(username=f'{PREFIX}-buyer-{i}') for i in range(checkouts)])
+    buyers = list(User.objects.filter(username__startswith=f'{PREFIX}-buyer-'))
+
+    rng = random.Random(seed)
+    store = DatabaseCartStore()
+    for buyer in buyers:
+        for product in rng.sample(products, rng.randint(1, min(3, len(products)))):
+            store.add(f'user:{buyer.id}', product.id, rng.randint(1, 3))
+    return products, buyers, store
+
+
+def cleanup():
+    Order.objects.filter(customer__username__startswith=PREFIX).delete()
+    Product.objects.filter(slug__startswith=PREFIX).delete()
+    Category.objects.filter(slug=PREFIX).delete()
+    User.objects.filter(username__startswith=PREFIX).delete()
+
+
+def run(*args):
+    threads = int(args[0]) if args else 8
+    checkouts = int(args[1]) if len(args) > 1 else 400
+    hot_products = int(args[2]) if len(args) > 2 else 4
+    stock = int(args[3]) if len(args) > 3 else 100
+
+    cleanup()
+    products, buyers, store = setup(checkouts, hot_products, stock)
+    queue = list(buyers)
+    lock = threading.Lock()
+    outcomes = Counter()
+    errors = []
+
+    def worker():
+        try:
+            while True:
+                with lock:
+                    if not queue:
+                        return
+                    buyer = queue.pop()
+                try:
+                    place_order(buyer, Cart(f'user:{buyer.id}', store))
+                    outcome = 'placed'
+                except CheckoutError:
+                    outcome = 'refused'
+                except Exception as exc:
+                    outcome = 'errors'
+                    errors.append(repr(exc))
+                with lock:
+                    outcomes[outcome] += 1
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    ordered = dict(OrderItem.objects.filter(product__in=products).values_list('product').annotate(
+        units=Sum('quantity')).order_by())
+    oversold = False
+    print(f'{connection.vendor}: {threads} threads, {checkouts} checkouts over {hot_products} products '
+          f'with {stock} units each')
+    for product in products:
+        product.refresh_from_db()
+        units = ordered.get(product.id, 0)
+        consistent = units + product.stock_quantity == stock and product.in_stock == (product.stock_quantity > 0)
+        oversold |= not consistent
+        print(f'  {product.name}: ordered {units:4d}, left {product.stock_quantity:4d}, '
+              f'in_stock={product.in_stock} {"ok" if consistent else "OVERSOLD"}')
+    print(f'  placed {outcomes["placed"]}, refused {outcomes["refused"]}, errors {outcomes["errors"]}')
+    print(f'  {checkouts / elapsed:.0f} checkouts/sec ({elapsed:.2f}s)')
+    if errors:
+        print(f'  first error: {errors[0]}')
+    print('  no oversell' if not oversold else '  OVERSELL DETECTED')
+
+    cleanup()
@@ -0,0 +1,108 @@
+"""
+Benchmark the admin dashboard stats: the previous live aggregates against
+the materialized DashboardStat read, the periodic refresh job and ?fresh=1.
+
+Run with: python manage.py runscript bench_dashboard_stats --script-args 100000
+
+Benchmark products are created inside a transaction that is rolled back.
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from admin_panel import stats
+from authentication.models import UserProfile
+from products.models import Category, Product
+
+
+def make_catalogue(count, seed=7):
+    rng = random.Random(seed)
+    vendors = []
+    for i in range(50):
+        user = User.objects.create_user(username=f'bench-vendor-{i}', email=f'bench-vendor-{i}@example.com')
+        user.profile.role = 'vendor'
+        user.profile.vendor_tier = rng.choice(['free', 'basic', 'premium', 'featured'])
+        user.profile.save()
+        vendors.append(user)
+    category = Category.objects.create(name='Bench category', slug='bench-category')
+    for start in range(0, count, 5000):
+        Product.objects.bulk_create([
+            Product(
+                name=f'Bench product {i}',
+                slug=f'bench-product-{i}',
+                category=category,
+                vendor=rng.choice(vendors),
+                price=Decimal('999.00'),
+                stock_quantity=5,
+                is_active=rng.random() > 0.1,
+                view_count=rng.randint(0, 5000),
+                contact_reveal_count=rng.randint(0, 200),
+            )
+            for i in range(start, min(start + 5000, count))
+        ])
+    # created_at is auto_now_add; spread it after insert so the 30/7-day windows are realistic
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE products_product SET created_at = datetime(created_at, '-' || (id % 365) || ' days')"
+            if connection.vendor == 'sqlite' else
+            "UPDATE products_product SET created_at = created_at - (id % 365) * interval '1 day'"
+        )
+
+
+def live_stats():
+    """The aggregates DashboardStatsView used to run on every request"""
+    since_30d = timezone.now() - timedelta(days=30)
+    recent = Product.objects.filter(created_at__gte=since_30d)
+    since_7d = timezone.now() - timedelta(days=7)
+    return {
+        'total_products': Product.objects.count(),
+        'active_products': Product.objects.filter(is_active=True).count(),
+        'total_vendors': User.objects.filter(profile__role='vendor').count(),
+        'total_customers': User.objects.filter(profile__role='customer').count(),
+        'views': recent.aggregate(total=Sum('view_count'))['total'],
+        'contacts': recent.aggregate(total=Sum('contact_reveal_count'))['total'],
+        'tiers': list(UserProfile.objects.filter(role='vendor').values('vendor_tier').annotate(count=Count('id'))),
+        'top_viewed': list(Product.objects.filter(is_active=True).order_by('-view_count')[:10].values(
+            'id', 'name', 'view_count', 'contact_reveal_count')),
+        'top_contacted': list(Product.objects.filter(is_active=True).order_by('-contact_reveal_count')[:10].values(
+            'id', 'name', 'view_count', 'contact_reveal_count')),
+        'recent': list(Product.objects.filter(created_at__gte=since_7d).order_by('-created_at')[:20].values(
+            'id', 'name', 'created_at', 'vendor__email', 'view_count')),
+    }
+
+
+def median_ms(func, repeat=7):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run(*args):
+    count = int(args[0]) if args else 100000
+    with transaction.atomic():
+        make_catalogue(count)
+        stats.refresh()
+        product = Product.objects.filter(name__startswith='Bench').first()
+
+        def save_product():
+            product.stock_quantity += 1
+            product.save()
+
+        print(f'Dashboard stats over {count} products (median ms)')
+        print(f'  live aggregates (previous view):    {median_ms(live_stats):8.2f}')
+        print(f'  materialized read:                  {median_ms(stats.dashboard_stats):8.2f}')
+        print(f'  refresh job, counters only:          {median_ms(lambda: stats.refresh(snapshots=[])):8.2f}')
+        print(f'  refresh job, everything (?fresh=1): {median_ms(stats.refresh):8.2f}')
+        print(f'  product save incl. stat signals:    {median_ms(save_product):8.2f}')
+
+        transaction.set_rollback(True)
@@ -0,0 +1,89 @@
+"""
+Benchmark listing facet counts (products.facets) against what the products
+page had to do without them: one COUNT per category, price bucket, tier and
+city, each a query of its own.
+
+The catalogue grows through the given sizes (products.generator), and at
+each size both are timed for a few filter sets, plus a cached lookup.
+
+Run with: python manage.py runscript bench_facets --script-args 10000 100000 1000000
+All database work is rolled back at the end.
+"""
+import statistics
+import time
+
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from authentication.models import Location, UserProfile
+from products import cache
+from products.facets import FACETS, cached_facet_counts, facet_counts, price_buckets
+from products.generator import CatalogueGenerator
+from products.models import Category
+from products.views import AllProductsView
+
+FILTERS = ['', 'city=Nairobi', 'category={category}', 'search=samsung', 'min_price=1000&max_price=20000']
+
+
+def filtered(query):
+    request = Request(APIRequestFactory().get(f'/api/all_products/?{query}'))
+    view = AllProductsView(request=request, args=(), kwargs={}, format_kwarg=None)
+    return request.query_params, view.filter_queryset(view.get_queryset())
+
+
+def one_count_each(queryset):
+    """The per-bucket COUNTs facets replace"""
+    queryset = queryset.order_by()
+    counts = [queryset.filter(category=category).count() for category in Category.objects.all()]
+    for low, high in price_buckets():
+        bucket = queryset.filter(price__gte=low)
+        counts.append((bucket.filter(price__lt=high) if high is not None else bucket).count())
+    counts += [queryset.filter(tier_priority=priority).count() for priority in UserProfile.TIER_PRIORITY.values()]
+    for key in Location.objects.filter(level='city').values_list('key', flat=True):
+        low, high = Location.key_range(key)
+        counts.append(queryset.filter(location_key__gte=low, location_key__lt=high).count())
+    return counts
+
+
+def measure(func, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        connection.queries_log.clear()   # a full log (after generating) would count as 0 queries
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), len(queries)
+
+
+def run(*args):
+    sizes = [int(arg) for arg in args] or [10000, 100000]
+
+    with transaction.atomic():
+        total = 0
+        print(f"{'products':>9} {'filter':32} {'facets ms':>10} {'queries':>8} "
+              f"{'per-count ms':>13} {'queries':>8} {'cached ms':>10}")
+        for index, size in enumerate(sizes):
+            generator = CatalogueGenerator(products=size - total, vendors=max((size - total) // 50, 10),
+                                           seed=100 + index)
+            generator.generate()
+            total = size
+            category = Category.objects.order_by('-active_product_count').values_list('id', flat=True).first()
+
+            for query in FILTERS:
+                query = query.format(category=category)
+                params, queryset = filtered(query)
+                facets_ms, facets_queries = measure(lambda: facet_counts(queryset, FACETS))
+                # Too slow to repeat at a million products (search alone takes minutes)
+                counts_ms, counts_queries = measure(lambda: one_count_each(queryset),
+                                                    repeat=3 if size < 1000000 else 1)
+                caches[cache._config()['ALIAS']].clear()
+                cached_facet_counts(params, FACETS, queryset)
+                cached_ms, _ = measure(lambda: cached_facet_counts(params, FACETS, queryset), repeat=20)
+                print(f'{size:9} {query or "(none)":32} {facets_ms:10.1f} {facets_queries:8} '
+                      f'{counts_ms:13.1f} {counts_queries:8} {cached_ms:10.2f}')
+
+        transaction.set_rollback(True)
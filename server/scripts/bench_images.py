@@ -0,0 +1,78 @@
+"""
+Benchmark product image variant rendering and listing payload savings.
+
+Renders synthetic camera-sized photos inline and over process pools, then
+compares the bytes a 20-card products grid downloads using the original
+uploads against the card-width `thumbnail` (JPEG) and the WebP srcset
+candidate a browser would pick for the same slot.
+
+Run with: python manage.py runscript bench_images --script-args 40 1 4
+(images, then worker counts to compare). Files go to a temporary
+MEDIA_ROOT that is deleted at the end; the database is not touched.
+"""
+import io
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from django.test import override_settings
+from PIL import Image, ImageDraw, ImageFilter
+
+from products.images import _config, product_image_storage, regenerate
+
+GRID = 20
+PHOTO_SIZE = (3000, 2250)
+
+
+def synthetic_photo(seed):
+    """Noisy shapes on a gradient: compresses roughly like a product photo"""
+    rng = random.Random(seed)
+    image = Image.linear_gradient('L').resize(PHOTO_SIZE).convert('RGB')
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(PHOTO_SIZE[0]), rng.randrange(PHOTO_SIZE[1])
+        radius = rng.randrange(50, 600)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius),
+                     fill=tuple(rng.randrange(256) for _ in range(3)))
+    noise = Image.effect_noise(PHOTO_SIZE, 24).convert('RGB')
+    image = Image.blend(image, noise, 0.15).filter(ImageFilter.SMOOTH)
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def run(*args):
+    count = int(args[0]) if args else 40
+    worker_counts = [int(arg) for arg in args[1:]] or [1, os.cpu_count()]
+    media_root = tempfile.mkdtemp()
+
+    try:
+        with override_settings(MEDIA_ROOT=media_root):
+            names = []
+            for i in range(count):
+                names.append(product_image_storage.save(f'products/bench/{i}.jpg', io.BytesIO(synthetic_photo(i))))
+
+            print(f'Rendering {len(_config()["WIDTHS"])} widths x {len(_config()["FORMATS"])} formats '
+                  f'for {count} {PHOTO_SIZE[0]}x{PHOTO_SIZE[1]} JPEGs')
+            results = {}
+            for workers in worker_counts:
+                shutil.rmtree(os.path.join(media_root, 'products', 'variants'), ignore_errors=True)
+                started = time.perf_counter()
+                results = {name: variants for name, variants, error in regenerate(names, workers=workers)}
+                elapsed = time.perf_counter() - started
+                print(f'  {workers:2d} worker(s): {count / elapsed:6.1f} images/sec ({elapsed:.1f}s)')
+
+            card = str(_config()['CARD_WIDTH'])
+            sizes = {'original': 0, f'thumbnail ({card}w JPEG)': 0, f'srcset {card}w WebP': 0}
+            for name in names[:GRID]:
+                sizes['original'] += product_image_storage.size(name)
+                sizes[f'thumbnail ({card}w JPEG)'] += product_image_storage.size(results[name]['jpeg'][card])
+                sizes[f'srcset {card}w WebP'] += product_image_storage.size(results[name]['webp'][card])
+
+            print(f'Image bytes for a {GRID}-card grid')
+            for label, size in sizes.items():
+                print(f'  {label:24s} {size / 1024:9.0f} KiB  {size / sizes["original"]:6.1%}')
+    finally:
+        shutil.rmtree(media_root)
@@ -0,0 +1,88 @@
+"""
+Benchmark the bulk CSV importer on synthetic rows against the old
+per-row update_or_create loop from scripts/seedfile.py.
+
+Run with: python manage.py runscript bench_import --script-args 100000
+
+The synthetic CSV is written to a temp file; all database work is rolled
+back at the end. The per-row baseline only runs on the first 2,000 rows.
+"""
+import csv
+import os
+import random
+import tempfile
+import time
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from products.importer import ProductImporter, clean_price_to_decimal
+from products.models import Category, Product
+
+BASELINE_ROWS = 2000
+WORDS = ['Samsung', 'Galaxy', 'Redmi', 'Ramtons', 'Kettle', 'Blender', 'Smart', 'TV', 'Fridge',
+         'Cooker', 'Dual', 'SIM', 'Pro', 'Max', 'Mini', 'Inch', '4K', 'Silver', 'Black', 'Steel']
+
+
+def write_synthetic_csv(path, rows, seed=42):
+    rng = random.Random(seed)
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(['Category', 'Name', 'URL', 'Price', 'Image URL', 'Product Details', 'Specifications'])
+        for i in range(rows):
+            name = ' '.join(rng.choices(WORDS, k=4)) + f' {i}'
+            writer.writerow([
+                rng.choice(['Phones & Tablets', 'Home & Office', 'Electronics']),
+                name,
+                '',
+                f'KSh {rng.randint(200, 250000):,}',
+                '',
+                ' '.join(rng.choices(WORDS, k=rng.randint(20, 200))),
+                'Key Features: ' + ' '.join(rng.choices(WORDS, k=30)),
+            ])
+
+
+def per_row_baseline(path, limit):
+    """The seedfile.py approach: update_or_create for every row"""
+    category, _ = Category.objects.get_or_create(name='Baseline', defaults={'slug': 'baseline'})
+    started = time.perf_counter()
+    with open(path, newline='', encoding='utf-8') as handle:
+        for i, row in enumerate(csv.DictReader(handle)):
+            if i >= limit:
+                break
+            Product.objects.update_or_create(
+                slug=f'baseline-{slugify(row["Name"])}',
+                defaults={
+                    'name': row['Name'],
+                    'description': f"{row['Product Details']}\n\n--- SPECIFICATIONS ---\n\n{row['Specifications']}",
+                    'category': category,
+                    'price': clean_price_to_decimal(row['Price']),
+                    'stock_quantity': 10,
+                },
+            )
+    return limit / (time.perf_counter() - started)
+
+
+def run(*args):
+    rows = int(args[0]) if args else 100000
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    os.close(fd)
+    try:
+        write_synthetic_csv(path, rows)
+        print(f'Synthetic CSV: {rows} rows, {os.path.getsize(path) / 1e6:.1f} MB')
+
+        with transaction.atomic():
+            baseline = per_row_baseline(path, min(rows, BASELINE_ROWS))
+            print(f'  per-row update_or_create:  {baseline:10.0f} rows/sec (first {min(rows, BASELINE_ROWS)} rows)')
+
+            stats = ProductImporter(chunk_size=1000).import_file(path)
+            print(f'  bulk import (insert):      {stats.rows_per_second:10.0f} rows/sec '
+                  f'({stats.created} created in {stats.elapsed:.1f}s)')
+
+            stats = ProductImporter(chunk_size=1000).import_file(path)
+            print(f'  bulk import (re-import):   {stats.rows_per_second:10.0f} rows/sec '
+                  f'({stats.updated} updated in {stats.elapsed:.1f}s)')
+
+            transaction.set_rollback(True)
+    finally:
+        os.remove(path)
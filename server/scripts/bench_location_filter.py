@@ -0,0 +1,85 @@
+"""
+Benchmark location-filtered product listings: the old icontains filters
+on the vendor's profile (a join to auth_user and authentication_userprofile
+with LIKE '%...%') against the Location key range on
+Product.location_key, on a catalogue from products.generator.
+
+Run with: python manage.py runscript bench_location_filter --script-args 100000 2000
+(products, vendors). All database work is rolled back at the end.
+"""
+import statistics
+import time
+
+from django.db import connection, transaction
+
+from products.filters import filter_by_location
+from products.generator import CatalogueGenerator
+from products.models import Product
+
+# (label, query params): a big city, a small one, a district name shared by
+# several cities, and a subtree by path
+CASES = [
+    ('city=Nairobi', {'city': 'Nairobi'}),
+    ('city=Kitale', {'city': 'Kitale'}),
+    ('district=Milimani', {'district': 'Milimani'}),
+    ('location=mombasa/nyali', {'location': 'mombasa/nyali'}),
+]
+
+
+def icontains(queryset, city=None, district=None, location=None):
+    """AllProductsView's filters before Location"""
+    if city:
+        queryset = queryset.filter(vendor__profile__city__icontains=city)
+    if district:
+        queryset = queryset.filter(vendor__profile__district__icontains=district)
+    if location:
+        for part in location.split('/'):
+            queryset = queryset.filter(vendor__profile__neighborhood__icontains=part)
+    return queryset
+
+
+def listing():
+    return Product.objects.filter(is_active=True).order_by('-tier_priority', '-created_at', '-id')
+
+
+def median_ms(func, repeat=7):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def plan(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}' if connection.vendor == 'sqlite' else f'EXPLAIN {sql}', params)
+        return ' | '.join(str(row[-1]) for row in cursor.fetchall())
+
+
+def run(*args):
+    products = int(args[0]) if args else 100000
+    vendors = int(args[1]) if len(args) > 1 else 2000
+
+    with transaction.atomic():
+        _, stats = CatalogueGenerator(products=products, vendors=vendors, seed=11).generate()
+        print(f'Generated {stats.products} products / {stats.vendors} vendors in {stats.elapsed:.0f}s')
+        print(f"{'filter':26} {'matches':>8} {'count old':>10} {'count new':>10} "
+              f"{'page old':>9} {'page new':>9}   (ms, median of 7)")
+
+        for label, params in CASES:
+            old, new = icontains(listing(), **params), filter_by_location(listing(), **params)
+            matches = new.count()
+            count_old = median_ms(lambda: old.count())
+            count_new = median_ms(lambda: new.count())
+            page_old = median_ms(lambda: list(old.values_list('id', flat=True)[:20]))
+            page_new = median_ms(lambda: list(new.values_list('id', flat=True)[:20]))
+            print(f'{label:26} {matches:8} {count_old:10.1f} {count_new:10.1f} {page_old:9.1f} {page_new:9.1f}')
+
+        label, params = CASES[0]
+        print(f'\nPlan, {label}:')
+        print(f'  old: {plan(icontains(listing(), **params))}')
+        print(f'  new: {plan(filter_by_location(listing(), **params))}')
+
+        transaction.set_rollback(True)
@@ -0,0 +1,103 @@
+"""
+Exercise read replica routing with two SQLite files standing in for the
+primary and a replica.
+
+Copies the primary into the replica (a one-off "replication"), then shows
+which database each step reads from:
+
+1. catalogue GETs go to the replica;
+2. a guest adds to their cart (a write, not replicated) and is pinned, so
+   the next cart read sees the line; once the pin expires it reads the
+   stale replica;
+3. with the replica file gone, catalogue GETs fall back to the primary
+   (the replica directory is left deleted).
+
+Run with:
+    DATABASE_URL=sqlite:////tmp/primary.sqlite3 \\
+    DATABASE_REPLICA_URLS=sqlite:////tmp/replica/replica.sqlite3 \\
+    python manage.py runscript bench_replicas --script-args 20
+(catalogue requests per step) against a migrated, seeded primary.
+"""
+import os
+import shutil
+import sqlite3
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.test import APIClient
+
+from products.models import Product
+from server import db_router
+
+CATALOGUE = ('/api/all_products/', '/api/featured/', '/api/categories/')
+
+
+def count_queries(func):
+    """Run func, returning its result and {alias: queries}"""
+    queries = Counter()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(
+                lambda execute, sql, params, many, context, alias=alias: queries.update([alias]) or execute(sql, params, many, context)
+            ))
+        result = func()
+    return result, dict(queries)
+
+
+def catalogue_reads(client, requests):
+    def run():
+        started = time.perf_counter()
+        for i in range(requests):
+            cache.clear()  # measure the database, not the catalogue cache
+            client.get(CATALOGUE[i % len(CATALOGUE)])
+        return (time.perf_counter() - started) * 1000 / requests
+    return count_queries(run)
+
+
+def replicate(alias):
+    primary, replica = (connections[name].settings_dict['NAME'] for name in (DEFAULT_DB_ALIAS, alias))
+    connections[alias].close()
+    os.makedirs(os.path.dirname(replica), exist_ok=True)
+    with sqlite3.connect(primary) as source, sqlite3.connect(replica) as target:
+        source.backup(target)
+    return replica
+
+
+def run(*args):
+    requests = int(args[0]) if args else 20
+    aliases = db_router._config()['ALIASES']
+    if not aliases or connections[aliases[0]].vendor != 'sqlite':
+        print('Set DATABASE_URL and DATABASE_REPLICA_URLS to two SQLite files (see the docstring)')
+        return
+    alias = aliases[0]
+    replica = replicate(alias)
+    print(f'Replicated {connections[DEFAULT_DB_ALIAS].settings_dict["NAME"]} -> {replica}')
+    client = APIClient(SERVER_NAME='localhost')
+
+    ms, queries = catalogue_reads(client, requests)
+    print(f'1. {requests} catalogue GETs: {ms:.1f} ms avg, queries {queries}')
+
+    product = Product.objects.filter(is_active=True, in_stock=True).first()
+    response = client.post('/api/cart/add/', {'product_id': product.id, 'quantity': 1}, format='json')
+    headers = {'HTTP_X_CART_TOKEN': response.json()['cart_token']}
+    pinned = 'db_pin' in response.cookies
+    (lines, queries) = count_queries(lambda: len(client.get('/api/cart/', **headers).json()['items']))
+    print(f'2. Added to cart (pinned: {pinned}); next cart read: {lines} line(s), queries {queries}')
+    client.cookies.clear()
+    (lines, queries) = count_queries(lambda: len(client.get('/api/cart/', **headers).json()['items']))
+    print(f'   Pin expired; cart read: {lines} line(s) from the stale replica, queries {queries}')
+
+    connections[alias].close()
+    shutil.rmtree(os.path.dirname(replica))
+    db_router._health.clear()
+    try:
+        ms, queries = catalogue_reads(client, requests)
+        print(f'3. Replica removed: {requests} catalogue GETs: {ms:.1f} ms avg, queries {queries}, '
+              f'health {db_router.replica_status()}')
+    finally:
+        # Undo the demo write on the primary
+        client.post('/api/cart/clear/', **headers)
+        db_router._health.clear()
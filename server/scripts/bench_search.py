@@ -0,0 +1,101 @@
+"""
+Benchmark product search latency: icontains scans (the old SearchFilter)
+against the full-text backend, on a catalogue built from the Jumia CSVs.
+
+Run with: python manage.py runscript bench_search --script-args 50
+
+The argument is how many copies of the CSV catalogue to load (175 rows
+each). Everything runs inside a transaction that is rolled back.
+"""
+import csv
+import os
+import statistics
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+
+from products.models import Category, Product
+from products.search import LikeSearchBackend, get_search_backend
+
+CSV_FILES = [
+    'csv/jumia_products_with_details.csv',
+    'csv/jumia_home-office-appliances_with_details.csv',
+]
+
+# What a user types into the products page search box, keystroke by keystroke
+QUERIES = ['s', 'sa', 'sam', 'sams', 'samsung', 'samsung gal', 'kettle', 'dual sim', 'blender 1.5', 'fridge']
+
+
+def load_rows():
+    rows = []
+    for path in CSV_FILES:
+        with open(os.path.join(settings.BASE_DIR, path), newline='', encoding='utf-8') as handle:
+            rows.extend(csv.DictReader(handle))
+    return rows
+
+
+def parse_price(value):
+    try:
+        return Decimal(value.replace('KSh', '').replace(',', '').strip())
+    except (InvalidOperation, AttributeError):
+        return Decimal('100.00')
+
+
+def build_catalogue(copies):
+    rows = load_rows()
+    categories = {}
+    for row in rows:
+        name = row['Category'] or 'Uncategorised'
+        if name not in categories:
+            categories[name], _ = Category.objects.get_or_create(
+                name=f'bench {name}', defaults={'slug': f'bench-{len(categories)}'}
+            )
+
+    products = []
+    for copy in range(copies):
+        for i, row in enumerate(rows):
+            products.append(Product(
+                name=row['Name'],
+                description=f"{row['Product Details']}\n\n--- SPECIFICATIONS ---\n\n{row['Specifications']}",
+                category=categories[row['Category'] or 'Uncategorised'],
+                price=parse_price(row['Price']),
+                stock_quantity=10,
+                slug=f'bench-{copy}-{i}',
+            ))
+    Product.objects.bulk_create(products, batch_size=2000)
+    return len(products)
+
+
+def time_query(backend, term, ordering, repeat=5):
+    """Median ms to fetch the first page of ids, ordered the way the listing orders them"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        queryset = backend.search(Product.objects.filter(is_active=True), term).order_by(*ordering)
+        list(queryset[:20].values_list('id', flat=True))
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run(*args):
+    copies = int(args[0]) if args else 50
+
+    with transaction.atomic():
+        created = build_catalogue(copies)
+        backend = get_search_backend()
+        started = time.perf_counter()
+        indexed = backend.rebuild()
+        index_seconds = time.perf_counter() - started
+
+        print(f'{created} benchmark products added, {indexed} indexed with '
+              f'{type(backend).__name__} in {index_seconds:.2f}s')
+        print(f'{"query":<14} {"icontains ms":>13} {"full-text ms":>13}')
+        like = LikeSearchBackend()
+        for term in QUERIES:
+            like_ms = time_query(like, term, ('-tier_priority', '-created_at', '-id'))
+            full_text_ms = time_query(backend, term, ('-search_rank', '-id'))
+            print(f'{term:<14} {like_ms:>13.2f} {full_text_ms:>13.2f}')
+
+        transaction.set_rollback(True)
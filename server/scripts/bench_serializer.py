@@ -0,0 +1,86 @@
+"""
+Microbenchmark per-row serialization cost of product listings:
+ProductSerializer on select_related instances against
+ProductListingSerializer on .values() rows, for 20/100/1000-row pages.
+
+Run with: python manage.py runscript bench_serializer
+
+Benchmark products are created inside a transaction that is rolled back.
+"""
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from products.models import Category, Product
+from products.serializers import ProductListingSerializer, ProductSerializer, listing_values
+
+PAGE_SIZES = [20, 100, 1000]
+
+
+def make_products(count):
+    vendor = User.objects.create_user(username='bench-vendor', email='bench-vendor@example.com')
+    vendor.profile.role = 'vendor'
+    vendor.profile.city = 'Nairobi'
+    vendor.profile.district = 'Westlands'
+    vendor.profile.phone = '+254700000000'
+    vendor.profile.save()
+    category = Category.objects.create(name='Bench category', slug='bench-category')
+    Product.objects.bulk_create([
+        Product(
+            name=f'Bench product {i}',
+            slug=f'bench-product-{i}',
+            description='Benchmark product description ' * 10,
+            category=category,
+            vendor=vendor,
+            price=Decimal('1999.00'),
+            stock_quantity=5,
+        )
+        for i in range(count)
+    ])
+    return vendor
+
+
+def median_ms(func, repeat=7):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def run(*args):
+    with transaction.atomic():
+        vendor = make_products(max(PAGE_SIZES))
+        queryset = Product.objects.filter(vendor=vendor).order_by('-created_at')
+
+        for label, user in (('anonymous', AnonymousUser()), ('authenticated', vendor)):
+            request = Request(APIRequestFactory().get('/api/all_products/'))
+            request.user = user
+            context = {'request': request}
+
+            print(f'\n{label} request - microseconds per row (serialize only / fetch + serialize + render)')
+            print(f'{"rows":>6} {"ProductSerializer":>26} {"ProductListingSerializer":>28}')
+            for size in PAGE_SIZES:
+                instances = list(queryset.select_related('category', 'vendor', 'vendor__profile')[:size])
+                rows = list(listing_values(queryset)[:size])
+
+                drf_only = median_ms(lambda: ProductSerializer(instances, many=True, context=context).data)
+                fast_only = median_ms(lambda: ProductListingSerializer(rows, context=context).data)
+                drf_full = median_ms(lambda: JSONRenderer().render(ProductSerializer(
+                    queryset.select_related('category', 'vendor', 'vendor__profile')[:size],
+                    many=True, context=context).data))
+                fast_full = median_ms(lambda: JSONRenderer().render(ProductListingSerializer(
+                    listing_values(queryset)[:size], context=context).data))
+
+                per_row = lambda ms: f'{ms * 1000 / size:8.1f}'
+                print(f'{size:>6} {per_row(drf_only):>12} / {per_row(drf_full):>10}'
+                      f' {per_row(fast_only):>14} / {per_row(fast_full):>10}')
+
+        transaction.set_rollback(True)
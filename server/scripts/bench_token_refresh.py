@@ -0,0 +1,108 @@
+"""
+Benchmark refresh-token rotation after a simulated month of traffic: every
+user refreshing hourly for 30 days leaves 720 outstanding and 719
+blacklisted rows each. Refreshes are then run through stock simplejwt's
+TokenRefreshSerializer and through authentication.tokens' (bloom and
+cache blacklist stores), before and after prune_expired_tokens.
+
+Run with: python manage.py runscript bench_token_refresh --script-args 200 2000
+(users, refreshes per measurement). All database work is rolled back at the end.
+"""
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework_simplejwt import serializers as simplejwt_serializers
+from rest_framework_simplejwt import tokens as simplejwt_tokens
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from authentication import tokens
+
+DAYS = 30
+ROTATIONS_PER_DAY = 24
+BATCH = 5000
+# A signed refresh token is ~280 characters; the table stores it in full
+TOKEN_TEXT = 'x' * 280
+
+
+def simulate_month(users):
+    """Outstanding rows for DAYS of hourly rotations per user; all but the newest blacklisted"""
+    lifetime = simplejwt_tokens.api_settings.REFRESH_TOKEN_LIFETIME
+    start = timezone.now() - timedelta(days=DAYS)
+    step = timedelta(hours=24 / ROTATIONS_PER_DAY)
+    rotations = DAYS * ROTATIONS_PER_DAY
+    rows = []
+
+    def flush():
+        created = OutstandingToken.objects.bulk_create(rows)
+        BlacklistedToken.objects.bulk_create(
+            [BlacklistedToken(token=token) for token in created if token.created_at < start + step * (rotations - 1)]
+        )
+        rows.clear()
+
+    for user in users:
+        for rotation in range(rotations):
+            issued = start + step * rotation
+            rows.append(OutstandingToken(user=user, jti=uuid.uuid4().hex, token=TOKEN_TEXT,
+                                         created_at=issued, expires_at=issued + lifetime))
+            if len(rows) >= BATCH:
+                flush()
+    if rows:
+        flush()
+
+
+def measure(label, serializer_class, token_class, users, refreshes):
+    current = [str(token_class.for_user(user)) for user in users]
+    connection.queries_log.clear()   # a full log would count as 0 queries
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        for number in range(refreshes):
+            index = number % len(current)
+            serializer = serializer_class(data={'refresh': current[index]})
+            serializer.is_valid(raise_exception=True)
+            current[index] = serializer.validated_data['refresh']
+        elapsed = time.perf_counter() - started
+    print(f'  {label:36} {refreshes / elapsed:8.0f} refreshes/s {len(queries) / refreshes:6.1f} queries each')
+
+
+def sizes():
+    table = tokens.token_table_sizes()
+    return f"{table['outstanding']} outstanding, {table['blacklisted']} blacklisted, {table['expired']} expired"
+
+
+def run(*args):
+    user_count = int(args[0]) if args else 200
+    refreshes = int(args[1]) if len(args) > 1 else 2000
+    stores = {
+        'bloom': tokens.BloomBlacklistStore(1_000_000, 0.001, 1.0, 3600, 30),
+        'cache': tokens.CacheBlacklistStore('default', 'bench-jwt-blacklist'),
+    }
+
+    with transaction.atomic():
+        users = User.objects.bulk_create([User(username=f'bench-refresh-{n}') for n in range(user_count)])
+        started = time.perf_counter()
+        simulate_month(users)
+        print(f'Simulated {DAYS} days of hourly rotations for {user_count} users in '
+              f'{time.perf_counter() - started:.0f}s: {sizes()}')
+
+        def measure_all(when):
+            print(f'{when}:')
+            measure('simplejwt TokenRefreshSerializer', simplejwt_serializers.TokenRefreshSerializer,
+                    simplejwt_tokens.RefreshToken, users, refreshes)
+            for name, store in stores.items():
+                with mock.patch.object(tokens, '_store', store):
+                    measure(f'tokens.TokenRefreshSerializer ({name})', tokens.TokenRefreshSerializer,
+                            tokens.RefreshToken, users, refreshes)
+
+        measure_all('Before pruning')
+        started = time.perf_counter()
+        deleted = tokens.prune_expired_tokens()
+        print(f'Pruned {deleted} expired tokens in {time.perf_counter() - started:.1f}s: {sizes()}')
+        measure_all('After pruning')
+
+        transaction.set_rollback(True)
@@ -0,0 +1,68 @@
+"""
+Benchmark product detail throughput: per-request UPDATE + refresh_from_db
+(the old path) against buffered view counting.
+
+Run with: python manage.py runscript bench_view_counts --script-args 2000
+
+Everything runs inside a transaction that is rolled back, so the database
+is left untouched.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import F
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+
+from products import views
+from products.models import Product
+from products.serializers import ProductSerializer
+from products.view_counts import MemoryViewBuffer, ViewCounter
+import products.view_counts as view_counts
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def legacy_product_by_id(request, id):
+    """The product_by_id implementation before buffered view counting"""
+    product = Product.objects.select_related('category', 'vendor', 'vendor__profile').get(id=id, is_active=True)
+    Product.objects.filter(id=product.id).update(view_count=F('view_count') + 1)
+    product.refresh_from_db()
+    serializer = ProductSerializer(product, context={'request': request})
+    return Response({'success': True, 'product': serializer.data})
+
+
+def time_requests(view, product_ids, requests):
+    factory = APIRequestFactory()
+    started = time.perf_counter()
+    for i in range(requests):
+        product_id = product_ids[i % len(product_ids)]
+        response = view(factory.get(f'/api/products/{product_id}/'), id=product_id)
+        assert response.status_code == 200, response.status_code
+    return time.perf_counter() - started
+
+
+def run(*args):
+    requests = int(args[0]) if args else 2000
+    product_ids = list(Product.objects.filter(is_active=True).values_list('id', flat=True)[:50])
+    if not product_ids:
+        print('No active products - seed the database first (python seed.py)')
+        return
+
+    with transaction.atomic():
+        before = time_requests(legacy_product_by_id, product_ids, requests)
+
+        counter = ViewCounter(MemoryViewBuffer(), flush_interval=5.0, max_pending=1000)
+        view_counts._view_counter = counter
+        after = time_requests(views.product_by_id, product_ids, requests)
+        counter.flush()
+        view_counts._view_counter = None
+
+        transaction.set_rollback(True)
+
+    print(f'{requests} detail requests over {len(product_ids)} products')
+    print(f'  UPDATE + refresh per request: {requests / before:8.1f} req/s')
+    print(f'  buffered view counting:       {requests / after:8.1f} req/s')
+    print(f'  speedup: {before / after:.2f}x')
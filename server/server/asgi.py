@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
+# Serve the public catalogue reads with the async views (products.async_views)
+os.environ.setdefault('ASYNC_CATALOGUE_VIEWS', '1')
 
 application = get_asgi_application()
@@ -0,0 +1,17 @@
+# server/celery.py - Celery application for background tasks
+"""
+Workers: celery -A server worker -l info
+
+Configured from the CELERY_* settings. Without REDIS_URL there is no broker
+and notifications.metrics.enqueue() runs jobs on a background thread of the
+web process; tests run them eagerly.
+"""
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
+
+app = Celery('server')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -0,0 +1,270 @@
+# server/db_router.py - Read replica routing
+"""
+Sends the reads of safe (GET/HEAD/OPTIONS) requests to a read replica and
+everything else to the primary ('default'). Replicas are the database
+aliases in settings.READ_REPLICAS['ALIASES'] (see DATABASE_REPLICA_URLS).
+
+- Writes always go to the primary, and so do reads outside a request
+  (management commands, background tasks) and inside a transaction.
+- Read-your-writes: an unsafe request that writes pins its client to the
+  primary for PIN_SECONDS, so the next page shows what it just saved. Writes
+  a safe request triggers as a side effect (e.g. a buffered view-count
+  flush) don't pin: they aren't the client's own changes. Clients are
+  recognised by the user id in their bearer token (pin kept in the cache)
+  or, for guests, by a short-lived cookie.
+- Health: each replica is checked at most every HEALTH_CHECK_INTERVAL
+  seconds (connects, and on PostgreSQL measures replay lag against
+  MAX_LAG_SECONDS). Unhealthy replicas are skipped; with none left reads
+  fall back to the primary. A safe request whose replica fails mid-way is
+  retried once on the primary.
+"""
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, InterfaceError, OperationalError, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ALIASES': [],
+    'PIN_SECONDS': 5,
+    'HEALTH_CHECK_INTERVAL': 10,
+    'MAX_LAG_SECONDS': 30,
+    'COOKIE_NAME': 'db_pin',
+}
+
+PIN_KEY_PREFIX = 'db:pin'
+
+# Replication lag in seconds; 0 while the replica has replayed everything it received
+POSTGRES_LAG_SQL = """
+    SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+           ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END
+"""
+
+_routing = ContextVar('replica_routing', default=None)
+_health = {}    # alias -> (healthy, checked at)
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'READ_REPLICAS', {})}
+
+
+class RequestRouting:
+    """Routing state for one request"""
+
+    def __init__(self, safe, use_replica):
+        self.safe = safe
+        self.use_replica = use_replica
+        self.replica = None
+        self.wrote = False
+
+
+def check_replica(alias, max_lag):
+    try:
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql' and max_lag is not None:
+                cursor.execute(POSTGRES_LAG_SQL)
+                lag = cursor.fetchone()[0]
+                if lag > max_lag:
+                    logger.warning('Replica %s is %.1fs behind; reading from the primary', alias, lag)
+                    return False
+            else:
+                cursor.execute('SELECT 1')
+        return True
+    except Exception as exc:
+        logger.warning('Replica %s is unavailable: %s', alias, exc)
+        return False
+
+
+def is_healthy(alias):
+    """Cached replica health, rechecked every HEALTH_CHECK_INTERVAL seconds"""
+    config = _config()
+    healthy, checked_at = _health.get(alias, (None, 0))
+    if time.monotonic() - checked_at >= config['HEALTH_CHECK_INTERVAL']:
+        healthy = check_replica(alias, config['MAX_LAG_SECONDS'])
+        _health[alias] = (healthy, time.monotonic())
+    return healthy
+
+
+def mark_unhealthy(alias):
+    _health[alias] = (False, time.monotonic())
+
+
+def replica_status():
+    """{alias: healthy} for every configured replica"""
+    return {alias: is_healthy(alias) for alias in _config()['ALIASES']}
+
+
+def choose_replica():
+    healthy = [alias for alias in _config()['ALIASES'] if is_healthy(alias)]
+    return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+
+def in_transaction():
+    return connections[DEFAULT_DB_ALIAS].in_atomic_block
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if routing is None or not routing.use_replica or in_transaction():
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Follow relations on the database the object came from
+            return instance._state.db
+        if routing.replica is None:
+            # One replica for the whole request, so its reads are consistent
+            routing.replica = choose_replica()
+        return routing.replica
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None and not routing.safe:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *_config()['ALIASES']}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in _config()['ALIASES']:
+            return False
+        return None
+
+
+def _pin_key(user_id):
+    return f'{PIN_KEY_PREFIX}:{user_id}'
+
+
+def _bearer_user_id(request):
+    """User id claimed by a valid bearer token, without a database query"""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = header and authentication.get_raw_token(header)
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_validated_token(raw_token).get(jwt_settings.USER_ID_CLAIM)
+    except InvalidToken:
+        return None  # reported by authentication proper
+
+
+def _bearer_pin_key(request):
+    user_id = _bearer_user_id(request)
+    return None if user_id is None else _pin_key(user_id)
+
+
+def is_pinned(request, config):
+    if config['COOKIE_NAME'] in request.COOKIES:
+        return True
+    key = _bearer_pin_key(request)
+    return key is not None and cache.get(key) is not None
+
+
+async def ais_pinned(request, config):
+    if config['COOKIE_NAME'] in request.COOKIES:
+        return True
+    key = _bearer_pin_key(request)
+    return key is not None and await cache.aget(key) is not None
+
+
+def _pin_cookie(response, config):
+    response.set_cookie(config['COOKIE_NAME'], '1', max_age=config['PIN_SECONDS'], httponly=True, samesite='Lax')
+
+
+def _pinned_user(request):
+    user = getattr(request, 'user', None)
+    return user if user is not None and user.is_authenticated else None
+
+
+def pin(request, response, config):
+    _pin_cookie(response, config)
+    user = _pinned_user(request)
+    if user is not None:
+        cache.set(_pin_key(user.id), 1, timeout=config['PIN_SECONDS'])
+
+
+async def apin(request, response, config):
+    _pin_cookie(response, config)
+    user = _pinned_user(request)
+    if user is not None:
+        await cache.aset(_pin_key(user.id), 1, timeout=config['PIN_SECONDS'])
+
+
+class ReplicaRoutingMiddleware:
+    """Sets up ReplicaRouter for each request and pins writers to the primary"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        config = _config()
+        if not config['ALIASES']:
+            return self.get_response(request)
+
+        safe = request.method in SAFE_METHODS
+        routing = RequestRouting(safe, safe and not is_pinned(request, config))
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if routing.wrote:
+            pin(request, response, config)
+        return response
+
+    async def __acall__(self, request):
+        config = _config()
+        if not config['ALIASES']:
+            return await self.get_response(request)
+
+        safe = request.method in SAFE_METHODS
+        routing = RequestRouting(safe, safe and not await ais_pinned(request, config))
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if routing.wrote:
+            await apin(request, response, config)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._replica_view = (view_func, view_args, view_kwargs)
+
+    def process_exception(self, request, exception):
+        routing = _routing.get()
+        on_replica = routing is not None and routing.use_replica and routing.replica != DEFAULT_DB_ALIAS
+        if not on_replica or routing.replica is None or not isinstance(exception, (OperationalError, InterfaceError)):
+            return None
+        logger.warning('Replica %s failed, retrying %s on the primary: %s', routing.replica, request.path, exception)
+        mark_unhealthy(routing.replica)
+        routing.use_replica = False
+        view_func, view_args, view_kwargs = request._replica_view
+        if iscoroutinefunction(view_func):
+            # process_exception runs in a worker thread for async views
+            return async_to_sync(view_func)(request, *view_args, **view_kwargs)
+        return view_func(request, *view_args, **view_kwargs)
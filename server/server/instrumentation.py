@@ -0,0 +1,370 @@
+# server/instrumentation.py - Per-request performance instrumentation
+"""
+InstrumentationMiddleware measures every request:
+
+- queries / db:  SQL statements run and time spent in them, on any thread
+                 the request uses (sync_to_async included) and any alias
+- serializer:    time spent producing serializer .data (DRF and ProductListingSerializer)
+- total:         time through the rest of the middleware stack and the view
+
+Each response gets a Server-Timing header (shown in the browser's network
+panel), e.g. `db;dur=4.1;desc="3 queries", serializer;dur=1.2, total;dur=9.8`,
+and each request a JSON log line on the 'server.instrumentation' logger.
+Requests running more queries than their route's budget
+(INSTRUMENTATION['QUERY_BUDGET'], or per route in 'QUERY_BUDGETS') or
+slower than SLOW_REQUEST_MS are logged as warnings and counted.
+
+Per-route counters and histograms are accumulated in-process and added to
+the default cache every FLUSH_INTERVAL seconds, so every worker process
+adds to the same totals. prometheus_metrics() renders them in Prometheus
+text format for the admin-only /api/admin/metrics/ endpoint.
+"""
+import functools
+import json
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from functools import cached_property
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.urls import URLPattern, URLResolver, get_resolver
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'QUERY_BUDGET': 20,
+    'QUERY_BUDGETS': {},        # route -> budget (None: no budget)
+    'SLOW_REQUEST_MS': 1000,
+    'FLUSH_INTERVAL': 10,
+    'DURATION_BUCKETS_MS': (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+    'QUERY_BUCKETS': (0, 1, 2, 5, 10, 20, 50, 100),
+}
+
+KEY_PREFIX = 'metrics:http'
+UNMATCHED = '<unmatched>'
+# Totals kept per route; times in microseconds so they can be cache.incr'd
+FIELDS = ('requests', 'errors', 'over_budget', 'slow', 'duration_us', 'db_us', 'serializer_us', 'queries')
+
+_metrics = ContextVar('request_metrics', default=None)
+_pending = {}   # cache key -> amount not yet flushed
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'INSTRUMENTATION', {})}
+
+
+class RequestMetrics:
+    """What one request has spent so far"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.serializer = 0.0
+        self.serializing = False
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+
+def current_metrics():
+    return _metrics.get()
+
+
+# Measuring
+
+def record_query(execute, sql, params, many, context):
+    metrics = _metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db += time.perf_counter() - started
+        metrics.queries += 1
+
+
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def _timed(get_data):
+    @functools.wraps(get_data)
+    def timed(serializer):
+        metrics = _metrics.get()
+        if metrics is None or metrics.serializing:
+            # Serializers nested through .data are part of the outer one's time
+            return get_data(serializer)
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            return get_data(serializer)
+        finally:
+            metrics.serializer += time.perf_counter() - started
+            metrics.serializing = False
+    timed.instrumented = True
+    return timed
+
+
+def install():
+    """Record queries on every connection and time serializer .data"""
+    from products.serializers import ProductListingSerializer
+
+    connection_created.connect(install_query_recorder)
+    for connection in connections.all(initialized_only=True):
+        install_query_recorder(connection)
+    # Serializer and ListSerializer .data both go through BaseSerializer.data
+    if not getattr(BaseSerializer.data.fget, 'instrumented', False):
+        BaseSerializer.data = property(_timed(BaseSerializer.data.fget))
+    # The listing fast path isn't a DRF serializer; its .data is a cached_property
+    listing_data = ProductListingSerializer.__dict__['data']
+    if not getattr(listing_data.func, 'instrumented', False):
+        timed = cached_property(_timed(listing_data.func))
+        timed.__set_name__(ProductListingSerializer, 'data')
+        ProductListingSerializer.data = timed
+
+
+# Reporting
+
+def route_of(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None else UNMATCHED
+
+
+def query_budget(route, config):
+    return config['QUERY_BUDGETS'].get(route, config['QUERY_BUDGET'])
+
+
+def server_timing(metrics, total):
+    return (f'db;dur={metrics.db * 1000:.1f};desc="{metrics.queries} queries", '
+            f'serializer;dur={metrics.serializer * 1000:.1f}, total;dur={total * 1000:.1f}')
+
+
+def finish(request, response, metrics, config):
+    """Header, log line and counters for a finished request; True when counters are due a flush"""
+    total = metrics.total
+    route = route_of(request)
+    budget = query_budget(route, config)
+    over_budget = budget is not None and metrics.queries > budget
+    slow = total * 1000 > config['SLOW_REQUEST_MS']
+
+    response['Server-Timing'] = server_timing(metrics, total)
+    line = {
+        'event': 'request',
+        'method': request.method,
+        'path': request.path,
+        'route': route,
+        'status': response.status_code,
+        'total_ms': round(total * 1000, 1),
+        'db_ms': round(metrics.db * 1000, 1),
+        'queries': metrics.queries,
+        'serializer_ms': round(metrics.serializer * 1000, 1),
+    }
+    if over_budget:
+        line['query_budget'] = budget
+    if over_budget or slow:
+        logger.warning(json.dumps(line))
+    else:
+        logger.info(json.dumps(line))
+
+    return observe(route, response.status_code, total, metrics, over_budget, slow, config)
+
+
+def _key(route, field):
+    return f'{KEY_PREFIX}:{route}:{field}'
+
+
+def _bucket(value, bounds):
+    """Index of the first bound value fits under; len(bounds) for +Inf"""
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            return index
+    return len(bounds)
+
+
+def observe(route, status, total, metrics, over_budget, slow, config):
+    amounts = {
+        'requests': 1,
+        'errors': int(status >= 500),
+        'over_budget': int(over_budget),
+        'slow': int(slow),
+        'duration_us': round(total * 1e6),
+        'db_us': round(metrics.db * 1e6),
+        'serializer_us': round(metrics.serializer * 1e6),
+        'queries': metrics.queries,
+        f'duration_le_{_bucket(total * 1000, config["DURATION_BUCKETS_MS"])}': 1,
+        f'queries_le_{_bucket(metrics.queries, config["QUERY_BUCKETS"])}': 1,
+    }
+    with _pending_lock:
+        for field, amount in amounts.items():
+            if amount:
+                key = _key(route, field)
+                _pending[key] = _pending.get(key, 0) + amount
+    return time.monotonic() - _last_flush >= config['FLUSH_INTERVAL']
+
+
+def _add(key, amount):
+    try:
+        cache.incr(key, amount)
+    except ValueError:
+        if not cache.add(key, amount, timeout=None):
+            cache.incr(key, amount)
+
+
+def flush():
+    """Add this process's pending counts to the shared totals"""
+    global _last_flush
+    with _pending_lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    for key, amount in pending.items():
+        _add(key, amount)
+
+
+def known_routes(resolver=None, prefix=''):
+    """Every route in the URLconf, as ResolverMatch.route spells them"""
+    resolver = resolver or get_resolver()
+    routes = []
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            routes += known_routes(pattern, _join_route(prefix, str(pattern.pattern)))
+        elif isinstance(pattern, URLPattern):
+            routes.append(_join_route(prefix, str(pattern.pattern)))
+    return routes
+
+
+def _join_route(prefix, route):
+    # As URLResolver.resolve joins them for ResolverMatch.route
+    return prefix + (route[1:] if prefix and route.startswith('^') else route)
+
+
+def route_stats():
+    """{route: {field: value, 'duration_buckets': [...], 'query_buckets': [...]}} for routes with traffic"""
+    config = _config()
+    flush()
+    routes = [UNMATCHED, *dict.fromkeys(known_routes())]
+    duration_fields = [f'duration_le_{index}' for index in range(len(config['DURATION_BUCKETS_MS']) + 1)]
+    query_fields = [f'queries_le_{index}' for index in range(len(config['QUERY_BUCKETS']) + 1)]
+    fields = FIELDS + tuple(duration_fields) + tuple(query_fields)
+    values = cache.get_many([_key(route, field) for route in routes for field in fields])
+    stats = {}
+    for route in routes:
+        counts = {field: values.get(_key(route, field), 0) for field in fields}
+        if not counts['requests']:
+            continue
+        stats[route] = {
+            **{field: counts[field] for field in FIELDS},
+            'query_budget': query_budget(route, config),
+            'duration_buckets': [counts[field] for field in duration_fields],
+            'query_buckets': [counts[field] for field in query_fields],
+        }
+    return stats
+
+
+def _number(value):
+    return str(value) if isinstance(value, int) else repr(round(value, 6))
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _histogram(lines, name, route, bounds, buckets, total):
+    cumulative = 0
+    for bound, count in zip([*bounds, '+Inf'], buckets):
+        cumulative += count
+        lines.append(f'{name}_bucket{{route="{route}",le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_sum{{route="{route}"}} {total}')
+    lines.append(f'{name}_count{{route="{route}"}} {cumulative}')
+
+
+def prometheus_metrics():
+    """Per-route request metrics in Prometheus text exposition format"""
+    config = _config()
+    stats = route_stats()
+    families = {
+        'http_requests_total': ('counter', 'Requests handled', 'requests', 1),
+        'http_request_errors_total': ('counter', 'Requests answered with a 5xx', 'errors', 1),
+        'http_request_query_budget_exceeded_total': ('counter', 'Requests over their route\'s query budget',
+                                                     'over_budget', 1),
+        'http_request_slow_total': ('counter', 'Requests slower than SLOW_REQUEST_MS', 'slow', 1),
+        'http_request_db_seconds_total': ('counter', 'Time spent in SQL queries', 'db_us', 1e-6),
+        'http_request_serializer_seconds_total': ('counter', 'Time spent in DRF serializers', 'serializer_us', 1e-6),
+    }
+    lines = []
+    for name, (kind, help_text, field, scale) in families.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+        for route, counts in stats.items():
+            lines.append(f'{name}{{route="{_label(route)}"}} {_number(counts[field] * scale)}')
+
+    lines += ['# HELP http_route_query_budget Queries a request may run before it is flagged',
+              '# TYPE http_route_query_budget gauge']
+    for route, counts in stats.items():
+        if counts['query_budget'] is not None:
+            lines.append(f'http_route_query_budget{{route="{_label(route)}"}} {counts["query_budget"]}')
+
+    lines += ['# HELP http_request_duration_seconds Request duration', '# TYPE http_request_duration_seconds histogram']
+    for route, counts in stats.items():
+        _histogram(lines, 'http_request_duration_seconds', _label(route),
+                   [f'{bound / 1000:g}' for bound in config['DURATION_BUCKETS_MS']],
+                   counts['duration_buckets'], _number(counts['duration_us'] * 1e-6))
+
+    lines += ['# HELP http_request_queries SQL queries per request', '# TYPE http_request_queries histogram']
+    for route, counts in stats.items():
+        _histogram(lines, 'http_request_queries', _label(route), config['QUERY_BUCKETS'],
+                   counts['query_buckets'], counts['queries'])
+    return '\n'.join(lines) + '\n'
+
+
+class InstrumentationMiddleware:
+    """Measures each request; see module docstring"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not _config()['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+        if finish(request, response, metrics, _config()):
+            flush()
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _metrics.reset(token)
+        if finish(request, response, metrics, _config()):
+            await sync_to_async(flush, thread_sensitive=False)()
+        return response
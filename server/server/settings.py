@@ -10,9 +10,13 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 from datetime import timedelta
 
+import dj_database_url
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -24,7 +28,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-82rifh$y!m0b-xs410axxr+^*^&90@ptltk79*@hnlh_x+i9_@'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = []
 
@@ -51,6 +55,11 @@ INSTALLED_APPS = [
     'products',
     'authentication',
     'admin_panel',
+    'analytics',
+    'cart',
+    'orders',
+    'notifications',
+    'loadtest',
 ]
 
 DEFAULT_COMMISSION_RATE = 15.0
@@ -58,12 +67,22 @@ DEFAULT_TAX_RATE = 16.0
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'  # For development
 DEFAULT_FROM_EMAIL = 'noreply@kipsunya.com'
 
+# Buffered product view counting (see products/view_counts.py)
+# Use 'file' when running several gunicorn workers so
+# `python manage.py flush_view_counts` can drain every worker's views.
+VIEW_COUNTER = {
+    'BACKEND': 'memory',
+    'PATH': BASE_DIR / 'var' / 'view_counts.log',
+    'FLUSH_INTERVAL': 5.0,
+    'MAX_PENDING': 1000,
+}
+
 
 
 # Updated REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',  # Add JWT auth
+        'authentication.authentication.ProfileJWTAuthentication',  # JWT auth, loads user + profile in one query
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',  # Changed from AllowAny to require auth by default
@@ -121,11 +140,14 @@ CORS_ALLOW_ALL_ORIGINS = True
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',        # Keep CORS first
+    'server.instrumentation.InstrumentationMiddleware',  # Server-Timing, request logs, /api/admin/metrics/
+    'server.throttling.ThrottleMiddleware',          # 429s before auth, queries or password hashing
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',    # Removed duplicate
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'server.db_router.ReplicaRoutingMiddleware',    # Read replicas, read-your-writes
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -154,11 +176,38 @@ WSGI_APPLICATION = 'server.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# DATABASE_URL selects the primary (SQLite by default). DATABASE_REPLICA_URLS
+# is an optional comma-separated list of read replicas; server.db_router
+# sends the reads of GET requests to them (see READ_REPLICAS below).
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+    'default': dj_database_url.config(default=f'sqlite:///{BASE_DIR / "db.sqlite3"}', conn_max_age=600),
+}
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Concurrent writers queue for the write lock (taken when a transaction
+    # starts) instead of failing with "database is locked"
+    DATABASES['default']['OPTIONS'] = {
+        **DATABASES['default'].get('OPTIONS', {}), 'timeout': 20, 'transaction_mode': 'IMMEDIATE',
+    }
+    # A file rather than shared-cache memory, so the concurrency tests'
+    # threads write through connections of their own
+    DATABASES['default']['TEST'] = {'NAME': str(BASE_DIR / 'test_db.sqlite3')}
+for number, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    DATABASES[f'replica_{number}'] = {
+        **dj_database_url.parse(url.strip(), conn_max_age=600),
+        'TEST': {'MIRROR': 'default'},
     }
+
+DATABASE_ROUTERS = ['server.db_router.ReplicaRouter']
+
+# Read replica routing (server.db_router). A client that writes reads from
+# the primary for the next PIN_SECONDS; replicas are health-checked every
+# HEALTH_CHECK_INTERVAL seconds and skipped when down or (PostgreSQL) more
+# than MAX_LAG_SECONDS behind
+READ_REPLICAS = {
+    'ALIASES': [alias for alias in DATABASES if alias != 'default'],
+    'PIN_SECONDS': 5,
+    'HEALTH_CHECK_INTERVAL': 10,
+    'MAX_LAG_SECONDS': 30,
 }
 # import dj_database_url
 # import os
@@ -183,6 +232,151 @@ DATABASES = {
 
 
 
+# Caching - Redis when REDIS_URL is set, per-process local memory otherwise
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'kipsunya',
+        }
+    }
+
+# Refresh-token blacklist checks (authentication.tokens): the shared cache
+# with Redis, an in-process bloom filter over the table otherwise
+TOKEN_BLACKLIST = {
+    'BACKEND': 'cache' if REDIS_URL else 'bloom',
+    'SYNC_INTERVAL': 1.0,
+    'PRUNE_BATCH_SIZE': 5000,
+}
+
+# Rate limits and load shedding (server.throttling): sliding windows per
+# client address, per account and across all clients, counted in Redis
+# when REDIS_URL is set. A password check costs ~0.3-0.6s of a core, so
+# size the login/register 'global' rates to the cores serving them.
+# THROTTLE_NUM_PROXIES: proxies in front of the app whose X-Forwarded-For to trust
+THROTTLING = {
+    'ENABLED': os.environ.get('THROTTLING_ENABLED', '1') == '1',
+    'BACKEND': 'redis' if REDIS_URL else 'local',
+    'REDIS_URL': REDIS_URL,
+    'NUM_PROXIES': int(os.environ.get('THROTTLE_NUM_PROXIES', '0')),
+    'SCOPES': {
+        'login': {'routes': ['api/auth/login/', 'api/auth/token/'],
+                  'ip': '20/min', 'account': '10/min', 'global': os.environ.get('THROTTLE_LOGIN_RATE', '20/s')},
+        'register': {'routes': ['api/auth/register/'],
+                     'ip': '10/hour', 'global': os.environ.get('THROTTLE_REGISTER_RATE', '10/s')},
+        'refresh': {'routes': ['api/auth/refresh/'], 'ip': '120/min'},
+        'catalogue': {'routes': ['api/all_products/', 'api/featured/', 'api/products/<int:id>/',
+                                 'api/product/<slug:slug>/', 'api/categories/list/'],
+                      'ip': '1200/min'},
+    },
+}
+
+# Public catalogue response cache (see products/cache.py)
+CATALOGUE_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 60,  # also bounds staleness of buffered view counts
+    'KEY_PREFIX': 'catalogue',
+}
+
+# Serve the public catalogue reads with async views (products.async_views).
+# server/asgi.py turns this on; WSGI servers keep the DRF views
+ASYNC_CATALOGUE_VIEWS = os.environ.get('ASYNC_CATALOGUE_VIEWS') == '1'
+
+# Materialized admin dashboard stats (admin_panel.stats); snapshots older
+# than MAX_AGE seconds are recomputed by refresh_dashboard_stats
+DASHBOARD_STATS = {
+    'MAX_AGE': 300,
+}
+
+# Daily product activity rollups (analytics.rollup); daily rows older than
+# RETENTION_DAYS are folded into monthly rows by compact_analytics
+ANALYTICS = {
+    'RETENTION_DAYS': 120,
+}
+
+# Server-side carts (cart.storage); a Redis hash per cart when REDIS_URL is
+# set, CartItem rows otherwise. Guest carts expire after ANONYMOUS_TTL seconds
+CART = {
+    'BACKEND': 'redis' if REDIS_URL else 'database',
+    'REDIS_URL': REDIS_URL,
+    'ANONYMOUS_TTL': 60 * 60 * 24 * 30,
+}
+
+# Background tasks (celery -A server worker). Redis is the broker when
+# REDIS_URL is set; without one, notifications.metrics.enqueue() runs jobs
+# on a background thread of the web process. Tasks run inline (eagerly)
+# only under `manage.py test` or with CELERY_TASK_ALWAYS_EAGER=1.
+CELERY_BROKER_URL = REDIS_URL
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER') == '1' or sys.argv[1:2] == ['test']
+CELERY_TASK_IGNORE_RESULT = True
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+
+# Outgoing mail (notifications.mail); messages are sent in batches of
+# BATCH_SIZE over one SMTP connection per background job
+NOTIFICATIONS = {
+    'BATCH_SIZE': 100,
+    'ADMIN_RECIPIENTS': [
+        address.strip()
+        for address in os.environ.get('ADMIN_NOTIFICATION_EMAILS', 'admin@kipsunya.com,vendors@kipsunya.com').split(',')
+        if address.strip()
+    ],
+}
+
+# Product image variants (products.images): resized copies rendered in the
+# background after upload, one per width and format. CARD_WIDTH picks the
+# variant served as `thumbnail` on listing cards.
+PRODUCT_IMAGES = {
+    'WIDTHS': (160, 320, 640, 1280),
+    'FORMATS': ('webp', 'jpeg'),
+    'QUALITY': 80,
+    'CARD_WIDTH': 320,
+}
+
+# Per-request instrumentation (server.instrumentation): Server-Timing
+# headers, a JSON log line per request and per-route metrics at
+# /api/admin/metrics/. Requests over their route's query budget (or slower
+# than SLOW_REQUEST_MS) are logged as warnings and counted.
+INSTRUMENTATION = {
+    'ENABLED': os.environ.get('INSTRUMENTATION_ENABLED', '1') == '1',
+    'QUERY_BUDGET': 20,
+    'QUERY_BUDGETS': {
+        'api/admin/dashboard-stats/': 12,   # a first load or ?fresh=1 recomputes the snapshots
+        'api/all_products/': 8,   # 5, plus up to 3 when ?facets= counts aren't cached
+        'api/products/<int:id>/': 5,
+    },
+    'SLOW_REQUEST_MS': 1000,
+    'FLUSH_INTERVAL': 10,
+}
+
+# Request log lines go to the console; with DEBUG on (runserver already
+# prints requests) only budget/slow warnings are shown
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'server.instrumentation': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'WARNING' if DEBUG else 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
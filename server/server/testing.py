@@ -0,0 +1,30 @@
+# server/testing.py - Helpers shared by the apps' tests
+import threading
+
+from django.db import connection
+
+
+def race(*calls):
+    """
+    Call each function in a thread of its own, all released at once, and
+    return what each returned or raised, in order. Each thread closes its
+    database connection, so use it from a TransactionTestCase.
+    """
+    barrier = threading.Barrier(len(calls))
+    outcomes = [None] * len(calls)
+
+    def run(index, call):
+        try:
+            barrier.wait()
+            outcomes[index] = call()
+        except Exception as exc:  # returned for the test to assert on
+            outcomes[index] = exc
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(index, call)) for index, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
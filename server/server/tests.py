@@ -0,0 +1,282 @@
+import functools
+import json
+import re
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import OperationalError, router
+from django.http import JsonResponse
+from django.test import TestCase, override_settings
+from django.urls import include, path
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from products.models import Category, Product
+from products.serializers import CategorySerializer
+
+from . import db_router, instrumentation, throttling
+
+
+def read_view(request):
+    return JsonResponse({'read': router.db_for_read(Product)})
+
+
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def write_view(request):
+    return Response({'write': router.db_for_write(Product)})
+
+
+def flaky_view(request):
+    database = router.db_for_read(Product)
+    if database != 'default':
+        raise OperationalError('replica went away')
+    return JsonResponse({'read': database})
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def categories_view(request, page):
+    for _ in range(3):
+        list(Category.objects.all())
+    return Response(CategorySerializer(Category.objects.all(), many=True).data)
+
+
+async def async_count_view(request):
+    return JsonResponse({'products': await Product.objects.acount()})
+
+
+urlpatterns = [
+    path('read/', read_view),
+    path('write/', write_view),
+    path('flaky/', flaky_view),
+    path('categories/<int:page>/', categories_view),
+    path('async-count/', async_count_view),
+    path('api/', include('products.urls')),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__, READ_REPLICAS={'ALIASES': ['replica_1', 'replica_2'], 'PIN_SECONDS': 5})
+class ReplicaRoutingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        db_router._health.clear()
+        # TestCase wraps every test in a transaction, which keeps reads on the primary
+        for name, value in (('in_transaction', False), ('is_healthy', True)):
+            patcher = mock.patch.object(db_router, name, return_value=value)
+            self.addCleanup(patcher.stop)
+            patcher.start()
+
+    def read(self, **headers):
+        return self.client.get('/read/', headers=headers).json()['read']
+
+    def test_safe_requests_read_from_a_replica(self):
+        self.assertIn(self.read(), {'replica_1', 'replica_2'})
+
+    def test_writes_and_unsafe_requests_use_the_primary(self):
+        self.assertEqual(self.client.post('/write/').json()['write'], 'default')
+        self.client.cookies.clear()
+        with mock.patch.object(db_router, 'choose_replica') as choose:
+            self.client.post('/read/')
+        choose.assert_not_called()
+
+    def test_reads_outside_requests_and_in_transactions_use_the_primary(self):
+        self.assertEqual(router.db_for_read(Product), 'default')
+        with mock.patch.object(db_router, 'in_transaction', return_value=True):
+            self.assertEqual(self.read(), 'default')
+
+    def test_a_guest_that_writes_is_pinned_by_cookie(self):
+        response = self.client.post('/write/')
+        self.assertEqual(response.cookies['db_pin']['max-age'], 5)
+        self.assertEqual(self.read(), 'default')
+
+        self.client.cookies.clear()  # the cookie expired
+        self.assertNotEqual(self.read(), 'default')
+
+    def test_side_effect_writes_of_safe_requests_do_not_pin(self):
+        response = self.client.get('/write/')
+        self.assertEqual(response.json()['write'], 'default')
+        self.assertNotIn('db_pin', response.cookies)
+        self.assertNotEqual(self.read(), 'default')
+
+    def test_a_user_that_writes_is_pinned_across_clients(self):
+        user = User.objects.create_user(username='shopper@example.com')
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(user).access_token}'}
+        self.client.post('/write/', headers=headers)
+        self.client.cookies.clear()
+
+        self.assertEqual(self.read(**headers), 'default')
+        self.assertNotEqual(self.read(), 'default')
+        self.assertNotEqual(self.read(Authorization='Bearer not-a-token'), 'default')
+
+        cache.clear()  # the pin expired
+        self.assertNotEqual(self.read(**headers), 'default')
+
+    def test_unhealthy_replicas_are_skipped(self):
+        db_router.is_healthy.side_effect = lambda alias: alias == 'replica_2'
+        self.assertEqual({self.read() for _ in range(10)}, {'replica_2'})
+
+        db_router.is_healthy.side_effect = lambda alias: False
+        self.assertEqual(self.read(), 'default')
+
+    def test_a_replica_failing_mid_request_is_retried_on_the_primary(self):
+        with self.assertLogs('server.db_router', 'WARNING'):
+            response = self.client.get('/flaky/')
+        self.assertEqual(response.json()['read'], 'default')
+        self.assertEqual(len([alias for alias, (healthy, _) in db_router._health.items() if not healthy]), 1)
+
+
+@override_settings(READ_REPLICAS={'ALIASES': ['replica_1'], 'HEALTH_CHECK_INTERVAL': 60})
+class ReplicaHealthTests(TestCase):
+
+    def setUp(self):
+        db_router._health.clear()
+
+    def test_health_is_checked_once_per_interval(self):
+        with mock.patch.object(db_router, 'check_replica', return_value=False) as check:
+            self.assertEqual(db_router.replica_status(), {'replica_1': False})
+            self.assertEqual(db_router.choose_replica(), 'default')
+        self.assertEqual(check.call_count, 1)
+
+    def test_missing_database_counts_as_down(self):
+        with self.assertLogs('server.db_router', 'WARNING'):
+            self.assertFalse(db_router.check_replica('replica_1', max_lag=30))
+
+    def test_replicas_are_never_migrated(self):
+        self.assertFalse(router.allow_migrate('replica_1', 'products'))
+        self.assertTrue(router.allow_migrate('default', 'products'))
+
+
+@override_settings(ROOT_URLCONF=__name__, INSTRUMENTATION={
+    'QUERY_BUDGET': 10, 'QUERY_BUDGETS': {'categories/<int:page>/': 3}, 'FLUSH_INTERVAL': 0,
+})
+class InstrumentationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        Category.objects.create(name='Kitchen', slug='kitchen')
+
+    def timings(self, response):
+        return {name: float(duration) for name, duration in re.findall(r'(\w+);dur=([\d.]+)', response['Server-Timing'])}
+
+    def test_server_timing_reports_queries_db_serializer_and_total_time(self):
+        with self.assertLogs('server.instrumentation', 'WARNING') as logs:
+            response = self.client.get('/categories/1/')
+        self.assertIn('desc="4 queries"', response['Server-Timing'])
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {'db', 'serializer', 'total'})
+        self.assertGreater(timings['serializer'], 0)
+        self.assertGreaterEqual(timings['total'], timings['db'])
+
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['route'], line['queries'], line['query_budget']), ('categories/<int:page>/', 4, 3))
+
+    def test_listing_serializer_time_is_reported(self):
+        category = Category.objects.get(slug='kitchen')
+        Product.objects.bulk_create([Product(name=f'Kettle {i}', slug=f'kettle-{i}', category=category,
+                                             price=Decimal('10.00')) for i in range(20)])
+        self.assertGreater(self.timings(self.client.get('/api/all_products/'))['serializer'], 0)
+
+    def test_within_budget_logs_at_info(self):
+        with self.assertLogs('server.instrumentation', 'INFO') as logs:
+            self.client.get('/read/')
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual(json.loads(logs.records[0].getMessage())['route'], 'read/')
+
+    def test_queries_in_async_views_are_counted(self):
+        response = self.client.get('/async-count/')
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+    def test_prometheus_histograms_per_route(self):
+        with self.assertLogs('server.instrumentation', 'WARNING'):
+            self.client.get('/categories/1/')
+            self.client.get('/categories/2/')
+        self.client.get('/read/')
+        self.client.get('/missing/')
+
+        metrics = instrumentation.prometheus_metrics()
+        self.assertIn('http_requests_total{route="categories/<int:page>/"} 2', metrics)
+        self.assertIn('http_request_query_budget_exceeded_total{route="categories/<int:page>/"} 2', metrics)
+        self.assertIn('http_request_query_budget_exceeded_total{route="read/"} 0', metrics)
+        self.assertIn('http_route_query_budget{route="categories/<int:page>/"} 3', metrics)
+        self.assertIn('http_request_queries_bucket{route="categories/<int:page>/",le="5"} 2', metrics)
+        self.assertIn('http_request_queries_bucket{route="categories/<int:page>/",le="2"} 0', metrics)
+        self.assertIn('http_request_duration_seconds_bucket{route="read/",le="+Inf"} 1', metrics)
+        self.assertIn('http_request_duration_seconds_count{route="<unmatched>"} 1', metrics)
+        self.assertNotIn('flaky/', metrics)
+
+
+LOGIN_LIMITS = {
+    'NUM_PROXIES': 1,
+    'SCOPES': {'login': {'routes': ['api/auth/login/'], 'ip': '3/min', 'account': '5/min', 'global': '8/min'}},
+}
+
+
+@override_settings(THROTTLING=LOGIN_LIMITS)
+class ThrottleTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(throttling, '_store', throttling.LocalThrottleStore())
+        self.addCleanup(patcher.stop)
+        self.store = patcher.start()
+        User.objects.create_user(username='shopper@example.com', email='shopper@example.com', password='pass12345')
+
+    def login(self, address, email='shopper@example.com', password='wrong-password'):
+        return self.client.post('/api/auth/login/', json.dumps({'email': email, 'password': password}),
+                                content_type='application/json', HTTP_X_FORWARDED_FOR=address)
+
+    def test_sliding_window_weights_the_previous_window(self):
+        check = functools.partial(throttling.check, self.store, 'key', '4/min')
+        self.assertEqual([check(now) for now in (0, 10, 20, 30)], [None] * 4)
+        self.assertEqual(check(40), 35)                 # 4 * 15/60 + 1 fits at 75
+        self.assertEqual(check(74), 1)                  # rejected hits aren't counted...
+        self.assertIsNone(check(75))
+        self.assertEqual(check(76), 14)                 # ...only those let through
+        self.assertIsNone(check(90))
+
+    def test_over_the_limit_is_rejected_before_any_query_or_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login('203.0.113.1').status_code, 401)
+        with mock.patch('authentication.views.authenticate') as authenticate, self.assertNumQueries(0):
+            response = self.login('203.0.113.1')
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        # Other addresses are unaffected
+        self.assertEqual(self.login('203.0.113.2', password='pass12345').status_code, 200)
+
+    def test_an_account_is_limited_across_addresses(self):
+        statuses = [self.login(f'198.51.100.{number}').status_code for number in range(6)]
+        self.assertEqual(statuses, [401] * 5 + [429])
+        self.assertEqual(self.login('198.51.100.99', email='other@example.com').status_code, 401)
+
+    def test_a_rejection_is_not_counted_against_earlier_limits(self):
+        for number in range(5):
+            self.login(f'198.51.100.{number}')
+        self.assertEqual(self.login('203.0.113.1').status_code, 429)  # the account is locked
+        statuses = [self.login('203.0.113.1', email=f'guess{number}@example.com').status_code for number in range(4)]
+        self.assertEqual(statuses, [401] * 3 + [429])
+
+    def test_global_limit_sheds_load_from_every_address(self):
+        statuses = [self.login(f'192.0.2.{number}', email=f'guess{number}@example.com').status_code
+                    for number in range(10)]
+        self.assertEqual(statuses, [401] * 8 + [429] * 2)
+
+    def test_routes_outside_every_scope_are_not_counted(self):
+        for _ in range(5):
+            self.client.get('/api/categories/list/', HTTP_X_FORWARDED_FOR='203.0.113.1')
+        self.assertEqual(self.store.counts, {})
+
+    def test_redis_failure_falls_back_to_local_counters(self):
+        store = throttling.RedisThrottleStore('redis://127.0.0.1:1/0', 'test', 0.05, 60)
+        with self.assertLogs('server.throttling', 'WARNING'):
+            self.assertEqual(store.hit('key', 60, 0), (1, 0))
+        # Not retried until RETRY_REDIS_AFTER has passed
+        with mock.patch.object(store.client, 'pipeline') as pipeline:
+            self.assertEqual(store.hit('key', 60, 1), (2, 0))
+        pipeline.assert_not_called()
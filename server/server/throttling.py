@@ -0,0 +1,289 @@
+# server/throttling.py - Sliding-window rate limits and load shedding
+"""
+ThrottleMiddleware answers requests over a limit with a 429 and a
+Retry-After header before the view runs: no authentication, no database
+query, no password hashing. Limits are grouped into scopes
+(THROTTLING['SCOPES']), each listing the routes it covers (as
+ResolverMatch.route spells them, like INSTRUMENTATION's QUERY_BUDGETS) and
+up to three limits:
+
+- 'ip':      per client address (REMOTE_ADDR, or the X-Forwarded-For entry
+             added by the nearest of NUM_PROXIES trusted proxies)
+- 'account': per account named in the request body (login's email, the
+             token endpoint's username), however many addresses the
+             guesses come from
+- 'global':  across every client, shedding load on expensive routes: it
+             caps the password hashes per second the servers will attempt
+
+Rates are written like DRF's, e.g. '20/min'. Each limit is a sliding
+window counter: this fixed window's count plus the previous window's,
+weighted by how much of it still overlaps the window ending now. That is
+one INCR per limit per request, all of them undone if any limit rejects
+the request: only requests let through count, so a flood above a global limit still lets
+that limit's worth through rather than starving everyone. Limits are
+checked ip, account, global, stopping at the first exceeded, so a single
+flooding address uses up its own budget rather than everyone's, and an
+account locked by guesses from elsewhere doesn't use up this address's.
+
+Counters live in Redis when BACKEND is 'redis', so every worker shares
+them, and in process memory otherwise. If Redis fails or is slower than
+REDIS_TIMEOUT the in-process counters take over for RETRY_REDIS_AFTER
+seconds.
+"""
+import hashlib
+import json
+import logging
+import math
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'BACKEND': 'local',
+    'REDIS_URL': None,
+    'KEY_PREFIX': 'throttle',
+    'REDIS_TIMEOUT': 0.1,           # seconds
+    'RETRY_REDIS_AFTER': 5,         # seconds on in-process counters after a Redis failure
+    'NUM_PROXIES': 0,               # trusted proxies in front of the app; 0 uses REMOTE_ADDR
+    'ACCOUNT_FIELDS': ('email', 'username'),
+    'SCOPES': {},                   # name -> {'routes': [...], 'ip': rate, 'account': rate, 'global': rate}
+}
+
+LIMITS = ('ip', 'account', 'global')
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def _config():
+    return {**DEFAULTS, **getattr(settings, 'THROTTLING', {})}
+
+
+def parse_rate(rate):
+    """'20/min' -> (20, 60)"""
+    count, _, period = rate.partition('/')
+    return int(count), PERIODS[period.strip()[0]]
+
+
+class LocalThrottleStore:
+    """Window counters in this process's memory"""
+
+    PRUNE_EVERY = 10000   # hits between sweeps of expired windows
+
+    def __init__(self):
+        self.counts = {}    # (key, window, index) -> hits
+        self.lock = threading.Lock()
+        self.hits = 0
+
+    def hit(self, key, window, now):
+        """Count a hit; returns (hits in this window, hits in the previous one)"""
+        index = int(now // window)
+        with self.lock:
+            current = self.counts[key, window, index] = self.counts.get((key, window, index), 0) + 1
+            previous = self.counts.get((key, window, index - 1), 0)
+            self.hits += 1
+            if self.hits % self.PRUNE_EVERY == 0:
+                self.prune(now)
+        return current, previous
+
+    def undo(self, key, window, now):
+        index = int(now // window)
+        with self.lock:
+            if self.counts.get((key, window, index)):
+                self.counts[key, window, index] -= 1
+
+    def prune(self, now):
+        for key, window, index in list(self.counts):
+            if (index + 2) * window <= now:
+                del self.counts[key, window, index]
+
+
+class RedisThrottleStore:
+    """Window counters in Redis, shared by every worker; in-process while Redis is unavailable"""
+
+    def __init__(self, url, key_prefix, timeout, retry_after):
+        import redis
+
+        self.errors = (redis.RedisError, OSError)
+        self.client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self.key_prefix = key_prefix
+        self.retry_after = retry_after
+        self.fallback = LocalThrottleStore()
+        self.down_until = 0.0
+
+    def hit(self, key, window, now):
+        if time.monotonic() < self.down_until:
+            return self.fallback.hit(key, window, now)
+        index = int(now // window)
+        current_key = f'{self.key_prefix}:{key}:{window}:{index}'
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.incr(current_key)
+            pipe.expire(current_key, window * 2)
+            pipe.get(f'{self.key_prefix}:{key}:{window}:{index - 1}')
+            current, _, previous = pipe.execute()
+        except self.errors as exc:
+            logger.warning('Throttle counters unavailable (%s); counting in-process for %ss', exc, self.retry_after)
+            self.down_until = time.monotonic() + self.retry_after
+            return self.fallback.hit(key, window, now)
+        return current, int(previous or 0)
+
+    def undo(self, key, window, now):
+        if time.monotonic() < self.down_until:
+            return self.fallback.undo(key, window, now)
+        try:
+            self.client.decr(f'{self.key_prefix}:{key}:{window}:{int(now // window)}')
+        except self.errors:
+            pass
+
+
+_store = None
+
+
+def get_throttle_store():
+    """Return the process-wide store configured by settings.THROTTLING"""
+    global _store
+    if _store is None:
+        config = _config()
+        if config['BACKEND'] == 'redis':
+            _store = RedisThrottleStore(config['REDIS_URL'], config['KEY_PREFIX'],
+                                        config['REDIS_TIMEOUT'], config['RETRY_REDIS_AFTER'])
+        elif config['BACKEND'] == 'local':
+            _store = LocalThrottleStore()
+        else:
+            raise ValueError(f"Unknown THROTTLING backend: {config['BACKEND']}")
+    return _store
+
+
+def retry_after(allowed, previous, limit, window, offset):
+    """Seconds until one more request would fit under limit"""
+    if allowed < limit:
+        # Once enough of the previous window has slid out of view
+        return window * (1 - (limit - 1 - allowed) / previous) - offset
+    # In the next window, once enough of this one has slid out of view
+    return window - offset + window * max(0.0, 1 - (limit - 1) / allowed)
+
+
+def check(store, key, rate, now):
+    """Count a hit against key; None if within rate, else seconds to wait (and the hit is not counted)"""
+    limit, window = parse_rate(rate)
+    current, previous = store.hit(key, window, now)
+    offset = now % window
+    if previous * (1 - offset / window) + current <= limit:
+        return None
+    store.undo(key, window, now)
+    return max(1, math.ceil(retry_after(current - 1, previous, limit, window, offset)))
+
+
+def client_address(request, num_proxies):
+    if num_proxies:
+        forwarded = [address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+        if len(forwarded) >= num_proxies and forwarded[-num_proxies]:
+            return forwarded[-num_proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def account_of(request, fields):
+    """The account a login-style request names, normalized; None if it names none"""
+    if request.content_type in ('application/x-www-form-urlencoded', 'multipart/form-data'):
+        data = request.POST
+    else:
+        # As the login view reads it, whatever the Content-Type says
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return None
+    if not hasattr(data, 'get'):
+        return None
+    for field in fields:
+        value = data.get(field)
+        if isinstance(value, str) and value.strip():
+            return value.strip().lower()
+    return None
+
+
+def scope_for(route, config):
+    for name, scope in config['SCOPES'].items():
+        if route in scope['routes']:
+            return name, scope
+    return None, None
+
+
+def throttle(request, config, store=None, now=None):
+    """(scope, limit, seconds to wait) for the first limit request exceeds, or None"""
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return None
+    # Lets instrumentation file a 429 under its route
+    request.resolver_match = match
+    name, scope = scope_for(match.route, config)
+    if scope is None:
+        return None
+    store = store or get_throttle_store()
+    now = time.time() if now is None else now
+    counted = []    # (key, window) of the limits already let through
+    for limit in LIMITS:
+        if limit not in scope:
+            continue
+        if limit == 'ip':
+            key = f'{name}:ip:{client_address(request, config["NUM_PROXIES"])}'
+        elif limit == 'account':
+            account = account_of(request, config['ACCOUNT_FIELDS'])
+            if account is None:
+                continue
+            key = f'{name}:account:{hashlib.sha256(account.encode()).hexdigest()[:32]}'
+        else:
+            key = f'{name}:global'
+        wait = check(store, key, scope[limit], now)
+        if wait is not None:
+            for earlier in counted:
+                store.undo(*earlier, now)
+            return name, limit, wait
+        counted.append((key, parse_rate(scope[limit])[1]))
+    return None
+
+
+def throttled_response(wait):
+    response = JsonResponse({'detail': f'Request was throttled. Expected available in {wait} seconds.'}, status=429)
+    response['Retry-After'] = str(wait)
+    return response
+
+
+class ThrottleMiddleware:
+    """Rejects requests over their scope's limits; see module docstring"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not _config()['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        throttled = throttle(request, _config())
+        if throttled is not None:
+            return throttled_response(throttled[2])
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        config = _config()
+        if isinstance(get_throttle_store(), LocalThrottleStore):
+            throttled = throttle(request, config)
+        else:
+            throttled = await sync_to_async(throttle, thread_sensitive=False)(request, config)
+        if throttled is not None:
+            return throttled_response(throttled[2])
+        return await self.get_response(request)
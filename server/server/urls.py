@@ -25,6 +25,8 @@ urlpatterns = [
     path('api/', include('products.urls')),
     path('api/auth/', include('authentication.urls')),
     path('api/admin/', include('admin_panel.urls')),
+    path('api/cart/', include('cart.urls')),
+    path('api/', include('orders.urls')),
 ]
 
 # Serve media files in development